@@ -5,17 +5,17 @@ Dashboard para monitorar performance, acurácia e retreinar modelo
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 from datetime import datetime, timedelta
 import joblib
 import json
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, RandomizedSearchCV
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import time
+from vetlib.boosting import MOTORES_BOOSTING
+from vetlib.jobs import FilaJobs
+from vetlib.modeling import salvar_modelo as salvar_modelo_app
+from vetlib.streaming import MODELOS_STREAMING, treinar_modelo_streaming
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -75,11 +75,11 @@ def carregar_dados_reais():
         data_path = Path("data")
         if not data_path.exists():
             return None
-            
+        
         csv_files = list(data_path.glob("*.csv"))
         if not csv_files:
             return None
-            
+        
         # Priorizar datasets específicos
         datasets_prioritarios = [
             'veterinary_complete_real_dataset.csv',
@@ -95,12 +95,12 @@ def carregar_dados_reais():
                 df = pd.read_csv(dataset_path)
                 if len(df) > 0:
                     return df, dataset_name
-                    
+        
         # Se não encontrar os prioritários, usar qualquer CSV
         if csv_files:
             df = pd.read_csv(csv_files[0])
             return df, csv_files[0].name
-            
+        
         return None
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
@@ -245,130 +245,125 @@ elif pagina == "🤖 Treinar Modelo":
         use_advanced_features = st.checkbox("🔧 Feature Engineering Avançado", value=True)
         use_feature_selection = st.checkbox("🎯 Seleção de Features", value=True)
         test_size = st.slider("📊 Tamanho do Teste", 0.1, 0.4, 0.2, 0.05)
+        motor = st.selectbox(
+            "🌲 Motor de Boosting", MOTORES_BOOSTING,
+            format_func={'exato': 'Exato (GradientBoosting)', 'histograma': 'Histograma (multi-núcleo, faltantes nativos)'}.get,
+            help="O motor histograma discretiza as features, usa todos os núcleos e para sozinho quando a validação interna deixa de melhorar"
+        )
     
     with col2:
         use_hyperparameter_tuning = st.checkbox("⚙️ Otimização de Hiperparâmetros", value=True)
         cv_folds = st.slider("🔄 Validação Cruzada (folds)", 3, 10, 5)
         random_state = st.number_input("🎲 Random State", 1, 1000, 42)
     
-    # Botão para treinar
+    # Compressão pós-treino
+    gerar_compacto = st.checkbox("📦 Gerar versão compacta (destilação/truncagem)", value=False)
+    if gerar_compacto:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            latencia_max_ms = st.number_input("⏱️ Latência máxima (ms/caso)", 0.1, 1000.0, 5.0, 0.5)
+        with col2:
+            tamanho_max_mb = st.number_input("💾 Tamanho máximo (MB)", 0.1, 5000.0, 20.0, 1.0)
+        with col3:
+            tolerancia_acuracia = st.slider("🎯 Perda máxima de acurácia", 0.0, 0.1, 0.01, 0.005)
+    
+    fila_jobs = FilaJobs()
+    
+    # Botão para treinar: o treino roda num processo separado (vetlib.jobs)
     if st.button("🚀 Treinar Modelo", type="primary", use_container_width=True):
+        if st.session_state.get('job_gerencial') is not None:
+            st.warning("⚠️ Já existe um treinamento em andamento nesta sessão")
+        else:
+            st.session_state.job_gerencial = fila_jobs.submeter(
+                'vetlib.training_jobs:treinar_gradient_boosting',
+                {
+                    'df': df,
+                    'use_advanced_features': use_advanced_features,
+                    'use_feature_selection': use_feature_selection,
+                    'test_size': test_size,
+                    'use_hyperparameter_tuning': use_hyperparameter_tuning,
+                    'cv_folds': cv_folds,
+                    'random_state': random_state,
+                    'gerar_compacto': gerar_compacto,
+                    'latencia_max_ms': latencia_max_ms if gerar_compacto else None,
+                    'tamanho_max_mb': tamanho_max_mb if gerar_compacto else None,
+                    'tolerancia_acuracia': tolerancia_acuracia if gerar_compacto else 0.01,
+                    'motor': motor,
+                    'n_jobs': -1
+                },
+                descricao=f"Gradient Boosting ({motor}) - {dataset_name}"
+            )
+    
+    # Acompanhamento do job
+    job_gerencial = st.session_state.get('job_gerencial')
+    resultado = None
+    
+    if job_gerencial is not None:
+        estado_job = fila_jobs.estado(job_gerencial)
         
-        with st.spinner("🔄 Preparando dados..."):
-            # Preparar dados
-            df_ml = df.copy()
-            
-            # Codificação
-            le_especie = LabelEncoder()
-            le_sexo = LabelEncoder()
-            le_diagnostico = LabelEncoder()
-            
-            if 'especie' in df_ml.columns:
-                df_ml['especie_encoded'] = le_especie.fit_transform(df_ml['especie'])
-            if 'sexo' in df_ml.columns:
-                df_ml['sexo_encoded'] = le_sexo.fit_transform(df_ml['sexo'])
-            df_ml['diagnostico_encoded'] = le_diagnostico.fit_transform(df_ml['diagnostico'])
-            
-            # Feature engineering
-            if use_advanced_features:
-                # Criar features derivadas
-                if 'idade_anos' in df_ml.columns:
-                    df_ml['idade_categoria'] = pd.cut(df_ml['idade_anos'], bins=[0, 1, 3, 7, 12, 100], labels=[0, 1, 2, 3, 4])
-                    df_ml['idade_senior'] = (df_ml['idade_anos'] > 7).astype(int)
-                
-                # Criar features de sintomas
-                sintoma_cols = [col for col in df_ml.columns if col in ['febre', 'apatia', 'perda_peso', 'vomito', 'diarreia', 'tosse', 'letargia', 'feridas_cutaneas', 'poliuria', 'polidipsia']]
-                if sintoma_cols:
-                    df_ml['total_sintomas'] = df_ml[sintoma_cols].sum(axis=1)
-            
-            # Selecionar features numéricas
-            numeric_cols = df_ml.select_dtypes(include=[np.number]).columns.tolist()
-            if 'diagnostico_encoded' in numeric_cols:
-                numeric_cols.remove('diagnostico_encoded')
+        if estado_job is None or estado_job['status'] == 'cancelado':
+            st.warning("⏹️ Treinamento cancelado")
+            st.session_state.job_gerencial = None
+        
+        elif estado_job['status'] == 'erro':
+            st.error(f"❌ Erro durante o treinamento: {estado_job.get('erro')}")
+            st.session_state.job_gerencial = None
+        
+        elif estado_job['status'] == 'concluido':
+            resultado = fila_jobs.resultado(job_gerencial)
+            st.session_state.job_gerencial = None
+        
+        else:
+            progresso_job = estado_job.get('progresso', {})
+            etapa = progresso_job.get('etapa') or 'aguardando vaga na fila'
+            if progresso_job.get('n_folds'):
+                etapa += (f" — candidato {progresso_job['candidato']}/{progresso_job['n_candidatos']},"
+                          f" fold {progresso_job['fold']}/{progresso_job['n_folds']}")
             
-            X = df_ml[numeric_cols].fillna(0)
-            y = df_ml['diagnostico_encoded']
+            st.progress(progresso_job.get('percentual', 0))
+            st.text(f"🔄 {etapa} ({estado_job['tempo_decorrido_s']:.0f}s)")
             
-            # Feature selection
-            if use_feature_selection:
-                from sklearn.feature_selection import SelectKBest, f_classif
-                k_best = min(30, X.shape[1])
-                selector = SelectKBest(score_func=f_classif, k=k_best)
-                X = selector.fit_transform(X, y)
-        
-        with st.spinner("🔄 Dividindo dados..."):
-            # Dividir dados
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=test_size, random_state=random_state, stratify=y
-            )
+            if st.button("⏹️ Cancelar Treinamento"):
+                fila_jobs.cancelar(job_gerencial)
+                st.session_state.job_gerencial = None
+                st.rerun()
             
-            # Escalar
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-        
-        with st.spinner("🔄 Treinando modelo..."):
-            # Configurar modelo
-            gb_params = {
-                'n_estimators': 1000,
-                'learning_rate': 0.01,
-                'max_depth': 12,
-                'min_samples_split': 2,
-                'min_samples_leaf': 1,
-                'subsample': 0.8,
-                'random_state': random_state
-            }
+            time.sleep(1.0)
+            st.rerun()
+    
+    if resultado is not None:
+        accuracy = resultado['accuracy']
+        cv_mean = resultado['cv_mean']
+        cv_std = resultado['cv_std']
+        
+        # Versão compacta dentro do orçamento
+        if 'relatorio_compressao' in resultado:
+            relatorio = resultado['relatorio_compressao']
             
-            # Otimização de hiperparâmetros
-            if use_hyperparameter_tuning:
-                param_grid = {
-                    'n_estimators': [800, 1000, 1200],
-                    'learning_rate': [0.005, 0.01, 0.02],
-                    'max_depth': [10, 12, 15],
-                    'subsample': [0.7, 0.8, 0.9]
-                }
+            if resultado['caminho_compacto'] is not None:
+                escolhido = relatorio['escolhido']
+                st.success(f"📦 Modelo compacto salvo em {resultado['caminho_compacto']} "
+                           f"({escolhido['metodo']} {escolhido['parametros']})")
                 
-                gb_base = GradientBoostingClassifier(random_state=random_state)
-                random_search = RandomizedSearchCV(
-                    gb_base, param_grid, n_iter=15, cv=cv_folds, 
-                    scoring='accuracy', random_state=random_state, n_jobs=-1
-                )
-                random_search.fit(X_train_scaled, y_train)
-                gb_params.update(random_search.best_params_)
-            
-            # Treinar modelo final
-            gb_model = GradientBoostingClassifier(**gb_params)
-            gb_model.fit(X_train_scaled, y_train)
-            
-            # Predições
-            y_pred = gb_model.predict(X_test_scaled)
-            accuracy = accuracy_score(y_test, y_pred)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("🎯 Acurácia compacta (teste)", f"{escolhido['accuracy_teste']:.1%}",
+                              f"{escolhido['delta_acuracia_teste']:+.1%}")
+                with col2:
+                    st.metric("⚡ Speedup", f"{escolhido['speedup']:.1f}x",
+                              f"{escolhido['latencia_ms']:.2f} ms/caso")
+                with col3:
+                    st.metric("💾 Tamanho", f"{escolhido['tamanho_mb']:.1f} MB",
+                              f"{escolhido['reducao_tamanho']:.1f}x menor")
+            else:
+                st.warning("⚠️ Nenhum candidato atendeu ao orçamento dentro da tolerância de acurácia")
             
-            # Validação cruzada
-            cv_scores = cross_val_score(gb_model, X_train_scaled, y_train, cv=cv_folds)
-            cv_mean = cv_scores.mean()
-            cv_std = cv_scores.std()
-        
-        # Salvar modelo
-        with st.spinner("💾 Salvando modelo..."):
-            model_data = {
-                'model': gb_model,
-                'scaler': scaler,
-                'le_diagnostico': le_diagnostico,
-                'le_especie': le_especie,
-                'le_sexo': le_sexo,
-                'accuracy': accuracy,
-                'cv_mean': cv_mean,
-                'cv_std': cv_std,
-                'timestamp': datetime.now().isoformat(),
-                'training_samples': len(X_train),
-                'test_samples': len(X_test),
-                'features_used': numeric_cols[:X.shape[1]] if use_feature_selection else numeric_cols
-            }
-            
-            model_path = Path("models")
-            model_path.mkdir(exist_ok=True)
-            joblib.dump(model_data, model_path / "gb_optimized_model.pkl")
+            df_candidatos = pd.DataFrame(relatorio['candidatos'])
+            if not df_candidatos.empty:
+                df_candidatos['parametros'] = df_candidatos['parametros'].astype(str)
+            st.dataframe(df_candidatos, use_container_width=True)
+            st.caption(f"Candidatos comparados numa validação de {relatorio['n_validacao']} casos separada do treino; "
+                       f"a acurácia do escolhido é a do teste")
         
         # Mostrar resultados
         st.success("✅ Modelo treinado e salvo com sucesso!")
@@ -386,6 +381,56 @@ elif pagina == "🤖 Treinar Modelo":
             st.success(f"🎉 **META ALCANÇADA!** Acurácia de {accuracy:.1%} >= 85%!")
         else:
             st.warning(f"🎯 Meta: 85% | Atual: {accuracy:.1%} | Faltam: {(0.85-accuracy)*100:.1f}%")
+    
+    # Jobs recentes (todas as sessões desta máquina)
+    with st.expander("📋 Jobs de treinamento"):
+        jobs_recentes = fila_jobs.listar(limite=10)
+        st.caption(f"Até {fila_jobs.max_concorrentes} treinos simultâneos nesta máquina; os demais aguardam na fila.")
+        if jobs_recentes:
+            st.dataframe(
+                pd.DataFrame(jobs_recentes)[['id', 'descricao', 'status', 'tempo_decorrido_s']],
+                use_container_width=True
+            )
+    
+    # Treinamento out-of-core: histórico completo maior que a memória
+    st.markdown("---")
+    with st.expander("🌊 Treinamento Streaming (dados maiores que a memória)"):
+        st.caption("Lê o CSV em blocos, sem carregá-lo inteiro; o tamanho dos blocos sai do orçamento de memória.")
+        
+        caminho_streaming = st.text_input("📁 Arquivo CSV", value=str(Path("data") / dataset_name))
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            modelo_streaming = st.selectbox("🤖 Modelo", MODELOS_STREAMING)
+        with col2:
+            memoria_max_mb = st.number_input("💾 Memória máxima (MB)", 64, 65536, 512, 64)
+        with col3:
+            n_epocas = st.slider("🔁 Épocas", 1, 10, 3)
+        
+        if st.button("🌊 Treinar em Streaming", use_container_width=True):
+            if not Path(caminho_streaming).exists():
+                st.error(f"❌ Arquivo não encontrado: {caminho_streaming}")
+            else:
+                with st.spinner("🌊 Treinando em blocos..."):
+                    modelo, preprocessadores, feature_names, historico = treinar_modelo_streaming(
+                        caminho_streaming, nome_modelo=modelo_streaming, memoria_max_mb=memoria_max_mb,
+                        n_epocas=n_epocas, random_state=random_state, verbose=False
+                    )
+                    model_file = salvar_modelo_app(
+                        modelo, preprocessadores, feature_names, caminho_base='models/modelo_streaming'
+                    )
+                
+                st.success(f"✅ Modelo streaming salvo em {model_file}")
+                
+                metricas = historico['metricas_teste']
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("🎯 Acurácia", f"{metricas['accuracy']:.1%}" if metricas else "N/A")
+                with col2:
+                    st.metric("📊 F1 Macro", f"{metricas['f1_macro']:.3f}" if metricas else "N/A")
+                with col3:
+                    st.metric("📦 Linhas", f"{historico['n_linhas']:,}",
+                              f"blocos de {historico['tamanho_bloco']:,}")
 
 # Página: Analytics
 elif pagina == "📊 Analytics":
@@ -0,0 +1,157 @@
+"""
+Benchmark dos motores de gradient boosting dos scripts de produção
+Compara o motor exato (GradientBoosting) com o motor histograma
+(HistGradientBoosting) lado a lado, com a configuração fixa dos scripts
+(PARAMETROS_PADRAO): tempo de treino, iterações ajustadas, acurácia, F1 macro
+e latência de predição, no dataset real e em datasets sintéticos com o schema
+do app em várias escalas.
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import accuracy_score, f1_score
+
+from benchmark_modeling import gerar_dataset_sintetico, _commit_atual
+from vetlib.boosting import MOTORES_BOOSTING, PARAMETROS_PADRAO, criar_boosting, iteracoes_ajustadas
+from vetlib.pipeline import construir_features, selecionar_features
+
+DATASET_REAL = 'data/veterinary_complete_real_dataset.csv'
+
+
+def _dataset_sintetico(n_linhas, random_state=42):
+    """Dataset sintético com idades dentro das faixas de idade_categoria dos scripts"""
+    df = gerar_dataset_sintetico(n_linhas, random_state=random_state)
+    df['idade_anos'] = df['idade_anos'].clip(0.1, 99)
+    return df
+
+
+def medir_motor(df, motor, random_state=42, n_repeticoes=30):
+    """
+    Treina e avalia um motor como os scripts de produção (create_*.py)
+    
+    Args:
+        df: DataFrame com o histórico de casos (coluna diagnostico)
+        motor: 'exato' ou 'histograma'
+        random_state: Seed
+        n_repeticoes: Repetições para a mediana da latência de um caso
+    
+    Returns:
+        dict com tempos, iterações e métricas
+    """
+    features = construir_features(df)
+    selecao = selecionar_features(features['X'], features['y'], motor=motor, random_state=random_state)
+    X_train_scaled, X_test_scaled = selecao['X_train'], selecao['X_test']
+    y_train, y_test = selecao['y_train'], selecao['y_test']
+    
+    modelo = criar_boosting(motor, random_state=random_state, **PARAMETROS_PADRAO[motor])
+    
+    inicio = time.perf_counter()
+    modelo.fit(X_train_scaled, y_train)
+    tempo_treino = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    y_pred = modelo.predict(X_test_scaled)
+    tempo_predicao = time.perf_counter() - inicio
+    
+    caso = X_test_scaled[:1]
+    modelo.predict_proba(caso)  # aquecimento
+    tempos = []
+    for _ in range(n_repeticoes):
+        inicio = time.perf_counter()
+        modelo.predict_proba(caso)
+        tempos.append(time.perf_counter() - inicio)
+    
+    return {
+        'motor': motor,
+        'n_treino': len(X_train_scaled),
+        'n_features': X_train_scaled.shape[1],
+        'faltantes_pct': float(np.isnan(X_train_scaled).mean() * 100),
+        'tempo_treino_s': tempo_treino,
+        'iteracoes': iteracoes_ajustadas(modelo),
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'f1_macro': float(f1_score(y_test, y_pred, average='macro')),
+        'predicao_lote_ms_por_caso': tempo_predicao / len(X_test_scaled) * 1000,
+        'latencia_caso_ms': float(np.median(tempos) * 1000)
+    }
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de gradient boosting")
+    parser.add_argument('--dados', default=DATASET_REAL,
+                        help="CSV real a incluir (vazio para pular)")
+    parser.add_argument('--escalas', type=int, nargs='*', default=[10000, 100000],
+                        help="Números de linhas dos datasets sintéticos")
+    parser.add_argument('--motores', nargs='+', choices=MOTORES_BOOSTING, default=list(MOTORES_BOOSTING))
+    parser.add_argument('--saida', default=None,
+                        help="Arquivo JSON do relatório (padrão: benchmarks/boosting_<commit>.json)")
+    args = parser.parse_args()
+    
+    commit = _commit_atual()
+    
+    datasets = []
+    if args.dados and Path(args.dados).exists():
+        datasets.append((Path(args.dados).name, lambda: pd.read_csv(args.dados)))
+    for n_linhas in args.escalas:
+        datasets.append((f"sintetico_{n_linhas}", lambda n=n_linhas: _dataset_sintetico(n)))
+    
+    print("🚀 VETDIAGNOSIS AI - BENCHMARK DOS MOTORES DE BOOSTING")
+    print("=" * 50)
+    print(f"📊 {len(datasets)} datasets | commit {commit} | {os.cpu_count()} núcleos")
+    
+    resultados = []
+    for nome, carregar in datasets:
+        df = carregar()
+        print(f"\n📁 {nome} ({len(df):,} linhas)")
+        
+        for motor in args.motores:
+            resultado = {'dataset': nome, **medir_motor(df, motor)}
+            resultados.append(resultado)
+            print(f"   • {motor}: treino {resultado['tempo_treino_s']:.2f}s "
+                  f"({resultado['iteracoes']} iterações), acurácia {resultado['accuracy']:.4f}, "
+                  f"F1 {resultado['f1_macro']:.4f}, {resultado['latencia_caso_ms']:.2f} ms/caso")
+    
+    df_resultados = pd.DataFrame(resultados)
+    tabela = df_resultados.pivot(index='dataset', columns='motor',
+                                 values=['tempo_treino_s', 'accuracy', 'f1_macro'])
+    if set(args.motores) == set(MOTORES_BOOSTING):
+        tabela['speedup_treino'] = tabela[('tempo_treino_s', 'exato')] / tabela[('tempo_treino_s', 'histograma')]
+    
+    print("\n📈 Lado a lado:")
+    print(tabela.round(4).to_string())
+    
+    relatorio = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'n_cpus': os.cpu_count(),
+            'argumentos': vars(args)
+        },
+        'resultados': resultados
+    }
+    
+    saida = Path(args.saida or f"benchmarks/boosting_{commit or 'local'}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n✅ Relatório salvo em: {saida}")
+    
+    return 0
+
+if __name__ == "__main__":
+    exit_code = main()
+    exit(exit_code)
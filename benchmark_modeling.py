@@ -0,0 +1,396 @@
+"""
+Benchmark de treinamento do vetlib.modeling
+Mede fit, validação cruzada, busca de hiperparâmetros e predição de cada modelo
+disponível em datasets sintéticos com o schema do app (SCHEMA_COLUNAS), em
+várias escalas de linhas, features e núcleos. O relatório JSON pode ser
+comparado entre commits para detectar regressões de custo de treino.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from vetlib.data_io import SCHEMA_COLUNAS
+from vetlib.preprocessing import (
+    FAIXAS_REFERENCIA, preparar_features_target, criar_preprocessador, aplicar_preprocessamento
+)
+from vetlib.modeling import (
+    obter_modelos_disponiveis, criar_modelo_base, treinar_modelo, comparar_modelos
+)
+
+try:
+    import resource
+    RESOURCE_DISPONIVEL = True
+except ImportError:  # Windows
+    RESOURCE_DISPONIVEL = False
+
+ESCALAS_PADRAO = [1000, 10000, 100000, 1000000]
+
+DIAGNOSTICOS = [
+    'Doença Renal Crônica', 'Diabetes Mellitus', 'Hepatopatia', 'Anemia',
+    'Gastroenterite', 'Dermatite', 'Pneumonia', 'Hipertireoidismo'
+]
+
+# Exames deslocados (em desvios da faixa normal) em cada diagnóstico sintético
+SINAIS_DIAGNOSTICO = {
+    'Doença Renal Crônica': {'ureia': 2.5, 'creatinina': 2.5},
+    'Diabetes Mellitus': {'glicose': 3.0, 'colesterol': 1.0},
+    'Hepatopatia': {'alt': 2.5, 'fosfatase_alcalina': 2.0},
+    'Anemia': {'hemoglobina': -2.5, 'hematocrito': -2.5},
+    'Gastroenterite': {'leucocitos': 1.5, 'proteinas_totais': -1.0},
+    'Dermatite': {'eosinofilos': 2.0},
+    'Pneumonia': {'leucocitos': 2.0, 'temperatura_retal': 1.5},
+    'Hipertireoidismo': {'glicose': 0.8, 'alt': 1.0, 'pulso': 2.0}
+}
+
+SINTOMAS_DIAGNOSTICO = {
+    'Doença Renal Crônica': ['poliuria', 'polidipsia', 'apatia'],
+    'Diabetes Mellitus': ['poliuria', 'polidipsia', 'perda_peso'],
+    'Hepatopatia': ['vomito', 'apatia'],
+    'Anemia': ['letargia', 'apatia'],
+    'Gastroenterite': ['vomito', 'diarreia'],
+    'Dermatite': ['feridas_cutaneas'],
+    'Pneumonia': ['tosse', 'febre'],
+    'Hipertireoidismo': ['perda_peso', 'poliuria']
+}
+
+
+def gerar_dataset_sintetico(n_linhas, n_features_extras=0, random_state=42):
+    """
+    Gera um dataset com as colunas de SCHEMA_COLUNAS e sinal por diagnóstico
+    
+    Args:
+        n_linhas: Número de casos
+        n_features_extras: Exames adicionais de ruído (para escalar features)
+        random_state: Seed
+    
+    Returns:
+        DataFrame com identificação, exames, sintomas e diagnóstico
+    """
+    rng = np.random.RandomState(random_state)
+    
+    diagnostico = rng.choice(DIAGNOSTICOS, size=n_linhas)
+    especie = rng.choice(['Canina', 'Felina'], size=n_linhas, p=[0.6, 0.4])
+    
+    dados = {
+        'id': np.arange(n_linhas),
+        'data': '2024-01-01',
+        'especie': especie,
+        'raca': rng.choice(['SRD', 'Labrador', 'Poodle', 'Siamês', 'Persa'], size=n_linhas),
+        'idade_anos': np.round(rng.gamma(2.0, 3.0, size=n_linhas), 1),
+        'sexo': rng.choice(['M', 'F'], size=n_linhas)
+    }
+    
+    faixas = FAIXAS_REFERENCIA['Canina']
+    for exame in SCHEMA_COLUNAS['exames']:
+        minimo, maximo = faixas.get(exame, (50.0, 150.0))
+        centro = (minimo + maximo) / 2
+        desvio = (maximo - minimo) / 4
+        
+        deslocamento = np.zeros(n_linhas)
+        for diag, sinais in SINAIS_DIAGNOSTICO.items():
+            if exame in sinais:
+                deslocamento[diagnostico == diag] = sinais[exame]
+        
+        valores = centro + desvio * (rng.normal(size=n_linhas) + deslocamento)
+        valores[rng.rand(n_linhas) < 0.05] = np.nan  # exames não realizados
+        dados[exame] = np.round(valores, 2)
+    
+    for i in range(n_features_extras):
+        dados[f'exame_extra_{i}'] = np.round(rng.normal(100, 20, size=n_linhas), 2)
+    
+    for sintoma in SCHEMA_COLUNAS['sintomas']:
+        probabilidade = np.full(n_linhas, 0.1)
+        for diag, sintomas in SINTOMAS_DIAGNOSTICO.items():
+            if sintoma in sintomas:
+                probabilidade[diagnostico == diag] = 0.7
+        dados[sintoma] = (rng.rand(n_linhas) < probabilidade).astype(int)
+    
+    dados['diagnostico'] = diagnostico
+    
+    return pd.DataFrame(dados)
+
+
+def _rss_pico_mb():
+    """Pico de memória residente do processo (MB)"""
+    if not RESOURCE_DISPONIVEL:
+        return None
+    
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _cronometrar(resultados, fase, funcao):
+    """Executa funcao registrando tempo e pico de RSS acumulado da fase"""
+    inicio = time.perf_counter()
+    retorno = funcao()
+    resultados[fase] = {
+        'tempo_s': time.perf_counter() - inicio,
+        'rss_pico_mb': _rss_pico_mb()
+    }
+    return retorno
+
+
+def _preparar_caso(n_linhas, n_features_extras, random_state):
+    """Gera e pré-processa os dados de um caso (como a página de treino)"""
+    df = gerar_dataset_sintetico(n_linhas, n_features_extras, random_state)
+    X, y, _ = preparar_features_target(df)
+    y = pd.Series(LabelEncoder().fit_transform(y), index=y.index)
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=random_state, stratify=y
+    )
+    
+    preprocessadores = criar_preprocessador(X_train)
+    X_train_proc, preprocessadores = aplicar_preprocessamento(X_train, preprocessadores, fit=True)
+    X_test_proc, _ = aplicar_preprocessamento(X_test, preprocessadores, fit=False)
+    
+    return X_train_proc, X_test_proc, y_train, y_test
+
+
+def executar_caso(caso):
+    """
+    Executa um caso do benchmark (roda em um processo novo para isolar o RSS)
+    
+    Args:
+        caso: dict com modelo, n_linhas, n_features_extras, n_jobs, cv_folds,
+              executar_cv, executar_busca e random_state
+    
+    Returns:
+        dict com as medições de cada fase
+    """
+    fases = {}
+    rss_inicial = _rss_pico_mb()
+    
+    X_train, X_test, y_train, y_test = _cronometrar(
+        fases, 'preprocessamento',
+        lambda: _preparar_caso(caso['n_linhas'], caso['n_features_extras'], caso['random_state'])
+    )
+    
+    if caso['modelo'] == 'comparar_modelos':
+        _cronometrar(
+            fases, 'comparar_modelos',
+            lambda: comparar_modelos(X_train, y_train, X_test, y_test, n_jobs=caso['n_jobs'])
+        )
+    else:
+        n_jobs = caso['n_jobs']
+        
+        estimador = criar_modelo_base(caso['modelo'], random_state=caso['random_state'], n_jobs=n_jobs)
+        _cronometrar(fases, 'fit', lambda: estimador.fit(X_train, y_train))
+        
+        if caso['executar_cv']:
+            cv = StratifiedKFold(n_splits=caso['cv_folds'], shuffle=True, random_state=caso['random_state'])
+            _cronometrar(
+                fases, 'cv',
+                lambda: cross_val_score(clone(estimador), X_train, y_train, cv=cv,
+                                        scoring='f1_macro', n_jobs=n_jobs)
+            )
+        
+        if caso['executar_busca']:
+            _cronometrar(
+                fases, 'busca',
+                lambda: treinar_modelo(
+                    X_train, y_train, caso['modelo'], usar_grid_search=True,
+                    cv_folds=caso['cv_folds'], random_state=caso['random_state'], n_jobs=n_jobs
+                )
+            )
+        
+        _cronometrar(fases, 'predict_lote', lambda: estimador.predict_proba(X_test))
+        
+        x = X_test.iloc[[0]]
+        estimador.predict_proba(x)
+        tempos = []
+        for _ in range(20):
+            inicio = time.perf_counter()
+            estimador.predict_proba(x)
+            tempos.append(time.perf_counter() - inicio)
+        fases['predict_1_caso'] = {'tempo_s': float(np.median(tempos)), 'rss_pico_mb': _rss_pico_mb()}
+    
+    return {
+        'modelo': caso['modelo'],
+        'n_linhas': caso['n_linhas'],
+        'n_features': int(X_train.shape[1]),
+        'n_jobs': caso['n_jobs'],
+        'rss_inicial_mb': rss_inicial,
+        'fases': fases
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar_relatorios(relatorio_base, relatorio_novo, limiar=0.2, tempo_minimo_s=0.05):
+    """
+    Compara dois relatórios e aponta fases que ficaram mais lentas
+    
+    Args:
+        relatorio_base: Relatório de referência (dict)
+        relatorio_novo: Relatório atual (dict)
+        limiar: Aumento relativo de tempo considerado regressão (0.2 = 20%)
+        tempo_minimo_s: Fases mais rápidas que isso na base são ignoradas (ruído)
+    
+    Returns:
+        DataFrame com tempos, razão e coluna 'regressao'
+    """
+    def _indexar(relatorio):
+        linhas = {}
+        for r in relatorio['resultados']:
+            if 'erro' in r:
+                continue
+            for fase, medida in r['fases'].items():
+                chave = (r['modelo'], r['n_linhas'], r['n_features'], r['n_jobs'], fase)
+                linhas[chave] = medida['tempo_s']
+        return linhas
+    
+    base = _indexar(relatorio_base)
+    novo = _indexar(relatorio_novo)
+    
+    linhas = []
+    for chave in sorted(set(base) & set(novo), key=str):
+        razao = novo[chave] / base[chave] if base[chave] > 0 else np.nan
+        linhas.append({
+            'modelo': chave[0], 'n_linhas': chave[1], 'n_features': chave[2],
+            'n_jobs': chave[3], 'fase': chave[4],
+            'tempo_base_s': base[chave], 'tempo_novo_s': novo[chave], 'razao': razao,
+            'regressao': bool(base[chave] >= tempo_minimo_s and razao > 1 + limiar)
+        })
+    
+    return pd.DataFrame(linhas)
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de treinamento do vetlib.modeling")
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help="Números de linhas dos datasets sintéticos")
+    parser.add_argument('--features-extras', type=int, nargs='+', default=[0],
+                        help="Exames extras de ruído (escala de features)")
+    parser.add_argument('--n-jobs', type=int, nargs='+', default=[1, -1],
+                        help="Núcleos a testar (escala de núcleos)")
+    parser.add_argument('--modelos', nargs='+', default=None,
+                        help="Modelos a medir (padrão: todos de obter_modelos_disponiveis)")
+    parser.add_argument('--cv-folds', type=int, default=3)
+    parser.add_argument('--max-linhas-cv', type=int, default=100000,
+                        help="Acima disso a validação cruzada é pulada")
+    parser.add_argument('--max-linhas-busca', type=int, default=10000,
+                        help="Acima disso a busca de hiperparâmetros é pulada")
+    parser.add_argument('--max-linhas-comparacao', type=int, default=100000,
+                        help="Acima disso comparar_modelos é pulado")
+    parser.add_argument('--saida', default=None,
+                        help="Arquivo JSON do relatório (padrão: benchmarks/modeling_<commit>.json)")
+    parser.add_argument('--comparar', default=None,
+                        help="Relatório de referência para detectar regressões")
+    parser.add_argument('--limiar-regressao', type=float, default=0.2,
+                        help="Aumento relativo de tempo considerado regressão")
+    args = parser.parse_args()
+    
+    modelos = args.modelos or list(obter_modelos_disponiveis().keys())
+    commit = _commit_atual()
+    
+    casos = []
+    for n_linhas in args.escalas:
+        for n_features_extras in args.features_extras:
+            for n_jobs in args.n_jobs:
+                comuns = {
+                    'n_linhas': n_linhas, 'n_features_extras': n_features_extras,
+                    'n_jobs': n_jobs, 'cv_folds': args.cv_folds, 'random_state': 42,
+                    'executar_cv': n_linhas <= args.max_linhas_cv,
+                    'executar_busca': n_linhas <= args.max_linhas_busca
+                }
+                for modelo in modelos:
+                    casos.append({'modelo': modelo, **comuns})
+                if n_linhas <= args.max_linhas_comparacao:
+                    casos.append({'modelo': 'comparar_modelos', **comuns})
+    
+    print("🚀 VETDIAGNOSIS AI - BENCHMARK DE TREINAMENTO")
+    print("=" * 50)
+    print(f"📊 {len(casos)} casos | commit {commit} | {os.cpu_count()} núcleos")
+    
+    resultados = []
+    contexto = get_context('spawn')
+    
+    for i, caso in enumerate(casos, start=1):
+        descricao = (f"{caso['modelo']} | {caso['n_linhas']:,} linhas | "
+                     f"+{caso['n_features_extras']} features | n_jobs={caso['n_jobs']}")
+        print(f"\n[{i}/{len(casos)}] {descricao}")
+        
+        # Um processo por caso: o pico de RSS não se acumula entre casos
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                resultado = executor.submit(executar_caso, caso).result()
+        except Exception as e:
+            print(f"   ❌ Erro: {e}")
+            resultados.append({**caso, 'erro': str(e)})
+            continue
+        
+        for fase, medida in resultado['fases'].items():
+            rss = f"{medida['rss_pico_mb']:.0f} MB" if medida['rss_pico_mb'] is not None else "-"
+            print(f"   • {fase}: {medida['tempo_s']:.3f}s (pico RSS {rss})")
+        
+        resultados.append(resultado)
+    
+    relatorio = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'n_cpus': os.cpu_count(),
+            'argumentos': vars(args)
+        },
+        'resultados': resultados
+    }
+    
+    saida = Path(args.saida or f"benchmarks/modeling_{commit or 'local'}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n✅ Relatório salvo em: {saida}")
+    
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            relatorio_base = json.load(f)
+        
+        df_comparacao = comparar_relatorios(relatorio_base, relatorio, limiar=args.limiar_regressao)
+        regressoes = df_comparacao[df_comparacao['regressao']] if len(df_comparacao) else df_comparacao
+        
+        print(f"\n📈 Comparação com {args.comparar} (commit {relatorio_base['meta'].get('commit')}):")
+        if len(regressoes):
+            print(f"❌ {len(regressoes)} regressões acima de {args.limiar_regressao:.0%}:")
+            print(regressoes.to_string(index=False))
+            return 1
+        
+        print(f"✅ Nenhuma regressão acima de {args.limiar_regressao:.0%} "
+              f"({len(df_comparacao)} fases comparadas)")
+    
+    return 0
+
+if __name__ == "__main__":
+    exit_code = main()
+    exit(exit_code)
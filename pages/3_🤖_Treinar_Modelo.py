@@ -10,6 +10,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import sys
+import time
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 
@@ -18,16 +19,44 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from vetlib.preprocessing import (
     preparar_features_target, criar_preprocessador,
-    aplicar_preprocessamento, selecionar_features_importantes
+    aplicar_preprocessamento, atualizar_estatisticas_preprocessamento
 )
 from vetlib.modeling import (
-    obter_modelos_disponiveis, treinar_modelo, avaliar_modelo,
-    obter_importancia_features, salvar_modelo, calcular_roc_curves,
-    avaliar_por_especie
+    obter_modelos_disponiveis, salvar_modelo, comparar_modelos_iter
 )
+from vetlib.incremental import (
+    atualizar_modelo_incremental, verificar_necessidade_retreino
+)
+from vetlib.data_io import carregar_arquivo, mapear_colunas_automatico, padronizar_valores
+from vetlib.tree_inference import compilar_ensemble, suporta_compilacao
+from vetlib.training_cache import CacheTreino, impressao_dados, chave_treino
+from vetlib.jobs import FilaJobs
+from vetlib.registry import listar_modelos_registrados, registrar_modelo
+from vetlib.feature_budget import construir_modelo_enxuto, salvar_modelo_enxuto
+from vetlib.explain import carregar_fundo, salvar_fundo, limpar_cache_explainers, plotar_permutation_importance
+from vetlib.permutation import salvar_importancia_permutacao, limpar_cache_base
+from vetlib.case_index import salvar_indice_casos
+from vetlib.hybrid_diagnosis import sistema_hibrido
 
 st.set_page_config(page_title="Treinar Modelo", page_icon="🤖", layout="wide")
 
+# Acompanhamento dos jobs de treinamento
+INTERVALO_ATUALIZACAO_S = 1.0
+
+ETAPAS_TREINO = {
+    'divisao': "📊 Dividindo dados em treino e teste...",
+    'preprocessamento': "🔧 Aplicando pré-processamento...",
+    'selecao_features': "🎯 Selecionando features importantes...",
+    'treinamento': "🤖 Treinando modelo...",
+    'ajuste': "🤖 Ajustando modelo...",
+    'cascata': "⚡ Calibrando a cascata (modelo rápido + ensemble)...",
+    'busca': "🔍 Busca de hiperparâmetros",
+    'validacao_cruzada': "📊 Validação cruzada",
+    'avaliacao': "📈 Avaliando modelo...",
+    'importancia': "🔍 Calculando importância de features...",
+    'salvando': "💾 Salvando e registrando modelo..."
+}
+
 # Título
 st.title("🤖 Treinar Modelo de Machine Learning")
 st.markdown("Pipeline completo de treinamento, avaliação e explicabilidade")
@@ -111,6 +140,50 @@ with st.expander("🔬 Opções Avançadas"):
         "Número de folds para validação cruzada",
         3, 10, 5
     )
+    
+    rotear_por_especie = st.checkbox(
+        "🐾 Um modelo por espécie (roteado)",
+        value=False,
+        help="Treina um modelo compacto por espécie em paralelo; espécies raras usam o modelo global"
+    )
+    
+    if rotear_por_especie:
+        min_amostras_rota = st.slider(
+            "Casos mínimos para uma espécie ter modelo próprio",
+            20, 500, 50
+        )
+    else:
+        min_amostras_rota = None
+    
+    usar_cascata = st.checkbox(
+        "⚡ Cascata: modelo rápido antes do ensemble",
+        value=False,
+        help="Uma regressão logística calibrada responde os casos óbvios; só os incertos vão para o modelo completo"
+    )
+    
+    if usar_cascata:
+        tolerancia_cascata = st.slider(
+            "Perda máxima de acurácia aceita pela cascata (%)",
+            0.0, 5.0, 1.0, 0.5
+        ) / 100
+    else:
+        tolerancia_cascata = None
+    
+    cache_treino = CacheTreino()
+    usar_cache = st.checkbox(
+        "⚡ Reaproveitar treinos em cache",
+        value=True,
+        help="Mesmos dados, features, modelo e parâmetros retornam o resultado salvo em disco"
+    )
+    
+    estatisticas_cache = cache_treino.estatisticas()
+    st.caption(
+        f"Cache: {estatisticas_cache['n_entradas']} treinos, "
+        f"{estatisticas_cache['tamanho_mb']:.1f} / {estatisticas_cache['tamanho_max_mb']:.0f} MB"
+    )
+    if st.button("🧹 Limpar cache de treinos"):
+        cache_treino.limpar()
+        st.rerun()
 
 st.markdown("---")
 
@@ -169,285 +242,573 @@ st.plotly_chart(fig_dist, use_container_width=True)
 st.markdown("---")
 st.markdown("## 🚀 Treinamento")
 
+fila_jobs = FilaJobs()
+
 if st.button("🎯 Treinar Modelo", type="primary", use_container_width=False):
+    # Cache de treinos (dados + features + modelo + parâmetros + seed)
+    parametros_cache = {
+        'usar_grid_search': usar_grid_search,
+        'cv_folds': cv_folds,
+        'test_size': test_size,
+        'incluir_features_anormalidade': incluir_features_anormalidade,
+        'n_features_selecao': n_features
+    }
+    if rotear_por_especie:
+        parametros_cache['min_amostras_rota'] = min_amostras_rota
+    if usar_cascata:
+        parametros_cache['tolerancia_cascata'] = tolerancia_cascata
+    chave_cache = chave_treino(
+        impressao_dados(X, y), feature_names, modelo_selecionado, parametros_cache, random_state
+    )
+    resultado_cache = cache_treino.obter(chave_cache) if usar_cache else None
     
-    # Progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    if resultado_cache is not None:
+        st.session_state.resultado_treino = resultado_cache
+        st.session_state.resultado_treino_aplicar = True
+        st.info("⚡ Resultado recuperado do cache de treinos")
     
-    try:
-        # 1. Split dos dados
-        status_text.text("📊 Dividindo dados em treino e teste...")
-        progress_bar.progress(10)
-        
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y,
-            test_size=test_size,
-            random_state=random_state,
-            stratify=y
-        )
-        
-        # Guardar espécie para análise posterior
-        if 'especie' in X_train.columns:
-            especie_train = X_train['especie'].copy()
-            especie_test = X_test['especie'].copy()
-        else:
-            especie_train = None
-            especie_test = None
-        
-        # 2. Pré-processamento
-        status_text.text("🔧 Aplicando pré-processamento...")
-        progress_bar.progress(20)
-        
-        preprocessadores = criar_preprocessador(X_train)
-        X_train_proc, preprocessadores = aplicar_preprocessamento(
-            X_train, preprocessadores, fit=True
+    elif st.session_state.get('job_treino') is None:
+        # Treino em processo separado: a página só acompanha o job
+        st.session_state.job_treino = fila_jobs.submeter(
+            'vetlib.training_jobs:treinar_e_avaliar',
+            {
+                'X': X, 'y': y, 'feature_names': feature_names,
+                'nome_modelo': modelo_selecionado,
+                'test_size': test_size,
+                'usar_grid_search': usar_grid_search,
+                'cv_folds': cv_folds,
+                'random_state': random_state,
+                'usar_selecao_features': usar_selecao_features,
+                'n_features': n_features,
+                'chave_cache': chave_cache,
+                'rotear_por_especie': rotear_por_especie,
+                'min_amostras_rota': min_amostras_rota or 50,
+                'usar_cascata': usar_cascata,
+                'tolerancia_cascata': tolerancia_cascata or 0.01,
+                'n_jobs': -1
+            },
+            descricao=f"{modelo_selecionado}{' por espécie' if rotear_por_especie else ''} ({len(X)} casos)"
         )
-        X_test_proc, _ = aplicar_preprocessamento(
-            X_test, preprocessadores, fit=False
+    
+    else:
+        st.warning("⚠️ Já existe um treinamento em andamento nesta sessão")
+
+with st.expander("📋 Jobs de treinamento e modelos registrados"):
+    jobs_recentes = fila_jobs.listar(limite=10)
+    st.caption(f"Até {fila_jobs.max_concorrentes} treinos simultâneos nesta máquina; os demais aguardam na fila.")
+    
+    if jobs_recentes:
+        st.dataframe(
+            pd.DataFrame(jobs_recentes)[['id', 'descricao', 'status', 'tempo_decorrido_s']],
+            use_container_width=True
         )
-        
-        # 3. Seleção de features (opcional)
-        if usar_selecao_features:
-            status_text.text("🎯 Selecionando features importantes...")
-            progress_bar.progress(30)
-            
-            features_selecionadas, feature_scores = selecionar_features_importantes(
-                X_train_proc, y_train, n_features=n_features
+    
+    df_registrados = listar_modelos_registrados()
+    if not df_registrados.empty:
+        st.dataframe(df_registrados.head(10), use_container_width=True)
+
+# Acompanhamento do job de treinamento
+job_treino = st.session_state.get('job_treino')
+
+if job_treino is not None:
+    estado_job = fila_jobs.estado(job_treino)
+    
+    if estado_job is None or estado_job['status'] == 'cancelado':
+        st.warning("⏹️ Treinamento cancelado")
+        st.session_state.job_treino = None
+    
+    elif estado_job['status'] == 'erro':
+        st.error(f"❌ Erro durante o treinamento: {estado_job.get('erro')}")
+        if estado_job.get('traceback'):
+            with st.expander("Ver detalhes do erro"):
+                st.code(estado_job['traceback'])
+        st.session_state.job_treino = None
+    
+    elif estado_job['status'] == 'concluido':
+        st.session_state.resultado_treino = fila_jobs.resultado(job_treino)
+        st.session_state.resultado_treino_aplicar = True
+        st.session_state.job_treino = None
+        st.success(f"🎉 Modelo treinado com sucesso! Registrado em {st.session_state.resultado_treino['caminho_modelo']}")
+        st.balloons()
+    
+    else:
+        progresso_job = estado_job.get('progresso', {})
+        descricao_etapa = ETAPAS_TREINO.get(progresso_job.get('etapa'), "⏳ Aguardando vaga na fila...")
+        if progresso_job.get('n_folds'):
+            descricao_etapa += (
+                f" — candidato {progresso_job['candidato']}/{progresso_job['n_candidatos']},"
+                f" fold {progresso_job['fold']}/{progresso_job['n_folds']}"
             )
-            
-            X_train_proc = X_train_proc[features_selecionadas]
-            X_test_proc = X_test_proc[features_selecionadas]
-            feature_names = features_selecionadas
-            
-            st.info(f"✅ {len(features_selecionadas)} features selecionadas")
-        
-        # 4. Treinamento
-        status_text.text(f"🤖 Treinando {modelo_selecionado}...")
-        progress_bar.progress(50)
-        
-        modelo, historico = treinar_modelo(
-            X_train_proc, y_train,
-            nome_modelo=modelo_selecionado,
-            usar_grid_search=usar_grid_search,
-            cv_folds=cv_folds,
-            random_state=random_state
-        )
-        
-        # 5. Avaliação
-        status_text.text("📈 Avaliando modelo...")
-        progress_bar.progress(70)
-        
-        metricas = avaliar_modelo(modelo, X_test_proc, y_test, nomes_classes=modelo.classes_, label_encoder=historico.get('label_encoder'))
         
-        # 6. Importância de features
-        status_text.text("🔍 Calculando importância de features...")
-        progress_bar.progress(85)
+        st.progress(progresso_job.get('percentual', 0))
+        st.text(f"{descricao_etapa} ({estado_job['tempo_decorrido_s']:.0f}s)")
+        st.caption("O treino roda em segundo plano: é possível navegar para outras páginas e voltar.")
         
-        df_importancia = obter_importancia_features(modelo, feature_names)
-        
-        # 7. ROC curves
-        roc_curves = calcular_roc_curves(modelo, X_test_proc, y_test)
-        
-        # 8. Avaliar por espécie
-        if especie_test is not None:
-            metricas_especies = avaliar_por_especie(modelo, X_test_proc, y_test, especie_test, historico.get('label_encoder'))
-        else:
-            metricas_especies = None
-        
-        progress_bar.progress(100)
-        status_text.text("✅ Treinamento concluído!")
+        if st.button("⏹️ Cancelar Treinamento"):
+            fila_jobs.cancelar(job_treino)
+            st.session_state.job_treino = None
+            st.rerun()
         
-        # Salvar no session_state
+        time.sleep(INTERVALO_ATUALIZACAO_S)
+        st.rerun()
+
+resultado_treino = st.session_state.get('resultado_treino')
+
+if resultado_treino is not None:
+    modelo = resultado_treino['modelo']
+    preprocessadores = resultado_treino['preprocessadores']
+    feature_names = resultado_treino['feature_names']
+    historico = resultado_treino['historico']
+    metricas = resultado_treino['metricas']
+    intervalos = resultado_treino['intervalos']
+    df_importancia = resultado_treino['df_importancia']
+    df_permutacao = resultado_treino.get('df_importancia_permutacao')
+    resumo_permutacao = resultado_treino.get('resumo_importancia_permutacao')
+    indice_casos = resultado_treino.get('indice_casos')
+    roc_curves = resultado_treino['roc_curves']
+    metricas_especies = resultado_treino['metricas_especies']
+    relatorio_rotas = resultado_treino.get('relatorio_rotas')
+    relatorio_cascata = resultado_treino.get('relatorio_cascata')
+    
+    # Salvar no session_state (uma vez por treino, para não desfazer atualizações incrementais)
+    if st.session_state.pop('resultado_treino_aplicar', False):
         st.session_state.modelo_treinado = modelo
+        st.session_state.modelo_compilado = compilar_ensemble(modelo) if suporta_compilacao(modelo) else None
         st.session_state.preprocessor = preprocessadores
         st.session_state.feature_names = feature_names
         st.session_state.target_names = modelo.classes_.tolist()
         st.session_state.metricas_modelo = metricas
+        st.session_state.intervalos_metricas = intervalos
         st.session_state.historico_treino = historico
         st.session_state.df_importancia = df_importancia
+        st.session_state.importancia_permutacao = (df_permutacao, resumo_permutacao)
         st.session_state.roc_curves = roc_curves
         st.session_state.metricas_especies = metricas_especies
-        
-        st.success("🎉 Modelo treinado com sucesso!")
-        st.balloons()
-        
-        # ====================================================================
-        # RESULTADOS
-        # ====================================================================
-        
-        st.markdown("---")
-        st.markdown("## 📊 Resultados do Treinamento")
-        
-        # Métricas principais
-        st.markdown("### 🎯 Métricas de Avaliação")
+        st.session_state.relatorio_rotas = relatorio_rotas
+        st.session_state.manifesto_modelo = None
+        st.session_state.fundo_shap = carregar_fundo(resultado_treino['caminho_modelo'])
+        st.session_state.indice_casos = indice_casos
+        st.session_state.explicacao_global = resultado_treino.get('explicacao_global')
+    
+    # ====================================================================
+    # RESULTADOS
+    # ====================================================================
+    
+    st.markdown("---")
+    st.markdown("## 📊 Resultados do Treinamento")
+    
+    # Métricas principais
+    st.markdown("### 🎯 Métricas de Avaliação")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Accuracy", f"{metricas['accuracy']:.3f}")
+    
+    with col2:
+        st.metric("F1 Score (Macro)", f"{metricas['f1_macro']:.3f}")
+    
+    with col3:
+        st.metric("Precision (Macro)", f"{metricas['precision_macro']:.3f}")
+    
+    with col4:
+        if metricas['roc_auc']:
+            st.metric("ROC AUC", f"{metricas['roc_auc']:.3f}")
+        else:
+            st.metric("ROC AUC", "N/A")
+    
+    # Intervalos de confiança (bootstrap sobre as predições em cache)
+    with st.expander("📏 Intervalos de confiança (bootstrap, 95%)"):
+        st.dataframe(
+            intervalos.style.format('{:.3f}'),
+            use_container_width=True
+        )
+    
+    # Validação cruzada
+    if 'cv_f1_mean' in historico:
+        st.info(f"📊 **Validação Cruzada (F1 Macro):** {historico['cv_f1_mean']:.3f} ± {historico['cv_f1_std']:.3f}")
+    
+    # Cascata: tráfego desviado, latência por estágio e custo em acurácia
+    if relatorio_cascata is not None:
+        st.markdown("### ⚡ Cascata (modelo rápido → ensemble)")
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Accuracy", f"{metricas['accuracy']:.3f}")
+            st.metric("Respondidos pelo rápido", f"{relatorio_cascata['fracao_rapido']:.1%}")
         
         with col2:
-            st.metric("F1 Score (Macro)", f"{metricas['f1_macro']:.3f}")
+            st.metric(
+                "Accuracy da cascata",
+                f"{relatorio_cascata['accuracy_cascata']:.3f}",
+                f"{relatorio_cascata['delta_accuracy']:+.3f} vs. ensemble"
+            )
         
         with col3:
-            st.metric("Precision (Macro)", f"{metricas['precision_macro']:.3f}")
+            st.metric("Latência (rápido)", f"{relatorio_cascata['latencia_caso_rapido_ms']:.2f} ms")
         
         with col4:
-            if metricas['roc_auc']:
-                st.metric("ROC AUC", f"{metricas['roc_auc']:.3f}")
-            else:
-                st.metric("ROC AUC", "N/A")
-        
-        # Validação cruzada
-        if 'cv_f1_mean' in historico:
-            st.info(f"📊 **Validação Cruzada (F1 Macro):** {historico['cv_f1_mean']:.3f} ± {historico['cv_f1_std']:.3f}")
-        
-        # Matriz de confusão
-        st.markdown("### 📊 Matriz de Confusão")
-        
-        conf_matrix = metricas['confusion_matrix']
+            st.metric(
+                "Latência média (cascata)",
+                f"{relatorio_cascata['latencia_caso_cascata_ms']:.2f} ms",
+                f"ensemble: {relatorio_cascata['latencia_caso_pesado_ms']:.2f} ms",
+                delta_color="off"
+            )
         
-        fig_conf = px.imshow(
-            conf_matrix,
-            labels=dict(x="Predito", y="Real", color="Casos"),
-            x=modelo.classes_,
-            y=modelo.classes_,
-            color_continuous_scale='Blues',
-            text_auto=True,
-            aspect="auto"
+        st.caption(
+            f"Limiar de confiança calibrado fora do fold: {relatorio_cascata['limiar']:.3f} "
+            f"(só o modelo rápido: accuracy {relatorio_cascata['accuracy_rapido']:.3f})"
         )
-        fig_conf.update_layout(height=max(400, len(modelo.classes_) * 50))
+    
+    # Desempenho por espécie (e por rota, no modelo roteado)
+    if metricas_especies:
+        st.markdown("### 🐾 Desempenho por Espécie")
         
-        st.plotly_chart(fig_conf, use_container_width=True)
+        df_especies_eval = pd.DataFrame(metricas_especies).T
+        df_especies_eval = df_especies_eval[['n_samples', 'accuracy', 'f1_macro']].astype(float)
         
-        # Relatório de classificação
-        st.markdown("### 📋 Relatório de Classificação")
+        col1, col2 = st.columns([2, 3])
         
-        class_report = metricas['classification_report']
+        with col1:
+            st.dataframe(
+                df_especies_eval.style.format({
+                    'n_samples': '{:.0f}',
+                    'accuracy': '{:.3f}',
+                    'f1_macro': '{:.3f}'
+                }).background_gradient(subset=['f1_macro'], cmap='RdYlGn', vmin=0, vmax=1),
+                use_container_width=True
+            )
         
-        # Converter para DataFrame
-        df_report = pd.DataFrame(class_report).transpose()
-        df_report = df_report[df_report.index != 'accuracy']  # Remover linha accuracy
-        df_report = df_report.iloc[:-2]  # Remover macro/weighted avg
+        with col2:
+            fig_especies = px.bar(
+                df_especies_eval.reset_index().rename(columns={'index': 'especie'}),
+                x='especie',
+                y=['accuracy', 'f1_macro'],
+                barmode='group',
+                title='Accuracy e F1 por Espécie',
+                range_y=[0, 1]
+            )
+            st.plotly_chart(fig_especies, use_container_width=True)
         
+        especie_detalhe = st.selectbox(
+            "Matriz de confusão da espécie:",
+            list(metricas_especies.keys())
+        )
         st.dataframe(
-            df_report.style.format({
-                'precision': '{:.3f}',
-                'recall': '{:.3f}',
-                'f1-score': '{:.3f}',
-                'support': '{:.0f}'
-            }).background_gradient(subset=['f1-score'], cmap='RdYlGn', vmin=0, vmax=1),
+            pd.DataFrame(metricas_especies[especie_detalhe]['confusion_matrix']),
             use_container_width=True
         )
         
-        # Curvas ROC
-        if roc_curves and len(roc_curves) > 0:
-            st.markdown("### 📈 Curvas ROC")
-            
-            fig_roc = go.Figure()
+        if relatorio_rotas is not None:
+            st.markdown("#### 🔀 Rotas do modelo por espécie")
+            st.caption(
+                "Cada caso é pontuado pelo modelo da sua espécie; espécies raras ou desconhecidas "
+                "vão para a rota global. accuracy_global/f1_global: o modelo global na mesma fatia."
+            )
+            st.dataframe(
+                relatorio_rotas.style.format({
+                    'n_treino': '{:.0f}',
+                    'n_samples': '{:.0f}',
+                    'accuracy': '{:.3f}',
+                    'f1_macro': '{:.3f}',
+                    'accuracy_global': '{:.3f}',
+                    'f1_global': '{:.3f}',
+                    'latencia_caso_ms': '{:.2f}',
+                    'predicao_lote_ms_por_caso': '{:.3f}',
+                    'tamanho_mb': '{:.2f}'
+                }, na_rep='-'),
+                use_container_width=True
+            )
+    
+    # Matriz de confusão
+    st.markdown("### 📊 Matriz de Confusão")
+    
+    conf_matrix = metricas['confusion_matrix']
+    
+    fig_conf = px.imshow(
+        conf_matrix,
+        labels=dict(x="Predito", y="Real", color="Casos"),
+        x=metricas['nomes_matriz'],
+        y=metricas['nomes_matriz'],
+        color_continuous_scale='Blues',
+        text_auto=True,
+        aspect="auto"
+    )
+    fig_conf.update_layout(height=max(400, len(metricas['nomes_matriz']) * 50))
+    
+    st.plotly_chart(fig_conf, use_container_width=True)
+    
+    # Relatório de classificação
+    st.markdown("### 📋 Relatório de Classificação")
+    
+    class_report = metricas['classification_report']
+    
+    # Converter para DataFrame
+    df_report = pd.DataFrame(class_report).transpose()
+    df_report = df_report[df_report.index != 'accuracy']  # Remover linha accuracy
+    df_report = df_report.iloc[:-2]  # Remover macro/weighted avg
+    
+    st.dataframe(
+        df_report.style.format({
+            'precision': '{:.3f}',
+            'recall': '{:.3f}',
+            'f1-score': '{:.3f}',
+            'support': '{:.0f}'
+        }).background_gradient(subset=['f1-score'], cmap='RdYlGn', vmin=0, vmax=1),
+        use_container_width=True
+    )
+    
+    # Curvas ROC
+    if roc_curves and len(roc_curves) > 0:
+        st.markdown("### 📈 Curvas ROC")
+        
+        fig_roc = go.Figure()
+        
+        for classe, dados in roc_curves.items():
+            fpr = dados['fpr']
+            tpr = dados['tpr']
             
-            for classe, dados in roc_curves.items():
-                fpr = dados['fpr']
-                tpr = dados['tpr']
-                
-                # Calcular AUC
-                from sklearn.metrics import auc
-                roc_auc = auc(fpr, tpr)
-                
-                fig_roc.add_trace(go.Scatter(
-                    x=fpr, y=tpr,
-                    name=f'{classe} (AUC = {roc_auc:.3f})',
-                    mode='lines'
-                ))
+            # Calcular AUC
+            from sklearn.metrics import auc
+            roc_auc = auc(fpr, tpr)
             
-            # Linha diagonal
             fig_roc.add_trace(go.Scatter(
-                x=[0, 1], y=[0, 1],
-                name='Chance',
-                mode='lines',
-                line=dict(dash='dash', color='gray')
+                x=fpr, y=tpr,
+                name=f'{classe} (AUC = {roc_auc:.3f})',
+                mode='lines'
             ))
-            
-            fig_roc.update_layout(
-                title='Curvas ROC (One-vs-Rest)',
-                xaxis_title='False Positive Rate',
-                yaxis_title='True Positive Rate',
-                height=500
-            )
-            
-            st.plotly_chart(fig_roc, use_container_width=True)
         
-        # Importância de features
-        if df_importancia is not None:
-            st.markdown("### 🔍 Importância das Features")
-            
-            df_imp_top = df_importancia.head(20)
+        # Linha diagonal
+        fig_roc.add_trace(go.Scatter(
+            x=[0, 1], y=[0, 1],
+            name='Chance',
+            mode='lines',
+            line=dict(dash='dash', color='gray')
+        ))
+        
+        fig_roc.update_layout(
+            title='Curvas ROC (One-vs-Rest)',
+            xaxis_title='False Positive Rate',
+            yaxis_title='True Positive Rate',
+            height=500
+        )
+        
+        st.plotly_chart(fig_roc, use_container_width=True)
+    
+    # Importância de features
+    if df_importancia is not None:
+        st.markdown("### 🔍 Importância das Features")
+        
+        df_imp_top = df_importancia.head(20)
+        
+        fig_imp = px.bar(
+            df_imp_top,
+            x='importancia',
+            y='feature',
+            orientation='h',
+            title='Top 20 Features Mais Importantes',
+            color='importancia',
+            color_continuous_scale='Viridis'
+        )
+        fig_imp.update_layout(
+            yaxis={'categoryorder': 'total ascending'},
+            height=max(400, len(df_imp_top) * 25)
+        )
+        
+        st.plotly_chart(fig_imp, use_container_width=True)
+    
+    # Importância por permutação (queda de acurácia no teste, com parada antecipada)
+    if df_permutacao is not None:
+        fig_perm = plotar_permutation_importance(df_permutacao)
+        st.plotly_chart(fig_perm, use_container_width=True)
+        st.caption(
+            f"Permutação em {resumo_permutacao['n_amostras']} casos de teste: "
+            f"{resumo_permutacao['n_permutacoes']} de {resumo_permutacao['n_permutacoes_maximo']} "
+            f"permutações possíveis ({resumo_permutacao['tempo_s']:.1f}s)"
+        )
+    
+    # Salvar modelo
+    st.markdown("---")
+    st.markdown("## 💾 Salvar Modelo")
+    
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        nome_modelo = st.text_input(
+            "Nome do modelo",
+            value=f"modelo_{historico['modelo'].replace(' ', '_').lower()}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+    
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("💾 Salvar Modelo", use_container_width=True):
+            try:
+                caminho_salvo = salvar_modelo(
+                    modelo,
+                    preprocessadores,
+                    feature_names,
+                    caminho_base=f'models/{nome_modelo}',
+                    explicacao_global=st.session_state.get('explicacao_global')
+                )
+                if st.session_state.get('fundo_shap') is not None:
+                    salvar_fundo(caminho_salvo, st.session_state.fundo_shap)
+                if df_permutacao is not None:
+                    salvar_importancia_permutacao(caminho_salvo, df_permutacao, resumo_permutacao)
+                if indice_casos is not None:
+                    salvar_indice_casos(caminho_salvo, indice_casos)
+                st.success(f"✅ Modelo salvo em: {caminho_salvo}")
+                st.info("👉 Agora você pode usar o modelo na página **🔍 Predição**!")
+            except Exception as e:
+                st.error(f"❌ Erro ao salvar: {str(e)}")
+
+# ============================================================================
+# SEÇÃO: COMPARAÇÃO DE MODELOS
+# ============================================================================
+
+st.markdown("---")
+st.markdown("## ⚖️ Comparar Modelos")
+
+with st.expander("Treinar todos os algoritmos em paralelo e comparar"):
+    modelos_comparar = st.multiselect(
+        "Algoritmos a comparar:",
+        list(modelos_disponiveis.keys()),
+        default=list(modelos_disponiveis.keys())
+    )
+    
+    if st.button("⚖️ Comparar Modelos", disabled=len(modelos_comparar) == 0):
+        try:
+            X_train_cmp, X_test_cmp, y_train_cmp, y_test_cmp = train_test_split(
+                X, y,
+                test_size=test_size,
+                random_state=random_state,
+                stratify=y
+            )
             
-            fig_imp = px.bar(
-                df_imp_top,
-                x='importancia',
-                y='feature',
-                orientation='h',
-                title='Top 20 Features Mais Importantes',
-                color='importancia',
-                color_continuous_scale='Viridis'
+            preprocessadores_cmp = criar_preprocessador(X_train_cmp)
+            X_train_cmp, preprocessadores_cmp = aplicar_preprocessamento(
+                X_train_cmp, preprocessadores_cmp, fit=True
             )
-            fig_imp.update_layout(
-                yaxis={'categoryorder': 'total ascending'},
-                height=max(400, len(df_imp_top) * 25)
+            X_test_cmp, _ = aplicar_preprocessamento(
+                X_test_cmp, preprocessadores_cmp, fit=False
             )
             
-            st.plotly_chart(fig_imp, use_container_width=True)
+            progresso_cmp = st.progress(0)
+            tabela_cmp = st.empty()
+            resultados_cmp = []
+            
+            # Cada modelo aparece na tabela assim que termina
+            for n_concluidos, resultado in enumerate(comparar_modelos_iter(
+                X_train_cmp, y_train_cmp, X_test_cmp, y_test_cmp,
+                modelos_treinar=modelos_comparar
+            ), start=1):
+                if 'erro' in resultado:
+                    st.warning(f"Erro ao treinar {resultado['Modelo']}: {resultado['erro']}")
+                else:
+                    resultados_cmp.append(resultado)
+                
+                progresso_cmp.progress(int(100 * n_concluidos / len(modelos_comparar)))
+                
+                if resultados_cmp:
+                    df_cmp = pd.DataFrame(resultados_cmp).sort_values('F1 (Macro)', ascending=False)
+                    tabela_cmp.dataframe(
+                        df_cmp.set_index('Modelo').style.format('{:.3f}', na_rep='N/A'),
+                        use_container_width=True
+                    )
+            
+            st.session_state.comparacao_modelos = pd.DataFrame(resultados_cmp)
         
-        # Avaliação por espécie
-        if metricas_especies:
-            st.markdown("### 🐾 Avaliação por Espécie")
+        except Exception as e:
+            st.error(f"❌ Erro durante a comparação: {str(e)}")
+
+# ============================================================================
+# SEÇÃO: MODELO ENXUTO (ORÇAMENTO DE FEATURES)
+# ============================================================================
+
+st.markdown("---")
+st.markdown("## 🪶 Modelo Enxuto")
+
+with st.expander("Menor conjunto de exames que mantém a acurácia"):
+    st.markdown("""
+    Ordena as features por importância e busca o menor conjunto cuja acurácia (validação
+    cruzada) fica dentro da tolerância. O modelo salvo só pede esses exames na predição,
+    e um manifesto com as entradas obrigatórias é gravado ao lado do artefato.
+    """)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        metodo_enxuto = st.radio(
+            "Importância das features:",
+            ['modelo', 'permutacao'],
+            format_func=lambda m: {'modelo': 'Do próprio modelo', 'permutacao': 'Por permutação'}[m],
+            horizontal=True
+        )
+    
+    with col2:
+        tolerancia_enxuto = st.slider(
+            "Perda máxima de acurácia (%)",
+            0.0, 5.0, 1.0, 0.5,
+            key='tolerancia_enxuto'
+        ) / 100
+    
+    if st.button("🪶 Construir Modelo Enxuto"):
+        try:
+            curva_enxuto = st.empty()
+            pontos_curva = {}
             
-            df_especies_eval = pd.DataFrame(metricas_especies).T
-            df_especies_eval = df_especies_eval[['n_samples', 'accuracy', 'f1_macro']]
+            def _progresso_enxuto(info):
+                pontos_curva[info['n_features']] = info['accuracy_cv']
+                curva_enxuto.caption(
+                    "Avaliados: " + ", ".join(f"{k} features → {v:.3f}" for k, v in sorted(pontos_curva.items()))
+                )
             
-            st.dataframe(
-                df_especies_eval.style.format({
-                    'n_samples': '{:.0f}',
-                    'accuracy': '{:.3f}',
-                    'f1_macro': '{:.3f}'
-                }),
-                use_container_width=True
+            with st.spinner(f"Buscando o menor conjunto de features para {modelo_selecionado}..."):
+                resultado_enxuto = construir_modelo_enxuto(
+                    X, y,
+                    nome_modelo=modelo_selecionado,
+                    tolerancia=tolerancia_enxuto,
+                    metodo=metodo_enxuto,
+                    test_size=test_size,
+                    cv_folds=cv_folds,
+                    random_state=random_state,
+                    progresso=_progresso_enxuto
+                )
+            
+            manifesto = resultado_enxuto['manifesto']
+            caminho_enxuto, caminho_manifesto_enxuto = salvar_modelo_enxuto(
+                resultado_enxuto,
+                f"models/modelo_{modelo_selecionado.replace(' ', '_').lower()}_enxuto_{pd.Timestamp.now():%Y%m%d_%H%M%S}"
             )
-        
-        # Salvar modelo
-        st.markdown("---")
-        st.markdown("## 💾 Salvar Modelo")
-        
-        col1, col2 = st.columns([3, 1])
-        
-        with col1:
-            nome_modelo = st.text_input(
-                "Nome do modelo",
-                value=f"modelo_{modelo_selecionado.replace(' ', '_').lower()}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}"
+            registrar_modelo(caminho_enxuto, {
+                'origem': 'Modelo Enxuto',
+                'modelo': modelo_selecionado,
+                'accuracy': manifesto['accuracy_teste'],
+                'n_features': manifesto['n_features']
+            })
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric(
+                "Features",
+                manifesto['n_features'],
+                f"{manifesto['n_features'] - manifesto['n_features_original']} de {manifesto['n_features_original']}"
             )
+            col2.metric(
+                "Accuracy (teste)",
+                f"{manifesto['accuracy_teste']:.3f}",
+                f"{manifesto['accuracy_teste'] - manifesto['accuracy_teste_original']:+.3f}"
+            )
+            col3.metric(
+                "Latência por caso",
+                f"{manifesto['latencia_caso_ms']:.2f} ms",
+                f"{manifesto['latencia_caso_ms'] - manifesto['latencia_caso_ms_original']:+.2f} ms",
+                delta_color="inverse"
+            )
+            
+            st.markdown("**Entradas obrigatórias:** " + ", ".join(manifesto['features_obrigatorias']))
+            st.success(f"✅ Modelo salvo em {caminho_enxuto} (manifesto: {caminho_manifesto_enxuto.name})")
         
-        with col2:
-            st.markdown("<br>", unsafe_allow_html=True)
-            if st.button("💾 Salvar Modelo", use_container_width=True):
-                try:
-                    caminho_salvo = salvar_modelo(
-                        modelo,
-                        preprocessadores,
-                        feature_names,
-                        caminho_base=f'models/{nome_modelo}'
-                    )
-                    st.success(f"✅ Modelo salvo em: {caminho_salvo}")
-                    st.info("👉 Agora você pode usar o modelo na página **🔍 Predição**!")
-                except Exception as e:
-                    st.error(f"❌ Erro ao salvar: {str(e)}")
-        
-    except Exception as e:
-        st.error(f"❌ Erro durante o treinamento: {str(e)}")
-        import traceback
-        with st.expander("Ver detalhes do erro"):
-            st.code(traceback.format_exc())
+        except Exception as e:
+            st.error(f"❌ Erro ao construir o modelo enxuto: {str(e)}")
 
 # ============================================================================
 # SEÇÃO: MODELO ATUAL
@@ -469,11 +830,103 @@ if st.session_state.get('modelo_treinado') is not None:
     
     with col3:
         if st.button("🗑️ Limpar Modelo"):
+            st.session_state.resultado_treino = None
             st.session_state.modelo_treinado = None
+            st.session_state.modelo_compilado = None
             st.session_state.preprocessor = None
             st.session_state.feature_names = None
             st.session_state.target_names = None
+            st.session_state.indice_casos = None
+            st.session_state.explicacao_global = None
+            st.session_state.manifesto_modelo = None
+            st.session_state.fundo_shap = None
+            st.session_state.importancia_permutacao = None
             st.rerun()
+    
+    # Atualização incremental com novos casos confirmados
+    historico_atual = st.session_state.get('historico_treino') or {}
+    
+    if 'incremental' in historico_atual:
+        with st.expander("🔄 Atualização Incremental (novos casos)"):
+            st.markdown("""
+            Atualiza o modelo atual com novos casos diagnosticados sem repetir o treino completo.
+            O pré-processamento permanece congelado; um retreino completo é sugerido quando a
+            deriva ou a queda de desempenho ultrapassam os limites.
+            """)
+            
+            estado_inc = historico_atual['incremental']
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Atualizações", estado_inc['n_atualizacoes'])
+            col2.metric("Casos incrementais", estado_inc['n_incremental'])
+            col3.metric("Casos do treino completo", estado_inc['n_treino_completo'])
+            
+            arquivo_novos = st.file_uploader(
+                "Novos casos (com diagnóstico)",
+                type=['csv', 'xlsx', 'xls'],
+                key='upload_incremental'
+            )
+            
+            if arquivo_novos is not None and st.button("🔄 Atualizar Modelo"):
+                try:
+                    df_novos = carregar_arquivo(arquivo_novos)
+                    
+                    if isinstance(df_novos, dict):
+                        df_novos = list(df_novos.values())[0]
+                    
+                    if df_novos is not None:
+                        df_novos, _ = mapear_colunas_automatico(df_novos)
+                        df_novos = padronizar_valores(df_novos)
+                        df_novos = df_novos.dropna(subset=['diagnostico'])
+                        
+                        X_novos, y_novos, _ = preparar_features_target(df_novos)
+                        
+                        preprocessadores_atuais = st.session_state.preprocessor
+                        colunas_treino = list(preprocessadores_atuais['scaler'].feature_names_in_)
+                        X_novos = X_novos.reindex(columns=colunas_treino)
+                        
+                        preprocessadores_atuais = atualizar_estatisticas_preprocessamento(
+                            X_novos, preprocessadores_atuais
+                        )
+                        X_novos_proc, _ = aplicar_preprocessamento(
+                            X_novos, preprocessadores_atuais, fit=False
+                        )
+                        X_novos_proc = X_novos_proc[st.session_state.feature_names]
+                        
+                        modelo_atualizado, resumo = atualizar_modelo_incremental(
+                            st.session_state.modelo_treinado, historico_atual, X_novos_proc, y_novos
+                        )
+                        verificacao = verificar_necessidade_retreino(historico_atual, preprocessadores_atuais)
+                        
+                        limpar_cache_explainers(modelo_atualizado)
+                        limpar_cache_base(modelo_atualizado)
+                        st.session_state.modelo_treinado = modelo_atualizado
+                        st.session_state.modelo_compilado = (
+                            compilar_ensemble(modelo_atualizado) if suporta_compilacao(modelo_atualizado) else None
+                        )
+                        st.session_state.preprocessor = preprocessadores_atuais
+                        st.session_state.historico_treino = historico_atual
+                        # Explicações globais descreviam o modelo antes da atualização
+                        st.session_state.explicacao_global = None
+                        st.session_state.importancia_permutacao = (None, None)
+                        
+                        # Casos confirmados já pesquisáveis no sistema híbrido, sem reconstruir os índices
+                        if sistema_hibrido.df_historico is not None:
+                            sistema_hibrido.adicionar_casos(df_novos)
+                        
+                        st.success(
+                            f"✅ Modelo atualizado com {resumo['n_novos']} casos "
+                            f"(F1 prequencial: {resumo['f1_prequencial']:.3f})"
+                        )
+                        
+                        if verificacao['retreino_necessario']:
+                            st.warning("⚠️ Retreino completo recomendado:")
+                            for motivo in verificacao['motivos']:
+                                st.markdown(f"- {motivo}")
+                        else:
+                            st.info("ℹ️ Modelo incremental dentro dos limites; retreino completo não necessário")
+                
+                except Exception as e:
+                    st.error(f"❌ Erro na atualização incremental: {str(e)}")
 
 # Footer
 st.markdown("---")
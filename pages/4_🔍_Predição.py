@@ -6,17 +6,26 @@ Fazer predições de diagnóstico com explicabilidade
 import streamlit as st
 import pandas as pd
 import numpy as np
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
 # Adicionar path da biblioteca
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from vetlib.modeling import prever_diagnostico, carregar_modelo
+from vetlib.modeling import prever_diagnostico, carregar_artefato
+from vetlib.tree_inference import compilar_ensemble, suporta_compilacao
+from vetlib.tree_attribution import suporta_atribuicao
+from vetlib.feature_budget import carregar_manifesto
+from vetlib.permutation import carregar_importancia_permutacao
+from vetlib.case_index import carregar_indice_casos
 from vetlib.explain import (
     explicar_predicao_local, gerar_texto_explicacao,
     plotar_shap_summary, calcular_shap_values, plotar_shap_waterfall,
-    calcular_permutation_importance, plotar_permutation_importance
+    calcular_permutation_importance, plotar_permutation_importance, carregar_fundo,
+    explicar_lote, resumir_explicacoes_lote, plotar_shap_global, plotar_perfis_classe,
+    SHAP_DISPONIVEL
 )
 from vetlib.insights import gerar_alertas_valores_criticos, gerar_recomendacoes_clinicas
 from vetlib.preprocessing import FAIXAS_REFERENCIA
@@ -58,13 +67,25 @@ if st.session_state.get('modelo_treinado') is None:
             )
             
             if st.button("📥 Carregar Modelo"):
-                modelo, preprocessadores, feature_names, classes = carregar_modelo(str(modelo_arquivo))
+                # Uma única leitura do artefato: modelo e explicação global pré-calculada
+                artefato = carregar_artefato(str(modelo_arquivo))
                 
-                if modelo is not None:
+                if artefato is not None:
+                    modelo = artefato['modelo']
+                    explicacao_global = artefato.get('explicacao_global')
                     st.session_state.modelo_treinado = modelo
-                    st.session_state.preprocessor = preprocessadores
-                    st.session_state.feature_names = feature_names
-                    st.session_state.target_names = classes
+                    st.session_state.modelo_compilado = compilar_ensemble(modelo) if suporta_compilacao(modelo) else None
+                    st.session_state.preprocessor = artefato['preprocessadores']
+                    st.session_state.feature_names = artefato['feature_names']
+                    st.session_state.target_names = artefato['classes']
+                    st.session_state.manifesto_modelo = carregar_manifesto(modelo_arquivo)
+                    st.session_state.fundo_shap = carregar_fundo(modelo_arquivo)
+                    st.session_state.explicacao_global = explicacao_global
+                    st.session_state.importancia_permutacao = (
+                        (explicacao_global['importancia_permutacao'], explicacao_global['resumo_permutacao'])
+                        if explicacao_global is not None else carregar_importancia_permutacao(modelo_arquivo)
+                    )
+                    st.session_state.indice_casos = carregar_indice_casos(modelo_arquivo)
                     st.success("✅ Modelo carregado!")
                     st.rerun()
                 else:
@@ -81,6 +102,55 @@ preprocessadores = st.session_state.get('preprocessor')
 feature_names = st.session_state.get('feature_names')
 target_names = st.session_state.get('target_names')
 
+# Ensembles de árvores usam o motor compilado (mesmas probabilidades, menor latência)
+modelo_inferencia = st.session_state.get('modelo_compilado') or modelo
+
+# Casos de treino normalizados, salvos com o modelo (busca dos casos mais semelhantes)
+indice_casos = st.session_state.get('indice_casos')
+
+# Modelo enxuto: só os exames do manifesto entram na predição
+manifesto_modelo = st.session_state.get('manifesto_modelo')
+if manifesto_modelo is not None:
+    st.info(
+        f"🪶 Modelo enxuto: usa {manifesto_modelo['n_features']} de "
+        f"{manifesto_modelo['n_features_original']} features. Entradas obrigatórias: "
+        + ", ".join(manifesto_modelo['features_obrigatorias'])
+    )
+
+# Explicação global salva com o modelo: os gráficos só desenham, nada é recalculado
+explicacao_global = st.session_state.get('explicacao_global')
+if explicacao_global is not None:
+    with st.expander("🌐 Explicabilidade global do modelo"):
+        tab_shap, tab_permutacao, tab_perfis = st.tabs(["📊 SHAP por classe", "🔀 Permutação", "🧬 Perfis das classes"])
+        
+        with tab_shap:
+            if explicacao_global['shap_medio_abs'] is not None:
+                classe_shap = st.selectbox(
+                    "Classe", ['Todas'] + explicacao_global['classes'], key='classe_shap_global'
+                )
+                st.plotly_chart(
+                    plotar_shap_global(explicacao_global, None if classe_shap == 'Todas' else classe_shap),
+                    use_container_width=True
+                )
+                st.caption(
+                    f"|SHAP| médio em {explicacao_global['n_amostras_shap']} casos de treino "
+                    f"({explicacao_global['metodo_shap']}), calculado no treinamento"
+                )
+            else:
+                st.info(
+                    "SHAP não disponível para este modelo"
+                    + (f": {explicacao_global['erro_shap']}" if explicacao_global.get('erro_shap') else ".")
+                )
+        
+        with tab_permutacao:
+            fig_permutacao = plotar_permutation_importance(explicacao_global)
+            if fig_permutacao is not None:
+                st.plotly_chart(fig_permutacao, use_container_width=True)
+        
+        with tab_perfis:
+            st.plotly_chart(plotar_perfis_classe(explicacao_global), use_container_width=True)
+            st.caption("Média de cada feature padronizada nos casos de treino de cada diagnóstico")
+
 # Sistema sempre disponível via fallback
 
 # ============================================================================
@@ -318,17 +388,49 @@ if modo == "📝 Entrada Manual":
                     feature_names is not None):
                     try:
                         resultados = prever_diagnostico(
-                            modelo,
+                            modelo_inferencia,
                             dados_predicao,
                             preprocessadores,
                             feature_names,
                             top_n=3
                         )
                         st.info("🤖 **Predição usando modelo de IA treinado**")
+                        if hasattr(modelo_inferencia, 'resumo_estatisticas'):
+                            resumo_cascata = modelo_inferencia.resumo_estatisticas()
+                            st.caption(
+                                f"⚡ Cascata: {resumo_cascata['fracao_rapido']:.0%} das "
+                                f"{resumo_cascata['n_casos']} predições da sessão respondidas pelo modelo rápido"
+                            )
                     except Exception as model_error:
                         st.warning(f"⚠️ Erro no modelo treinado: {str(model_error)[:100]}...")
                         st.info("🔄 **Usando sistema de regras clínicas como fallback**")
                         raise model_error
+                    
+                    # Explicação SHAP e casos semelhantes do caso predito pelo modelo
+                    # (explainer em cache: só o custo da instância)
+                    try:
+                        from vetlib.preprocessing import aplicar_preprocessamento
+                        
+                        X_caso = pd.DataFrame([dados_predicao]).reindex(columns=feature_names, fill_value=0)
+                        X_caso_proc, _ = aplicar_preprocessamento(X_caso, preprocessadores, fit=False)
+                        
+                        explicacao = explicar_predicao_local(
+                            modelo, X_caso_proc, feature_names, preprocessadores,
+                            fundo=st.session_state.get('fundo_shap')
+                        )
+                        
+                        with st.expander("🔬 Features que mais pesaram neste caso"):
+                            st.dataframe(pd.DataFrame(explicacao['features_importantes']), use_container_width=True)
+                            st.caption(
+                                f"⏱️ Explicação ({explicacao['metodo_explicacao']}) calculada em "
+                                f"{explicacao['tempo_explicacao_ms']:.2f} ms"
+                            )
+                        
+                        if indice_casos is not None:
+                            with st.expander("📚 Casos semelhantes no treino"):
+                                st.dataframe(indice_casos.casos_similares(X_caso_proc, k=5), use_container_width=True)
+                    except Exception as erro_explicacao:
+                        st.warning(f"⚠️ Não foi possível explicar o caso: {str(erro_explicacao)[:100]}")
                 else:
                     raise ValueError("Modelo ou preprocessadores não disponíveis")
                     
@@ -557,9 +659,18 @@ elif modo == "📤 Upload de Arquivo":
             if colunas_faltantes:
                 st.warning(f"⚠️ Colunas faltantes serão preenchidas com 0: {colunas_faltantes[:10]}")
             
+            explicar_casos_lote = st.checkbox(
+                "🔬 Explicar cada caso (SHAP em lote)",
+                value=False,
+                disabled=not (SHAP_DISPONIVEL or suporta_atribuicao(modelo)),
+                help="Calcula a contribuição de cada feature para cada caso, em blocos paralelos gravados em disco. "
+                     "As features de maior impacto entram na tabela e no download."
+            )
+            
             # Botão de predição
             if st.button("🔍 Fazer Predições em Lote", type="primary"):
                 with st.spinner(f"Fazendo predições para {len(df_pred)} amostras..."):
+                    diretorio_shap_lote = None
                     try:
                         # Preparar dados
                         df_prep = df_pred.copy()
@@ -576,9 +687,11 @@ elif modo == "📤 Upload de Arquivo":
                         from vetlib.preprocessing import aplicar_preprocessamento
                         X_pred_proc, _ = aplicar_preprocessamento(X_pred, preprocessadores, fit=False)
                         
-                        # Predizer
-                        y_pred = modelo.predict(X_pred_proc)
-                        y_proba = modelo.predict_proba(X_pred_proc)
+                        # Predizer (uma única passada; na cascata, estatísticas só deste lote)
+                        if hasattr(modelo_inferencia, 'zerar_estatisticas'):
+                            modelo_inferencia.zerar_estatisticas()
+                        y_proba = modelo_inferencia.predict_proba(X_pred_proc)
+                        y_pred = modelo_inferencia.classes_[np.argmax(y_proba, axis=1)]
                         
                         # Adicionar resultados ao DataFrame original
                         df_resultado = df_pred.copy()
@@ -594,9 +707,55 @@ elif modo == "📤 Upload de Arquivo":
                             lambda x: 'Alta' if x > 0.7 else 'Média' if x > 0.4 else 'Baixa'
                         )
                         
+                        # Explicação de cada caso, bloco a bloco, com progresso na página
+                        # (.npy temporário, apagado depois de oferecido o download)
+                        caminho_shap_lote = None
+                        if explicar_casos_lote:
+                            barra_shap = st.progress(0.0, text="🔬 Explicando casos...")
+                            
+                            def atualizar_shap(info):
+                                barra_shap.progress(
+                                    info['n_concluidos'] / info['n_total'],
+                                    text=f"🔬 {info['n_concluidos']}/{info['n_total']} casos explicados"
+                                )
+                            
+                            diretorio_shap_lote = Path(tempfile.mkdtemp(prefix='shap_lote_'))
+                            caminho_shap_lote = explicar_lote(
+                                modelo, X_pred_proc,
+                                caminho_saida=diretorio_shap_lote / f"shap_lote_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.npy",
+                                fundo=st.session_state.get('fundo_shap'),
+                                progresso=atualizar_shap
+                            )
+                            df_top = resumir_explicacoes_lote(
+                                caminho_shap_lote, np.argmax(y_proba, axis=1), feature_names
+                            )
+                            df_resultado = pd.concat([df_resultado.reset_index(drop=True), df_top], axis=1)
+                        
+                        # Casos de treino mais semelhantes a cada linha (busca em blocos)
+                        if indice_casos is not None:
+                            df_similares = indice_casos.resumir_lote(X_pred_proc, y_pred, k=5)
+                            df_resultado = pd.concat([df_resultado.reset_index(drop=True), df_similares], axis=1)
+                        
+                        # Hipótese do sistema híbrido pelo histórico (uma busca por espécie para o lote todo)
+                        if st.session_state.get('df_main') is not None:
+                            if sistema_hibrido.df_historico is None:
+                                sistema_hibrido.carregar_dados_historicos(st.session_state.df_main)
+                            df_hipoteses = sistema_hibrido.gerar_hipoteses_lote(df_pred, n_hipoteses=1)
+                            df_resultado = pd.concat(
+                                [df_resultado.reset_index(drop=True), df_hipoteses.reset_index(drop=True)], axis=1
+                            )
+                        
                         # Mostrar resultados
                         st.success(f"✅ Predições concluídas para {len(df_resultado)} amostras!")
                         
+                        if hasattr(modelo_inferencia, 'resumo_estatisticas'):
+                            resumo_cascata = modelo_inferencia.resumo_estatisticas()
+                            st.info(
+                                f"⚡ Cascata: {resumo_cascata['fracao_rapido']:.1%} dos casos respondidos pelo "
+                                f"modelo rápido ({resumo_cascata['rapido_ms_por_caso']:.3f} ms/caso); "
+                                f"os demais pelo ensemble ({resumo_cascata['pesado_ms_por_caso']:.3f} ms/caso)"
+                            )
+                        
                         st.markdown("### 📊 Resultados")
                         
                         # Métricas resumidas
@@ -644,6 +803,15 @@ elif modo == "📤 Upload de Arquivo":
                         if 'especie' in df_resultado.columns:
                             colunas_mostrar.append('especie')
                         
+                        if caminho_shap_lote is not None:
+                            colunas_mostrar += ['feature_1', 'impacto_1', 'feature_2', 'impacto_2', 'feature_3', 'impacto_3']
+                        
+                        if indice_casos is not None:
+                            colunas_mostrar += ['casos_similares', 'similaridade_media', 'concordancia_similares']
+                        
+                        if 'hipotese_1' in df_resultado.columns:
+                            colunas_mostrar += ['hipotese_1', 'score_hipotese_1']
+                        
                         st.dataframe(df_resultado[colunas_mostrar], use_container_width=True)
                         
                         # Download de resultados
@@ -671,11 +839,29 @@ elif modo == "📤 Upload de Arquivo":
                                 mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                             )
                         
+                        if caminho_shap_lote is not None:
+                            # Array completo (casos × features × classes) lido do disco pelo botão
+                            with open(caminho_shap_lote, 'rb') as arquivo_shap:
+                                st.download_button(
+                                    label="📥 Download SHAP completo (.npy)",
+                                    data=arquivo_shap,
+                                    file_name=caminho_shap_lote.name,
+                                    mime='application/octet-stream'
+                                )
+                            st.caption(
+                                f"Array float32 (casos × {len(feature_names)} features × {len(target_names)} classes), "
+                                f"features e classes na ordem do modelo"
+                            )
+                        
                     except Exception as e:
                         st.error(f"❌ Erro ao fazer predições: {str(e)}")
                         import traceback
                         with st.expander("Ver detalhes"):
                             st.code(traceback.format_exc())
+                    finally:
+                        # O botão já leu o arquivo: nada fica acumulado em disco a cada lote
+                        if diretorio_shap_lote is not None:
+                            shutil.rmtree(diretorio_shap_lote, ignore_errors=True)
 
 # ============================================================================
 # SIDEBAR: INFO DO MODELO
@@ -698,6 +884,16 @@ with st.sidebar:
         metricas = st.session_state.metricas_modelo
         st.metric("F1 Score", f"{metricas['f1_macro']:.3f}")
         st.metric("Accuracy", f"{metricas['accuracy']:.3f}")
+    
+    # Importância por permutação salva com o artefato (nada é recalculado aqui)
+    df_permutacao, resumo_permutacao = st.session_state.get('importancia_permutacao') or (None, None)
+    if df_permutacao is not None:
+        with st.expander("🔀 Importância por permutação"):
+            st.dataframe(
+                df_permutacao[['feature', 'importancia', 'ic_inferior', 'ic_superior']].head(15),
+                use_container_width=True
+            )
+            st.caption(f"Queda de acurácia ao embaralhar cada feature ({resumo_permutacao['n_amostras']} casos)")
 
 # ============================================================================
 # SISTEMA DE MEDICAMENTOS E PROTOCOLO DE TRATAMENTO
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Teste da inferência em cascata: limiar calibrado e despacho entre estágios
+"""
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from vetlib.cascade import ModeloCascata, calibrar_limiar, construir_cascata, relatorio_cascata
+
+def test_cascade():
+    print("🧪 Testando inferência em cascata...")
+    
+    # Limiar vetorizado igual à busca exaustiva
+    rng = np.random.RandomState(0)
+    confianca = np.round(rng.rand(300), 2)
+    acerto_rapido = rng.rand(300) < confianca
+    acerto_pesado = rng.rand(300) < 0.8
+    
+    limiar = calibrar_limiar(confianca, acerto_rapido, acerto_pesado, tolerancia=0.01)
+    
+    acuracia_pesado = acerto_pesado.mean()
+    candidatos = [np.inf] + sorted(set(confianca))
+    aceitos = [
+        t for t in candidatos
+        if np.where(confianca >= t, acerto_rapido, acerto_pesado).mean() >= acuracia_pesado - 0.01
+    ]
+    assert limiar == min(aceitos)
+    print(f"✅ Limiar igual à busca exaustiva ({limiar:.2f})")
+    
+    X, y = make_classification(
+        n_samples=1000, n_features=10, n_informative=6,
+        n_classes=3, random_state=0
+    )
+    pesado = RandomForestClassifier(n_estimators=50, random_state=0).fit(X[:700], y[:700])
+    cascata = construir_cascata(pesado, X[:700], y[:700], tolerancia=0.0, cv_folds=3)
+    
+    proba = cascata.predict_proba(X[700:])
+    confiante = cascata.rapido.predict_proba(X[700:]).max(axis=1) >= cascata.limiar
+    assert np.allclose(proba[confiante], cascata.rapido.predict_proba(X[700:])[confiante])
+    assert np.allclose(proba[~confiante], pesado.predict_proba(X[700:])[~confiante])
+    assert cascata.resumo_estatisticas()['fracao_rapido'] == confiante.mean()
+    print(f"✅ {confiante.mean():.0%} dos casos respondidos pelo estágio rápido")
+    
+    # Limiar infinito: sempre o ensemble
+    sempre_pesado = ModeloCascata(cascata.rapido, pesado, np.inf)
+    assert np.allclose(sempre_pesado.predict_proba(X[700:]), pesado.predict_proba(X[700:]))
+    
+    relatorio = relatorio_cascata(cascata, X[700:], y[700:], n_repeticoes=3)
+    print({k: round(v, 3) for k, v in relatorio.items()})
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_cascade()
+    if success:
+        print("\n🎉 Inferência em cascata está funcionando corretamente!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Teste do índice de casos: top-k por argpartition, lote, modo aproximado e persistência
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from vetlib.case_index import IndiceCasos, salvar_indice_casos, carregar_indice_casos
+
+def test_case_index():
+    print("🧪 Testando índice de casos...")
+    
+    rng = np.random.RandomState(0)
+    centros = rng.randn(10, 12)
+    X = centros[rng.randint(0, 10, 3000)] + 0.5 * rng.randn(3000, 12)
+    y = rng.choice(['Dermatite', 'Gastrite', 'Otite'], 3000)
+    consultas = X[:50] + 0.1 * rng.randn(50, 12)
+    
+    # Mesmo top-k da similaridade de cosseno com ordenação completa
+    esperado = np.argsort(-cosine_similarity(consultas, X), axis=1, kind='stable')[:, :5]
+    indice = IndiceCasos(X, y)
+    posicoes, similaridades = indice.buscar(consultas, k=5)
+    
+    assert not indice.aproximado
+    assert np.array_equal(posicoes, esperado)
+    assert (np.diff(similaridades, axis=1) <= 0).all()
+    print("✅ Top-k exato igual ao cosine_similarity + argsort")
+    
+    # Resumo de um lote inteiro
+    df_lote = indice.resumir_lote(consultas, y[:50], k=5)
+    assert len(df_lote) == 50
+    assert df_lote['concordancia_similares'].between(0, 1).all()
+    print("✅ Casos semelhantes de cada linha do lote")
+    
+    # Modo aproximado: listas invertidas, quase sempre os mesmos vizinhos
+    aproximado = IndiceCasos(X, y, aproximado=True, n_listas=20, n_sondagens=5)
+    posicoes_aprox, _ = aproximado.buscar(consultas, k=5)
+    recall = np.mean([
+        len(set(aproximado.ids[posicoes_aprox[i]]) & set(esperado[i])) / 5 for i in range(50)
+    ])
+    assert recall >= 0.9
+    print(f"✅ Índice aproximado com recall@5 de {recall:.2f}")
+    
+    # Salvo e carregado ao lado do artefato
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_modelo = Path(diretorio) / 'modelo.pkl'
+        for original in (indice, aproximado):
+            salvar_indice_casos(caminho_modelo, original)
+            carregado = carregar_indice_casos(caminho_modelo)
+            assert carregado.aproximado == original.aproximado
+            assert carregado.casos_similares(consultas[:1]).equals(original.casos_similares(consultas[:1]))
+        assert carregar_indice_casos(Path(diretorio) / 'outro.pkl') is None
+    print("✅ Índice salvo e carregado com o modelo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_case_index()
+    if success:
+        print("\n🎉 Índice de casos está funcionando corretamente!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Teste da compressão de modelos: truncagem de ensembles, orçamento e
+artefato compacto
+"""
+
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from vetlib.compression import truncar_ensemble, comprimir_modelo, salvar_modelo_compacto
+
+def _dados():
+    X, y = make_classification(
+        n_samples=500, n_features=8, n_informative=5, n_redundant=0,
+        n_classes=3, random_state=0
+    )
+    return X[:350], y[:350], X[350:], y[350:]
+
+def test_compression():
+    print("🧪 Testando compressão de modelos...")
+    
+    X_train, y_train, X_test, y_test = _dados()
+    
+    # Boosting truncado = predição do estágio correspondente
+    gb = GradientBoostingClassifier(n_estimators=50, max_depth=2, random_state=0).fit(X_train, y_train)
+    estagios = list(gb.staged_predict(X_test))
+    estagios_proba = list(gb.staged_predict_proba(X_test))
+    for n in (1, 5, 20, 49):
+        truncado = truncar_ensemble(gb, n)
+        assert len(truncado.estimators_) == n and truncado.n_estimators_ == n
+        assert np.array_equal(truncado.predict(X_test), estagios[n - 1]), n
+        assert np.allclose(truncado.predict_proba(X_test), estagios_proba[n - 1]), n
+    assert len(gb.estimators_) == 50 and np.array_equal(gb.predict(X_test), estagios[-1])
+    print("✅ Boosting truncado igual a staged_predict, original intacto")
+    
+    # Floresta truncada = média das primeiras árvores
+    rf = RandomForestClassifier(n_estimators=40, random_state=0).fit(X_train, y_train)
+    for n in (1, 10, 25):
+        truncado = truncar_ensemble(rf, n)
+        media = np.mean([arvore.predict_proba(X_test) for arvore in rf.estimators_[:n]], axis=0)
+        assert np.allclose(truncado.predict_proba(X_test), media), n
+    assert len(rf.estimators_) == 40
+    print("✅ Floresta truncada igual à média das primeiras árvores")
+    
+    # Escolha na validação tirada do treino; o teste só mede o escolhido
+    modelo, relatorio = comprimir_modelo(gb, X_train, y_train, X_test, y_test,
+                                         tolerancia_acuracia=0.05, destilar=False, verbose=False)
+    escolhido = relatorio['escolhido']
+    assert modelo is not None and escolhido['metodo'] == 'truncagem'
+    assert relatorio['n_validacao'] == 70
+    assert escolhido['delta_acuracia'] >= -0.05
+    assert escolhido['accuracy'] == max(c['accuracy'] for c in relatorio['candidatos'] if c['atende'])
+    assert np.isclose(escolhido['accuracy_teste'], (modelo.predict(X_test) == y_test).mean())
+    assert np.isclose(relatorio['original']['accuracy_teste'], (gb.predict(X_test) == y_test).mean())
+    assert np.isclose(escolhido['delta_acuracia_teste'],
+                      escolhido['accuracy_teste'] - relatorio['original']['accuracy_teste'])
+    print(f"✅ Escolhido na validação: {escolhido['parametros']} "
+          f"({escolhido['delta_acuracia_teste']:+.4f} no teste)")
+    
+    # Orçamento impossível não devolve modelo
+    modelo_vazio, relatorio_vazio = comprimir_modelo(gb, X_train, y_train, X_test, y_test,
+                                                     tamanho_max_mb=1e-9, destilar=False, verbose=False)
+    assert modelo_vazio is None and relatorio_vazio['escolhido'] is None
+    assert not any(c['atende'] for c in relatorio_vazio['candidatos'])
+    print("✅ Orçamento impossível não escolhe candidato")
+    
+    # Artefato compacto ao lado do original, no mesmo formato
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = Path(diretorio) / 'modelo_teste.pkl'
+        joblib.dump({'model': gb, 'accuracy': relatorio['original']['accuracy'], 'feature_names': list(range(8))}, caminho)
+        
+        caminho_compacto = salvar_modelo_compacto(caminho, modelo, relatorio)
+        assert caminho_compacto == caminho.with_name('modelo_teste_compacto.pkl')
+        
+        model_data = joblib.load(caminho_compacto)
+        assert model_data['feature_names'] == list(range(8))
+        assert np.array_equal(model_data['model'].predict(X_test), modelo.predict(X_test))
+        assert model_data['compressao']['artefato_original'] == 'modelo_teste.pkl'
+        assert model_data['compressao']['parametros'] == escolhido['parametros']
+        assert model_data['accuracy'] == escolhido['accuracy_teste']
+        assert model_data['compressao']['delta_acuracia'] == escolhido['delta_acuracia_teste']
+    print("✅ Artefato compacto preserva o formato do original")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_compression()
+    if success:
+        print("\n🎉 Compressão de modelos está funcionando corretamente!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Teste do motor de avaliação em passada única: métricas idênticas às do sklearn
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, roc_auc_score
+from sklearn.preprocessing import LabelEncoder
+
+from vetlib.evaluation import pontuar_modelo, metricas_globais, metricas_por_grupo, intervalos_bootstrap
+
+def test_evaluation():
+    print("🧪 Testando motor de avaliação...")
+    
+    X, y = make_classification(
+        n_samples=900, n_features=10, n_informative=6,
+        n_classes=5, random_state=0
+    )
+    rotulos = np.array(['Artrose', 'Dermatite', 'Diabetes', 'Gastrite', 'Otite'])[y]
+    label_encoder = LabelEncoder().fit(rotulos)
+    
+    modelo = RandomForestClassifier(n_estimators=50, random_state=0)
+    modelo.fit(X[:600], label_encoder.transform(rotulos[:600]))
+    
+    X_test, y_test = X[600:], rotulos[600:]
+    especies = pd.Series(np.random.RandomState(0).choice(['Canina', 'Felina', 'Equina'], len(y_test)))
+    
+    pontuacao = pontuar_modelo(modelo, X_test, y_test, label_encoder)
+    y_true = label_encoder.transform(y_test)
+    y_pred = modelo.predict(X_test)
+    
+    metricas = metricas_globais(pontuacao)
+    assert np.isclose(metricas['accuracy'], accuracy_score(y_true, y_pred))
+    assert np.isclose(metricas['f1_macro'], f1_score(y_true, y_pred, average='macro'))
+    assert np.isclose(metricas['f1_weighted'], f1_score(y_true, y_pred, average='weighted'))
+    assert np.isclose(metricas['precision_macro'], precision_score(y_true, y_pred, average='macro'))
+    assert np.array_equal(metricas['confusion_matrix'], confusion_matrix(y_true, y_pred))
+    assert np.isclose(metricas['roc_auc'], roc_auc_score(y_true, modelo.predict_proba(X_test), multi_class='ovr'))
+    print("✅ Métricas globais idênticas ao sklearn")
+    
+    por_especie = metricas_por_grupo(pontuacao, especies)
+    for especie, metricas_especie in por_especie.items():
+        mascara = (especies == especie).values
+        assert metricas_especie['n_samples'] == mascara.sum()
+        assert np.isclose(metricas_especie['f1_macro'], f1_score(y_true[mascara], y_pred[mascara], average='macro'))
+        assert np.array_equal(metricas_especie['confusion_matrix'], confusion_matrix(y_true[mascara], y_pred[mascara]))
+    print(f"✅ Métricas por espécie idênticas ao sklearn ({len(por_especie)} espécies)")
+    
+    intervalos = intervalos_bootstrap(pontuacao, n_bootstrap=500)
+    assert (intervalos['inferior'] <= intervalos['estimativa']).all()
+    assert (intervalos['estimativa'] <= intervalos['superior']).all()
+    print("✅ Intervalos bootstrap contêm as estimativas")
+    print(intervalos.round(3))
+    
+    # Rótulo que o modelo nunca viu: erro em vez de cair na classe vizinha
+    modelo_parcial = RandomForestClassifier(n_estimators=10, random_state=0)
+    mascara_treino = rotulos[:600] != 'Diabetes'
+    modelo_parcial.fit(X[:600][mascara_treino], rotulos[:600][mascara_treino])
+    try:
+        pontuar_modelo(modelo_parcial, X_test, y_test)
+        assert False, "rótulo desconhecido não foi detectado"
+    except ValueError as erro:
+        assert 'Diabetes' in str(erro)
+    print("✅ Rótulos desconhecidos pelo modelo geram erro")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_evaluation()
+    if success:
+        print("\n🎉 Motor de avaliação está funcionando corretamente!")
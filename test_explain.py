@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Teste do cache de explainers SHAP, do fundo resumido do KernelExplainer e
+das explicações em lote
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import shap
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from vetlib.explain import (
+    obter_explainer, limpar_cache_explainers, resumir_fundo, salvar_fundo, carregar_fundo, caminho_fundo,
+    explicar_lote, carregar_explicacoes_lote, resumir_explicacoes_lote, obter_atribuidor
+)
+
+def _dados():
+    X, y = make_classification(
+        n_samples=300, n_features=6, n_informative=4, n_redundant=0,
+        n_classes=3, random_state=0
+    )
+    return X, y
+
+def test_explainer_cache():
+    print("🧪 Testando cache de explainers e fundo resumido...")
+    
+    X, y = _dados()
+    
+    # Árvores: o TreeExplainer é construído uma vez por modelo
+    floresta = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    explainer = obter_explainer(floresta)
+    assert obter_explainer(floresta) is explainer
+    
+    outra = RandomForestClassifier(n_estimators=10, random_state=1).fit(X, y)
+    assert obter_explainer(outra) is not explainer
+    
+    limpar_cache_explainers(floresta)
+    assert obter_explainer(floresta) is not explainer
+    print("✅ TreeExplainer reaproveitado por modelo")
+    
+    # Sem árvores: a segunda chamada vem do cache e dispensa o fundo
+    logistica = LogisticRegression(max_iter=1000).fit(X, y)
+    explainer = obter_explainer(logistica, X_fundo=X)
+    assert obter_explainer(logistica) is explainer
+    
+    limpar_cache_explainers()
+    try:
+        obter_explainer(logistica)
+        assert False, "KernelExplainer sem fundo fora do cache"
+    except ValueError:
+        pass
+    print("✅ KernelExplainer reaproveitado sem refazer o fundo")
+    
+    # Fundo: centróides k-means com pesos pela fração de casos
+    fundo = resumir_fundo(X, n_centroides=8)
+    assert fundo['centroides'].shape == (8, X.shape[1])
+    assert np.isclose(fundo['pesos'].sum(), 1) and (fundo['pesos'] > 0).all()
+    assert resumir_fundo(X[:5])['centroides'].shape == (5, X.shape[1])
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_modelo = Path(diretorio) / 'modelo_teste.pkl'
+        assert carregar_fundo(caminho_modelo) is None
+        
+        caminho = salvar_fundo(caminho_modelo, fundo)
+        assert caminho == caminho_fundo(caminho_modelo) == Path(diretorio) / 'modelo_teste_fundo_shap.npz'
+        
+        carregado = carregar_fundo(caminho_modelo)
+        assert np.array_equal(carregado['centroides'], fundo['centroides'])
+        assert np.array_equal(carregado['pesos'], fundo['pesos'])
+        
+        explainer = obter_explainer(logistica, fundo=carregado)
+        assert explainer.data.data.shape == (8, X.shape[1])
+        assert np.allclose(explainer.data.weights, fundo['pesos'])
+    limpar_cache_explainers()
+    print("✅ Fundo salvo e carregado ao lado do artefato")
+    
+    return True
+
+def test_explicar_lote():
+    print("🧪 Testando explicações SHAP em lote...")
+    
+    X, y = _dados()
+    X_lote = X[:230]
+    floresta = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        eventos = []
+        caminho = explicar_lote(
+            floresta, X_lote, caminho_saida=Path(diretorio) / 'lote.npy',
+            tamanho_bloco=50, n_jobs=2, progresso=eventos.append
+        )
+        valores = carregar_explicacoes_lote(caminho)
+        assert isinstance(valores, np.memmap) and valores.dtype == np.float32
+        assert valores.shape == (len(X_lote), X.shape[1], 3)
+        assert len(eventos) == 5 and eventos[-1]['n_concluidos'] == eventos[-1]['n_total'] == len(X_lote)
+        print("✅ Arquivo (casos × features × classes) com progresso por bloco")
+        
+        # Cada caso igual ao SHAP calculado diretamente, linha a linha
+        explainer = shap.TreeExplainer(floresta)
+        for i in range(0, len(X_lote), 7):
+            direto = np.asarray(explainer.shap_values(X_lote[i:i + 1]))[0]
+            assert np.allclose(valores[i], direto, atol=1e-5), i
+        
+        # Valores SHAP somam a probabilidade menos o valor esperado
+        proba = floresta.predict_proba(X_lote)
+        assert np.allclose(valores.sum(axis=1) + explainer.expected_value, proba, atol=1e-4)
+        print("✅ Lote igual ao SHAP caso a caso")
+        
+        # Top features da classe predita, lidas em blocos de tamanho diferente
+        classes_preditas = proba.argmax(axis=1)
+        nomes = [f'exame_{i}' for i in range(X.shape[1])]
+        resumo = resumir_explicacoes_lote(caminho, classes_preditas, nomes, top_n=3, tamanho_bloco=64)
+        assert len(resumo) == len(X_lote)
+        
+        impacto = np.asarray(valores)[np.arange(len(X_lote)), :, classes_preditas]
+        ordem = np.argsort(-np.abs(impacto), axis=1)[:, :3]
+        for i in range(3):
+            assert (resumo[f'feature_{i + 1}'].to_numpy() == np.array(nomes)[ordem[:, i]]).all()
+            assert np.allclose(resumo[f'impacto_{i + 1}'], impacto[np.arange(len(X_lote)), ordem[:, i]])
+        del valores
+        
+        # GradientBoosting multiclasse (o TreeExplainer recusa): TreeSHAP nativo, sem fundo
+        boosting = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(X, y)
+        caminho = explicar_lote(boosting, X_lote, caminho_saida=Path(diretorio) / 'lote_gb.npy',
+                                tamanho_bloco=50, n_jobs=1)
+        valores = carregar_explicacoes_lote(caminho)
+        margem = valores.sum(axis=1) + obter_atribuidor(boosting).valor_esperado
+        assert np.allclose(margem, boosting.decision_function(X_lote), atol=1e-4)
+        del valores
+    limpar_cache_explainers()
+    print("✅ Top features por caso na classe predita")
+    print("✅ GradientBoosting multiclasse explicado sem fundo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_explainer_cache() and test_explicar_lote()
+    if success:
+        print("\n🎉 Cache de explainers e explicações em lote estão funcionando corretamente!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Teste do modelo enxuto: menor conjunto de features dentro da tolerância
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+
+from vetlib.feature_budget import construir_modelo_enxuto, _menor_prefixo
+from vetlib.modeling import prever_diagnostico
+
+def test_feature_budget():
+    print("🧪 Testando modelo enxuto...")
+    
+    # 4 features informativas e 16 de ruído
+    X, y = make_classification(
+        n_samples=800, n_features=20, n_informative=4, n_redundant=0,
+        n_classes=3, shuffle=False, random_state=0
+    )
+    X = pd.DataFrame(X, columns=[f'exame_{i}' for i in range(X.shape[1])])
+    y = pd.Series(np.array(['Dermatite', 'Gastrite', 'Otite'])[y])
+    
+    resultado = construir_modelo_enxuto(X, y, 'Random Forest', tolerancia=0.02, cv_folds=3)
+    manifesto = resultado['manifesto']
+    
+    assert manifesto['n_features'] < manifesto['n_features_original']
+    assert manifesto['accuracy_cv'] >= manifesto['accuracy_cv_original'] - 0.02
+    assert set(manifesto['features_obrigatorias']) <= {f'exame_{i}' for i in range(4)}
+    print(f"✅ {manifesto['n_features']} de {manifesto['n_features_original']} features "
+          f"(CV {manifesto['accuracy_cv']:.3f} vs {manifesto['accuracy_cv_original']:.3f})")
+    
+    # Nenhum tamanho menor avaliado cabe na tolerância
+    curva = resultado['curva']
+    menores = curva[curva.index < manifesto['n_features']]
+    assert (menores < manifesto['accuracy_cv_original'] - 0.02).all()
+    
+    # A inferência só precisa das entradas do manifesto
+    caso = X.iloc[[0]][manifesto['features_obrigatorias']].copy()
+    predicao = prever_diagnostico(
+        resultado['modelo'], caso, resultado['preprocessadores'], resultado['feature_names']
+    )
+    assert len(predicao) == 3
+    print("✅ Predição usando apenas as entradas obrigatórias")
+    
+    return True
+
+def test_menor_prefixo():
+    print("🧪 Testando busca do menor prefixo com CV ruidosa...")
+    
+    def curva(valores):
+        avaliados = []
+        def avaliar(k):
+            avaliados.append(k)
+            return valores[k]
+        return avaliar, avaliados
+    
+    # Curva monotônica: o limiar exato
+    valores = {k: min(0.9, 0.5 + 0.05 * k) for k in range(1, 21)}
+    avaliar, _ = curva(valores)
+    assert _menor_prefixo(avaliar, 20, 0.88) == 8
+    
+    # A busca binária aceitaria k=5 (passa por ruído com k=6 fora): sobe até um k estável
+    valores = {k: 0.9 if k >= 8 else 0.7 for k in range(1, 21)}
+    valores[5] = 0.9
+    avaliar, avaliados = curva(valores)
+    assert _menor_prefixo(avaliar, 20, 0.88) == 8
+    assert 6 in avaliados
+    
+    # Curvas ruidosas: k atende, k+1 atende e k-1 não atende
+    rng = np.random.RandomState(0)
+    for _ in range(200):
+        base = np.minimum(0.9, 0.5 + 0.04 * np.arange(1, 21))
+        valores = dict(zip(range(1, 21), base + rng.normal(0, 0.03, 20)))
+        avaliar, _ = curva(valores)
+        alvo = valores[20] - 0.02
+        escolhido = _menor_prefixo(avaliar, 20, alvo)
+        assert escolhido == 20 or (valores[escolhido] >= alvo and (escolhido == 19 or valores[escolhido + 1] >= alvo))
+        assert escolhido == 1 or valores[escolhido - 1] < alvo
+    print("✅ Resultado conferido na vizinhança (k-1 não atende, k+1 atende)")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_menor_prefixo() and test_feature_budget()
+    if success:
+        print("\n🎉 Modelo enxuto está funcionando corretamente!")
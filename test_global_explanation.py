@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Teste da explicação global salva no artefato do modelo
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from vetlib.explain import (
+    gerar_explicacao_global, plotar_shap_global, plotar_perfis_classe, plotar_permutation_importance
+)
+from vetlib.modeling import salvar_modelo, carregar_artefato, carregar_modelo
+from vetlib.permutation import calcular_importancia_permutacao
+
+def test_global_explanation():
+    print("🧪 Testando explicação global do modelo...")
+    
+    # 3 features informativas e 5 de ruído
+    X, y = make_classification(
+        n_samples=600, n_features=8, n_informative=3, n_redundant=0,
+        n_classes=3, shuffle=False, random_state=0
+    )
+    X = pd.DataFrame(X, columns=[f'exame_{i}' for i in range(X.shape[1])])
+    y = np.array(['Dermatite', 'Gastrite', 'Otite'])[y]
+    modelo = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    
+    df_permutacao, resumo_permutacao = calcular_importancia_permutacao(modelo, X, y)
+    explicacao = gerar_explicacao_global(modelo, X, y, df_permutacao=df_permutacao,
+                                         resumo_permutacao=resumo_permutacao, max_amostras=100)
+    
+    shap_medio_abs = explicacao['shap_medio_abs']
+    assert shap_medio_abs.shape == (8, 3)
+    assert list(shap_medio_abs.columns) == ['Dermatite', 'Gastrite', 'Otite']
+    assert set(shap_medio_abs.sum(axis=1).nlargest(3).index) == {'exame_0', 'exame_1', 'exame_2'}
+    assert explicacao['perfis_classe'].shape == (3, 8)
+    print(f"✅ |SHAP| por classe ({explicacao['metodo_shap']}), permutação e perfis")
+    
+    # Salva dentro do artefato e desenha sem recalcular
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.chdir(diretorio)
+        try:
+            caminho = salvar_modelo(modelo, {}, list(X.columns), caminho_base='models/modelo',
+                                    explicacao_global=explicacao)
+            artefato = carregar_artefato(caminho)
+            assert carregar_modelo(caminho)[2] == list(X.columns)
+        finally:
+            os.chdir(diretorio_original)
+    
+    salva = artefato['explicacao_global']
+    assert salva['shap_medio_abs'].equals(shap_medio_abs)
+    assert salva['importancia_permutacao'].equals(df_permutacao)
+    
+    for figura in (plotar_shap_global(salva), plotar_shap_global(salva, classe='Otite'),
+                   plotar_perfis_classe(salva), plotar_permutation_importance(salva)):
+        assert figura is not None
+    print("✅ Explicação salva no artefato e gráficos gerados a partir dela")
+    
+    # GradientBoosting multiclasse sem fundo (o TreeExplainer recusa): TreeSHAP nativo
+    boosting = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(X, y)
+    explicacao = gerar_explicacao_global(boosting, X, y, max_amostras=100)
+    assert explicacao['metodo_shap'] == 'treeshap' and explicacao['erro_shap'] is None
+    assert set(explicacao['shap_medio_abs'].sum(axis=1).nlargest(3).index) == {'exame_0', 'exame_1', 'exame_2'}
+    print("✅ GradientBoosting multiclasse com |SHAP| do motor nativo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_global_explanation()
+    if success:
+        print("\n🎉 Explicação global está funcionando corretamente!")
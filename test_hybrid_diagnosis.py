@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Teste dos índices por espécie do sistema híbrido de diagnóstico
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from vetlib.hybrid_diagnosis import SistemaDiagnosticoHibrido
+
+def _historico(n=300, random_state=0):
+    """Histórico sintético com duas espécies em escalas diferentes"""
+    rng = np.random.RandomState(random_state)
+    especie = np.where(rng.rand(n) < 0.6, 'Canina', 'Felina')
+    escala = np.where(especie == 'Canina', 1.0, 3.0)[:, np.newaxis]
+    
+    df = pd.DataFrame(rng.normal(size=(n, 4)) * escala, columns=['ureia', 'creatinina', 'glicose', 'alt'])
+    df['vomito'] = rng.randint(0, 2, n)
+    df.loc[rng.rand(n) < 0.05, 'glicose'] = np.nan
+    df.insert(0, 'especie', especie)
+    df['diagnostico'] = rng.choice(['Doença Renal', 'Diabetes', 'Saudável'], n)
+    return df
+
+def test_hybrid_diagnosis():
+    print("🧪 Testando índices por espécie do sistema híbrido...")
+    
+    df = _historico()
+    sistema = SistemaDiagnosticoHibrido()
+    sistema.carregar_dados_historicos(df)
+    
+    assert set(sistema.indices_especie) == {None, 'Canina', 'Felina'}
+    print("✅ Um índice por espécie, mais o índice geral")
+    
+    # Caso igual a um felino completo do histórico: ele mesmo vem primeiro
+    linha = df[(df['especie'] == 'Felina') & df['glicose'].notna()].iloc[5]
+    exames = {col: linha[col] for col in ['ureia', 'creatinina', 'glicose', 'alt']}
+    sintomas = {'vomito': bool(linha['vomito'])}
+    
+    casos = sistema.encontrar_casos_similares(sintomas, exames, 'Felina', n_casos=10)
+    assert len(casos) == 10 and (casos['especie'] == 'Felina').all()
+    assert casos.index[0] == linha.name and np.isclose(casos['similaridade'].iloc[0], 1, atol=1e-5)
+    
+    # Similaridades = cosseno no espaço padronizado só com os felinos
+    felinos = df[df['especie'] == 'Felina'].drop(columns=['especie', 'diagnostico'])
+    felinos = felinos.fillna(felinos.median())
+    scaler = StandardScaler().fit(felinos)
+    Z = scaler.transform(felinos)
+    z = scaler.transform(felinos.loc[[linha.name]])[0]
+    cosseno = pd.Series(Z @ z / (np.linalg.norm(Z, axis=1) * np.linalg.norm(z)), index=felinos.index)
+    
+    assert np.allclose(casos['similaridade'], cosseno.loc[casos.index], atol=1e-5)
+    assert np.allclose(casos['similaridade'], cosseno.nlargest(10), atol=1e-5)
+    print("✅ Casos da mesma espécie, alinhados com o histórico")
+    
+    # Espécie desconhecida usa o índice geral
+    casos = sistema.encontrar_casos_similares(sintomas, exames, 'Equina', n_casos=10)
+    assert len(casos) == 10
+    print("✅ Espécie sem casos usa o índice geral")
+    
+    return True
+
+def test_hipoteses_lote():
+    print("🧪 Testando hipóteses em lote do sistema híbrido...")
+    
+    df = _historico()
+    sistema = SistemaDiagnosticoHibrido()
+    sistema.carregar_dados_historicos(df)
+    
+    lote = _historico(n=40, random_state=1).drop(columns=['diagnostico'])
+    lote.loc[:4, 'especie'] = 'Equina'
+    resultado = sistema.gerar_hipoteses_lote(lote, n_casos=15, n_hipoteses=2)
+    assert len(resultado) == len(lote) and resultado.index.equals(lote.index)
+    
+    # Mesmo score do caminho de um caso: 0,6 × frequência + 0,4 × similaridade média
+    for indice, linha in lote.iterrows():
+        exames = {col: linha[col] for col in ['ureia', 'creatinina', 'glicose', 'alt']}
+        casos = sistema.encontrar_casos_similares({'vomito': linha['vomito']}, exames, linha['especie'], n_casos=15)
+        por_diagnostico = casos.groupby('diagnostico')['similaridade'].agg(['size', 'mean'])
+        scores = (por_diagnostico['size'] / len(casos) * 0.6 + por_diagnostico['mean'] * 0.4).sort_values(ascending=False)
+        
+        assert np.isclose(resultado.loc[indice, 'score_hipotese_1'], scores.iloc[0])
+        assert np.isclose(resultado.loc[indice, 'score_hipotese_2'], scores.iloc[1])
+        assert resultado.loc[indice, 'casos_hipotese_1'] == por_diagnostico.loc[resultado.loc[indice, 'hipotese_1'], 'size']
+    print("✅ Lote igual a gerar as hipóteses caso a caso")
+    
+    # Vazão em 100 mil casos
+    grande = _historico(n=100_000, random_state=2).drop(columns=['diagnostico'])
+    inicio = time.perf_counter()
+    resultado = sistema.gerar_hipoteses_lote(grande)
+    duracao = time.perf_counter() - inicio
+    assert resultado['hipotese_1'].notna().all()
+    print(f"✅ {len(grande):,} casos em {duracao:.2f}s ({len(grande) / duracao:,.0f} casos/s)")
+    
+    return True
+
+def test_adicionar_casos():
+    print("🧪 Testando adição incremental de casos ao sistema híbrido...")
+    
+    df = _historico()
+    sistema = SistemaDiagnosticoHibrido()
+    sistema.carregar_dados_historicos(df)
+    scaler_felino = sistema.indices_especie['Felina']['scaler']
+    
+    novos = _historico(n=30, random_state=3)
+    novos = novos[novos['glicose'].notna()].copy()
+    novos.index += 1000
+    novos.iloc[0, novos.columns.get_loc('especie')] = 'Felina'
+    novos.iloc[0, novos.columns.get_loc('diagnostico')] = 'Leptospirose'
+    novos.iloc[1, novos.columns.get_loc('especie')] = 'Equina'
+    
+    sistema.adicionar_casos(novos.iloc[:1])
+    sistema.adicionar_casos(novos.iloc[1:])
+    
+    # Nada foi reajustado: os casos novos estão só nas caudas
+    assert sistema.indices_especie['Felina']['scaler'] is scaler_felino
+    assert len(sistema.df_historico) == len(df) and len(sistema.df_novos) == len(novos)
+    assert len(sistema.indices_especie[None]['cauda']) == len(novos)
+    print("✅ Casos novos na cauda, com o scaler congelado")
+    
+    # Cada caso novo é o mais semelhante a si mesmo (espécie sem índice -> índice geral)
+    for _, linha in novos.iloc[:4].iterrows():
+        exames = {col: linha[col] for col in ['ureia', 'creatinina', 'glicose', 'alt']}
+        casos = sistema.encontrar_casos_similares({'vomito': linha['vomito']}, exames, linha['especie'], n_casos=5)
+        assert casos.index[0] == linha.name and np.isclose(casos['similaridade'].iloc[0], 1, atol=1e-5)
+        assert casos['diagnostico'].iloc[0] == linha['diagnostico']
+    
+    lote = sistema.gerar_hipoteses_lote(novos.iloc[:1].drop(columns=['diagnostico']), n_hipoteses=10)
+    assert 'Leptospirose' in lote.filter(like='hipotese_').iloc[0].values
+    print("✅ Casos e diagnósticos novos pesquisáveis logo após a adição")
+    
+    # Reconstrução incorpora os casos novos ao histórico
+    sistema.reconstruir_indices()
+    assert len(sistema.df_historico) == len(df) + len(novos) and sistema.df_novos is None
+    assert 'Equina' in sistema.indices_especie
+    assert all(grupo['cauda'] is None for grupo in sistema.indices_especie.values())
+    print("✅ Reconstrução incorpora os casos novos")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_hybrid_diagnosis() and test_hipoteses_lote() and test_adicionar_casos()
+    if success:
+        print("\n🎉 Índices por espécie do sistema híbrido estão funcionando corretamente!")
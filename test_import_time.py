@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Teste do orçamento de importação: cada módulo da vetlib importado num
+interpretador novo com `python -X importtime`, sem streamlit, shap, plotly,
+lightgbm ou xgboost
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Dependências que só podem ser importadas no primeiro uso (ver vetlib.lazy)
+DEPENDENCIAS_PESADAS = ('streamlit', 'shap', 'plotly', 'lightgbm', 'xgboost', 'requests')
+
+# Tempo máximo de importação de um módulo (cumulativo, com pandas/sklearn)
+ORCAMENTO_MS = 5000
+
+def _tempos_importacao(modulo):
+    """Tempo cumulativo (ms) de cada pacote importado por `import modulo`"""
+    saida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+    ).stderr
+    
+    tempos = {}
+    for linha in saida.splitlines():
+        if linha.startswith('import time:') and '|' in linha:
+            _, cumulativo, nome = linha.split('|')
+            if cumulativo.strip().isdigit():
+                tempos[nome.strip()] = int(cumulativo) / 1000
+    return tempos
+
+def test_import_time():
+    print("🧪 Testando orçamento de importação da vetlib...")
+    
+    modulos = sorted(
+        f'vetlib.{caminho.stem}' for caminho in (Path(__file__).parent / 'vetlib').glob('*.py')
+        if caminho.stem != '__init__'
+    )
+    
+    print(f"\n{'módulo':<34}{'ms':>8}")
+    for modulo in modulos:
+        tempos = _tempos_importacao(modulo)
+        print(f"{modulo:<34}{tempos[modulo]:>8.0f}")
+        
+        pesadas = [d for d in DEPENDENCIAS_PESADAS if d in tempos]
+        assert not pesadas, f"{modulo} importa {pesadas} na importação"
+        assert tempos[modulo] < ORCAMENTO_MS, f"{modulo} levou {tempos[modulo]:.0f} ms"
+    
+    print(f"\n✅ {len(modulos)} módulos abaixo de {ORCAMENTO_MS} ms e sem dependências pesadas")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_import_time()
+    if success:
+        print("\n🎉 Orçamento de importação está sendo respeitado!")
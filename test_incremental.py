@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Teste da atualização incremental: warm start, reservatório por classe e
+gatilhos de retreino completo
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from vetlib.incremental import (
+    iniciar_estado_incremental, atualizar_modelo_incremental, verificar_necessidade_retreino
+)
+from vetlib.preprocessing import (
+    criar_preprocessador, aplicar_preprocessamento, atualizar_estatisticas_preprocessamento
+)
+
+def _dados():
+    X, y = make_classification(
+        n_samples=600, n_features=6, n_informative=4, n_redundant=0,
+        n_classes=3, random_state=0
+    )
+    X = pd.DataFrame(X, columns=[f'exame_{i}' for i in range(6)])
+    rotulos = np.array(['Dermatite', 'Diabetes', 'Otite'])[y]
+    return X, rotulos
+
+def test_incremental():
+    print("🧪 Testando atualização incremental...")
+    
+    X, rotulos = _dados()
+    label_encoder = LabelEncoder().fit(rotulos)
+    y_cod = label_encoder.transform(rotulos)
+    
+    # Florestas ganham árvores; boosting continua os estágios
+    modelos = [
+        (RandomForestClassifier(n_estimators=20, random_state=0), lambda m: len(m.estimators_)),
+        (GradientBoostingClassifier(n_estimators=20, random_state=0), lambda m: len(m.estimators_)),
+        (HistGradientBoostingClassifier(max_iter=20, early_stopping=False, random_state=0), lambda m: m.n_iter_)
+    ]
+    for modelo, tamanho in modelos:
+        modelo.fit(X[:400], y_cod[:400])
+        historico = iniciar_estado_incremental(
+            X[:400], rotulos[:400], {'label_encoder': label_encoder, 'cv_f1_mean': 0.8}
+        )
+        
+        modelo, resumo = atualizar_modelo_incremental(modelo, historico, X[400:500], rotulos[400:500])
+        assert resumo['estimadores_adicionados'] > 0
+        assert tamanho(modelo) == 20 + resumo['estimadores_adicionados'], type(modelo).__name__
+        assert set(modelo.predict(X[500:])) <= set(range(3))
+        assert historico['incremental']['n_incremental'] == 100
+        print(f"✅ {type(modelo).__name__}: 20 → {tamanho(modelo)} estimadores")
+    
+    # Reservatório: no máximo capacidade por classe, só com casos da própria classe
+    historico = iniciar_estado_incremental(
+        X[:400], rotulos[:400], {'label_encoder': label_encoder}, capacidade_por_classe=30
+    )
+    estado = historico['incremental']
+    X_array = X.to_numpy()
+    
+    for classe, reservatorio in estado['reservatorio'].items():
+        X_classe = X_array[:400][y_cod[:400] == classe]
+        assert len(reservatorio['X']) == 30 and reservatorio['vistos'] == len(X_classe)
+        assert all((X_classe == linha).all(axis=1).any() for linha in reservatorio['X'])
+    
+    modelo = RandomForestClassifier(n_estimators=10, random_state=0).fit(X[:400], y_cod[:400])
+    atualizar_modelo_incremental(modelo, historico, X[400:500], rotulos[400:500])
+    for classe, reservatorio in estado['reservatorio'].items():
+        assert len(reservatorio['X']) == 30
+        assert reservatorio['vistos'] == (y_cod[:500] == classe).sum()
+    print("✅ Reservatório por classe com capacidade fixa")
+    
+    # Classe nova exige retreino completo
+    try:
+        atualizar_modelo_incremental(modelo, historico, X[:2], np.array(['Otite', 'Gastrite']))
+        assert False, "classe nova não foi detectada"
+    except ValueError:
+        pass
+    
+    # Sem deriva e com poucos casos incrementais, não há retreino
+    preprocessadores = criar_preprocessador(X[:400])
+    _, preprocessadores = aplicar_preprocessamento(X[:400], preprocessadores, fit=True)
+    preprocessadores = atualizar_estatisticas_preprocessamento(X[400:500], preprocessadores)
+    
+    verificacao = verificar_necessidade_retreino(historico, preprocessadores, limites={'queda_f1': 1.0})
+    assert not verificacao['retreino_necessario'], verificacao['motivos']
+    assert estado['retreino_agendado'] is None
+    
+    # Deriva de uma feature agenda o retreino
+    X_deriva = X[500:].copy()
+    X_deriva['exame_3'] += 10 * X['exame_3'].std()
+    preprocessadores = atualizar_estatisticas_preprocessamento(X_deriva, preprocessadores)
+    
+    verificacao = verificar_necessidade_retreino(historico, preprocessadores, limites={'queda_f1': 1.0})
+    assert verificacao['retreino_necessario']
+    assert verificacao['metricas']['feature_maior_deriva'] == 'exame_3'
+    assert any("exame_3" in motivo for motivo in verificacao['motivos'])
+    assert estado['retreino_agendado']['motivos'] == verificacao['motivos']
+    print("✅ Deriva no pré-processamento agenda retreino completo")
+    
+    # Queda do F1 prequencial em relação ao F1 do treino completo
+    estado['f1_referencia'] = 1.0
+    estado['f1_prequencial'] = [0.6, 0.6, 0.6]
+    verificacao = verificar_necessidade_retreino(historico)
+    assert verificacao['retreino_necessario'] and np.isclose(verificacao['metricas']['queda_f1'], 0.4)
+    print("✅ Queda do F1 prequencial agenda retreino completo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_incremental()
+    if success:
+        print("\n🎉 Atualização incremental está funcionando corretamente!")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Teste da fila de jobs de treinamento (processos separados)
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import cross_val_score
+
+from benchmark_modeling import gerar_dataset_sintetico
+from vetlib.jobs import FilaJobs, STATUS_FINAIS, nucleos_por_job
+from vetlib.modeling import progresso_por_fold
+from vetlib.preprocessing import preparar_features_target
+from vetlib.registry import listar_modelos_registrados
+
+def _aguardar(fila, job_id, timeout=300):
+    inicio = time.time()
+    while time.time() - inicio < timeout:
+        estado = fila.estado(job_id)
+        if estado['status'] in STATUS_FINAIS:
+            return estado
+        time.sleep(0.2)
+    raise TimeoutError(job_id)
+
+def test_jobs():
+    print("🧪 Testando fila de jobs...")
+    
+    diretorio_original = os.getcwd()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Artefatos e registro vão para models/ do diretório de trabalho
+        os.chdir(diretorio)
+        try:
+            df = gerar_dataset_sintetico(400, random_state=0)
+            X, y, feature_names = preparar_features_target(df)
+            
+            fila = FilaJobs(diretorio='jobs', max_concorrentes=1)
+            kwargs = {'X': X, 'y': y, 'feature_names': feature_names, 'cv_folds': 3}
+            
+            # Busca em paralelo: o progresso vem de cada fold concluído
+            job_longo = fila.submeter(
+                'vetlib.training_jobs:treinar_e_avaliar',
+                {**kwargs, 'nome_modelo': 'Random Forest', 'usar_grid_search': True, 'n_jobs': 2},
+                descricao='busca'
+            )
+            job_curto = fila.submeter(
+                'vetlib.training_jobs:treinar_e_avaliar',
+                {**kwargs, 'nome_modelo': 'Logistic Regression'},
+                descricao='direto'
+            )
+            
+            # Com uma vaga, um dos jobs espera enquanto o outro executa
+            while True:
+                estados = [fila.estado(job_longo), fila.estado(job_curto)]
+                status = sorted(estado['status'] for estado in estados)
+                assert status != ['executando', 'executando'], status
+                if estados[0]['status'] == 'executando' and estados[0]['progresso'].get('fold'):
+                    break
+                time.sleep(0.1)
+            
+            progresso = estados[0]['progresso']
+            assert progresso['etapa'] == 'busca' and progresso['n_folds'] == 3, progresso
+            assert 'tempo_decorrido_s' in progresso
+            
+            # Cancelamento encerra o processo e libera a vaga
+            assert fila.cancelar(job_longo)
+            assert fila.estado(job_longo)['status'] == 'cancelado'
+            
+            estado = _aguardar(fila, job_curto)
+            assert estado['status'] == 'concluido', estado
+            
+            resultado = fila.resultado(job_curto)
+            assert resultado['metricas']['accuracy'] > 0.5
+            assert Path(resultado['caminho_modelo']).exists()
+            
+            registrados = listar_modelos_registrados()
+            assert len(registrados) == 1 and registrados['existe'].all()
+            assert registrados.loc[0, 'modelo'] == 'Logistic Regression'
+            
+            assert fila.limpar_finalizados() == 2
+            assert fila.listar() == []
+        finally:
+            os.chdir(diretorio_original)
+    
+    print("✅ Fila de jobs: vaga única, progresso por fold, cancelamento e registro")
+    
+    return True
+
+def test_progresso_paralelo():
+    print("🧪 Testando progresso por fold em paralelo...")
+    
+    X, y = make_classification(n_samples=300, n_features=6, random_state=0)
+    modelo = RandomForestClassifier(n_estimators=10, random_state=0)
+    
+    eventos = []
+    with progresso_por_fold('accuracy', eventos.append, 'validacao_cruzada', 1, 4, n_jobs=2) as scoring:
+        scores = cross_val_score(modelo, X, y, cv=4, scoring=scoring, n_jobs=2)
+    
+    assert [evento['n_concluidos'] for evento in eventos] == [1, 2, 3, 4], eventos
+    assert eventos[-1]['fold'] == 4 and eventos[-1]['n_folds'] == 4
+    assert len(scores) == 4
+    
+    # Fora do bloco o joblib volta a não avisar ninguém
+    eventos.clear()
+    cross_val_score(modelo, X, y, cv=4, n_jobs=2)
+    assert eventos == []
+    
+    assert nucleos_por_job(max_concorrentes=1) == (os.cpu_count() or 1)
+    assert nucleos_por_job(max_concorrentes=10 ** 6) == 1
+    print("✅ Cada fold concluído é informado também em paralelo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_jobs() and test_progresso_paralelo()
+    if success:
+        print("\n🎉 Fila de jobs está funcionando corretamente!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Teste da importância por permutação com orçamento
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from vetlib.permutation import (
+    amostra_estratificada, calcular_importancia_permutacao,
+    salvar_importancia_permutacao, carregar_importancia_permutacao
+)
+
+def test_permutation():
+    print("🧪 Testando importância por permutação com orçamento...")
+    
+    # Amostra estratificada mantém a proporção das classes
+    y = np.array(['Otite'] * 700 + ['Gastrite'] * 200 + ['Dermatite'] * 100)
+    indices = amostra_estratificada(y, 200)
+    _, contagens = np.unique(y[indices], return_counts=True)
+    assert sorted(contagens) == [20, 40, 140]
+    print("✅ Amostra estratificada com as proporções de y")
+    
+    # 3 features informativas e 7 de ruído
+    X, y = make_classification(
+        n_samples=1500, n_features=10, n_informative=3, n_redundant=0,
+        n_classes=3, shuffle=False, random_state=0
+    )
+    X = pd.DataFrame(X, columns=[f'exame_{i}' for i in range(X.shape[1])])
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=0, stratify=y)
+    modelo = RandomForestClassifier(n_estimators=30, random_state=0).fit(X_train, y_train)
+    
+    df_importancia, resumo = calcular_importancia_permutacao(
+        modelo, X_test, y_test, max_amostras=400, max_repeticoes=10, tolerancia=0.01
+    )
+    
+    assert set(df_importancia['feature'].head(3)) == {'exame_0', 'exame_1', 'exame_2'}
+    ruido = df_importancia[~df_importancia['feature'].isin(['exame_0', 'exame_1', 'exame_2'])]
+    assert (ruido['importancia'].abs() < 0.02).all()
+    print("✅ Features informativas no topo e ruído perto de zero")
+    
+    # Features de ruído param cedo: menos permutações que o máximo
+    assert resumo['n_amostras'] == 400
+    assert resumo['n_permutacoes'] < resumo['n_permutacoes_maximo']
+    assert (df_importancia['n_repeticoes'] >= 3).all()
+    print(f"✅ {resumo['n_permutacoes']} de {resumo['n_permutacoes_maximo']} permutações")
+    
+    # Salvo e carregado ao lado do artefato
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_modelo = Path(diretorio) / 'modelo.pkl'
+        salvar_importancia_permutacao(caminho_modelo, df_importancia, resumo)
+        df_carregado, resumo_carregado = carregar_importancia_permutacao(caminho_modelo)
+        
+        assert df_carregado['feature'].tolist() == df_importancia['feature'].tolist()
+        assert np.allclose(df_carregado['importancia'], df_importancia['importancia'])
+        assert resumo_carregado['n_permutacoes'] == resumo['n_permutacoes']
+        assert carregar_importancia_permutacao(Path(diretorio) / 'outro.pkl') == (None, None)
+    print("✅ Importância salva e carregada com o modelo")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_permutation()
+    if success:
+        print("\n🎉 Importância por permutação está funcionando corretamente!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Teste do pipeline unificado de treinamento (cache por etapa)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import joblib
+
+from benchmark_modeling import gerar_dataset_sintetico
+from vetlib.pipeline import PERFIS, executar_pipeline
+
+def test_pipeline():
+    print("🧪 Testando pipeline unificado...")
+    
+    diretorio_original = os.getcwd()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.chdir(diretorio)
+        try:
+            df = gerar_dataset_sintetico(600, random_state=0)
+            df['idade_anos'] = df['idade_anos'].clip(0.1, 99)
+            df.to_csv('casos.csv', index=False)
+            
+            config = {
+                **PERFIS['otimizado'],
+                'dados': 'casos.csv',
+                'motor': 'histograma',
+                'k_features': 20,
+                'n_iter': 2,
+                'cv_folds': 3,
+                'param_grid': {'max_iter': [30, 60], 'learning_rate': [0.1], 'max_leaf_nodes': [15, 31]}
+            }
+            
+            primeira = executar_pipeline(config, n_jobs=1, verbose=False)
+            assert not any(etapa['cache'] for etapa in primeira['etapas'].values())
+            
+            artefato = joblib.load(primeira['caminho_modelo'])
+            assert artefato['model_type'] == 'HistGradientBoostingClassifier'
+            assert artefato['selector'].get_support().sum() == 20
+            assert Path('models/model_info.txt').exists()
+            
+            # Mesma configuração: todas as etapas cacheáveis vêm do cache
+            segunda = executar_pipeline(config, n_jobs=1, verbose=False)
+            cache = {nome: etapa['cache'] for nome, etapa in segunda['etapas'].items()}
+            assert cache == {'carregar': True, 'features': True, 'selecao': True,
+                             'busca': True, 'avaliacao': True, 'exportacao': False}, cache
+            assert segunda['model_data']['accuracy'] == primeira['model_data']['accuracy']
+            
+            # Só o espaço de busca muda: leitura, features e seleção são reaproveitadas
+            nova_busca = executar_pipeline(
+                {**config, 'param_grid': {**config['param_grid'], 'learning_rate': [0.05, 0.2]}},
+                n_jobs=1, verbose=False
+            )
+            cache = {nome: etapa['cache'] for nome, etapa in nova_busca['etapas'].items()}
+            assert cache['carregar'] and cache['features'] and cache['selecao'], cache
+            assert not cache['busca'] and not cache['avaliacao'], cache
+            
+            # Perfil sem busca: CV calculada na avaliação, sem seletor no artefato
+            basico = executar_pipeline(
+                {**PERFIS['basico'], 'dados': 'casos.csv', 'motor': 'histograma', 'cv_folds': 3,
+                 'parametros': {'max_iter': 50}},
+                n_jobs=1, verbose=False
+            )
+            assert basico['etapas']['carregar']['cache']
+            assert basico['busca'] is None and basico['model_data']['cv_std'] >= 0
+            assert 'selector' not in basico['model_data']
+            assert basico['model_data']['accuracy'] > 0.5
+        finally:
+            os.chdir(diretorio_original)
+    
+    print("✅ Pipeline: etapas cacheadas, busca recalculada isoladamente e perfis de exportação")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_pipeline()
+    if success:
+        print("\n🎉 Pipeline de treinamento está funcionando corretamente!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Teste do modelo roteado por espécie: despacho pela coluna 'especie' e reserva global
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+
+from vetlib.preprocessing import criar_preprocessador, aplicar_preprocessamento
+from vetlib.routing import ModeloPorEspecie, ROTA_GLOBAL, relatorio_rotas
+
+def test_routing():
+    print("🧪 Testando modelo roteado por espécie...")
+    
+    X, y = make_classification(
+        n_samples=1200, n_features=8, n_informative=5,
+        n_classes=3, random_state=0
+    )
+    df = pd.DataFrame(X, columns=[f'exame_{i}' for i in range(X.shape[1])])
+    df['especie'] = np.random.RandomState(0).choice(['Canina', 'Felina', 'Equina'], len(df), p=[0.6, 0.38, 0.02])
+    
+    preprocessadores = criar_preprocessador(df[:900])
+    X_train, preprocessadores = aplicar_preprocessamento(df[:900], preprocessadores, fit=True)
+    X_test, _ = aplicar_preprocessamento(df[900:], preprocessadores, fit=False)
+    
+    modelo = ModeloPorEspecie('Random Forest', min_amostras=50, n_jobs=2)
+    modelo.fit(X_train, y[:900])
+    modelo.nomear_especies(preprocessadores)
+    
+    assert set(modelo.modelos_rotas()) == {ROTA_GLOBAL, 'Canina', 'Felina'}
+    print("✅ Espécie rara (Equina) sem rota própria")
+    
+    rotas = modelo.rotear(X_test)
+    especies_teste = df['especie'].values[900:]
+    assert np.array_equal(rotas == ROTA_GLOBAL, especies_teste == 'Equina')
+    
+    proba = modelo.predict_proba(X_test)
+    assert np.allclose(proba.sum(axis=1), 1)
+    for nome, modelo_rota in modelo.modelos_rotas().items():
+        mascara = rotas == nome
+        assert np.allclose(proba[mascara], modelo_rota.predict_proba(X_test[mascara]))
+    print("✅ Cada caso pontuado pelo modelo da sua rota")
+    
+    # Espécie nunca vista no treino cai no modelo global
+    df_novo = df[900:905].assign(especie='Bovina')
+    X_novo, _ = aplicar_preprocessamento(df_novo, preprocessadores, fit=False)
+    assert (modelo.rotear(X_novo) == ROTA_GLOBAL).all()
+    assert np.allclose(modelo.predict_proba(X_novo), modelo.modelo_global_.predict_proba(X_novo))
+    print("✅ Espécie desconhecida usa a rota global")
+    
+    relatorio = relatorio_rotas(modelo, X_test, y[900:], n_repeticoes=3)
+    assert relatorio['n_samples'].sum() == len(X_test)
+    print(relatorio.round(3))
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_routing()
+    if success:
+        print("\n🎉 Modelo roteado por espécie está funcionando corretamente!")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Teste do treinamento streaming (out-of-core) a partir de um CSV em disco
+"""
+
+import tempfile
+from pathlib import Path
+
+from benchmark_modeling import gerar_dataset_sintetico
+from vetlib.modeling import prever_diagnostico
+from vetlib.streaming import MODELOS_STREAMING, treinar_modelo_streaming
+
+def test_streaming():
+    print("🧪 Testando treinamento streaming...")
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = Path(diretorio) / 'historico.csv'
+        df = gerar_dataset_sintetico(6000, random_state=0)
+        df.to_csv(caminho, index=False)
+        
+        for nome_modelo in MODELOS_STREAMING:
+            # Orçamento pequeno: força vários blocos
+            modelo, preprocessadores, feature_names, historico = treinar_modelo_streaming(
+                caminho, nome_modelo=nome_modelo, memoria_max_mb=4, max_iter=60,
+                random_state=0, diretorio_temp=diretorio, verbose=False
+            )
+            
+            assert historico['tamanho_bloco'] < historico['n_linhas']
+            assert historico['n_treino'] + historico['n_teste'] == len(df)
+            assert historico['metricas_teste']['accuracy'] > 0.7, historico['metricas_teste']
+            
+            caso = df.drop(columns=['diagnostico']).iloc[[0]]
+            resultado = prever_diagnostico(modelo, caso, preprocessadores, feature_names)
+            assert resultado[0]['diagnostico'] in df['diagnostico'].unique()
+            
+            print(f"✅ {nome_modelo}: acurácia {historico['metricas_teste']['accuracy']:.3f} "
+                  f"em blocos de {historico['tamanho_bloco']:,} linhas")
+        
+        # Arquivos mapeados são removidos ao final
+        assert list(Path(diretorio).iterdir()) == [caminho]
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_streaming()
+    if success:
+        print("\n🎉 Treinamento streaming está funcionando corretamente!")
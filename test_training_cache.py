@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Teste do cache em disco de resultados de treinamento
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from vetlib.training_cache import CacheTreino, chave_treino, impressao_dados
+
+def test_training_cache():
+    print("🧪 Testando cache de treinos...")
+    
+    X = pd.DataFrame({'idade': [1.0, 2.0, 3.0], 'especie': ['Canina', 'Felina', 'Canina']})
+    y = pd.Series(['A', 'B', 'A'])
+    
+    # Mesmos dados → mesma impressão; qualquer alteração muda a chave
+    impressao = impressao_dados(X, y)
+    assert impressao == impressao_dados(X.copy(), y.copy())
+    assert impressao != impressao_dados(X.assign(idade=[1.0, 2.0, 4.0]), y)
+    assert impressao != impressao_dados(X, pd.Series(['A', 'B', 'B']))
+    
+    chave = chave_treino(impressao, X.columns, 'Random Forest', {'cv_folds': 5}, np.int64(42))
+    assert chave == chave_treino(impressao, list(X.columns), 'Random Forest', {'cv_folds': 5}, 42)
+    assert chave != chave_treino(impressao, X.columns, 'Random Forest', {'cv_folds': 3}, 42)
+    assert chave != chave_treino(impressao, X.columns, 'Gradient Boosting', {'cv_folds': 5}, 42)
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache = CacheTreino(diretorio, tamanho_max_mb=1)
+        assert cache.obter(chave) is None
+        
+        cache.guardar(chave, {'modelo': 'rf', 'metricas': {'accuracy': 0.9}})
+        assert cache.obter(chave)['metricas']['accuracy'] == 0.9
+        cache.limpar()
+        
+        # LRU: 'a' é acessada depois de 'b', então 'b' sai ao entrar 'c'
+        cache.max_entradas = 2
+        for i, nome in enumerate(['a', 'b']):
+            cache.guardar(nome, nome)
+            os.utime(cache._caminho(nome), (i, i))
+        cache.obter('a')
+        cache.guardar('c', 'c')
+        assert cache.obter('b') is None
+        assert cache.obter('a') == 'a' and cache.obter('c') == 'c'
+        
+        # Teto de tamanho: entradas grandes expulsam as antigas
+        cache.guardar('grande', np.zeros(100_000))
+        cache.guardar('maior', np.zeros(100_000))
+        estatisticas = cache.estatisticas()
+        assert estatisticas['tamanho_mb'] <= 1.0, estatisticas
+        assert cache.obter('maior') is not None
+        
+        # Entrada corrompida é descartada
+        cache._caminho('maior').write_bytes(b'corrompido')
+        assert cache.obter('maior') is None
+        
+        cache.limpar()
+        assert cache.estatisticas()['n_entradas'] == 0
+    
+    print("✅ Cache de treinos: chave, LRU, teto de tamanho e limpeza")
+    
+    return True
+
+if __name__ == "__main__":
+    success = test_training_cache()
+    if success:
+        print("\n🎉 Cache de treinos está funcionando corretamente!")
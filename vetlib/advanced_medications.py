@@ -6,11 +6,14 @@ Inclui medicamentos, cirurgias e integração com LLM
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
-import streamlit as st
-import requests
 import json
 from datetime import datetime
 
+from vetlib.lazy import ModuloPreguicoso
+
+# Cliente HTTP só é importado quando o chat chama a API
+requests = ModuloPreguicoso('requests')
+
 # ============================================================================
 # BASE DE DADOS EXPANDIDA DE MEDICAMENTOS VETERINÁRIOS
 # ============================================================================
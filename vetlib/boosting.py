@@ -0,0 +1,291 @@
+"""
+Motores de gradient boosting dos scripts de produção
+
+'exato' é o GradientBoostingClassifier: testa todos os cortes de cada
+feature, roda em um único núcleo e o custo cresce com o número de linhas.
+'histograma' é o HistGradientBoostingClassifier: discretiza as features em
+até 255 bins, usa todos os núcleos (OpenMP), tem parada antecipada nativa e
+trata valores faltantes sem imputação (o NaN ganha um bin próprio e cada
+split aprende para que lado enviá-lo).
+
+Os dois motores compartilham a busca staged de hiperparâmetros
+(busca_staged_n_estimators): um ajuste por configuração e fold pontua todas
+as contagens de iterações do grid.
+"""
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, ParameterGrid
+
+
+MOTORES_BOOSTING = ('exato', 'histograma')
+
+# Nome do parâmetro de número de iterações (árvores por classe) em cada motor
+PARAMETRO_ITERACOES = {
+    'exato': 'n_estimators',
+    'histograma': 'max_iter'
+}
+
+# Configuração fixa dos scripts de produção (app gerencial e create_*)
+PARAMETROS_PADRAO = {
+    'exato': {
+        'n_estimators': 1000,
+        'learning_rate': 0.01,
+        'max_depth': 12,
+        'min_samples_split': 2,
+        'min_samples_leaf': 1,
+        'subsample': 0.8,
+        'max_features': 'sqrt'
+    },
+    'histograma': {
+        'max_iter': 1000,
+        'learning_rate': 0.05,
+        'max_leaf_nodes': 31,
+        'min_samples_leaf': 10,
+        'l2_regularization': 1.0
+    }
+}
+
+# Espaço de busca de hiperparâmetros de cada motor
+GRIDS_BUSCA = {
+    'exato': {
+        'n_estimators': [800, 1000, 1200],
+        'learning_rate': [0.005, 0.01, 0.02],
+        'max_depth': [10, 12, 15],
+        'subsample': [0.7, 0.8, 0.9]
+    },
+    'histograma': {
+        'max_iter': [300, 600, 1000],
+        'learning_rate': [0.02, 0.05, 0.1],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [5, 10, 20],
+        'l2_regularization': [0.0, 1.0, 5.0]
+    }
+}
+
+# Espaço mais amplo da busca staged (perfil 'otimizado' do pipeline / train_model.py)
+GRIDS_BUSCA_STAGED = {
+    'exato': {
+        'n_estimators': [800, 1000, 1200, 1500],
+        'learning_rate': [0.005, 0.01, 0.02, 0.03],
+        'max_depth': [10, 12, 15, 18],
+        'min_samples_split': [2, 3, 5],
+        'subsample': [0.7, 0.8, 0.9],
+        'max_features': ['sqrt', 'log2', 0.8]
+    },
+    'histograma': GRIDS_BUSCA['histograma']
+}
+
+
+def criar_boosting(motor='exato', early_stopping=None, n_iter_no_change=50,
+                   validation_fraction=0.1, random_state=42, **params):
+    """
+    Cria o classificador de boosting do motor escolhido
+    
+    Args:
+        motor: 'exato' ou 'histograma'
+        early_stopping: Interrompe o boosting pela validação interna (None = só no
+            motor histograma; o exato ajusta todas as árvores pedidas)
+        n_iter_no_change: Iterações sem melhora antes de parar
+        validation_fraction: Fração do treino usada na validação interna
+        random_state: Seed
+        **params: Hiperparâmetros do motor (ver PARAMETROS_PADRAO)
+    
+    Returns:
+        Estimador não treinado
+    """
+    if early_stopping is None:
+        early_stopping = motor == 'histograma'
+    
+    if motor == 'exato':
+        if early_stopping:
+            params = {'n_iter_no_change': n_iter_no_change,
+                      'validation_fraction': validation_fraction, **params}
+        return GradientBoostingClassifier(random_state=random_state, **params)
+    
+    if motor == 'histograma':
+        return HistGradientBoostingClassifier(
+            random_state=random_state,
+            early_stopping=early_stopping,
+            n_iter_no_change=n_iter_no_change,
+            validation_fraction=validation_fraction,
+            **params
+        )
+    
+    raise ValueError(f"Motor '{motor}' não disponível (opções: {', '.join(MOTORES_BOOSTING)})")
+
+
+def iteracoes_ajustadas(modelo):
+    """Iterações efetivamente ajustadas (menor que o máximo se houve parada antecipada)"""
+    if hasattr(modelo, 'n_iter_'):
+        return int(modelo.n_iter_)
+    return int(modelo.n_estimators_)
+
+
+def preencher_faltantes(X, motor):
+    """
+    Prepara a matriz de features para o motor
+    
+    O motor exato não aceita NaN e recebe zeros (como os scripts sempre
+    fizeram); o motor histograma recebe os faltantes intactos.
+    
+    Args:
+        X: DataFrame de features
+        motor: 'exato' ou 'histograma'
+    
+    Returns:
+        DataFrame
+    """
+    if motor == 'histograma':
+        return X
+    return X.fillna(0)
+
+
+def selecionar_colunas(selector, X):
+    """
+    Aplica um SelectKBest já ajustado preservando NaN
+    
+    O transform do SelectKBest rejeita faltantes; como a seleção é só um
+    recorte de colunas, a máscara é aplicada diretamente.
+    
+    Args:
+        selector: SelectKBest ajustado
+        X: Array de features
+    
+    Returns:
+        Array com as colunas selecionadas
+    """
+    return np.asarray(X)[:, selector.get_support()]
+
+
+def _sortear_configuracoes(param_grid, n_iter, random_state, chave_iteracoes='n_estimators'):
+    """
+    Sorteia as configurações a avaliar, sem o eixo de n_estimators
+    
+    O número de árvores é avaliado por estágios dentro de um único ajuste, então
+    cada configuração sorteada cobre todos os valores de n_estimators do grid.
+    n_iter continua contando candidatos (configuração × n_estimators).
+    """
+    grid_sem_arvores = {k: v for k, v in param_grid.items() if k != chave_iteracoes}
+    configuracoes = list(ParameterGrid(grid_sem_arvores))
+    
+    n_arvores = len(param_grid.get(chave_iteracoes, [None]))
+    n_configs = min(len(configuracoes), max(1, int(np.ceil(n_iter / n_arvores))))
+    
+    rng = np.random.RandomState(random_state)
+    indices = rng.choice(len(configuracoes), size=n_configs, replace=False)
+    
+    return [configuracoes[i] for i in indices]
+
+
+def _avaliar_config_fold(params, X, y, idx_treino, idx_val, contagens_arvores,
+                         random_state, early_stopping, n_iter_no_change, validation_fraction,
+                         motor='exato'):
+    """Ajusta o máximo de árvores uma vez e pontua cada contagem por staged_predict"""
+    modelo = criar_boosting(
+        motor,
+        early_stopping=early_stopping,
+        n_iter_no_change=n_iter_no_change,
+        validation_fraction=validation_fraction,
+        random_state=random_state,
+        **{PARAMETRO_ITERACOES[motor]: max(contagens_arvores)},
+        **params
+    )
+    modelo.fit(X[idx_treino], y[idx_treino])
+    n_ajustadas = iteracoes_ajustadas(modelo)
+    
+    # Com early stopping o ajuste para antes de n_estimators; contagens acima
+    # disso produziriam exatamente o mesmo modelo (mesma parada, mesmas árvores)
+    y_val = y[idx_val]
+    scores_por_estagio = {}
+    for estagio, y_pred in enumerate(modelo.staged_predict(X[idx_val]), start=1):
+        if estagio in contagens_arvores or estagio == n_ajustadas:
+            scores_por_estagio[estagio] = accuracy_score(y_val, y_pred)
+    
+    scores = [scores_por_estagio[min(n, n_ajustadas)] for n in contagens_arvores]
+    
+    return scores, n_ajustadas
+
+
+def busca_staged_n_estimators(X, y, param_grid, n_iter=30, cv_folds=5, random_state=42,
+                              early_stopping=None, n_iter_no_change=50,
+                              validation_fraction=0.1, n_jobs=-1, motor='exato'):
+    """
+    Busca aleatória de hiperparâmetros com avaliação de n_estimators por estágios
+    
+    Em vez de ajustar um modelo por candidato (como o RandomizedSearchCV), cada
+    configuração restante é ajustada uma única vez por fold com o maior
+    n_estimators do grid, e todas as contagens candidatas são pontuadas a partir
+    das predições por estágio.
+    
+    Args:
+        X: Features de treino (array)
+        y: Target de treino (array)
+        param_grid: Grid de parâmetros (deve conter 'n_estimators', ou 'max_iter' no motor histograma)
+        n_iter: Número de candidatos (configuração × n_estimators) a avaliar
+        cv_folds: Número de folds para CV
+        random_state: Seed
+        early_stopping: Se True, interrompe o boosting pela validação interna
+            (None = padrão do motor, ver criar_boosting)
+        n_iter_no_change: Iterações sem melhora antes de parar
+        validation_fraction: Fração do fold de treino usada na validação interna
+        n_jobs: Processos paralelos (configuração × fold)
+        motor: 'exato' (GradientBoosting) ou 'histograma' (HistGradientBoosting)
+    
+    Returns:
+        dict com melhores parâmetros, melhor score, scores por fold e tabela de resultados
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    
+    chave_iteracoes = PARAMETRO_ITERACOES[motor]
+    contagens_arvores = sorted(param_grid[chave_iteracoes])
+    configuracoes = _sortear_configuracoes(param_grid, n_iter, random_state, chave_iteracoes)
+    
+    cv = StratifiedKFold(n_splits=cv_folds)
+    folds = list(cv.split(X, y))
+    
+    resultados_brutos = Parallel(n_jobs=n_jobs)(
+        delayed(_avaliar_config_fold)(
+            params, X, y, idx_treino, idx_val, contagens_arvores,
+            random_state, early_stopping, n_iter_no_change, validation_fraction, motor
+        )
+        for params in configuracoes
+        for idx_treino, idx_val in folds
+    )
+    
+    # scores[config, fold, contagem]
+    scores = np.array([r[0] for r in resultados_brutos]).reshape(
+        len(configuracoes), len(folds), len(contagens_arvores)
+    )
+    arvores_ajustadas = np.array([r[1] for r in resultados_brutos]).reshape(
+        len(configuracoes), len(folds)
+    )
+    
+    linhas = []
+    for i, params in enumerate(configuracoes):
+        for j, n_arvores in enumerate(contagens_arvores):
+            linhas.append({
+                **params,
+                chave_iteracoes: n_arvores,
+                'score_medio': scores[i, :, j].mean(),
+                'score_std': scores[i, :, j].std(),
+                'arvores_ajustadas_media': arvores_ajustadas[i].mean()
+            })
+    
+    df_resultados = pd.DataFrame(linhas).sort_values('score_medio', ascending=False)
+    
+    i_melhor, j_melhor = np.unravel_index(
+        np.argmax(scores.mean(axis=1)), (len(configuracoes), len(contagens_arvores))
+    )
+    
+    return {
+        'melhores_parametros': {**configuracoes[i_melhor], chave_iteracoes: contagens_arvores[j_melhor]},
+        'melhor_score': scores[i_melhor, :, j_melhor].mean(),
+        'scores_folds': scores[i_melhor, :, j_melhor].copy(),
+        'resultados': df_resultados,
+        'n_ajustes': len(resultados_brutos)
+    }
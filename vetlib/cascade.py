@@ -0,0 +1,247 @@
+"""
+Inferência em cascata: modelo rápido primeiro, ensemble só na dúvida
+
+O estágio rápido é uma regressão logística calibrada (sigmoid) sobre as
+mesmas features pré-processadas do ensemble. Quando a confiança calibrada de
+um caso atinge o limiar, a resposta do estágio rápido é a final; os demais
+casos seguem para o ensemble de árvores.
+
+O limiar é escolhido com predições fora do fold (validação cruzada) dos dois
+estágios: é o menor valor que mantém a acurácia da cascata a no máximo
+`tolerancia` da acurácia do ensemble sozinho.
+"""
+
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+from vetlib.evaluation import pontuar_modelo
+
+
+ETAPA_RAPIDA = 'rapido'
+ETAPA_PESADA = 'pesado'
+
+
+def criar_estagio_rapido(random_state=42):
+    """Regressão logística com confiança calibrada (um único modelo na inferência)"""
+    return CalibratedClassifierCV(
+        LogisticRegression(max_iter=1000, class_weight='balanced', random_state=random_state),
+        method='sigmoid',
+        cv=3,
+        ensemble=False
+    )
+
+
+class ModeloCascata:
+    """
+    Cascata de dois estágios com predict/predict_proba compatíveis com o sklearn
+    
+    Guarda em `estatisticas` quantos casos cada estágio respondeu e o tempo
+    gasto em cada um, acumulados entre chamadas (tráfego da página).
+    
+    Args:
+        rapido: Estágio rápido treinado (ver criar_estagio_rapido)
+        pesado: Ensemble treinado
+        limiar: Confiança mínima do estágio rápido para responder sozinho
+    """
+    
+    def __init__(self, rapido, pesado, limiar):
+        self.rapido = rapido
+        self.pesado = pesado
+        self.limiar = limiar
+        self.classes_ = pesado.classes_
+        self.n_features_in_ = getattr(pesado, 'n_features_in_', None)
+        
+        feature_names = getattr(pesado, 'feature_names_in_', None)
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+        
+        self.zerar_estatisticas()
+    
+    def zerar_estatisticas(self):
+        self.estatisticas = {'n_rapido': 0, 'n_pesado': 0, 'tempo_rapido_s': 0.0, 'tempo_pesado_s': 0.0}
+    
+    def resumo_estatisticas(self):
+        """Fração de casos do estágio rápido e milissegundos por caso em cada estágio"""
+        est = self.estatisticas
+        n_total = est['n_rapido'] + est['n_pesado']
+        return {
+            'n_casos': n_total,
+            'fracao_rapido': est['n_rapido'] / n_total if n_total else 0.0,
+            'rapido_ms_por_caso': est['tempo_rapido_s'] / n_total * 1000 if n_total else 0.0,
+            'pesado_ms_por_caso': est['tempo_pesado_s'] / est['n_pesado'] * 1000 if est['n_pesado'] else 0.0
+        }
+    
+    def com_estagio_pesado(self, pesado):
+        """Nova cascata com o mesmo estágio rápido e limiar (ex.: ensemble compilado)"""
+        return ModeloCascata(self.rapido, pesado, self.limiar)
+    
+    def etapas(self, X):
+        """
+        Estágio que responde cada caso
+        
+        Args:
+            X: Features pré-processadas
+        
+        Returns:
+            Array com 'rapido' ou 'pesado' por linha
+        """
+        confianca = self.rapido.predict_proba(X).max(axis=1)
+        return np.where(confianca >= self.limiar, ETAPA_RAPIDA, ETAPA_PESADA)
+    
+    def predict_proba(self, X):
+        inicio = time.perf_counter()
+        proba_rapido = self.rapido.predict_proba(X)
+        self.estatisticas['tempo_rapido_s'] += time.perf_counter() - inicio
+        
+        proba = np.zeros((len(proba_rapido), len(self.classes_)))
+        colunas = np.searchsorted(self.classes_, self.rapido.classes_)
+        proba[:, colunas] = proba_rapido
+        
+        duvida = np.flatnonzero(proba_rapido.max(axis=1) < self.limiar)
+        if len(duvida):
+            X_duvida = X.iloc[duvida] if hasattr(X, 'iloc') else np.asarray(X)[duvida]
+            inicio = time.perf_counter()
+            proba[duvida] = self.pesado.predict_proba(X_duvida)
+            self.estatisticas['tempo_pesado_s'] += time.perf_counter() - inicio
+        
+        self.estatisticas['n_rapido'] += len(proba) - len(duvida)
+        self.estatisticas['n_pesado'] += len(duvida)
+        
+        return proba
+    
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+    
+    @property
+    def feature_importances_(self):
+        return self.pesado.feature_importances_
+
+
+def calibrar_limiar(confianca, acerto_rapido, acerto_pesado, tolerancia=0.01):
+    """
+    Menor limiar de confiança que mantém a acurácia dentro da tolerância
+    
+    Os casos são ordenados por confiança decrescente; desviar os k mais
+    confiantes para o estágio rápido dá a acurácia
+    (acertos rápidos nos k primeiros + acertos do ensemble nos demais) / n,
+    calculada para todo k de uma vez com somas acumuladas.
+    
+    Args:
+        confianca: Confiança (probabilidade máxima) do estágio rápido por caso
+        acerto_rapido: Se o estágio rápido acertou cada caso
+        acerto_pesado: Se o ensemble acertou cada caso
+        tolerancia: Perda máxima de acurácia aceita em relação ao ensemble
+    
+    Returns:
+        limiar (np.inf se nenhum desvio cabe na tolerância)
+    """
+    ordem = np.argsort(-confianca, kind='stable')
+    confianca = confianca[ordem]
+    n = len(confianca)
+    
+    acertos_rapido = np.concatenate([[0], np.cumsum(acerto_rapido[ordem])])
+    acertos_pesado = np.concatenate([[0], np.cumsum(acerto_pesado[ordem])])
+    acuracia = (acertos_rapido + acertos_pesado[-1] - acertos_pesado) / n
+    
+    # Empates de confiança vão juntos para o mesmo estágio: só cortes entre valores distintos
+    cortes = np.concatenate([[True], confianca[:-1] > confianca[1:], [True]])
+    validos = np.flatnonzero(cortes & (acuracia >= acuracia[0] - tolerancia))
+    k = validos.max()
+    
+    return float(confianca[k - 1]) if k > 0 else np.inf
+
+
+def construir_cascata(pesado, X_train, y_train, tolerancia=0.01, cv_folds=5, random_state=42, n_jobs=None):
+    """
+    Treina o estágio rápido e escolhe o limiar com predições fora do fold
+    
+    Args:
+        pesado: Ensemble já treinado em X_train (é clonado na validação cruzada)
+        X_train: Features de treino pré-processadas
+        y_train: Target de treino (classes codificadas, como no ensemble)
+        tolerancia: Perda máxima de acurácia aceita em relação ao ensemble
+        cv_folds: Folds das predições fora do fold
+        random_state: Seed
+        n_jobs: Núcleos da validação cruzada
+    
+    Returns:
+        ModeloCascata
+    """
+    y_train = np.asarray(y_train)
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    
+    rapido = criar_estagio_rapido(random_state)
+    proba_rapido = cross_val_predict(clone(rapido), X_train, y_train, cv=cv, method='predict_proba', n_jobs=n_jobs)
+    proba_pesado = cross_val_predict(clone(pesado), X_train, y_train, cv=cv, method='predict_proba', n_jobs=n_jobs)
+    
+    classes = np.unique(y_train)
+    limiar = calibrar_limiar(
+        proba_rapido.max(axis=1),
+        classes[proba_rapido.argmax(axis=1)] == y_train,
+        classes[proba_pesado.argmax(axis=1)] == y_train,
+        tolerancia
+    )
+    
+    rapido.fit(X_train, y_train)
+    
+    return ModeloCascata(rapido, pesado, limiar)
+
+
+def _latencia_caso_ms(modelo, caso, n_repeticoes):
+    """Mediana da latência de predict_proba para um único caso"""
+    modelo.predict_proba(caso)  # aquecimento
+    tempos = []
+    for _ in range(n_repeticoes):
+        inicio = time.perf_counter()
+        modelo.predict_proba(caso)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos) * 1000)
+
+
+def relatorio_cascata(cascata, X_test, y_test, label_encoder=None, n_repeticoes=20):
+    """
+    Tráfego desviado, latência por estágio e variação de acurácia da cascata
+    
+    Args:
+        cascata: ModeloCascata treinado
+        X_test: Features de teste pré-processadas
+        y_test: Target de teste (rótulos originais)
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+        n_repeticoes: Repetições para a mediana da latência de um caso
+    
+    Returns:
+        dict com limiar, fracao_rapido, acurácias (cascata, ensemble, só
+        estágio rápido), delta_accuracy e latências por caso de cada estágio
+    """
+    etapas = cascata.etapas(X_test)
+    
+    acuracias = {}
+    for nome, modelo in (('cascata', cascata), ('pesado', cascata.pesado), ('rapido', cascata.rapido)):
+        pontuacao = pontuar_modelo(modelo, X_test, y_test, label_encoder)
+        acuracias[nome] = float(np.mean(pontuacao['y_true'] == pontuacao['y_pred']))
+    
+    relatorio = {
+        'limiar': cascata.limiar,
+        'fracao_rapido': float(np.mean(etapas == ETAPA_RAPIDA)),
+        'accuracy_cascata': acuracias['cascata'],
+        'accuracy_pesado': acuracias['pesado'],
+        'accuracy_rapido': acuracias['rapido'],
+        'delta_accuracy': acuracias['cascata'] - acuracias['pesado']
+    }
+    
+    caso = X_test.iloc[:1] if hasattr(X_test, 'iloc') else X_test[:1]
+    relatorio['latencia_caso_rapido_ms'] = _latencia_caso_ms(cascata.rapido, caso, n_repeticoes)
+    relatorio['latencia_caso_pesado_ms'] = _latencia_caso_ms(cascata.pesado, caso, n_repeticoes)
+    relatorio['latencia_caso_cascata_ms'] = (
+        relatorio['latencia_caso_rapido_ms']
+        + (1 - relatorio['fracao_rapido']) * relatorio['latencia_caso_pesado_ms']
+    )
+    
+    cascata.zerar_estatisticas()
+    
+    return relatorio
@@ -0,0 +1,228 @@
+"""
+Índice de casos para busca dos casos de treino mais semelhantes
+
+A matriz de casos é normalizada (norma 1 por linha) e guardada em float32 uma
+única vez, junto com o modelo; a similaridade de cosseno vira um produto
+matricial e o top-k sai de argpartition (O(N) por consulta, sem ordenar todo
+o conjunto de treino).
+
+Consultas em lote são processadas em blocos de linhas, para que a matriz de
+similaridades temporária não passe de alguns megabytes. Para conjuntos
+grandes, o modo aproximado agrupa os casos em listas por k-means (índice
+invertido) e compara cada consulta só com os casos das listas mais próximas.
+
+O índice é salvo ao lado do artefato do modelo ('<nome>_casos.npz').
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+
+# A partir deste número de casos o índice é aproximado por padrão
+LIMIAR_APROXIMADO = 100_000
+
+# Elementos da matriz de similaridades temporária por bloco de consultas (16 MB em float32)
+_ELEMENTOS_POR_BLOCO = 2**22
+
+
+def _normalizar(X):
+    """Linhas com norma 1, em float32 (linhas nulas continuam nulas)"""
+    X = np.asarray(X, dtype=np.float32)
+    normas = np.linalg.norm(X, axis=1, keepdims=True)
+    return np.divide(X, normas, out=np.zeros_like(X), where=normas > 0)
+
+
+def _top_k(similaridades, k):
+    """Posições e valores das k maiores similaridades de cada linha, em ordem decrescente"""
+    n = similaridades.shape[1]
+    k = min(k, n)
+    posicoes = np.argpartition(similaridades, n - k, axis=1)[:, n - k:]
+    valores = np.take_along_axis(similaridades, posicoes, axis=1)
+    ordem = np.argsort(-valores, axis=1, kind='stable')
+    return np.take_along_axis(posicoes, ordem, axis=1), np.take_along_axis(valores, ordem, axis=1)
+
+
+class IndiceCasos:
+    """
+    Casos de treino normalizados para busca por similaridade de cosseno
+    
+    Args:
+        X: Features pré-processadas dos casos (DataFrame ou array)
+        rotulos: Diagnóstico de cada caso
+        ids: Identificador de cada caso (None = posição em X)
+        aproximado: Se True, usa listas invertidas por k-means (None = automático pelo tamanho)
+        n_listas: Número de listas do modo aproximado (None = raiz de N)
+        n_sondagens: Listas visitadas por consulta no modo aproximado
+        random_state: Seed do k-means
+    """
+    
+    def __init__(self, X, rotulos, ids=None, aproximado=None, n_listas=None, n_sondagens=8,
+                 random_state=42):
+        self.matriz = _normalizar(X)
+        self.rotulos = np.asarray(rotulos)
+        self.ids = np.arange(len(self.matriz)) if ids is None else np.asarray(ids)
+        self.n_sondagens = n_sondagens
+        self.centroides = None
+        self.inicio_listas = None
+        
+        if aproximado is None:
+            aproximado = len(self.matriz) >= LIMIAR_APROXIMADO
+        if aproximado:
+            self._agrupar(n_listas or int(np.sqrt(len(self.matriz))), random_state)
+    
+    def _agrupar(self, n_listas, random_state):
+        """Ordena os casos por lista k-means: cada lista vira uma fatia contígua da matriz"""
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_listas, batch_size=4096, n_init=3, random_state=random_state
+        ).fit(self.matriz)
+        
+        ordem = np.argsort(kmeans.labels_, kind='stable')
+        self.matriz = np.ascontiguousarray(self.matriz[ordem])
+        self.rotulos = self.rotulos[ordem]
+        self.ids = self.ids[ordem]
+        self.centroides = _normalizar(kmeans.cluster_centers_)
+        self.inicio_listas = np.concatenate([[0], np.cumsum(np.bincount(kmeans.labels_, minlength=n_listas))])
+    
+    @property
+    def aproximado(self):
+        """Indica se o índice usa listas invertidas"""
+        return self.centroides is not None
+    
+    def __len__(self):
+        return len(self.matriz)
+    
+    def _buscar_exato(self, Q, k):
+        """Top-k contra todos os casos, em blocos de consultas"""
+        indices = np.empty((len(Q), min(k, len(self))), dtype=np.intp)
+        similaridades = np.empty(indices.shape, dtype=np.float32)
+        
+        linhas_bloco = max(1, _ELEMENTOS_POR_BLOCO // len(self))
+        for inicio in range(0, len(Q), linhas_bloco):
+            bloco = slice(inicio, inicio + linhas_bloco)
+            indices[bloco], similaridades[bloco] = _top_k(Q[bloco] @ self.matriz.T, k)
+        
+        return indices, similaridades
+    
+    def _buscar_aproximado(self, Q, k):
+        """Top-k só entre os casos das n_sondagens listas mais próximas de cada consulta"""
+        # Listas visitadas com menos de k casos deixam o fim da linha vazio (-1, -inf)
+        indices = np.full((len(Q), min(k, len(self))), -1, dtype=np.intp)
+        similaridades = np.full(indices.shape, -np.inf, dtype=np.float32)
+        listas, _ = _top_k(Q @ self.centroides.T, self.n_sondagens)
+        
+        for i, q in enumerate(Q):
+            candidatos = np.concatenate([
+                np.arange(self.inicio_listas[lista], self.inicio_listas[lista + 1]) for lista in listas[i]
+            ])
+            if len(candidatos) == 0:
+                continue
+            posicoes, valores = _top_k((self.matriz[candidatos] @ q)[np.newaxis], k)
+            indices[i, :posicoes.shape[1]] = candidatos[posicoes[0]]
+            similaridades[i, :posicoes.shape[1]] = valores[0]
+        
+        return indices, similaridades
+    
+    def buscar(self, X, k=5):
+        """
+        Casos mais semelhantes a cada linha de X
+        
+        Args:
+            X: Consultas pré-processadas (DataFrame ou array, uma ou várias linhas)
+            k: Número de casos por consulta
+        
+        Returns:
+            (posições no índice, similaridades), ambos com forma (consultas, k)
+        """
+        Q = _normalizar(X)
+        if self.aproximado:
+            return self._buscar_aproximado(Q, k)
+        return self._buscar_exato(Q, k)
+    
+    def casos_similares(self, X, k=5):
+        """DataFrame com id, similaridade e diagnóstico dos k casos mais semelhantes à primeira linha de X"""
+        posicoes, similaridades = self.buscar(np.asarray(X)[:1], k)
+        validos = posicoes[0] >= 0
+        posicoes = posicoes[0][validos]
+        
+        return pd.DataFrame({
+            'indice': self.ids[posicoes],
+            'similaridade': similaridades[0][validos],
+            'diagnostico': self.rotulos[posicoes]
+        })
+    
+    def resumir_lote(self, X, diagnosticos_preditos, k=5):
+        """
+        Resumo dos casos semelhantes de cada linha de um lote
+        
+        Args:
+            X: Lote pré-processado
+            diagnosticos_preditos: Diagnóstico predito de cada linha
+            k: Número de casos por linha
+        
+        Returns:
+            DataFrame com casos_similares (diagnósticos separados por vírgula),
+            similaridade_media e concordancia_similares (fração dos casos com o
+            diagnóstico predito)
+        """
+        posicoes, similaridades = self.buscar(X, k)
+        validos = posicoes >= 0
+        rotulos = np.where(validos, self.rotulos[np.where(validos, posicoes, 0)], None)
+        concordantes = (rotulos == np.asarray(diagnosticos_preditos)[:, np.newaxis]) & validos
+        
+        return pd.DataFrame({
+            'casos_similares': [', '.join(str(r) for r in linha if r is not None) for linha in rotulos],
+            'similaridade_media': np.where(validos, similaridades, 0).sum(axis=1) / validos.sum(axis=1).clip(1),
+            'concordancia_similares': concordantes.sum(axis=1) / validos.sum(axis=1).clip(1)
+        })
+
+
+def caminho_indice_casos(caminho_modelo):
+    """Caminho do índice de casos ao lado do artefato ('<nome>_casos.npz')"""
+    caminho_modelo = Path(caminho_modelo)
+    return caminho_modelo.with_name(f"{caminho_modelo.stem}_casos.npz")
+
+
+def salvar_indice_casos(caminho_modelo, indice):
+    """
+    Salva o índice de casos ao lado do artefato do modelo
+    
+    Args:
+        caminho_modelo: Caminho do artefato (.pkl)
+        indice: IndiceCasos
+    
+    Returns:
+        Caminho do arquivo salvo
+    """
+    caminho = caminho_indice_casos(caminho_modelo)
+    arrays = {
+        'matriz': indice.matriz,
+        'rotulos': indice.rotulos.astype(str),
+        'ids': indice.ids,
+        'n_sondagens': indice.n_sondagens
+    }
+    if indice.aproximado:
+        arrays.update(centroides=indice.centroides, inicio_listas=indice.inicio_listas)
+    
+    np.savez(caminho, **arrays)
+    return caminho
+
+
+def carregar_indice_casos(caminho_modelo):
+    """Índice de casos salvo ao lado do artefato, ou None se não houver"""
+    caminho = caminho_indice_casos(caminho_modelo)
+    if not caminho.exists():
+        return None
+    
+    indice = IndiceCasos.__new__(IndiceCasos)
+    with np.load(caminho) as dados:
+        indice.matriz = dados['matriz']
+        indice.rotulos = dados['rotulos']
+        indice.ids = dados['ids']
+        indice.n_sondagens = int(dados['n_sondagens'])
+        indice.centroides = dados['centroides'] if 'centroides' in dados else None
+        indice.inicio_listas = dados['inicio_listas'] if 'inicio_listas' in dados else None
+    
+    return indice
@@ -0,0 +1,349 @@
+"""
+Módulo de compressão de modelos
+
+Gera uma versão compacta de um ensemble treinado que caiba num orçamento de
+latência e/ou tamanho em disco, aceitando uma perda máxima de acurácia. Os
+candidatos são o próprio ensemble truncado (primeiros estágios do boosting ou
+primeiras árvores da floresta) e alunos destilados: GradientBoosting raso
+treinado com os rótulos do modelo original em dados reais e sintéticos (ou
+HistGradientBoosting raso, quando as features trazem valores faltantes).
+"""
+
+import copy
+import pickle
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+
+# Frações do ensemble original mantidas na truncagem
+FRACOES_TRUNCAGEM = [0.05, 0.1, 0.25, 0.5]
+
+# Alunos destilados: (max_depth, n_estimators), do menor para o maior
+CONFIGS_ALUNO = [(3, 150), (4, 300), (6, 300)]
+
+
+def medir_modelo(modelo, X_val, y_val, n_repeticoes=30):
+    """
+    Mede acurácia, latência de um único caso e tamanho serializado
+    
+    Args:
+        modelo: Modelo treinado
+        X_val: Features de validação
+        y_val: Target de validação
+        n_repeticoes: Repetições para a mediana da latência
+    
+    Returns:
+        dict com accuracy, latencia_ms e tamanho_mb
+    """
+    X_val = np.asarray(X_val)
+    accuracy = accuracy_score(y_val, modelo.predict(X_val))
+    
+    x = X_val[:1]
+    modelo.predict_proba(x)  # aquecimento
+    tempos = []
+    for _ in range(n_repeticoes):
+        inicio = time.perf_counter()
+        modelo.predict_proba(x)
+        tempos.append(time.perf_counter() - inicio)
+    
+    tamanho = len(pickle.dumps(modelo, protocol=pickle.HIGHEST_PROTOCOL))
+    
+    return {
+        'accuracy': float(accuracy),
+        'latencia_ms': float(np.median(tempos) * 1000),
+        'tamanho_mb': tamanho / 1e6
+    }
+
+
+def truncar_ensemble(modelo, n_estimadores):
+    """
+    Mantém apenas os primeiros estágios (boosting) ou árvores (floresta)
+    
+    Args:
+        modelo: GradientBoostingClassifier ou floresta treinada
+        n_estimadores: Número de estágios/árvores a manter
+    
+    Returns:
+        Cópia truncada do modelo (o original não é alterado)
+    """
+    truncado = copy.copy(modelo)
+    truncado.estimators_ = modelo.estimators_[:n_estimadores]
+    truncado.n_estimators = n_estimadores
+    
+    if hasattr(modelo, 'n_estimators_'):
+        truncado.n_estimators_ = n_estimadores
+        for atributo in ('train_score_', 'oob_improvement_', 'oob_scores_'):
+            if hasattr(modelo, atributo):
+                setattr(truncado, atributo, getattr(modelo, atributo)[:n_estimadores])
+    
+    return truncado
+
+
+def gerar_dados_destilacao(X, fator=3, escala_ruido=0.1, random_state=42):
+    """
+    Amplia o conjunto de treino com vizinhos sintéticos (ruído gaussiano)
+    
+    Os pontos sintéticos cobrem a vizinhança dos casos reais, onde o aluno
+    precisa imitar as fronteiras do modelo original.
+    
+    Args:
+        X: Features de treino (já transformadas)
+        fator: Pontos sintéticos por caso real
+        escala_ruido: Desvio do ruído em unidades de desvio-padrão da feature
+        random_state: Seed
+    
+    Returns:
+        Array com os casos reais seguidos dos sintéticos
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rng = np.random.RandomState(random_state)
+    
+    base = X[rng.randint(0, len(X), size=len(X) * fator)]
+    desvio = np.nanstd(X, axis=0)  # faltantes continuam faltantes nos vizinhos
+    sinteticos = base + rng.normal(0.0, 1.0, size=base.shape) * desvio * escala_ruido
+    
+    return np.vstack([X, sinteticos])
+
+
+def destilar_boosting(professor, X_train, max_depth=4, n_estimators=300,
+                      learning_rate=0.1, fator_sinteticos=3, random_state=42):
+    """
+    Treina um GradientBoosting raso que imita as predições do professor
+    
+    Args:
+        professor: Modelo original treinado
+        X_train: Features de treino (já transformadas)
+        max_depth: Profundidade das árvores do aluno
+        n_estimators: Máximo de estágios do aluno (com parada antecipada)
+        learning_rate: Taxa de aprendizado do aluno
+        fator_sinteticos: Pontos sintéticos por caso real
+        random_state: Seed
+    
+    Returns:
+        Aluno treinado (GradientBoostingClassifier, ou HistGradientBoostingClassifier
+        se houver faltantes)
+    """
+    X_destilacao = gerar_dados_destilacao(X_train, fator=fator_sinteticos, random_state=random_state)
+    y_destilacao = professor.predict(X_destilacao)
+    
+    if np.isnan(X_destilacao).any():
+        aluno = HistGradientBoostingClassifier(
+            max_iter=n_estimators,
+            max_depth=max_depth,
+            learning_rate=learning_rate,
+            early_stopping=True,
+            n_iter_no_change=20,
+            validation_fraction=0.1,
+            random_state=random_state
+        )
+        aluno.fit(X_destilacao, y_destilacao)
+        return aluno
+    
+    aluno = GradientBoostingClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        subsample=0.8,
+        n_iter_no_change=20,
+        validation_fraction=0.1,
+        random_state=random_state
+    )
+    aluno.fit(X_destilacao, y_destilacao)
+    
+    return aluno
+
+
+def _atende_orcamento(medidas, latencia_max_ms, tamanho_max_mb):
+    if latencia_max_ms is not None and medidas['latencia_ms'] > latencia_max_ms:
+        return False
+    if tamanho_max_mb is not None and medidas['tamanho_mb'] > tamanho_max_mb:
+        return False
+    return True
+
+
+def comprimir_modelo(modelo, X_train, y_train, X_test, y_test, latencia_max_ms=None,
+                     tamanho_max_mb=None, tolerancia_acuracia=0.01, destilar=True,
+                     fracao_validacao=0.2, random_state=42, verbose=True):
+    """
+    Procura uma versão compacta do modelo que caiba no orçamento
+    
+    Avalia truncagens do ensemble e alunos destilados numa validação separada
+    do treino (os alunos são destilados no restante); entre os que respeitam o
+    orçamento e perdem no máximo tolerancia_acuracia de acurácia, escolhe o
+    mais preciso (empate: o de menor latência). Só o escolhido é medido no
+    teste, que não participa da escolha: a acurácia e o delta reportados
+    vêm dele.
+    
+    Args:
+        modelo: Ensemble treinado (GradientBoosting, RandomForest ou ExtraTrees;
+            HistGradientBoosting só tem candidatos destilados)
+        X_train, y_train: Dados de treino (já transformados), base da
+            destilação e da validação
+        X_test, y_test: Dados de teste, para a acurácia final
+        latencia_max_ms: Latência máxima de um caso (None = sem limite)
+        tamanho_max_mb: Tamanho máximo serializado (None = sem limite)
+        tolerancia_acuracia: Perda máxima de acurácia (absoluta)
+        destilar: Se False, avalia apenas truncagens
+        fracao_validacao: Fração do treino reservada para escolher o candidato
+        random_state: Seed
+        verbose: Imprime o progresso
+    
+    Returns:
+        modelo compacto (ou None se nenhum candidato atender), dict com relatório
+        (candidatos medidos na validação; original e escolhido também no
+        teste, em accuracy_teste e delta_acuracia_teste)
+    """
+    X_train = np.asarray(X_train)
+    y_train = np.asarray(y_train)
+    _, contagens = np.unique(y_train, return_counts=True)
+    X_destilacao, X_val, _, y_val = train_test_split(
+        X_train, y_train, test_size=fracao_validacao, random_state=random_state,
+        stratify=y_train if contagens.min() >= 2 else None
+    )
+    
+    original = medir_modelo(modelo, X_val, y_val)
+    X_test = np.asarray(X_test)
+    original['accuracy_teste'] = float(accuracy_score(y_test, modelo.predict(X_test)))
+    
+    if verbose:
+        print(f"📏 Original: acurácia {original['accuracy']:.4f} na validação "
+              f"({original['accuracy_teste']:.4f} no teste), "
+              f"{original['latencia_ms']:.2f} ms/caso, {original['tamanho_mb']:.1f} MB")
+    
+    candidatos = []
+    n_original = len(getattr(modelo, 'estimators_', []))
+    
+    for fracao in FRACOES_TRUNCAGEM:
+        n_estimadores = max(1, int(round(n_original * fracao)))
+        if n_estimadores < n_original:
+            candidatos.append((
+                'truncagem', {'n_estimadores': n_estimadores},
+                lambda n=n_estimadores: truncar_ensemble(modelo, n)
+            ))
+    
+    if destilar:
+        for max_depth, n_estimators in CONFIGS_ALUNO:
+            candidatos.append((
+                'destilacao', {'max_depth': max_depth, 'n_estimators': n_estimators},
+                lambda d=max_depth, n=n_estimators: destilar_boosting(
+                    modelo, X_destilacao, max_depth=d, n_estimators=n, random_state=random_state
+                )
+            ))
+    
+    resultados = []
+    escolhido = None
+    modelo_escolhido = None
+    
+    for metodo, parametros, construir in candidatos:
+        inicio = time.perf_counter()
+        candidato = construir()
+        tempo_construcao = time.perf_counter() - inicio
+        
+        if not np.array_equal(candidato.classes_, modelo.classes_):
+            continue
+        
+        medidas = medir_modelo(candidato, X_val, y_val)
+        resultado = {
+            'metodo': metodo,
+            'parametros': parametros,
+            **medidas,
+            'delta_acuracia': medidas['accuracy'] - original['accuracy'],
+            'speedup': original['latencia_ms'] / max(medidas['latencia_ms'], 1e-9),
+            'reducao_tamanho': original['tamanho_mb'] / max(medidas['tamanho_mb'], 1e-9),
+            'tempo_construcao_s': tempo_construcao
+        }
+        resultado['atende'] = (
+            _atende_orcamento(medidas, latencia_max_ms, tamanho_max_mb)
+            and resultado['delta_acuracia'] >= -tolerancia_acuracia
+        )
+        resultados.append(resultado)
+        
+        if verbose:
+            marca = '✅' if resultado['atende'] else '  '
+            print(f"{marca} {metodo} {parametros}: acurácia {medidas['accuracy']:.4f} "
+                  f"({resultado['delta_acuracia']:+.4f}), {medidas['latencia_ms']:.2f} ms "
+                  f"({resultado['speedup']:.1f}x), {medidas['tamanho_mb']:.2f} MB")
+        
+        if resultado['atende'] and (
+            escolhido is None
+            or (resultado['accuracy'], -resultado['latencia_ms']) > (escolhido['accuracy'], -escolhido['latencia_ms'])
+        ):
+            escolhido = resultado
+            modelo_escolhido = candidato
+    
+    # Acurácia final do escolhido no teste, sem viés de seleção
+    if escolhido is not None:
+        escolhido = dict(escolhido)
+        escolhido['accuracy_teste'] = float(accuracy_score(y_test, modelo_escolhido.predict(X_test)))
+        escolhido['delta_acuracia_teste'] = escolhido['accuracy_teste'] - original['accuracy_teste']
+        
+        if verbose:
+            print(f"🎯 Escolhido {escolhido['metodo']} {escolhido['parametros']}: acurácia "
+                  f"{escolhido['accuracy_teste']:.4f} no teste ({escolhido['delta_acuracia_teste']:+.4f})")
+    
+    relatorio = {
+        'original': original,
+        'orcamento': {
+            'latencia_max_ms': latencia_max_ms,
+            'tamanho_max_mb': tamanho_max_mb,
+            'tolerancia_acuracia': tolerancia_acuracia
+        },
+        'n_validacao': len(X_val),
+        'candidatos': resultados,
+        'escolhido': escolhido
+    }
+    
+    return modelo_escolhido, relatorio
+
+
+def salvar_modelo_compacto(caminho_original, modelo_compacto, relatorio):
+    """
+    Salva o modelo compacto ao lado do artefato original
+    
+    O arquivo '<nome>_compacto.pkl' tem o mesmo formato do original (o modelo
+    é substituído) e registra em 'compressao' o delta de acurácia no teste, o
+    speedup e a redução de tamanho medidos.
+    
+    Args:
+        caminho_original: Caminho do artefato salvo com joblib
+        modelo_compacto: Modelo retornado por comprimir_modelo
+        relatorio: Relatório retornado por comprimir_modelo
+    
+    Returns:
+        Caminho do arquivo compacto
+    """
+    caminho_original = Path(caminho_original)
+    model_data = dict(joblib.load(caminho_original))
+    escolhido = relatorio['escolhido']
+    
+    model_data['model'] = modelo_compacto
+    model_data['accuracy'] = escolhido['accuracy_teste']
+    model_data['model_type'] = type(modelo_compacto).__name__
+    model_data['compressao'] = {
+        'artefato_original': caminho_original.name,
+        'metodo': escolhido['metodo'],
+        'parametros': escolhido['parametros'],
+        'accuracy_original': relatorio['original']['accuracy_teste'],
+        'delta_acuracia': escolhido['delta_acuracia_teste'],
+        'delta_acuracia_validacao': escolhido['delta_acuracia'],
+        'latencia_ms_original': relatorio['original']['latencia_ms'],
+        'latencia_ms': escolhido['latencia_ms'],
+        'speedup': escolhido['speedup'],
+        'tamanho_mb_original': relatorio['original']['tamanho_mb'],
+        'tamanho_mb': escolhido['tamanho_mb'],
+        'reducao_tamanho': escolhido['reducao_tamanho'],
+        'orcamento': relatorio['orcamento'],
+        'timestamp': datetime.now().isoformat()
+    }
+    
+    caminho_compacto = caminho_original.with_name(f"{caminho_original.stem}_compacto.pkl")
+    joblib.dump(model_data, caminho_compacto)
+    
+    return caminho_compacto
@@ -3,10 +3,14 @@ Módulo de entrada/saída e validação de dados
 """
 
 import pandas as pd
-import streamlit as st
 from pathlib import Path
 import io
 
+from vetlib.lazy import ModuloPreguicoso
+
+# Streamlit só é importado quando uma mensagem é mostrada na interface
+st = ModuloPreguicoso('streamlit')
+
 
 # Colunas esperadas no schema
 SCHEMA_COLUNAS = {
@@ -346,6 +350,25 @@ def padronizar_valores(df):
     return df_pad
 
 
+def ler_csv_em_blocos(caminho, tamanho_bloco=50000):
+    """
+    Lê um CSV grande em blocos, sem carregá-lo inteiro na memória
+    
+    Cada bloco passa pelo mesmo mapeamento de colunas e padronização de
+    valores aplicados aos uploads.
+    
+    Args:
+        caminho: Caminho do arquivo CSV
+        tamanho_bloco: Linhas por bloco
+    
+    Yields:
+        pd.DataFrame com até tamanho_bloco linhas
+    """
+    for bloco in pd.read_csv(caminho, chunksize=tamanho_bloco):
+        bloco, _ = mapear_colunas_automatico(bloco)
+        yield padronizar_valores(bloco)
+
+
 def salvar_dataset(df, nome_arquivo='dataset_vet.csv'):
     """
     Salva DataFrame na pasta data/
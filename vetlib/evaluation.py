@@ -0,0 +1,333 @@
+"""
+Motor de avaliação em passada única
+
+O conjunto de teste é pontuado uma única vez (predict_proba) e todas as métricas
+são derivadas da matriz de probabilidades em cache: acurácia, precisão, recall,
+F1, matrizes de confusão, curvas ROC/AUC, recortes por grupo (ex.: espécie) e
+por classe, e intervalos de confiança bootstrap vetorizados.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, roc_auc_score, roc_curve
+
+
+# Elementos (réplicas x amostras) processados por bloco no bootstrap
+_ELEMENTOS_POR_BLOCO_BOOTSTRAP = 2 ** 22
+
+METRICAS_BOOTSTRAP = ['accuracy', 'precision_macro', 'recall_macro', 'f1_macro', 'f1_weighted']
+
+
+def pontuar_modelo(modelo, X_test, y_test, label_encoder=None):
+    """
+    Pontua o conjunto de teste uma única vez e guarda o necessário para as métricas
+    
+    Args:
+        modelo: Modelo treinado
+        X_test: Features de teste
+        y_test: Target de teste (rótulos originais)
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+    
+    Returns:
+        dict com 'y_true' e 'y_pred' (índices de classe 0..K-1), 'y_proba',
+        'classes' (classes do modelo) e 'nomes_classes' (rótulos originais)
+    
+    Raises:
+        ValueError: Se y_test tiver rótulos que o modelo não conhece
+    """
+    y_proba = np.asarray(modelo.predict_proba(X_test))
+    classes = np.asarray(modelo.classes_)
+    
+    rotulos_originais = np.asarray(y_test)
+    y_test = rotulos_originais
+    if label_encoder is not None:
+        y_test = label_encoder.transform(y_test)
+        nomes_classes = label_encoder.inverse_transform(classes)
+    else:
+        nomes_classes = classes
+    
+    # searchsorted levaria um rótulo desconhecido para a classe vizinha
+    desconhecidos = ~np.isin(y_test, classes)
+    if desconhecidos.any():
+        raise ValueError(
+            f"Rótulos de teste que o modelo não conhece: {sorted(set(rotulos_originais[desconhecidos].tolist()))}"
+        )
+    
+    # classes_ é ordenado nos estimadores do sklearn: posição via busca binária
+    y_true = np.searchsorted(classes, y_test)
+    
+    return {
+        'y_true': y_true,
+        'y_pred': np.argmax(y_proba, axis=1),
+        'y_proba': y_proba,
+        'classes': classes,
+        'nomes_classes': np.asarray(nomes_classes)
+    }
+
+
+def _matrizes_confusao(chave_grupo, y_true, y_pred, n_grupos, n_classes):
+    """Matrizes de confusão de todos os grupos com um único bincount"""
+    chave = (chave_grupo * n_classes + y_true) * n_classes + y_pred
+    contagens = np.bincount(chave, minlength=n_grupos * n_classes * n_classes)
+    return contagens.reshape(n_grupos, n_classes, n_classes)
+
+
+def _divisao_segura(numerador, denominador):
+    return np.divide(numerador, denominador, out=np.zeros_like(numerador, dtype=np.float64),
+                     where=denominador > 0)
+
+
+def metricas_de_confusao(matrizes):
+    """
+    Métricas derivadas de matrizes de confusão (vetorizado sobre a 1ª dimensão)
+    
+    As médias macro consideram apenas as classes presentes no recorte (nos
+    rótulos reais ou preditos), como o scikit-learn.
+    
+    Args:
+        matrizes: Array (..., K, K) com linhas = real e colunas = predito
+    
+    Returns:
+        dict de arrays com accuracy, precision/recall/f1 macro e weighted
+    """
+    matrizes = np.asarray(matrizes, dtype=np.float64)
+    verdadeiros_positivos = np.diagonal(matrizes, axis1=-2, axis2=-1)
+    suporte = matrizes.sum(axis=-1)
+    preditos = matrizes.sum(axis=-2)
+    total = suporte.sum(axis=-1)
+    
+    precisao = _divisao_segura(verdadeiros_positivos, preditos)
+    recall = _divisao_segura(verdadeiros_positivos, suporte)
+    f1 = _divisao_segura(2 * verdadeiros_positivos, suporte + preditos)
+    
+    presentes = (suporte + preditos) > 0
+    n_presentes = np.maximum(presentes.sum(axis=-1), 1)
+    pesos = _divisao_segura(suporte, total[..., None])
+    
+    def macro(valores):
+        return (valores * presentes).sum(axis=-1) / n_presentes
+    
+    return {
+        'accuracy': _divisao_segura(verdadeiros_positivos.sum(axis=-1), total),
+        'precision_macro': macro(precisao),
+        'recall_macro': macro(recall),
+        'f1_macro': macro(f1),
+        'precision_weighted': (precisao * pesos).sum(axis=-1),
+        'recall_weighted': (recall * pesos).sum(axis=-1),
+        'f1_weighted': (f1 * pesos).sum(axis=-1)
+    }
+
+
+def matriz_confusao(pontuacao):
+    """Matriz de confusão K x K do conjunto de teste"""
+    n_classes = len(pontuacao['classes'])
+    zeros = np.zeros_like(pontuacao['y_true'])
+    return _matrizes_confusao(zeros, pontuacao['y_true'], pontuacao['y_pred'], 1, n_classes)[0]
+
+
+def metricas_globais(pontuacao):
+    """
+    Métricas do conjunto de teste no formato de avaliar_modelo
+    
+    Args:
+        pontuacao: Resultado de pontuar_modelo
+    
+    Returns:
+        dict com métricas, matriz de confusão, relatório por classe e ROC AUC
+    """
+    y_true = pontuacao['y_true']
+    y_pred = pontuacao['y_pred']
+    y_proba = pontuacao['y_proba']
+    n_classes = len(pontuacao['classes'])
+    
+    matriz = matriz_confusao(pontuacao)
+    metricas = {nome: float(valor) for nome, valor in metricas_de_confusao(matriz).items()}
+    
+    # Como no sklearn, a matriz mostra apenas as classes presentes
+    presentes = np.union1d(np.unique(y_true), np.unique(y_pred))
+    metricas['confusion_matrix'] = matriz[np.ix_(presentes, presentes)]
+    metricas['nomes_matriz'] = pontuacao['nomes_classes'][presentes]
+    
+    metricas['classification_report'] = classification_report(
+        y_true, y_pred,
+        labels=presentes,
+        target_names=[str(nome) for nome in pontuacao['nomes_classes'][presentes]],
+        output_dict=True,
+        zero_division=0
+    )
+    
+    try:
+        if n_classes == 2:
+            metricas['roc_auc'] = roc_auc_score(y_true, y_proba[:, 1])
+        else:
+            metricas['roc_auc'] = roc_auc_score(
+                y_true, y_proba, multi_class='ovr', average='macro', labels=np.arange(n_classes)
+            )
+    except ValueError:
+        metricas['roc_auc'] = None
+    
+    metricas['y_pred'] = pontuacao['classes'][y_pred]
+    metricas['y_proba'] = y_proba
+    
+    return metricas
+
+
+def curvas_roc(pontuacao):
+    """
+    Curvas ROC one-vs-rest de cada classe a partir das probabilidades em cache
+    
+    Args:
+        pontuacao: Resultado de pontuar_modelo
+    
+    Returns:
+        dict {nome_classe: {'fpr', 'tpr', 'thresholds'}}
+    """
+    y_true = pontuacao['y_true']
+    y_proba = pontuacao['y_proba']
+    nomes = pontuacao['nomes_classes']
+    
+    indices = [1] if len(nomes) == 2 else range(len(nomes))
+    curvas = {}
+    
+    for i in indices:
+        positivos = y_true == i
+        if positivos.all() or not positivos.any():
+            continue  # curva indefinida sem as duas classes
+        
+        fpr, tpr, thresholds = roc_curve(positivos, y_proba[:, i])
+        curvas[nomes[i]] = {'fpr': fpr, 'tpr': tpr, 'thresholds': thresholds}
+    
+    return curvas
+
+
+def metricas_por_grupo(pontuacao, grupos):
+    """
+    Métricas por grupo (ex.: espécie) no formato de avaliar_por_especie
+    
+    Todas as matrizes de confusão dos grupos saem de um único bincount sobre
+    os índices de grupo, sem nova predição.
+    
+    Args:
+        pontuacao: Resultado de pontuar_modelo
+        grupos: Rótulo de grupo de cada amostra, alinhado com o teste
+    
+    Returns:
+        dict {grupo: {'n_samples', 'accuracy', 'f1_macro', 'confusion_matrix'}}
+    """
+    valores_grupo, chave_grupo = np.unique(np.asarray(grupos), return_inverse=True)
+    n_classes = len(pontuacao['classes'])
+    
+    matrizes = _matrizes_confusao(
+        chave_grupo, pontuacao['y_true'], pontuacao['y_pred'], len(valores_grupo), n_classes
+    )
+    metricas = metricas_de_confusao(matrizes)
+    n_amostras = np.bincount(chave_grupo, minlength=len(valores_grupo))
+    
+    resultado = {}
+    for g, grupo in enumerate(valores_grupo):
+        presentes = np.flatnonzero(matrizes[g].sum(axis=0) + matrizes[g].sum(axis=1))
+        resultado[grupo] = {
+            'n_samples': int(n_amostras[g]),
+            'accuracy': float(metricas['accuracy'][g]),
+            'f1_macro': float(metricas['f1_macro'][g]),
+            'confusion_matrix': matrizes[g][np.ix_(presentes, presentes)]
+        }
+    
+    return resultado
+
+
+def metricas_por_classe(pontuacao):
+    """
+    Precisão, recall, F1, suporte e AUC one-vs-rest de cada classe
+    
+    Args:
+        pontuacao: Resultado de pontuar_modelo
+    
+    Returns:
+        DataFrame indexado pelo nome da classe
+    """
+    matriz = matriz_confusao(pontuacao).astype(np.float64)
+    verdadeiros_positivos = np.diag(matriz)
+    suporte = matriz.sum(axis=1)
+    preditos = matriz.sum(axis=0)
+    
+    auc_classes = []
+    for i in range(len(pontuacao['nomes_classes'])):
+        positivos = pontuacao['y_true'] == i
+        if positivos.any() and not positivos.all():
+            auc_classes.append(roc_auc_score(positivos, pontuacao['y_proba'][:, i]))
+        else:
+            auc_classes.append(np.nan)
+    
+    return pd.DataFrame({
+        'precision': _divisao_segura(verdadeiros_positivos, preditos),
+        'recall': _divisao_segura(verdadeiros_positivos, suporte),
+        'f1-score': _divisao_segura(2 * verdadeiros_positivos, suporte + preditos),
+        'support': suporte.astype(int),
+        'roc_auc': auc_classes
+    }, index=pontuacao['nomes_classes'])
+
+
+def intervalos_bootstrap(pontuacao, n_bootstrap=1000, nivel=0.95, grupos=None, random_state=42):
+    """
+    Intervalos de confiança bootstrap das métricas, sem repredizer
+    
+    Cada réplica reamostra os índices do teste; as matrizes de confusão de
+    todas as réplicas de um bloco saem de um único bincount.
+    
+    Args:
+        pontuacao: Resultado de pontuar_modelo
+        n_bootstrap: Número de réplicas
+        nivel: Nível de confiança
+        grupos: Se informado, reamostra dentro de cada grupo (estratificado)
+        random_state: Seed
+    
+    Returns:
+        DataFrame com estimativa, limite inferior e superior por métrica
+    """
+    rng = np.random.RandomState(random_state)
+    y_true = pontuacao['y_true']
+    y_pred = pontuacao['y_pred']
+    n_amostras = len(y_true)
+    n_classes = len(pontuacao['classes'])
+    par = y_true * n_classes + y_pred
+    
+    if grupos is not None:
+        _, chave_grupo = np.unique(np.asarray(grupos), return_inverse=True)
+        ordem = np.argsort(chave_grupo, kind='stable')
+        tamanhos = np.bincount(chave_grupo)
+        inicios = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    
+    tamanho_bloco = max(1, _ELEMENTOS_POR_BLOCO_BOOTSTRAP // max(n_amostras, 1))
+    blocos = []
+    
+    for inicio in range(0, n_bootstrap, tamanho_bloco):
+        n_replicas = min(tamanho_bloco, n_bootstrap - inicio)
+        
+        if grupos is None:
+            indices = rng.randint(0, n_amostras, size=(n_replicas, n_amostras))
+        else:
+            # Sorteio dentro de cada grupo mantendo o tamanho dos grupos
+            sorteio = rng.random_sample((n_replicas, n_amostras))
+            posicao = np.repeat(inicios, tamanhos) + (sorteio * np.repeat(tamanhos, tamanhos)).astype(int)
+            indices = ordem[posicao]
+        
+        deslocamento = np.arange(n_replicas)[:, None] * n_classes * n_classes
+        contagens = np.bincount(
+            (deslocamento + par[indices]).ravel(), minlength=n_replicas * n_classes * n_classes
+        )
+        blocos.append(metricas_de_confusao(contagens.reshape(n_replicas, n_classes, n_classes)))
+    
+    estimativas = metricas_de_confusao(matriz_confusao(pontuacao))
+    alfa = (1 - nivel) / 2
+    
+    linhas = {}
+    for metrica in METRICAS_BOOTSTRAP:
+        replicas = np.concatenate([bloco[metrica] for bloco in blocos])
+        linhas[metrica] = {
+            'estimativa': float(estimativas[metrica]),
+            'inferior': float(np.quantile(replicas, alfa)),
+            'superior': float(np.quantile(replicas, 1 - alfa))
+        }
+    
+    return pd.DataFrame(linhas).T
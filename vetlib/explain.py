@@ -1,24 +1,192 @@
 """
 Módulo de explicabilidade de modelos (SHAP e Permutation Importance)
+
+Os explainers SHAP ficam em cache por identidade do modelo: o TreeExplainer
+(ou o KernelExplainer, com seu fundo) é construído uma única vez e cada
+explicação paga só o custo da instância. O fundo do KernelExplainer é
+resumido por k-means no treino e salvo ao lado do artefato do modelo.
+
+Lotes grandes (ex.: auditoria de 100 mil casos) são explicados por
+explicar_lote: as linhas são divididas em blocos, cada bloco é explicado num
+processo separado e escrito direto num array float32 em disco
+(casos × features × classes, formato .npy), lido depois por memória mapeada.
+
+Árvores e ensembles do scikit-learn também são explicados pelo motor nativo
+de vetlib.tree_attribution (Saabas ou TreeSHAP exato em NumPy), que dispensa
+o shap e responde um caso em menos de um milissegundo no modo Saabas.
 """
 
+import time
+import weakref
+from datetime import datetime
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans
+
+from vetlib.case_index import IndiceCasos
+from vetlib.lazy import ModuloPreguicoso, modulo_disponivel
+from vetlib.permutation import amostra_estratificada, calcular_importancia_permutacao
+from vetlib.tree_attribution import criar_atribuidor, suporta_atribuicao
+
+# Interface, gráficos e SHAP (opcional) só são importados no primeiro uso
+st = ModuloPreguicoso('streamlit')
+go = ModuloPreguicoso('plotly.graph_objects')
+shap = ModuloPreguicoso('shap')
+SHAP_DISPONIVEL = modulo_disponivel('shap')
+
+
+# Modelos aceitos pelo TreeExplainer (árvore única ou ensembles)
+_MODELOS_ARVORE = (
+    'DecisionTreeClassifier', 'RandomForestClassifier', 'ExtraTreesClassifier',
+    'GradientBoostingClassifier', 'HistGradientBoostingClassifier',
+    'LGBMClassifier', 'XGBClassifier'
+)
+
+# Explainers e atribuidores já construídos, por identidade do modelo (somem junto com o modelo)
+_CACHE_EXPLAINERS = weakref.WeakKeyDictionary()
+_CACHE_ATRIBUIDORES = weakref.WeakKeyDictionary()
+
+N_CENTROIDES_FUNDO = 10
+
+DIRETORIO_EXPLICACOES = Path('explicacoes')
+TAMANHO_BLOCO_SHAP = 2000
+
+N_AMOSTRAS_EXPLICACAO_GLOBAL = 200
+N_AMOSTRAS_KERNEL_GLOBAL = 50
+
+
+def eh_modelo_arvore(modelo):
+    """Indica se o modelo é uma árvore ou um ensemble de árvores suportado pelo TreeExplainer"""
+    return hasattr(modelo, 'tree_') or type(modelo).__name__ in _MODELOS_ARVORE
+
+
+def resumir_fundo(X, n_centroides=N_CENTROIDES_FUNDO, random_state=42):
+    """
+    Resume o fundo do KernelExplainer em centróides k-means
+    
+    Args:
+        X: Features pré-processadas (DataFrame ou array)
+        n_centroides: Número de centróides
+        random_state: Seed
+    
+    Returns:
+        dict com 'centroides' (array) e 'pesos' (fração de casos de cada centróide)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_centroides = min(n_centroides, len(X))
+    
+    kmeans = KMeans(n_clusters=n_centroides, n_init=3, random_state=random_state).fit(X)
+    pesos = np.bincount(kmeans.labels_, minlength=n_centroides) / len(X)
+    
+    return {'centroides': kmeans.cluster_centers_, 'pesos': pesos}
 
-# Import SHAP (pode não estar disponível)
-try:
-    import shap
-    SHAP_DISPONIVEL = True
-except ImportError:
-    SHAP_DISPONIVEL = False
 
-from sklearn.inspection import permutation_importance
+def caminho_fundo(caminho_modelo):
+    """Caminho do fundo SHAP ao lado do artefato ('<nome>_fundo_shap.npz')"""
+    caminho_modelo = Path(caminho_modelo)
+    return caminho_modelo.with_name(f"{caminho_modelo.stem}_fundo_shap.npz")
+
+
+def salvar_fundo(caminho_modelo, fundo):
+    """
+    Salva o fundo resumido ao lado do artefato do modelo
+    
+    Args:
+        caminho_modelo: Caminho do artefato (.pkl)
+        fundo: Fundo resumido (ver resumir_fundo)
+    
+    Returns:
+        Caminho do arquivo salvo
+    """
+    caminho = caminho_fundo(caminho_modelo)
+    np.savez(caminho, centroides=fundo['centroides'], pesos=fundo['pesos'])
+    return caminho
+
+
+def carregar_fundo(caminho_modelo):
+    """Fundo salvo ao lado do artefato, ou None se não houver"""
+    caminho = caminho_fundo(caminho_modelo)
+    if not caminho.exists():
+        return None
+    
+    with np.load(caminho) as dados:
+        return {'centroides': dados['centroides'], 'pesos': dados['pesos']}
+
+
+def limpar_cache_explainers(modelo=None):
+    """Descarta o explainer de um modelo alterado no lugar (ex.: atualização incremental), ou todos"""
+    if modelo is None:
+        _CACHE_EXPLAINERS.clear()
+        _CACHE_ATRIBUIDORES.clear()
+    else:
+        _CACHE_EXPLAINERS.pop(modelo, None)
+        _CACHE_ATRIBUIDORES.pop(modelo, None)
+
+
+def obter_atribuidor(modelo):
+    """Motor nativo de atribuição do modelo (ver vetlib.tree_attribution), construído uma única vez"""
+    atribuidor = _CACHE_ATRIBUIDORES.get(modelo)
+    if atribuidor is None:
+        atribuidor = criar_atribuidor(modelo)
+        _CACHE_ATRIBUIDORES[modelo] = atribuidor
+    return atribuidor
+
+
+def obter_explainer(modelo, fundo=None, X_fundo=None):
+    """
+    Explainer SHAP do modelo, construído na primeira chamada e reaproveitado
+    
+    Args:
+        modelo: Modelo treinado
+        fundo: Fundo resumido (ver resumir_fundo/carregar_fundo), para modelos sem árvores
+        X_fundo: Dados para resumir o fundo quando 'fundo' não é informado
+    
+    Returns:
+        TreeExplainer ou KernelExplainer
+    """
+    explainer = _CACHE_EXPLAINERS.get(modelo)
+    if explainer is not None:
+        return explainer
+    
+    explainer = None
+    if eh_modelo_arvore(modelo):
+        try:
+            explainer = shap.TreeExplainer(modelo)
+        except Exception:
+            explainer = None  # Variante não suportada: cai no KernelExplainer
+    
+    if explainer is None:
+        if fundo is None:
+            if X_fundo is None:
+                raise ValueError("KernelExplainer precisa de um fundo (salvar_fundo no treino ou X_fundo)")
+            fundo = resumir_fundo(X_fundo)
+        
+        dados_fundo = shap.utils._legacy.DenseData(
+            fundo['centroides'],
+            [f'feature_{i}' for i in range(fundo['centroides'].shape[1])],
+            None,
+            fundo['pesos']
+        )
+        
+        # O KernelExplainer passa arrays: modelos que dependem dos nomes das
+        # colunas (ex.: ModeloPorEspecie) recebem o DataFrame de volta
+        colunas = getattr(modelo, 'feature_names_in_', None)
+        
+        def prever(Z):
+            if colunas is not None:
+                Z = pd.DataFrame(np.asarray(Z), columns=colunas)
+            return modelo.predict_proba(Z)
+        
+        explainer = shap.KernelExplainer(prever, dados_fundo)
+    
+    _CACHE_EXPLAINERS[modelo] = explainer
+    return explainer
 
 
-def calcular_shap_values(modelo, X, feature_names=None, max_samples=100):
+def calcular_shap_values(modelo, X, feature_names=None, max_samples=100, fundo=None):
     """
     Calcula SHAP values para explicabilidade
     
@@ -27,6 +195,7 @@ def calcular_shap_values(modelo, X, feature_names=None, max_samples=100):
         X: Features (DataFrame ou array)
         feature_names: Nomes das features
         max_samples: Número máximo de samples para calcular (performance)
+        fundo: Fundo resumido do KernelExplainer (None = resume X na primeira chamada)
         
     Returns:
         shap_values, explainer, X_sample
@@ -48,15 +217,8 @@ def calcular_shap_values(modelo, X, feature_names=None, max_samples=100):
         X_sample = X.copy()
     
     try:
-        # Tentar TreeExplainer (para modelos baseados em árvore)
-        if hasattr(modelo, 'tree_'):
-            explainer = shap.TreeExplainer(modelo)
-        else:
-            # Usar KernelExplainer (mais geral, mas mais lento)
-            explainer = shap.KernelExplainer(
-                modelo.predict_proba,
-                shap.sample(X_sample, min(100, len(X_sample)))
-            )
+        # TreeExplainer para árvores e ensembles; KernelExplainer (fundo resumido) para os demais
+        explainer = obter_explainer(modelo, fundo=fundo, X_fundo=X)
         
         shap_values = explainer.shap_values(X_sample)
         
@@ -67,6 +229,236 @@ def calcular_shap_values(modelo, X, feature_names=None, max_samples=100):
         return None, None, None
 
 
+def _shap_em_array(shap_values, n_classes):
+    """SHAP values no formato (amostras, features, classes), qualquer que seja a versão do shap"""
+    if isinstance(shap_values, list):
+        return np.stack(shap_values, axis=-1)
+    
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 2:
+        # Saída única (binário em log-odds): a classe negativa é o simétrico da positiva
+        return np.stack([-shap_values, shap_values], axis=-1) if n_classes == 2 else shap_values[..., None]
+    
+    return shap_values
+
+
+def _fundo_se_necessario(modelo, fundo, X):
+    """Fundo resumido de X quando o modelo cai no KernelExplainer (sem motor nativo nem TreeExplainer)"""
+    if fundo is not None or suporta_atribuicao(modelo):
+        return fundo
+    
+    try:
+        obter_explainer(modelo)  # TreeExplainer aceito: fica em cache e dispensa o fundo
+    except ValueError:
+        return resumir_fundo(X)
+    return None
+
+
+def _shap_bloco(modelo, fundo, X_bloco):
+    """SHAP values de um bloco de linhas, (casos, features, classes)"""
+    if suporta_atribuicao(modelo):
+        # TreeSHAP exato do motor nativo: mesmos valores do TreeExplainer, que
+        # além disso recusa alguns modelos (ex.: GradientBoosting multiclasse)
+        return obter_atribuidor(modelo).contribuicoes(X_bloco, metodo='treeshap')
+    
+    explainer = obter_explainer(modelo, fundo=fundo)
+    
+    # Barra de progresso do KernelExplainer desligada (processos do pool, jobs)
+    opcoes = {'silent': True} if isinstance(explainer, shap.KernelExplainer) else {}
+    return _shap_em_array(explainer.shap_values(X_bloco, **opcoes), len(modelo.classes_))
+
+
+def _explicar_bloco(modelo, fundo, X_bloco, caminho, inicio):
+    """Explica um bloco de linhas e escreve o resultado na sua fatia do arquivo"""
+    valores = _shap_bloco(modelo, fundo, X_bloco)
+    
+    saida = np.load(caminho, mmap_mode='r+')
+    saida[inicio:inicio + len(X_bloco)] = valores
+    saida.flush()
+    del saida
+    
+    return len(X_bloco)
+
+
+def explicar_lote(modelo, X, caminho_saida=None, fundo=None, tamanho_bloco=TAMANHO_BLOCO_SHAP,
+                  n_jobs=-1, progresso=None):
+    """
+    SHAP values de todos os casos de um lote, em blocos paralelos gravados em disco
+    
+    Cada bloco vai para um processo do pool e é escrito na sua fatia de um
+    .npy float32 (casos × features × classes); o lote inteiro nunca precisa
+    caber na memória. O progresso é informado a cada bloco concluído, na
+    ordem em que terminam. Os modelos de árvore aceitos pelo motor nativo
+    usam o seu TreeSHAP, com ou sem o shap instalado.
+    
+    Args:
+        modelo: Modelo treinado (não compilado)
+        X: Features pré-processadas (DataFrame ou array)
+        caminho_saida: Arquivo .npy de saída (None = explicacoes/shap_lote_<data>.npy)
+        fundo: Fundo resumido do KernelExplainer (None = resume X)
+        tamanho_bloco: Linhas por bloco
+        n_jobs: Processos do pool
+        progresso: Callback chamado com {'etapa', 'n_concluidos', 'n_total'}
+    
+    Returns:
+        Caminho do .npy (abrir com carregar_explicacoes_lote)
+    """
+    if not SHAP_DISPONIVEL and not suporta_atribuicao(modelo):
+        raise ImportError("Biblioteca SHAP não disponível. Instale com: pip install shap")
+    
+    X = np.asarray(X, dtype=np.float64)
+    n_total = len(X)
+    
+    if caminho_saida is None:
+        DIRETORIO_EXPLICACOES.mkdir(parents=True, exist_ok=True)
+        caminho_saida = DIRETORIO_EXPLICACOES / f"shap_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.npy"
+    caminho_saida = Path(caminho_saida)
+    
+    # Fundo resumido uma vez aqui, e não em cada processo
+    fundo = _fundo_se_necessario(modelo, fundo, X)
+    
+    saida = np.lib.format.open_memmap(
+        caminho_saida, mode='w+', dtype=np.float32,
+        shape=(n_total, X.shape[1], len(modelo.classes_))
+    )
+    del saida  # Cabeçalho gravado; os processos escrevem os blocos
+    
+    inicios = range(0, n_total, tamanho_bloco)
+    tarefas = (
+        delayed(_explicar_bloco)(modelo, fundo, X[inicio:inicio + tamanho_bloco], caminho_saida, inicio)
+        for inicio in inicios
+    )
+    
+    n_concluidos = 0
+    for n_bloco in Parallel(n_jobs=n_jobs, return_as='generator_unordered')(tarefas):
+        n_concluidos += n_bloco
+        if progresso is not None:
+            progresso({'etapa': 'shap_lote', 'n_concluidos': n_concluidos, 'n_total': n_total})
+    
+    return caminho_saida
+
+
+def carregar_explicacoes_lote(caminho):
+    """Array (casos × features × classes) de explicar_lote, mapeado em memória (somente leitura)"""
+    return np.load(caminho, mmap_mode='r')
+
+
+def resumir_explicacoes_lote(caminho, classes_preditas, feature_names, top_n=3, tamanho_bloco=TAMANHO_BLOCO_SHAP):
+    """
+    Features de maior impacto de cada caso, na classe predita
+    
+    Lê o arquivo bloco a bloco, sem carregar o lote inteiro.
+    
+    Args:
+        caminho: .npy de explicar_lote
+        classes_preditas: Índice (em modelo.classes_) da classe predita de cada caso
+        feature_names: Nomes das features
+        top_n: Features por caso
+        tamanho_bloco: Linhas lidas por vez
+    
+    Returns:
+        DataFrame com feature_i e impacto_i (i = 1..top_n) por caso
+    """
+    valores = carregar_explicacoes_lote(caminho)
+    classes_preditas = np.asarray(classes_preditas)
+    feature_names = np.asarray(feature_names)
+    top_n = min(top_n, valores.shape[1])
+    
+    blocos = []
+    for inicio in range(0, len(valores), tamanho_bloco):
+        fim = inicio + tamanho_bloco
+        linhas = np.arange(len(valores[inicio:fim]))
+        impacto = np.asarray(valores[inicio:fim])[linhas, :, classes_preditas[inicio:fim]]
+        
+        # Top-n sem ordenar todas as features; só os escolhidos são ordenados
+        top = np.argpartition(-np.abs(impacto), top_n - 1, axis=1)[:, :top_n]
+        ordem = np.argsort(-np.abs(np.take_along_axis(impacto, top, axis=1)), axis=1)
+        top = np.take_along_axis(top, ordem, axis=1)
+        
+        bloco = {}
+        for i in range(top_n):
+            bloco[f'feature_{i + 1}'] = feature_names[top[:, i]]
+            bloco[f'impacto_{i + 1}'] = impacto[linhas, top[:, i]]
+        blocos.append(pd.DataFrame(bloco))
+    
+    return pd.concat(blocos, ignore_index=True)
+
+
+def gerar_explicacao_global(modelo, X, y, label_encoder=None, df_permutacao=None, resumo_permutacao=None,
+                            fundo=None, max_amostras=N_AMOSTRAS_EXPLICACAO_GLOBAL,
+                            max_amostras_kernel=N_AMOSTRAS_KERNEL_GLOBAL, random_state=42):
+    """
+    Explicação global do modelo, calculada uma vez no treino e salva no artefato
+    
+    Args:
+        modelo: Modelo treinado
+        X: DataFrame de features pré-processadas (ex.: treino)
+        y: Target (rótulos originais se label_encoder for informado)
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+        df_permutacao: Importância por permutação já calculada (ver vetlib.permutation)
+        resumo_permutacao: Resumo da importância por permutação
+        fundo: Fundo resumido do KernelExplainer (None = resume X se for preciso)
+        max_amostras: Casos (amostra estratificada) usados no |SHAP| médio
+        max_amostras_kernel: Limite de casos quando o modelo usa o KernelExplainer
+        random_state: Seed
+    
+    Returns:
+        dict com classes, feature_names, shap_medio_abs (features × classes,
+        None se não puder ser calculado), metodo_shap, erro_shap (motivo
+        quando shap_medio_abs é None), importancia_permutacao,
+        resumo_permutacao, perfis_classe (média padronizada de cada feature
+        por classe), n_amostras_shap, tempo_s e timestamp
+    """
+    inicio = time.perf_counter()
+    
+    classes = np.asarray(modelo.classes_)
+    if label_encoder is not None:
+        classes = label_encoder.inverse_transform(classes)
+    feature_names = list(X.columns)
+    
+    # |SHAP| médio por classe numa amostra estratificada: TreeSHAP nativo nas árvores
+    # que ele cobre; no KernelExplainer (bem mais lento), uma amostra menor
+    shap_medio_abs, metodo_shap, n_amostras, erro_shap = None, None, 0, None
+    if suporta_atribuicao(modelo) or SHAP_DISPONIVEL:
+        try:
+            if suporta_atribuicao(modelo):
+                metodo_shap = 'treeshap'
+            else:
+                fundo = _fundo_se_necessario(modelo, fundo, X)
+                metodo_shap = 'shap'
+                if isinstance(obter_explainer(modelo, fundo=fundo), shap.KernelExplainer):
+                    max_amostras = min(max_amostras, max_amostras_kernel)
+            
+            indices = amostra_estratificada(y, max_amostras, random_state)
+            valores = _shap_bloco(modelo, fundo, X.iloc[indices])
+            shap_medio_abs = pd.DataFrame(np.abs(valores).mean(axis=0), index=feature_names, columns=classes)
+            n_amostras = len(indices)
+        except Exception as e:
+            # A explicação fica com permutação e perfis, e o motivo vai junto
+            metodo_shap = None
+            erro_shap = f"{type(e).__name__}: {e}"
+    else:
+        erro_shap = "Biblioteca SHAP não disponível e modelo sem motor nativo de atribuição"
+    
+    # Perfil de cada classe: média das features padronizadas dos seus casos
+    perfis_classe = X.groupby(np.asarray(y)).mean()
+    perfis_classe.index.name = 'classe'
+    
+    return {
+        'classes': classes.tolist(),
+        'feature_names': feature_names,
+        'shap_medio_abs': shap_medio_abs,
+        'metodo_shap': metodo_shap,
+        'erro_shap': erro_shap,
+        'importancia_permutacao': df_permutacao,
+        'resumo_permutacao': resumo_permutacao,
+        'perfis_classe': perfis_classe,
+        'n_amostras_shap': n_amostras,
+        'tempo_s': time.perf_counter() - inicio,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
 def plotar_shap_summary(shap_values, X, feature_names=None, classe=None):
     """
     Cria gráfico de resumo SHAP (importância global)
@@ -195,35 +587,32 @@ def calcular_permutation_importance(modelo, X, y, feature_names=None, n_repeats=
     """
     Calcula importância por permutação (alternativa ao SHAP)
     
+    Usa o cálculo com orçamento de vetlib.permutation: amostra estratificada,
+    até n_repeats repetições por feature com parada antecipada pelo
+    intervalo de confiança e cópias permutadas pontuadas em blocos.
+    
     Args:
         modelo: Modelo treinado
         X: Features
-        y: Target
+        y: Target (nas classes do modelo)
         feature_names: Nomes das features
-        n_repeats: Número de repetições
+        n_repeats: Número máximo de repetições por feature
         
     Returns:
         DataFrame com importâncias
     """
     try:
-        result = permutation_importance(
-            modelo, X, y,
-            n_repeats=n_repeats,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        if feature_names is None:
-            if isinstance(X, pd.DataFrame):
-                feature_names = X.columns.tolist()
-            else:
+        if not isinstance(X, pd.DataFrame):
+            if feature_names is None:
                 feature_names = [f'feature_{i}' for i in range(X.shape[1])]
+            X = pd.DataFrame(X, columns=feature_names)
         
-        df_importance = pd.DataFrame({
-            'feature': feature_names,
-            'importancia': result.importances_mean,
-            'std': result.importances_std
-        }).sort_values('importancia', ascending=False)
+        df_importance, _ = calcular_importancia_permutacao(
+            modelo, X, y,
+            min_repeticoes=min(3, n_repeats),
+            max_repeticoes=n_repeats,
+            random_state=42
+        )
         
         return df_importance
     
@@ -237,12 +626,16 @@ def plotar_permutation_importance(df_importance, top_n=20):
     Plota importância por permutação
     
     Args:
-        df_importance: DataFrame com importâncias
+        df_importance: DataFrame com importâncias, ou a explicação global do modelo
+            (ver gerar_explicacao_global)
         top_n: Número de features a mostrar
         
     Returns:
         Plotly figure
     """
+    if isinstance(df_importance, dict):
+        df_importance = df_importance.get('importancia_permutacao')
+    
     if df_importance is None or len(df_importance) == 0:
         return None
     
@@ -269,8 +662,85 @@ def plotar_permutation_importance(df_importance, top_n=20):
     return fig
 
 
+def plotar_shap_global(explicacao_global, classe=None, top_n=20):
+    """
+    Plota o |SHAP| médio salvo na explicação global do modelo (nada é recalculado)
+    
+    Args:
+        explicacao_global: Explicação global (ver gerar_explicacao_global)
+        classe: Classe a mostrar (None = barras empilhadas de todas as classes)
+        top_n: Número de features a mostrar
+    
+    Returns:
+        Plotly figure (None se a explicação não tiver SHAP)
+    """
+    shap_medio_abs = (explicacao_global or {}).get('shap_medio_abs')
+    if shap_medio_abs is None:
+        return None
+    
+    colunas = [classe] if classe is not None else list(shap_medio_abs.columns)
+    df_plot = shap_medio_abs[colunas]
+    df_plot = df_plot.loc[df_plot.sum(axis=1).nlargest(top_n).index[::-1]]
+    
+    fig = go.Figure([
+        go.Bar(y=df_plot.index, x=df_plot[coluna], name=str(coluna), orientation='h')
+        for coluna in colunas
+    ])
+    
+    fig.update_layout(
+        title=f'Importância Global das Features (SHAP){f" - {classe}" if classe is not None else ""}',
+        xaxis_title='|SHAP value| médio',
+        yaxis_title='Feature',
+        barmode='stack',
+        height=max(400, len(df_plot) * 25),
+        showlegend=classe is None
+    )
+    
+    return fig
+
+
+def plotar_perfis_classe(explicacao_global, top_n=15):
+    """
+    Mapa de calor da média padronizada das features mais importantes em cada classe
+    
+    Args:
+        explicacao_global: Explicação global (ver gerar_explicacao_global)
+        top_n: Número de features a mostrar (pelo |SHAP| médio, ou pela
+            variação entre classes se não houver SHAP)
+    
+    Returns:
+        Plotly figure
+    """
+    perfis = (explicacao_global or {}).get('perfis_classe')
+    if perfis is None or len(perfis) == 0:
+        return None
+    
+    shap_medio_abs = explicacao_global.get('shap_medio_abs')
+    relevancia = shap_medio_abs.sum(axis=1) if shap_medio_abs is not None else perfis.std(axis=0)
+    features = relevancia.nlargest(top_n).index
+    
+    fig = go.Figure(go.Heatmap(
+        z=perfis[features].values,
+        x=list(features),
+        y=[str(classe) for classe in perfis.index],
+        colorscale='RdBu',
+        reversescale=True,
+        zmid=0,
+        colorbar=dict(title='Média (z)')
+    ))
+    
+    fig.update_layout(
+        title='Perfil das Classes (média padronizada de cada feature)',
+        xaxis_title='Feature',
+        yaxis_title='Diagnóstico',
+        height=max(400, len(perfis) * 30)
+    )
+    
+    return fig
+
+
 def explicar_predicao_local(modelo, X_instance, feature_names, preprocessadores, 
-                           usar_shap=True, modelo_type='tree'):
+                           usar_shap=True, modelo_type='tree', fundo=None, metodo_atribuicao='saabas'):
     """
     Explica uma predição individual
     
@@ -281,9 +751,12 @@ def explicar_predicao_local(modelo, X_instance, feature_names, preprocessadores,
         preprocessadores: Preprocessadores usados
         usar_shap: Se True, usa SHAP; caso contrário, usa feature importance do modelo
         modelo_type: 'tree' ou 'linear'
+        fundo: Fundo resumido do KernelExplainer (ver carregar_fundo)
+        metodo_atribuicao: Modo do motor nativo para árvores ('saabas' ou 'treeshap')
         
     Returns:
-        dict com explicações
+        dict com explicações, 'metodo_explicacao' e 'tempo_explicacao_ms'
+        (custo da explicação do caso)
     """
     # Fazer predição
     y_pred = modelo.predict(X_instance)[0]
@@ -295,39 +768,48 @@ def explicar_predicao_local(modelo, X_instance, feature_names, preprocessadores,
         'features_importantes': []
     }
     
-    # Usar SHAP se disponível e solicitado
-    if usar_shap and SHAP_DISPONIVEL:
+    inicio = time.perf_counter()
+    classe_idx = list(modelo.classes_).index(y_pred)
+    valores_caso = np.asarray(X_instance)[0]
+    shap_vals = None
+    
+    # Árvores: motor nativo (sem shap); demais modelos: shap se disponível
+    if usar_shap and suporta_atribuicao(modelo):
+        shap_vals = obter_atribuidor(modelo).contribuicoes(X_instance, metodo_atribuicao)[0, :, classe_idx]
+        explicacao['metodo_explicacao'] = metodo_atribuicao
+    
+    elif usar_shap and SHAP_DISPONIVEL:
         try:
-            shap_values, explainer, _ = calcular_shap_values(modelo, X_instance, feature_names, max_samples=1)
+            shap_values, explainer, _ = calcular_shap_values(
+                modelo, X_instance, feature_names, max_samples=1, fundo=fundo
+            )
             
             if shap_values is not None:
                 # Pegar SHAP values da classe predita
-                classe_idx = list(modelo.classes_).index(y_pred)
-                
-                if isinstance(shap_values, list):
-                    shap_vals = shap_values[classe_idx][0]
-                else:
-                    shap_vals = shap_values[0]
-                
-                # Top features por impacto absoluto
-                top_indices = np.argsort(np.abs(shap_vals))[::-1][:10]
-                
-                for idx in top_indices:
-                    explicacao['features_importantes'].append({
-                        'feature': feature_names[idx],
-                        'valor': X_instance.iloc[0, idx] if isinstance(X_instance, pd.DataFrame) else X_instance[0, idx],
-                        'impacto': shap_vals[idx],
-                        'direcao': 'aumenta' if shap_vals[idx] > 0 else 'diminui'
-                    })
+                shap_vals = _shap_em_array(shap_values, len(modelo.classes_))[0, :, classe_idx]
+                explicacao['metodo_explicacao'] = 'shap'
         except:
             passar = True
     
+    if shap_vals is not None:
+        # Top features por impacto absoluto
+        top_indices = np.argsort(np.abs(shap_vals))[::-1][:10]
+        
+        for idx in top_indices:
+            explicacao['features_importantes'].append({
+                'feature': feature_names[idx],
+                'valor': valores_caso[idx],
+                'impacto': shap_vals[idx],
+                'direcao': 'aumenta' if shap_vals[idx] > 0 else 'diminui'
+            })
+    
     # Fallback: usar importância do modelo
     if len(explicacao['features_importantes']) == 0:
+        explicacao['metodo_explicacao'] = 'importancia_global'
+        
         if hasattr(modelo, 'feature_importances_'):
             importancias = modelo.feature_importances_
         elif hasattr(modelo, 'coef_'):
-            classe_idx = list(modelo.classes_).index(y_pred)
             importancias = np.abs(modelo.coef_[classe_idx])
         else:
             importancias = np.ones(len(feature_names))
@@ -336,13 +818,14 @@ def explicar_predicao_local(modelo, X_instance, feature_names, preprocessadores,
         top_indices = np.argsort(importancias)[::-1][:10]
         
         for idx in top_indices:
-            valor = X_instance.iloc[0, idx] if isinstance(X_instance, pd.DataFrame) else X_instance[0, idx]
             explicacao['features_importantes'].append({
                 'feature': feature_names[idx],
-                'valor': valor,
+                'valor': valores_caso[idx],
                 'importancia_global': importancias[idx]
             })
     
+    explicacao['tempo_explicacao_ms'] = (time.perf_counter() - inicio) * 1000
+    
     return explicacao
 
 
@@ -386,7 +869,7 @@ def gerar_texto_explicacao(explicacao, diagnostico_real=None):
     return texto
 
 
-def comparar_casos_similares(modelo, X_new, X_train, y_train, n_similares=5):
+def comparar_casos_similares(modelo, X_new, X_train, y_train, n_similares=5, indice=None):
     """
     Encontra e compara casos similares no conjunto de treino
     
@@ -396,23 +879,13 @@ def comparar_casos_similares(modelo, X_new, X_train, y_train, n_similares=5):
         X_train: Features de treino
         y_train: Diagnósticos de treino
         n_similares: Número de casos similares a retornar
+        indice: IndiceCasos já construído (ex.: carregar_indice_casos); se None,
+            é construído a partir de X_train e y_train
         
     Returns:
         DataFrame com casos similares
     """
-    from sklearn.metrics.pairwise import cosine_similarity
+    if indice is None:
+        indice = IndiceCasos(X_train, y_train)
     
-    # Calcular similaridade
-    similaridades = cosine_similarity(X_new, X_train)[0]
-    
-    # Top N mais similares
-    indices_similares = np.argsort(similaridades)[::-1][:n_similares]
-    
-    df_similares = pd.DataFrame({
-        'indice': indices_similares,
-        'similaridade': similaridades[indices_similares],
-        'diagnostico': y_train.iloc[indices_similares].values
-    })
-    
-    return df_similares
-
+    return indice.casos_similares(X_new, n_similares)
@@ -0,0 +1,253 @@
+"""
+Modelo enxuto: o menor conjunto de features dentro de uma tolerância de acurácia
+
+As features são ordenadas por importância (do próprio modelo, via
+obter_importancia_features, ou por permutação) e uma busca binária sobre o
+tamanho do prefixo encontra o menor k cuja acurácia de validação cruzada fica
+a no máximo `tolerancia` da acurácia com todas as features. Como a CV é
+ruidosa e não é monotônica em k, a vizinhança do resultado é conferida no
+final (ver _menor_prefixo).
+
+Como o pré-processamento é coluna a coluna (imputação, codificação e
+escalonamento independentes), a matriz de cada candidato é só um recorte da
+matriz já pré-processada. O modelo final é reajustado com preprocessadores
+que conhecem apenas as features escolhidas, e o manifesto lista as entradas
+que a inferência exige.
+"""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+
+from vetlib.modeling import criar_modelo_base, obter_importancia_features, salvar_modelo
+from vetlib.permutation import calcular_importancia_permutacao
+from vetlib.preprocessing import criar_preprocessador, aplicar_preprocessamento
+
+
+METODOS_IMPORTANCIA = ('modelo', 'permutacao')
+
+
+def _sem_progresso(info):
+    pass
+
+
+def ordenar_features(modelo, X, y, metodo='modelo', random_state=42, n_jobs=None):
+    """
+    Ordena as features da mais para a menos importante
+    
+    Args:
+        modelo: Modelo ajustado em X, y
+        X: DataFrame de features pré-processadas
+        y: Target codificado
+        metodo: 'modelo' (importâncias/coeficientes do estimador) ou 'permutacao'
+        random_state: Seed
+        n_jobs: Núcleos do modelo reajustado para a permutação
+    
+    Returns:
+        DataFrame com 'feature' e 'importancia', ordenado
+    """
+    if metodo == 'modelo':
+        df_importancia = obter_importancia_features(modelo, list(X.columns))
+        if df_importancia is not None:
+            return df_importancia.reset_index(drop=True)
+        # Estimadores sem importâncias (ex.: HistGradientBoosting) usam permutação
+    
+    # Permutação medida numa validação separada, com um modelo que não a viu
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=0.25, random_state=random_state, stratify=y
+    )
+    modelo_perm = clone(modelo).fit(X_fit, y_fit)
+    df_importancia, _ = calcular_importancia_permutacao(
+        modelo_perm, X_val, y_val, max_repeticoes=5, random_state=random_state
+    )
+    
+    return df_importancia[['feature', 'importancia']]
+
+
+def _latencia_caso_ms(modelo, preprocessadores, feature_names, caso, n_repeticoes=20):
+    """Mediana do tempo de pré-processar e pontuar um único caso"""
+    tempos = []
+    for _ in range(n_repeticoes + 1):
+        inicio = time.perf_counter()
+        X_proc, _ = aplicar_preprocessamento(caso[feature_names], preprocessadores, fit=False)
+        modelo.predict_proba(X_proc)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos[1:]) * 1000)
+
+
+def _menor_prefixo(avaliar, n_features, alvo):
+    """
+    Menor tamanho de prefixo com acurácia >= alvo, conferido na vizinhança
+    
+    A busca binária supõe acurácia monotônica em k, o que a validação cruzada
+    não garante. Ela já termina com k-1 fora do alvo; depois dela k sobe até
+    ficar estável (k e k+1 atendendo): um k que passou por ruído, com o
+    vizinho maior fora da tolerância, não é aceito.
+    
+    Args:
+        avaliar: Função k -> acurácia de validação cruzada (com cache)
+        n_features: Tamanho do ranking (avaliar(n_features) atende por definição)
+        alvo: Acurácia mínima
+    
+    Returns:
+        Número de features escolhido
+    """
+    def atende(k):
+        return k >= n_features or avaliar(k) >= alvo
+    
+    inferior, superior = 1, n_features
+    while inferior < superior:
+        meio = (inferior + superior) // 2
+        if atende(meio):
+            superior = meio
+        else:
+            inferior = meio + 1
+    
+    k = inferior
+    while not (atende(k) and atende(k + 1)):
+        k += 1
+    
+    return k
+
+
+def construir_modelo_enxuto(X, y, nome_modelo='Random Forest', tolerancia=0.01, metodo='modelo',
+                            test_size=0.2, cv_folds=5, random_state=42, n_jobs=None, progresso=None):
+    """
+    Busca o menor subconjunto de features dentro da tolerância e treina o modelo enxuto
+    
+    Args:
+        X, y: Features e target (saída de preparar_features_target)
+        nome_modelo: Nome do modelo (ver obter_modelos_disponiveis)
+        tolerancia: Perda máxima de acurácia (validação cruzada) aceita
+        metodo: Ordenação das features ('modelo' ou 'permutacao')
+        test_size: Fração de teste (a acurácia final é medida nela)
+        cv_folds: Folds da validação cruzada de cada candidato
+        random_state: Seed
+        n_jobs: Núcleos do modelo, da validação cruzada e da permutação
+        progresso: Callback chamado a cada tamanho avaliado
+    
+    Returns:
+        dict com modelo, preprocessadores, feature_names (as escolhidas),
+        manifesto e curva (acurácia de validação por número de features)
+    """
+    if metodo not in METODOS_IMPORTANCIA:
+        raise ValueError(f"Método '{metodo}' não disponível (opções: {', '.join(METODOS_IMPORTANCIA)})")
+    
+    progresso = progresso or _sem_progresso
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+    
+    label_encoder = LabelEncoder().fit(y_train)
+    y_train_cod = label_encoder.transform(y_train)
+    y_test_cod = label_encoder.transform(y_test)
+    
+    preprocessadores = criar_preprocessador(X_train)
+    X_train_proc, preprocessadores = aplicar_preprocessamento(X_train, preprocessadores, fit=True)
+    X_test_proc, _ = aplicar_preprocessamento(X_test, preprocessadores, fit=False)
+    
+    referencia = criar_modelo_base(nome_modelo, random_state=random_state, n_jobs=n_jobs)
+    referencia.fit(X_train_proc, y_train_cod)
+    df_importancia = ordenar_features(referencia, X_train_proc, y_train_cod, metodo, random_state, n_jobs)
+    ranking = df_importancia['feature'].tolist()
+    
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    curva = {}
+    
+    def acuracia_cv(k):
+        if k not in curva:
+            modelo_k = criar_modelo_base(nome_modelo, random_state=random_state)
+            curva[k] = cross_val_score(
+                modelo_k, X_train_proc[ranking[:k]], y_train_cod, cv=cv, scoring='accuracy', n_jobs=n_jobs
+            ).mean()
+            progresso({'etapa': 'orcamento_features', 'n_features': k, 'accuracy_cv': curva[k]})
+        return curva[k]
+    
+    # Busca binária pelo menor prefixo do ranking que cabe na tolerância, conferida na vizinhança
+    alvo = acuracia_cv(len(ranking)) - tolerancia
+    selecionadas = ranking[:_menor_prefixo(acuracia_cv, len(ranking), alvo)]
+    
+    # Modelo final: preprocessadores e modelo só com as features escolhidas
+    preprocessadores_enxuto = criar_preprocessador(X_train[selecionadas])
+    X_train_enxuto, preprocessadores_enxuto = aplicar_preprocessamento(
+        X_train[selecionadas], preprocessadores_enxuto, fit=True
+    )
+    X_test_enxuto, _ = aplicar_preprocessamento(X_test[selecionadas], preprocessadores_enxuto, fit=False)
+    
+    modelo = criar_modelo_base(nome_modelo, random_state=random_state, n_jobs=n_jobs)
+    modelo.fit(X_train_enxuto, y_train_cod)
+    
+    caso = X_test.iloc[:1]
+    manifesto = {
+        'modelo': nome_modelo,
+        'features_obrigatorias': selecionadas,
+        'n_features': len(selecionadas),
+        'n_features_original': len(ranking),
+        'tolerancia': tolerancia,
+        'metodo_importancia': metodo,
+        'accuracy_cv_original': float(curva[len(ranking)]),
+        'accuracy_cv': float(curva[len(selecionadas)]),
+        'accuracy_teste_original': float(np.mean(referencia.predict(X_test_proc) == y_test_cod)),
+        'accuracy_teste': float(np.mean(modelo.predict(X_test_enxuto) == y_test_cod)),
+        'latencia_caso_ms_original': _latencia_caso_ms(referencia, preprocessadores, list(X.columns), caso),
+        'latencia_caso_ms': _latencia_caso_ms(modelo, preprocessadores_enxuto, selecionadas, caso),
+        'classes': label_encoder.classes_.tolist(),
+        'importancias': dict(zip(df_importancia['feature'], df_importancia['importancia'].astype(float))),
+        'timestamp': datetime.now().isoformat()
+    }
+    
+    return {
+        'modelo': modelo,
+        'preprocessadores': preprocessadores_enxuto,
+        'feature_names': selecionadas,
+        'label_encoder': label_encoder,
+        'manifesto': manifesto,
+        'curva': pd.Series(curva, name='accuracy_cv').rename_axis('n_features').sort_index()
+    }
+
+
+def caminho_manifesto(caminho_modelo):
+    """Caminho do manifesto de entradas ao lado do artefato ('<nome>_manifesto.json')"""
+    caminho_modelo = Path(caminho_modelo)
+    return caminho_modelo.with_name(f"{caminho_modelo.stem}_manifesto.json")
+
+
+def salvar_modelo_enxuto(resultado, caminho_base):
+    """
+    Salva o modelo enxuto no formato da página de Predição e o manifesto ao lado
+    
+    Args:
+        resultado: Retorno de construir_modelo_enxuto
+        caminho_base: Caminho base do artefato (sem extensão)
+    
+    Returns:
+        (caminho do modelo, caminho do manifesto)
+    """
+    caminho_modelo = salvar_modelo(
+        resultado['modelo'], resultado['preprocessadores'], resultado['feature_names'],
+        caminho_base=caminho_base
+    )
+    
+    manifesto = caminho_manifesto(caminho_modelo)
+    with open(manifesto, 'w', encoding='utf-8') as f:
+        json.dump(resultado['manifesto'], f, indent=2, ensure_ascii=False)
+    
+    return caminho_modelo, manifesto
+
+
+def carregar_manifesto(caminho_modelo):
+    """Manifesto de entradas do artefato, ou None se o modelo não for enxuto"""
+    manifesto = caminho_manifesto(caminho_modelo)
+    if not manifesto.exists():
+        return None
+    
+    with open(manifesto, encoding='utf-8') as f:
+        return json.load(f)
@@ -6,35 +6,140 @@ Combina regras clínicas com aprendizado dos dados históricos
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
-from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
-import streamlit as st
+
+from vetlib.case_index import IndiceCasos
+from vetlib.lazy import ModuloPreguicoso
+
+# Streamlit só é importado quando uma mensagem é mostrada na interface
+st = ModuloPreguicoso('streamlit')
+
+# Casos adicionados (em fração do histórico indexado) que disparam a reconstrução dos índices
+FRACAO_RECONSTRUCAO = 0.25
 
 class SistemaDiagnosticoHibrido:
     def __init__(self):
         self.df_historico = None
-        self.modelo_similaridade = None
-        self.scaler = StandardScaler()
+        self.df_novos = None  # casos adicionados depois da última construção dos índices
         self.feature_names = None
+        self.indices_especie = {}  # espécie (None = todas) -> medianas, scaler, índice e cauda congelados
+        self.classes_diagnostico = None
+        self._posicao_feature = {}
         
     def carregar_dados_historicos(self, df: pd.DataFrame):
-        """Carrega dados históricos para aprendizado"""
+        """
+        Carrega dados históricos e monta um índice de vizinhos por espécie
+        
+        Cada espécie, e o conjunto todo (usado quando a espécie não é informada
+        ou não tem casos), ganha medianas, scaler e índice de casos próprios,
+        ajustados uma única vez aqui. As consultas só transformam o caso e
+        buscam no índice da espécie.
+        """
         self.df_historico = df.copy()
+        self.df_novos = None
         
         # Preparar features para similaridade
         feature_cols = [col for col in df.columns if col not in ['id', 'especie', 'raca', 'sexo', 'diagnostico', 'idade_anos']]
         self.feature_names = feature_cols
+        self._posicao_feature = {col: i for i, col in enumerate(feature_cols)}
         
-        # Preparar dados para treinamento
-        X = df[feature_cols].fillna(df[feature_cols].median())
+        X = df[feature_cols].to_numpy(dtype=np.float64)
+        diagnosticos = df['diagnostico'].to_numpy() if 'diagnostico' in df.columns else np.full(len(df), None)
+        codigos, classes = pd.factorize(diagnosticos, use_na_sentinel=False)
+        self.classes_diagnostico = pd.Index(classes)
         
-        # Treinar modelo de similaridade
-        X_scaled = self.scaler.fit_transform(X)
-        self.modelo_similaridade = NearestNeighbors(n_neighbors=10, metric='cosine')
-        self.modelo_similaridade.fit(X_scaled)
+        self.indices_especie = {None: self._construir_indice(X, codigos, np.arange(len(df)))}
+        if 'especie' in df.columns:
+            for especie, posicoes in df.groupby('especie').indices.items():
+                self.indices_especie[especie] = self._construir_indice(X[posicoes], codigos[posicoes], posicoes)
         
         st.success(f"✅ Dados históricos carregados: {len(df)} casos, {len(feature_cols)} features")
     
+    @staticmethod
+    def _construir_indice(X, codigos, posicoes):
+        """
+        Medianas, scaler e índice de casos de um grupo
+        
+        Os rótulos do índice são os códigos em classes_diagnostico, e os ids são
+        as linhas do histórico. Casos adicionados depois vão para a cauda.
+        """
+        with np.errstate(all='ignore'):
+            medianas = np.nan_to_num(np.nanmedian(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+        X = np.where(np.isnan(X), medianas, X)
+        
+        scaler = StandardScaler().fit(X)
+        return {
+            'medianas': medianas,
+            'scaler': scaler,
+            'indice': IndiceCasos(scaler.transform(X), codigos, ids=posicoes),
+            'cauda': None
+        }
+    
+    def adicionar_casos(self, df_novos: pd.DataFrame, fracao_reconstrucao: float = FRACAO_RECONSTRUCAO):
+        """
+        Torna novos casos confirmados pesquisáveis sem reconstruir os índices
+        
+        Os casos são preenchidos e padronizados com as medianas e o scaler
+        congelados de cada grupo e entram numa cauda buscada por força bruta,
+        no índice geral e no da sua espécie (espécies ainda sem índice só no
+        geral). O custo é proporcional aos casos novos. Quando a cauda passa de
+        fracao_reconstrucao do histórico indexado, os índices são reconstruídos
+        com todos os casos.
+        
+        Args:
+            df_novos: Casos com as mesmas colunas do histórico (inclusive 'diagnostico')
+            fracao_reconstrucao: Fração do histórico que dispara a reconstrução (None = nunca)
+        """
+        if self.df_historico is None:
+            self.carregar_dados_historicos(df_novos)
+            return
+        
+        inicio = len(self.df_historico) + (0 if self.df_novos is None else len(self.df_novos))
+        self.df_novos = df_novos.copy() if self.df_novos is None else pd.concat([self.df_novos, df_novos])
+        
+        diagnosticos = df_novos['diagnostico'].to_numpy() if 'diagnostico' in df_novos.columns else np.full(len(df_novos), None)
+        ineditos = pd.Index(pd.unique(diagnosticos)).difference(self.classes_diagnostico, sort=False)
+        self.classes_diagnostico = self.classes_diagnostico.append(ineditos)
+        codigos = self.classes_diagnostico.get_indexer(diagnosticos)
+        
+        X = df_novos.reindex(columns=self.feature_names).to_numpy(dtype=np.float64)
+        linhas = np.arange(inicio, inicio + len(df_novos))
+        especies = df_novos['especie'].to_numpy() if 'especie' in df_novos.columns else np.full(len(X), None)
+        
+        for especie, grupo in self.indices_especie.items():
+            mascara = np.ones(len(X), dtype=bool) if especie is None else especies == especie
+            if mascara.any():
+                self._adicionar_na_cauda(grupo, X[mascara], codigos[mascara], linhas[mascara])
+        
+        if fracao_reconstrucao is not None and len(self.df_novos) > fracao_reconstrucao * len(self.df_historico):
+            self.reconstruir_indices()
+    
+    @staticmethod
+    def _adicionar_na_cauda(grupo, X, codigos, linhas):
+        """Acrescenta casos à cauda do grupo, com as medianas e o scaler congelados"""
+        scaler = grupo['scaler']
+        Z = (np.where(np.isnan(X), grupo['medianas'], X) - scaler.mean_) / scaler.scale_
+        
+        # A cauda já está normalizada; normalizá-la de novo não a altera
+        cauda = grupo['cauda']
+        if cauda is not None:
+            Z = np.concatenate([cauda.matriz, Z])
+            codigos = np.concatenate([cauda.rotulos, codigos])
+            linhas = np.concatenate([cauda.ids, linhas])
+        
+        grupo['cauda'] = IndiceCasos(Z, codigos, ids=linhas, aproximado=False)
+    
+    def reconstruir_indices(self):
+        """Incorpora os casos adicionados ao histórico e reajusta medianas, scalers e índices"""
+        if self.df_novos is not None:
+            self.carregar_dados_historicos(pd.concat([self.df_historico, self.df_novos]))
+    
+    def _vetor_caso(self, sintomas: Dict, exames: Dict) -> np.ndarray:
+        """Caso atual na ordem de feature_names (features não informadas = 0)"""
+        valores = {**exames, **{sintoma: int(presente) for sintoma, presente in sintomas.items()}}
+        caso = np.array([valores.get(col, 0) for col in self.feature_names], dtype=np.float64)
+        return np.nan_to_num(caso)
+    
     def detectar_valores_criticos(self, exames: Dict, especie: str) -> Dict:
         """Detecta valores críticos baseados em faixas de referência"""
         
@@ -91,67 +196,132 @@ class SistemaDiagnosticoHibrido:
         return alertas
     
     def encontrar_casos_similares(self, sintomas: Dict, exames: Dict, especie: str, n_casos: int = 20) -> pd.DataFrame:
-        """Encontra casos similares nos dados históricos"""
+        """
+        Encontra casos similares nos dados históricos da mesma espécie
+        
+        Usa o scaler e o índice já ajustados da espécie (ou de todas, se a
+        espécie não for informada ou não tiver casos): nada é reajustado nem
+        copiado durante a consulta.
+        """
         
-        if self.df_historico is None or self.modelo_similaridade is None:
+        if self.df_historico is None or not self.indices_especie:
             return pd.DataFrame()
         
-        # Preparar dados do caso atual
-        caso_atual = {}
+        grupo = self.indices_especie.get(especie) or self.indices_especie[None]
+        linhas, similaridades, _ = self._buscar_no_grupo(grupo, self._vetor_caso(sintomas, exames)[np.newaxis], n_casos)
         
-        # Adicionar exames
-        for exame, valor in exames.items():
-            if exame in self.feature_names:
-                caso_atual[exame] = valor
-        
-        # Adicionar sintomas
-        for sintoma, presente in sintomas.items():
-            if sintoma in self.feature_names:
-                caso_atual[sintoma] = int(presente)
-        
-        # Adicionar dados demográficos padrão
-        for col in self.feature_names:
-            if col not in caso_atual:
-                if col == 'idade_anos':
-                    caso_atual[col] = 5.0  # Idade padrão
-                elif col in ['especie', 'sexo']:
-                    continue  # Pular colunas categóricas não numéricas
-                else:
-                    caso_atual[col] = 0  # Valor padrão
+        casos_similares = self._linhas_historico(linhas[0])
+        return casos_similares.assign(distancia=1 - similaridades[0], similaridade=similaridades[0])
+    
+    def _linhas_historico(self, linhas):
+        """Linhas do histórico na ordem pedida; posições além do histórico indexado vêm de df_novos"""
+        n_historico = len(self.df_historico)
+        novas = linhas >= n_historico
+        if not novas.any():
+            return self.df_historico.iloc[linhas]
         
-        # Criar DataFrame com o caso atual
-        df_caso = pd.DataFrame([caso_atual])
+        partes = pd.concat([self.df_historico.iloc[linhas[~novas]], self.df_novos.iloc[linhas[novas] - n_historico]])
+        return partes.iloc[np.argsort(np.concatenate([np.flatnonzero(~novas), np.flatnonzero(novas)]))]
+    
+    @staticmethod
+    def _buscar_no_grupo(grupo, X, n_casos):
+        """
+        Padroniza os casos com o scaler do grupo e busca no índice e na cauda
         
-        # Garantir que todas as colunas existem
-        for col in self.feature_names:
-            if col not in df_caso.columns:
-                df_caso[col] = 0
+        Returns:
+            (linhas do histórico, similaridades, códigos dos diagnósticos), com forma (casos, n_casos)
+        """
+        scaler = grupo['scaler']
+        Z = (X - scaler.mean_) / scaler.scale_
         
-        # Filtrar por espécie se especificado
-        df_filtrado = self.df_historico.copy()
-        if especie and 'especie' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['especie'] == especie]
+        indice = grupo['indice']
+        posicoes, similaridades = indice.buscar(Z, n_casos)
+        linhas, codigos = indice.ids[posicoes], indice.rotulos[posicoes]
         
-        # Preparar dados para similaridade
-        X_caso = df_caso[self.feature_names].fillna(0)
-        X_historico = df_filtrado[self.feature_names].fillna(df_filtrado[self.feature_names].median())
+        # Junta os k melhores do índice com os k melhores da cauda
+        cauda = grupo['cauda']
+        if cauda is not None:
+            posicoes_cauda, similaridades_cauda = cauda.buscar(Z, n_casos)
+            similaridades = np.concatenate([similaridades, similaridades_cauda], axis=1)
+            linhas = np.concatenate([linhas, cauda.ids[posicoes_cauda]], axis=1)
+            codigos = np.concatenate([codigos, cauda.rotulos[posicoes_cauda]], axis=1)
+            
+            ordem = np.argsort(-similaridades, axis=1, kind='stable')[:, :n_casos]
+            similaridades = np.take_along_axis(similaridades, ordem, axis=1)
+            linhas = np.take_along_axis(linhas, ordem, axis=1)
+            codigos = np.take_along_axis(codigos, ordem, axis=1)
+        
+        return linhas, similaridades.astype(np.float64), codigos
+    
+    def gerar_hipoteses_lote(self, df_casos: pd.DataFrame, n_casos: int = 20, n_hipoteses: int = 3) -> pd.DataFrame:
+        """
+        Hipóteses por casos similares para um lote inteiro de casos
         
-        # Escalar dados
-        X_caso_scaled = self.scaler.transform(X_caso)
-        X_historico_scaled = self.scaler.fit_transform(X_historico)
+        Mesmo critério de gerar_hipoteses_hibridas (score = 0,6 × frequência do
+        diagnóstico entre os vizinhos + 0,4 × similaridade média deles), mas com
+        uma única busca por espécie para todas as linhas e contagens por
+        diagnóstico feitas com bincount ponderado.
         
-        # Encontrar casos similares
-        try:
-            distances, indices = self.modelo_similaridade.kneighbors(X_caso_scaled)
+        Args:
+            df_casos: Casos com as colunas de feature_names (faltantes = 0) e 'especie'
+            n_casos: Vizinhos por caso
+            n_hipoteses: Hipóteses por caso, em ordem de score
+        
+        Returns:
+            DataFrame com o índice de df_casos e, para i de 1 a n_hipoteses,
+            hipotese_i, score_hipotese_i, casos_hipotese_i e prioridade_hipotese_i
+        """
+        if self.df_historico is None or not self.indices_especie:
+            return pd.DataFrame(index=df_casos.index)
+        
+        X = df_casos.reindex(columns=self.feature_names, fill_value=0).to_numpy(dtype=np.float64)
+        X = np.nan_to_num(X)
+        n_classes = len(self.classes_diagnostico)
+        
+        contagens = np.zeros((len(X), n_classes))
+        somas_similaridade = np.zeros((len(X), n_classes))
+        n_vizinhos = np.ones(len(X))
+        
+        # Espécie não informada ou sem casos no histórico -> índice geral
+        especies = df_casos['especie'].to_numpy() if 'especie' in df_casos.columns else np.full(len(X), None)
+        conhecidas = [especie for especie in self.indices_especie if especie is not None]
+        for especie, grupo in self.indices_especie.items():
+            mascara = ~np.isin(especies, conhecidas) if especie is None else especies == especie
+            if not mascara.any():
+                continue
             
-            # Retornar casos similares com diagnóstico
-            casos_similares = df_filtrado.iloc[indices[0]].copy()
-            casos_similares['distancia'] = distances[0]
-            casos_similares['similaridade'] = 1 - distances[0]  # Converter distância em similaridade
+            _, similaridades, codigos = self._buscar_no_grupo(grupo, X[mascara], n_casos)
             
-            return casos_similares.head(n_casos)
-        except:
-            return pd.DataFrame()
+            # Uma célula (caso, diagnóstico) por vizinho: contagem e soma das similaridades
+            celulas = (np.arange(len(codigos))[:, np.newaxis] * n_classes + codigos).ravel()
+            tamanho = len(codigos) * n_classes
+            contagens[mascara] = np.bincount(celulas, minlength=tamanho).reshape(-1, n_classes)
+            somas_similaridade[mascara] = np.bincount(
+                celulas, weights=similaridades.ravel(), minlength=tamanho
+            ).reshape(-1, n_classes)
+            n_vizinhos[mascara] = codigos.shape[1]
+        
+        frequencias = contagens / n_vizinhos[:, np.newaxis]
+        similaridades_medias = somas_similaridade / np.maximum(contagens, 1)
+        scores = np.where(contagens > 0, frequencias * 0.6 + similaridades_medias * 0.4, -np.inf)
+        
+        ordem = np.argsort(-scores, axis=1, kind='stable')[:, :n_hipoteses]
+        classes = np.asarray(self.classes_diagnostico, dtype=object)
+        casos = np.arange(len(X))
+        
+        resultado = {}
+        for i in range(ordem.shape[1]):
+            codigos = ordem[:, i]
+            score = scores[casos, codigos]
+            encontrada = np.isfinite(score)
+            resultado[f'hipotese_{i + 1}'] = np.where(encontrada, classes[codigos], None)
+            resultado[f'score_hipotese_{i + 1}'] = np.where(encontrada, score, np.nan)
+            resultado[f'casos_hipotese_{i + 1}'] = contagens[casos, codigos].astype(int)
+            resultado[f'prioridade_hipotese_{i + 1}'] = np.select(
+                [~encontrada, score > 0.7, score > 0.4], [None, 'ALTA', 'MÉDIA'], 'BAIXA'
+            )
+        
+        return pd.DataFrame(resultado, index=df_casos.index)
     
     def gerar_hipoteses_hibridas(self, sintomas: Dict, exames: Dict, especie: str) -> List[Dict]:
         """Gera hipóteses combinando regras clínicas e dados históricos"""
@@ -0,0 +1,305 @@
+"""
+Módulo de retreinamento incremental (warm start)
+
+Atualiza um modelo já treinado com novos casos sem repetir o treino completo:
+florestas ganham árvores ajustadas nos novos dados, modelos de boosting
+continuam o boosting e o pré-processamento apenas acumula estatísticas. O
+custo de cada atualização é proporcional aos novos casos (mais um reservatório
+de tamanho fixo por classe, que garante que todas as classes estejam presentes
+em cada ajuste).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from vetlib.preprocessing import calcular_deriva_preprocessamento
+
+
+# Limites padrão para agendar um retreino completo
+LIMITES_RETREINO = {
+    'proporcao_incremental': 0.5,   # casos incrementais / casos do treino completo
+    'deslocamento_media': 0.5,      # desvios-padrão de deriva em alguma feature
+    'razao_variancia': 2.0,         # razão entre variâncias acumulada e congelada
+    'queda_f1': 0.05                # F1 prequencial abaixo do F1 de CV do treino completo
+}
+
+
+def _codificar_target(y, historico):
+    """Codifica o target com o LabelEncoder do treino (se houver)"""
+    label_encoder = historico.get('label_encoder')
+    y = np.asarray(y)
+    
+    if label_encoder is None:
+        return y
+    
+    desconhecidas = set(np.unique(y)) - set(label_encoder.classes_)
+    if desconhecidas:
+        raise ValueError(
+            f"Classes novas exigem retreino completo: {sorted(desconhecidas)}"
+        )
+    
+    return label_encoder.transform(y)
+
+
+def _atualizar_reservatorio(estado, X, y, rng):
+    """Amostragem de reservatório por classe (Algoritmo R) com capacidade fixa"""
+    capacidade = estado['capacidade_por_classe']
+    
+    for classe in np.unique(y):
+        X_classe = X[y == classe]
+        reservatorio = estado['reservatorio'].setdefault(classe, {'X': X_classe[:0], 'vistos': 0})
+        
+        for linha in X_classe:
+            reservatorio['vistos'] += 1
+            if len(reservatorio['X']) < capacidade:
+                reservatorio['X'] = np.vstack([reservatorio['X'], linha])
+            else:
+                j = rng.randint(0, reservatorio['vistos'])
+                if j < capacidade:
+                    reservatorio['X'][j] = linha
+
+
+def _amostra_reservatorio(estado):
+    """Concatena o reservatório de todas as classes"""
+    blocos_X = []
+    blocos_y = []
+    
+    for classe, reservatorio in estado['reservatorio'].items():
+        blocos_X.append(reservatorio['X'])
+        blocos_y.append(np.full(len(reservatorio['X']), classe))
+    
+    return np.vstack(blocos_X), np.concatenate(blocos_y)
+
+
+def iniciar_estado_incremental(X_train, y_train, historico, capacidade_por_classe=50, random_state=42):
+    """
+    Prepara o histórico de um treino completo para receber atualizações incrementais
+    
+    Args:
+        X_train: Features de treino já pré-processadas
+        y_train: Target de treino (rótulos originais)
+        historico: Histórico retornado por treinar_modelo
+        capacidade_por_classe: Casos guardados por classe no reservatório
+        random_state: Seed
+    
+    Returns:
+        historico com a chave 'incremental'
+    """
+    rng = np.random.RandomState(random_state)
+    
+    estado = {
+        'capacidade_por_classe': capacidade_por_classe,
+        'reservatorio': {},
+        'n_treino_completo': len(X_train),
+        'n_incremental': 0,
+        'n_atualizacoes': 0,
+        'f1_referencia': historico.get('cv_f1_mean'),
+        'f1_prequencial': [],
+        'retreino_agendado': None,
+        'random_state': random_state,
+        'data_treino_completo': datetime.now().isoformat()
+    }
+    
+    _atualizar_reservatorio(
+        estado, np.asarray(X_train, dtype=np.float64), _codificar_target(y_train, historico), rng
+    )
+    
+    historico['incremental'] = estado
+    
+    return historico
+
+
+def _n_estimadores_novos(n_atual, n_novos, n_total, minimo=10):
+    """Árvores/estágios a adicionar, proporcionais à fração de dados novos"""
+    proporcional = int(np.ceil(n_atual * n_novos / max(n_total, 1)))
+    return int(np.clip(proporcional, min(minimo, n_atual), n_atual))
+
+
+def _continuar_ajuste(modelo, X_fit, y_fit, n_novos, n_total):
+    """Continua o ajuste do modelo conforme o tipo de estimador"""
+    nome_classe = type(modelo).__name__
+    
+    if nome_classe in ('RandomForestClassifier', 'ExtraTreesClassifier',
+                       'GradientBoostingClassifier'):
+        n_atual = len(modelo.estimators_)
+        n_adicionar = _n_estimadores_novos(n_atual, n_novos, n_total)
+        modelo.set_params(warm_start=True, n_estimators=n_atual + n_adicionar)
+        modelo.fit(X_fit, y_fit)
+        modelo.set_params(warm_start=False)
+        return modelo, n_adicionar
+    
+    if nome_classe == 'HistGradientBoostingClassifier':
+        n_atual = modelo.n_iter_
+        n_adicionar = _n_estimadores_novos(n_atual, n_novos, n_total)
+        modelo.set_params(warm_start=True, max_iter=n_atual + n_adicionar)
+        modelo.fit(X_fit, y_fit)
+        modelo.set_params(warm_start=False)
+        return modelo, n_adicionar
+    
+    if nome_classe == 'LGBMClassifier':
+        n_adicionar = _n_estimadores_novos(modelo.booster_.current_iteration(), n_novos, n_total)
+        booster_anterior = modelo.booster_
+        modelo.set_params(n_estimators=n_adicionar)
+        modelo.fit(X_fit, y_fit, init_model=booster_anterior)
+        return modelo, n_adicionar
+    
+    if nome_classe == 'XGBClassifier':
+        n_adicionar = _n_estimadores_novos(modelo.get_booster().num_boosted_rounds(), n_novos, n_total)
+        booster_anterior = modelo.get_booster()
+        modelo.set_params(n_estimators=n_adicionar)
+        modelo.fit(X_fit, y_fit, xgb_model=booster_anterior)
+        return modelo, n_adicionar
+    
+    if nome_classe == 'ModeloCascata':
+        # O estágio rápido fica congelado até o próximo treino completo
+        _, n_adicionar = _continuar_ajuste(modelo.pesado, X_fit, y_fit, n_novos, n_total)
+        return modelo, n_adicionar
+    
+    if nome_classe == 'ModeloPorEspecie':
+        # O modelo global recebe todos os casos; cada rota, só os da sua espécie,
+        # e apenas quando eles cobrem exatamente as classes que a rota conhece
+        rotas = modelo.rotear(X_fit)
+        _, n_adicionar = _continuar_ajuste(modelo.modelo_global_, X_fit, y_fit, n_novos, n_total)
+        
+        for valor, modelo_rota in modelo.modelos_especie_.items():
+            mascara = rotas == modelo.nomes_especie_[valor]
+            n_novos_rota = int(mascara[:n_novos].sum())
+            if n_novos_rota and np.array_equal(np.unique(y_fit[mascara]), modelo_rota.classes_):
+                _continuar_ajuste(modelo_rota, X_fit[mascara], y_fit[mascara],
+                                  n_novos_rota, modelo.n_treino_rotas_[valor])
+        return modelo, n_adicionar
+    
+    if 'warm_start' in modelo.get_params():
+        # Modelos lineares: parte dos coeficientes atuais
+        modelo.set_params(warm_start=True)
+        modelo.fit(X_fit, y_fit)
+        modelo.set_params(warm_start=False)
+        return modelo, 0
+    
+    raise ValueError(f"Modelo {nome_classe} não suporta atualização incremental")
+
+
+def atualizar_modelo_incremental(modelo, historico, X_novo, y_novo):
+    """
+    Atualiza o modelo com novos casos confirmados (warm start)
+    
+    Antes de ajustar, o modelo é avaliado nos novos casos (avaliação
+    prequencial), o que permite acompanhar a deriva em relação ao treino
+    completo sem precisar de um conjunto de teste separado.
+    
+    Args:
+        modelo: Modelo treinado (é modificado no lugar)
+        historico: Histórico com estado incremental (ver iniciar_estado_incremental)
+        X_novo: Novos casos já pré-processados com a transformação congelada
+        y_novo: Diagnósticos dos novos casos (rótulos originais)
+    
+    Returns:
+        modelo atualizado, dict com resumo da atualização
+    """
+    if 'incremental' not in historico:
+        raise ValueError("Histórico sem estado incremental; use iniciar_estado_incremental")
+    
+    estado = historico['incremental']
+    rng = np.random.RandomState(estado['random_state'] + estado['n_atualizacoes'] + 1)
+    
+    X_novo = np.asarray(X_novo, dtype=np.float64)
+    y_novo_cod = _codificar_target(y_novo, historico)
+    
+    # Manter os nomes de features com que o modelo foi treinado
+    nomes_features = getattr(modelo, 'feature_names_in_', None)
+    
+    def _como_entrada(X):
+        return X if nomes_features is None else pd.DataFrame(X, columns=nomes_features)
+    
+    # Avaliação prequencial: testar nos novos casos antes de treinar com eles
+    y_pred_antes = modelo.predict(_como_entrada(X_novo))
+    f1_antes = f1_score(y_novo_cod, y_pred_antes, average='macro', zero_division=0)
+    estado['f1_prequencial'].append(float(f1_antes))
+    
+    # Novos casos + reservatório (todas as classes presentes em cada ajuste)
+    X_reserva, y_reserva = _amostra_reservatorio(estado)
+    X_fit = _como_entrada(np.vstack([X_novo, X_reserva]))
+    y_fit = np.concatenate([y_novo_cod, y_reserva]).astype(y_reserva.dtype)
+    
+    n_total = estado['n_treino_completo'] + estado['n_incremental']
+    modelo, n_adicionados = _continuar_ajuste(modelo, X_fit, y_fit, len(X_novo), n_total)
+    
+    _atualizar_reservatorio(estado, X_novo, y_novo_cod, rng)
+    estado['n_incremental'] += len(X_novo)
+    estado['n_atualizacoes'] += 1
+    
+    resumo = {
+        'n_novos': len(X_novo),
+        'estimadores_adicionados': n_adicionados,
+        'f1_prequencial': float(f1_antes),
+        'data': datetime.now().isoformat()
+    }
+    
+    return modelo, resumo
+
+
+def verificar_necessidade_retreino(historico, preprocessadores=None, limites=None):
+    """
+    Mede o quanto o modelo incremental se afastou do último treino completo
+    
+    Critérios: fração de casos vistos só incrementalmente, deriva das
+    estatísticas de pré-processamento e queda do F1 prequencial em relação
+    ao F1 de validação cruzada do treino completo. Quando algum limite é
+    ultrapassado, o retreino completo fica agendado no histórico.
+    
+    Args:
+        historico: Histórico com estado incremental
+        preprocessadores: Dict de preprocessadores (para medir a deriva)
+        limites: Dict de limites (None = LIMITES_RETREINO)
+    
+    Returns:
+        dict com 'retreino_necessario', 'motivos' e 'metricas'
+    """
+    limites = {**LIMITES_RETREINO, **(limites or {})}
+    estado = historico['incremental']
+    
+    metricas = {
+        'proporcao_incremental': estado['n_incremental'] / max(estado['n_treino_completo'], 1),
+        'n_atualizacoes': estado['n_atualizacoes']
+    }
+    motivos = []
+    
+    if metricas['proporcao_incremental'] > limites['proporcao_incremental']:
+        motivos.append(
+            f"{metricas['proporcao_incremental']:.0%} dos casos foram vistos apenas incrementalmente"
+        )
+    
+    if preprocessadores is not None:
+        deriva = calcular_deriva_preprocessamento(preprocessadores)
+        metricas.update(deriva)
+        
+        if deriva['deslocamento_media_max'] > limites['deslocamento_media']:
+            motivos.append(
+                f"Média de '{deriva['feature_maior_deriva']}' deslocou "
+                f"{deriva['deslocamento_media_max']:.2f} desvios-padrão"
+            )
+        if deriva['razao_variancia_max'] > limites['razao_variancia']:
+            motivos.append(f"Variância mudou {deriva['razao_variancia_max']:.1f}x em alguma feature")
+    
+    # Média das últimas atualizações para não reagir a um lote isolado
+    recentes = estado['f1_prequencial'][-3:]
+    if recentes and estado['f1_referencia'] is not None:
+        metricas['f1_prequencial_recente'] = float(np.mean(recentes))
+        metricas['queda_f1'] = float(estado['f1_referencia'] - metricas['f1_prequencial_recente'])
+        
+        if metricas['queda_f1'] > limites['queda_f1']:
+            motivos.append(f"F1 prequencial caiu {metricas['queda_f1']:.3f} em relação ao treino completo")
+    
+    retreino_necessario = len(motivos) > 0
+    
+    if retreino_necessario and estado['retreino_agendado'] is None:
+        estado['retreino_agendado'] = {'data': datetime.now().isoformat(), 'motivos': motivos}
+    
+    return {
+        'retreino_necessario': retreino_necessario,
+        'motivos': motivos,
+        'metricas': metricas
+    }
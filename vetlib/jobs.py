@@ -0,0 +1,404 @@
+"""
+Fila local de jobs de treinamento
+
+Cada job roda num processo próprio (python -m vetlib.jobs), fora da thread do
+script Streamlit: a sessão continua responsiva e o job sobrevive à navegação
+entre páginas. O estado fica em disco (models/jobs/<id>/estado.json) e a
+página apenas o consulta. No máximo max_concorrentes jobs executam ao mesmo
+tempo na máquina; os demais aguardam na fila por uma vaga (lock de arquivo,
+liberado pelo sistema mesmo se o processo morrer). Cada job enxerga só a sua
+parte dos núcleos (cpu_count // max_concorrentes): n_jobs=-1 dentro do job
+usa essa parte, e jobs simultâneos não disputam a máquina inteira.
+"""
+
+import importlib
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+
+# Lock de arquivo para as vagas: fcntl (Linux/macOS) ou msvcrt (Windows)
+try:
+    import fcntl
+    FCNTL_DISPONIVEL = True
+except ImportError:
+    import msvcrt
+    FCNTL_DISPONIVEL = False
+
+
+DIRETORIO_JOBS = 'models/jobs'
+
+# Jobs executando ao mesmo tempo na máquina
+MAX_JOBS_CONCORRENTES = max(1, (os.cpu_count() or 2) // 2)
+
+# Variáveis que limitam os núcleos vistos pelo joblib/loky e pelas bibliotecas com OpenMP/BLAS
+VARIAVEIS_NUCLEOS = ('LOKY_MAX_CPU_COUNT', 'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+# Intervalo entre tentativas de obter uma vaga
+INTERVALO_FILA_S = 1.0
+
+STATUS_ATIVOS = ('na_fila', 'executando')
+STATUS_FINAIS = ('concluido', 'erro', 'cancelado')
+
+# Processos lançados por este servidor (evita processos zumbis)
+_PROCESSOS = {}
+
+
+class JobCancelado(Exception):
+    """Levantada dentro do job quando o cancelamento foi solicitado"""
+
+
+def nucleos_por_job(max_concorrentes=MAX_JOBS_CONCORRENTES):
+    """Núcleos reservados a cada job quando max_concorrentes executam juntos"""
+    return max(1, (os.cpu_count() or 1) // max_concorrentes)
+
+
+def _gravar_json(caminho, dados):
+    """Escrita atômica: leitores nunca veem um arquivo pela metade"""
+    descritor, temporario = tempfile.mkstemp(dir=Path(caminho).parent, suffix='.tmp')
+    with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, default=str)
+    os.replace(temporario, caminho)
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _processo_ativo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _travar(arquivo):
+    """Lock exclusivo sem espera; OSError se já estiver travado"""
+    if FCNTL_DISPONIVEL:
+        fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+@contextmanager
+def _vaga(diretorio, max_concorrentes, ao_aguardar):
+    """
+    Aguarda uma das max_concorrentes vagas da máquina
+    
+    Args:
+        diretorio: Diretório da fila (as vagas são arquivos de lock)
+        max_concorrentes: Número de vagas
+        ao_aguardar: Chamado a cada tentativa sem sucesso (verifica cancelamento)
+    
+    Yields:
+        Índice da vaga obtida
+    """
+    diretorio_vagas = Path(diretorio) / 'vagas'
+    diretorio_vagas.mkdir(parents=True, exist_ok=True)
+    
+    while True:
+        for indice in range(max_concorrentes):
+            arquivo = open(diretorio_vagas / f'vaga_{indice}.lock', 'a+')
+            try:
+                _travar(arquivo)
+            except OSError:
+                arquivo.close()
+                continue
+            
+            try:
+                yield indice
+            finally:
+                arquivo.close()  # libera o lock
+            return
+        
+        ao_aguardar()
+        time.sleep(INTERVALO_FILA_S)
+
+
+def _importar_funcao(caminho):
+    """'modulo.sub:funcao' -> função"""
+    nome_modulo, nome_funcao = caminho.split(':')
+    return getattr(importlib.import_module(nome_modulo), nome_funcao)
+
+
+def _executar_job(diretorio_job, diretorio_fila, max_concorrentes):
+    """
+    Corpo do processo de um job: aguarda vaga, executa a tarefa e grava o resultado
+    
+    Args:
+        diretorio_job: Diretório do job (tarefa.joblib e estado.json)
+        diretorio_fila: Diretório da fila (vagas)
+        max_concorrentes: Número de vagas da máquina
+    """
+    diretorio_job = Path(diretorio_job)
+    arquivo_estado = diretorio_job / 'estado.json'
+    
+    def atualizar(**campos):
+        # Depois do pedido de cancelamento o estado pertence a quem cancelou
+        if (diretorio_job / 'cancelar').exists():
+            raise JobCancelado()
+        estado = _ler_json(arquivo_estado) or {}
+        estado.update(campos)
+        _gravar_json(arquivo_estado, estado)
+    
+    try:
+        with _vaga(diretorio_fila, max_concorrentes, ao_aguardar=atualizar) as vaga:
+            tarefa = joblib.load(diretorio_job / 'tarefa.joblib')
+            inicio = time.time()
+            atualizar(status='executando', iniciado_em=datetime.now().isoformat(), vaga=vaga)
+            
+            def progresso(info):
+                atualizar(progresso={**info, 'tempo_decorrido_s': round(time.time() - inicio, 1)})
+            
+            funcao = _importar_funcao(tarefa['funcao'])
+            resultado = funcao(**tarefa['kwargs'], progresso=progresso)
+            
+            descritor, temporario = tempfile.mkstemp(dir=diretorio_job, suffix='.tmp')
+            os.close(descritor)
+            joblib.dump(resultado, temporario)
+            os.replace(temporario, diretorio_job / 'resultado.joblib')
+            
+            atualizar(
+                status='concluido',
+                finalizado_em=datetime.now().isoformat(),
+                progresso={'etapa': 'concluido', 'percentual': 100,
+                           'tempo_decorrido_s': round(time.time() - inicio, 1)}
+            )
+    
+    except JobCancelado:
+        pass
+    
+    except Exception as e:
+        estado = _ler_json(arquivo_estado) or {}
+        estado.update(
+            status='erro',
+            erro=str(e),
+            traceback=traceback.format_exc(),
+            finalizado_em=datetime.now().isoformat()
+        )
+        _gravar_json(arquivo_estado, estado)
+
+
+class FilaJobs:
+    """
+    Fila de jobs em processos separados, com estado em disco
+    
+    Args:
+        diretorio: Pasta dos jobs
+        max_concorrentes: Jobs executando ao mesmo tempo na máquina
+    """
+    
+    def __init__(self, diretorio=DIRETORIO_JOBS, max_concorrentes=MAX_JOBS_CONCORRENTES):
+        self.diretorio = Path(diretorio)
+        self.max_concorrentes = max_concorrentes
+    
+    def _diretorio_job(self, job_id):
+        return self.diretorio / job_id
+    
+    def submeter(self, funcao, kwargs=None, descricao=''):
+        """
+        Enfileira uma tarefa e lança o processo que a executa
+        
+        A tarefa é uma função importável ('modulo:funcao') que aceita o
+        argumento progresso, um callback que recebe um dict (etapa, candidato,
+        fold, ...) e é registrado no estado do job com o tempo decorrido.
+        
+        Args:
+            funcao: Caminho da função, ex.: 'vetlib.training_jobs:treinar_e_avaliar'
+            kwargs: Argumentos da função (serializados com joblib)
+            descricao: Texto exibido nas listas de jobs
+        
+        Returns:
+            Identificador do job
+        """
+        job_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+        diretorio_job = self._diretorio_job(job_id)
+        diretorio_job.mkdir(parents=True)
+        
+        joblib.dump({'funcao': funcao, 'kwargs': kwargs or {}}, diretorio_job / 'tarefa.joblib')
+        _gravar_json(diretorio_job / 'estado.json', {
+            'id': job_id,
+            'descricao': descricao,
+            'funcao': funcao,
+            'status': 'na_fila',
+            'criado_em': datetime.now().isoformat(),
+            'progresso': {}
+        })
+        
+        # O processo herda o diretório de trabalho; vetlib é importável de qualquer lugar
+        raiz_pacote = str(Path(__file__).resolve().parent.parent)
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [raiz_pacote, os.environ.get('PYTHONPATH')]))}
+        
+        # n_jobs=-1 dentro do job = só os núcleos da sua vaga
+        nucleos = str(nucleos_por_job(self.max_concorrentes))
+        env.update({variavel: nucleos for variavel in VARIAVEIS_NUCLEOS})
+        
+        with open(diretorio_job / 'saida.log', 'wb') as log:
+            processo = subprocess.Popen(
+                [sys.executable, '-m', 'vetlib.jobs', str(diretorio_job),
+                 str(self.diretorio), str(self.max_concorrentes)],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env,
+                start_new_session=True
+            )
+        (diretorio_job / 'pid').write_text(str(processo.pid))
+        _PROCESSOS[job_id] = processo
+        
+        return job_id
+    
+    def _pid(self, job_id):
+        try:
+            return int((self._diretorio_job(job_id) / 'pid').read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def estado(self, job_id):
+        """
+        Estado atual do job
+        
+        Args:
+            job_id: Identificador retornado por submeter
+        
+        Returns:
+            dict com status, progresso, tempo_decorrido_s etc. (None se não existir)
+        """
+        processo = _PROCESSOS.get(job_id)
+        if processo is not None and processo.poll() is not None:
+            del _PROCESSOS[job_id]
+        
+        arquivo_estado = self._diretorio_job(job_id) / 'estado.json'
+        estado = _ler_json(arquivo_estado)
+        if estado is None:
+            return None
+        
+        if estado['status'] in STATUS_ATIVOS:
+            pid = self._pid(job_id)
+            if pid is not None and job_id not in _PROCESSOS and not _processo_ativo(pid):
+                # Estado é relido: o processo pode ter terminado entre as duas leituras
+                estado = _ler_json(arquivo_estado)
+                if estado['status'] in STATUS_ATIVOS:
+                    estado.update(
+                        status='erro',
+                        erro='O processo do job terminou inesperadamente',
+                        finalizado_em=datetime.now().isoformat()
+                    )
+                    _gravar_json(arquivo_estado, estado)
+        
+        inicio = estado.get('iniciado_em') or estado['criado_em']
+        fim = estado.get('finalizado_em')
+        fim = datetime.fromisoformat(fim) if fim else datetime.now()
+        estado['tempo_decorrido_s'] = (fim - datetime.fromisoformat(inicio)).total_seconds()
+        
+        return estado
+    
+    def listar(self, limite=20):
+        """
+        Jobs mais recentes primeiro
+        
+        Args:
+            limite: Número máximo de jobs
+        
+        Returns:
+            Lista de estados
+        """
+        if not self.diretorio.exists():
+            return []
+        
+        ids = sorted(
+            (caminho.name for caminho in self.diretorio.iterdir()
+             if (caminho / 'estado.json').exists()),
+            reverse=True
+        )
+        
+        estados = [self.estado(job_id) for job_id in ids[:limite]]
+        return [estado for estado in estados if estado is not None]
+    
+    def resultado(self, job_id):
+        """
+        Resultado de um job concluído
+        
+        Args:
+            job_id: Identificador do job
+        
+        Returns:
+            Objeto retornado pela tarefa
+        """
+        return joblib.load(self._diretorio_job(job_id) / 'resultado.joblib')
+    
+    def cancelar(self, job_id):
+        """
+        Cancela um job na fila ou em execução (o processo é encerrado)
+        
+        Args:
+            job_id: Identificador do job
+        
+        Returns:
+            True se o job estava ativo
+        """
+        estado = self.estado(job_id)
+        if estado is None or estado['status'] not in STATUS_ATIVOS:
+            return False
+        
+        diretorio_job = self._diretorio_job(job_id)
+        (diretorio_job / 'cancelar').touch()
+        
+        pid = self._pid(job_id)
+        if pid is not None:
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(pid, signal.SIGTERM)  # inclui processos filhos (n_jobs > 1)
+                else:
+                    os.kill(pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+        
+        estado = _ler_json(diretorio_job / 'estado.json')
+        estado.update(status='cancelado', finalizado_em=datetime.now().isoformat())
+        _gravar_json(diretorio_job / 'estado.json', estado)
+        
+        return True
+    
+    def n_executando(self):
+        """Número de jobs ativos (na fila ou executando)"""
+        return sum(estado['status'] in STATUS_ATIVOS for estado in self.listar(limite=None))
+    
+    def limpar_finalizados(self):
+        """
+        Remove os diretórios dos jobs finalizados
+        
+        Returns:
+            Número de jobs removidos
+        """
+        removidos = 0
+        for estado in self.listar(limite=None):
+            if estado['status'] in STATUS_FINAIS:
+                shutil.rmtree(self._diretorio_job(estado['id']), ignore_errors=True)
+                removidos += 1
+        
+        return removidos
+
+
+if __name__ == '__main__':
+    _executar_job(sys.argv[1], sys.argv[2], int(sys.argv[3]))
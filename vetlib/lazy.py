@@ -0,0 +1,49 @@
+"""
+Importação sob demanda de dependências pesadas ou opcionais
+
+streamlit, shap, plotly, lightgbm e xgboost custam de centenas de
+milissegundos a alguns segundos para importar. Os módulos da vetlib os
+referenciam por um ModuloPreguicoso: o nome continua no nível do módulo
+(st.error, shap.TreeExplainer, go.Figure...), mas a importação só acontece no
+primeiro acesso a um atributo. Scripts, jobs e testes que não mostram nada na
+interface nunca importam o streamlit.
+
+A disponibilidade de um backend opcional é verificada por
+importlib.util.find_spec, sem importá-lo.
+"""
+
+import importlib
+import importlib.util
+
+
+def modulo_disponivel(nome):
+    """Indica se o módulo está instalado, sem importá-lo"""
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class ModuloPreguicoso:
+    """
+    Módulo importado no primeiro acesso a um atributo
+    
+    Args:
+        nome: Nome do módulo (ex.: 'shap', 'plotly.graph_objects')
+    """
+    
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+    
+    def _carregar(self):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+    
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+    
+    def __repr__(self):
+        estado = 'importado' if self._modulo is not None else 'não importado'
+        return f"<ModuloPreguicoso '{self._nome}' ({estado})>"
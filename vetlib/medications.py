@@ -6,7 +6,6 @@ Base de dados de medicamentos, doses e protocolos clínicos
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
-import streamlit as st
 
 # ============================================================================
 # BASE DE DADOS DE MEDICAMENTOS VETERINÁRIOS
@@ -5,29 +5,32 @@ Módulo de modelagem e treinamento de Machine Learning
 import pandas as pd
 import numpy as np
 import pickle
+import os
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold
+import joblib
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold, ParameterGrid
+from sklearn.metrics import get_scorer
+from sklearn.utils.parallel import Parallel as ParallelSklearn
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    classification_report, confusion_matrix, roc_auc_score, roc_curve
-)
-from sklearn.preprocessing import label_binarize, LabelEncoder
-import streamlit as st
-
-# Imports opcionais para modelos avançados
-try:
-    import lightgbm as lgb
-    LIGHTGBM_DISPONIVEL = True
-except ImportError:
-    LIGHTGBM_DISPONIVEL = False
-
-try:
-    import xgboost as xgb
-    XGBOOST_DISPONIVEL = True
-except ImportError:
-    XGBOOST_DISPONIVEL = False
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from vetlib.evaluation import pontuar_modelo, metricas_globais, curvas_roc, metricas_por_grupo
+from vetlib.lazy import ModuloPreguicoso, modulo_disponivel
+
+# Streamlit só é importado quando uma mensagem é mostrada na interface
+st = ModuloPreguicoso('streamlit')
+
+# Modelos avançados opcionais: verificados sem importar, importados no primeiro uso
+lgb = ModuloPreguicoso('lightgbm')
+LIGHTGBM_DISPONIVEL = modulo_disponivel('lightgbm')
+
+xgb = ModuloPreguicoso('xgboost')
+XGBOOST_DISPONIVEL = modulo_disponivel('xgboost')
 
 
 def obter_modelos_disponiveis():
@@ -40,6 +43,7 @@ def obter_modelos_disponiveis():
     modelos = {
         'Logistic Regression': LogisticRegression,
         'Random Forest': RandomForestClassifier,
+        'Hist Gradient Boosting': HistGradientBoostingClassifier,
     }
     
     if LIGHTGBM_DISPONIVEL:
@@ -76,6 +80,14 @@ def obter_parametros_grid(nome_modelo):
             'class_weight': ['balanced', 'balanced_subsample']
         }
     
+    elif nome_modelo == 'Hist Gradient Boosting':
+        return {
+            'learning_rate': [0.05, 0.1],
+            'max_leaf_nodes': [15, 31, 63],
+            'min_samples_leaf': [10, 20],
+            'l2_regularization': [0.0, 1.0]
+        }
+    
     elif nome_modelo == 'LightGBM' and LIGHTGBM_DISPONIVEL:
         return {
             'n_estimators': [100, 200],
@@ -96,8 +108,156 @@ def obter_parametros_grid(nome_modelo):
     return {}
 
 
+def criar_modelo_base(nome_modelo, random_state=42, n_jobs=None):
+    """
+    Cria o estimador (não treinado) com a configuração padrão do app
+    
+    Args:
+        nome_modelo: Nome do modelo (ver obter_modelos_disponiveis)
+        random_state: Seed
+        n_jobs: Núcleos do modelo (None = padrão do estimador)
+    
+    Returns:
+        Estimador configurado
+    """
+    modelos_disponiveis = obter_modelos_disponiveis()
+    
+    if nome_modelo not in modelos_disponiveis:
+        raise ValueError(f"Modelo '{nome_modelo}' não disponível")
+    
+    ModeloClasse = modelos_disponiveis[nome_modelo]
+    
+    if nome_modelo == 'Logistic Regression':
+        modelo_base = ModeloClasse(random_state=random_state, max_iter=1000, class_weight='balanced')
+    elif nome_modelo in ['Random Forest', 'LightGBM']:
+        modelo_base = ModeloClasse(random_state=random_state, class_weight='balanced')
+    elif nome_modelo == 'Hist Gradient Boosting':
+        # Usa todos os núcleos (OpenMP); a parada antecipada define o número de iterações
+        modelo_base = ModeloClasse(
+            random_state=random_state,
+            class_weight='balanced',
+            max_iter=500,
+            early_stopping=True,
+            n_iter_no_change=20,
+            validation_fraction=0.1
+        )
+    elif nome_modelo == 'XGBoost':
+        # XGBoost usa scale_pos_weight ao invés de class_weight
+        modelo_base = ModeloClasse(
+            random_state=random_state, 
+            eval_metric='mlogloss',
+            enable_categorical=False
+        )
+    else:
+        modelo_base = ModeloClasse(random_state=random_state)
+    
+    if n_jobs is not None and 'n_jobs' in modelo_base.get_params():
+        modelo_base.set_params(n_jobs=n_jobs)
+    
+    return modelo_base
+
+
+class ScorerComProgresso:
+    """
+    Scorer que avisa um callback a cada fold avaliado
+    
+    Na busca de hiperparâmetros e na validação cruzada o sklearn pontua os
+    folds na ordem (candidato, fold); contando as chamadas, o callback recebe
+    o candidato e o fold atuais. A contagem só é exata com n_jobs=1 (em
+    paralelo cada processo recebe sua própria cópia do scorer).
+    
+    Args:
+        scoring: Nome da métrica (ex.: 'f1_macro')
+        progresso: Callback que recebe um dict com etapa, candidato,
+            n_candidatos, fold e n_folds
+        etapa: Nome da etapa reportada
+        n_candidatos: Número de candidatos avaliados
+        n_folds: Número de folds por candidato
+    """
+    
+    def __init__(self, scoring, progresso, etapa, n_candidatos, n_folds):
+        self.scorer = get_scorer(scoring)
+        self.progresso = progresso
+        self.etapa = etapa
+        self.n_candidatos = n_candidatos
+        self.n_folds = n_folds
+        self.n_avaliados = 0
+    
+    def __call__(self, estimador, X, y):
+        score = self.scorer(estimador, X, y)
+        
+        self.progresso({
+            'etapa': self.etapa,
+            'candidato': self.n_avaliados // self.n_folds + 1,
+            'n_candidatos': self.n_candidatos,
+            'fold': self.n_avaliados % self.n_folds + 1,
+            'n_folds': self.n_folds
+        })
+        self.n_avaliados += 1
+        
+        return score
+
+
+@contextmanager
+def progresso_por_fold(scoring, progresso, etapa, n_candidatos, n_folds, n_jobs):
+    """
+    Scoring da busca ou da CV com aviso de progresso a cada fold concluído
+    
+    Num único processo devolve um ScorerComProgresso (candidato e fold
+    exatos). Em paralelo os folds são pontuados em outros processos, mas o
+    joblib registra cada conclusão no processo principal
+    (Parallel.print_progress); dentro do bloco essa contagem é repassada ao
+    callback. Como os folds terminam fora de ordem, candidato e fold indicam
+    a posição na contagem de folds concluídos.
+    
+    Args:
+        scoring: Nome da métrica (ex.: 'f1_macro')
+        progresso: Callback (None = sem progresso)
+        etapa: Nome da etapa reportada
+        n_candidatos: Número de candidatos avaliados
+        n_folds: Número de folds por candidato
+        n_jobs: n_jobs da busca ou da CV
+    
+    Yields:
+        Scorer para o parâmetro scoring do sklearn
+    """
+    if progresso is None:
+        yield scoring
+        return
+    
+    if effective_n_jobs(n_jobs) == 1:
+        yield ScorerComProgresso(scoring, progresso, etapa, n_candidatos, n_folds)
+        return
+    
+    n_total = n_candidatos * n_folds
+    print_progress_original = ParallelSklearn.print_progress
+    
+    def print_progress(parallel):
+        print_progress_original(parallel)
+        # Paralelismo interno do modelo no processo principal (threads) não conta
+        if getattr(parallel._backend, 'uses_threads', False):
+            return
+        n_concluidos = min(parallel.n_completed_tasks, n_total)
+        progresso({
+            'etapa': etapa,
+            'candidato': (n_concluidos - 1) // n_folds + 1,
+            'n_candidatos': n_candidatos,
+            'fold': (n_concluidos - 1) % n_folds + 1,
+            'n_folds': n_folds,
+            'n_concluidos': n_concluidos,
+            'n_total': n_total
+        })
+    
+    ParallelSklearn.print_progress = print_progress
+    try:
+        yield scoring
+    finally:
+        del ParallelSklearn.print_progress  # volta ao método herdado do joblib
+
+
 def treinar_modelo(X_train, y_train, nome_modelo='Random Forest', 
-                   usar_grid_search=False, cv_folds=5, random_state=42):
+                   usar_grid_search=False, cv_folds=5, random_state=42, n_jobs=None,
+                   progresso=None, rotear_por_especie=False, min_amostras_rota=50):
     """
     Treina um modelo de classificação
     
@@ -108,6 +268,10 @@ def treinar_modelo(X_train, y_train, nome_modelo='Random Forest',
         usar_grid_search: Se True, usa GridSearchCV
         cv_folds: Número de folds para CV
         random_state: Seed
+        n_jobs: Núcleos para o modelo, a busca e a CV (None = padrão de cada etapa)
+        progresso: Callback opcional, a cada fold da busca e da CV (ver progresso_por_fold)
+        rotear_por_especie: Se True, treina um modelo por espécie (ver vetlib.routing)
+        min_amostras_rota: Casos mínimos para uma espécie ter modelo próprio
         
     Returns:
         modelo treinado, histórico de treinamento
@@ -122,13 +286,6 @@ def treinar_modelo(X_train, y_train, nome_modelo='Random Forest',
         y_train_encoded = y_train
         classes_originais = np.unique(y_train)
     
-    modelos_disponiveis = obter_modelos_disponiveis()
-    
-    if nome_modelo not in modelos_disponiveis:
-        raise ValueError(f"Modelo '{nome_modelo}' não disponível")
-    
-    ModeloClasse = modelos_disponiveis[nome_modelo]
-    
     historico = {
         'modelo': nome_modelo,
         'n_samples_treino': len(X_train),
@@ -137,60 +294,67 @@ def treinar_modelo(X_train, y_train, nome_modelo='Random Forest',
         'label_encoder': label_encoder
     }
     
-    # Configurar modelo base
-    if nome_modelo == 'Logistic Regression':
-        modelo_base = ModeloClasse(random_state=random_state, max_iter=1000, class_weight='balanced')
-    elif nome_modelo in ['Random Forest', 'LightGBM']:
-        modelo_base = ModeloClasse(random_state=random_state, class_weight='balanced')
-    elif nome_modelo == 'XGBoost':
-        # XGBoost usa scale_pos_weight ao invés de class_weight
-        modelo_base = ModeloClasse(
-            random_state=random_state, 
-            eval_metric='mlogloss',
-            enable_categorical=False
+    if rotear_por_especie:
+        from vetlib.routing import ModeloPorEspecie
+        
+        modelo_base = ModeloPorEspecie(
+            nome_modelo, min_amostras=min_amostras_rota, random_state=random_state, n_jobs=n_jobs
         )
+        historico['roteado_por_especie'] = True
     else:
-        modelo_base = ModeloClasse(random_state=random_state)
+        modelo_base = criar_modelo_base(nome_modelo, random_state=random_state, n_jobs=n_jobs)
     
     # Grid Search ou treino direto
     if usar_grid_search:
         param_grid = obter_parametros_grid(nome_modelo)
+        if rotear_por_especie and param_grid:
+            # Cada candidato é aplicado a todas as rotas
+            param_grid = {'parametros': list(ParameterGrid(param_grid))}
         
         if param_grid:
             cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+            n_jobs_busca = n_jobs if n_jobs is not None else -1
             
-            grid_search = GridSearchCV(
-                modelo_base,
-                param_grid,
-                cv=cv,
-                scoring='f1_macro',
-                n_jobs=-1,
-                verbose=0
-            )
-            
-            grid_search.fit(X_train, y_train_encoded)
+            with progresso_por_fold(
+                'f1_macro', progresso, 'busca', len(ParameterGrid(param_grid)), cv_folds, n_jobs_busca
+            ) as scoring:
+                grid_search = GridSearchCV(
+                    modelo_base,
+                    param_grid,
+                    cv=cv,
+                    scoring=scoring,
+                    n_jobs=n_jobs_busca,
+                    verbose=0
+                )
+                
+                grid_search.fit(X_train, y_train_encoded)
             
             modelo = grid_search.best_estimator_
-            historico['melhores_parametros'] = grid_search.best_params_
+            historico['melhores_parametros'] = (
+                grid_search.best_params_['parametros'] if rotear_por_especie else grid_search.best_params_
+            )
             historico['melhor_score_cv'] = grid_search.best_score_
         else:
             modelo = modelo_base
             modelo.fit(X_train, y_train_encoded)
     else:
+        if progresso is not None:
+            progresso({'etapa': 'ajuste'})
         modelo = modelo_base
         modelo.fit(X_train, y_train_encoded)
     
     # Validação cruzada
     cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
     
-    cv_scores = cross_val_score(modelo, X_train, y_train_encoded, cv=cv, scoring='f1_macro')
+    with progresso_por_fold('f1_macro', progresso, 'validacao_cruzada', 1, cv_folds, n_jobs) as scoring:
+        cv_scores = cross_val_score(modelo, X_train, y_train_encoded, cv=cv, scoring=scoring, n_jobs=n_jobs)
     historico['cv_f1_mean'] = cv_scores.mean()
     historico['cv_f1_std'] = cv_scores.std()
     
     return modelo, historico
 
 
-def avaliar_modelo(modelo, X_test, y_test, nomes_classes=None, label_encoder=None):
+def avaliar_modelo(modelo, X_test, y_test, nomes_classes=None, label_encoder=None, pontuacao=None):
     """
     Avalia modelo no conjunto de teste
     
@@ -200,72 +364,18 @@ def avaliar_modelo(modelo, X_test, y_test, nomes_classes=None, label_encoder=Non
         y_test: Target de teste
         nomes_classes: Nomes das classes (opcional)
         label_encoder: LabelEncoder usado no treinamento (opcional)
+        pontuacao: Resultado de pontuar_modelo para reaproveitar as predições (opcional)
         
     Returns:
         dict com métricas de avaliação
     """
-    # Codificar y_test se necessário
-    if label_encoder is not None:
-        y_test_encoded = label_encoder.transform(y_test)
-    else:
-        y_test_encoded = y_test
+    if pontuacao is None:
+        pontuacao = pontuar_modelo(modelo, X_test, y_test, label_encoder)
     
-    # Predições
-    y_pred = modelo.predict(X_test)
-    y_proba = modelo.predict_proba(X_test)
+    if nomes_classes is not None:
+        pontuacao = {**pontuacao, 'nomes_classes': np.asarray(nomes_classes)}
     
-    # Decodificar predições se necessário
-    if label_encoder is not None:
-        y_pred_decoded = label_encoder.inverse_transform(y_pred)
-    else:
-        y_pred_decoded = y_pred
-    
-    # Métricas básicas
-    metricas = {
-        'accuracy': accuracy_score(y_test_encoded, y_pred),
-        'precision_macro': precision_score(y_test_encoded, y_pred, average='macro', zero_division=0),
-        'recall_macro': recall_score(y_test_encoded, y_pred, average='macro', zero_division=0),
-        'f1_macro': f1_score(y_test_encoded, y_pred, average='macro', zero_division=0),
-        'precision_weighted': precision_score(y_test_encoded, y_pred, average='weighted', zero_division=0),
-        'recall_weighted': recall_score(y_test_encoded, y_pred, average='weighted', zero_division=0),
-        'f1_weighted': f1_score(y_test_encoded, y_pred, average='weighted', zero_division=0),
-    }
-    
-    # Matriz de confusão
-    metricas['confusion_matrix'] = confusion_matrix(y_test_encoded, y_pred)
-    
-    # Classification report
-    if nomes_classes is None:
-        if label_encoder is not None:
-            nomes_classes = label_encoder.classes_
-        else:
-            nomes_classes = modelo.classes_
-    
-    metricas['classification_report'] = classification_report(
-        y_test_encoded, y_pred, 
-        target_names=nomes_classes,
-        output_dict=True,
-        zero_division=0
-    )
-    
-    # ROC AUC (multiclasse - One vs Rest)
-    try:
-        if len(modelo.classes_) == 2:
-            metricas['roc_auc'] = roc_auc_score(y_test_encoded, y_proba[:, 1])
-        else:
-            metricas['roc_auc'] = roc_auc_score(
-                y_test_encoded, y_proba, 
-                multi_class='ovr', 
-                average='macro'
-            )
-    except:
-        metricas['roc_auc'] = None
-    
-    # Predições e probabilidades para análise posterior
-    metricas['y_pred'] = y_pred
-    metricas['y_proba'] = y_proba
-    
-    return metricas
+    return metricas_globais(pontuacao)
 
 
 def obter_importancia_features(modelo, feature_names):
@@ -297,7 +407,7 @@ def obter_importancia_features(modelo, feature_names):
     return df_importancia
 
 
-def calcular_roc_curves(modelo, X_test, y_test):
+def calcular_roc_curves(modelo, X_test, y_test, label_encoder=None, pontuacao=None):
     """
     Calcula curvas ROC para cada classe
     
@@ -305,31 +415,19 @@ def calcular_roc_curves(modelo, X_test, y_test):
         modelo: Modelo treinado
         X_test: Features de teste
         y_test: Target de teste
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+        pontuacao: Resultado de pontuar_modelo para reaproveitar as predições (opcional)
         
     Returns:
         dict com curvas ROC por classe
     """
-    y_proba = modelo.predict_proba(X_test)
-    classes = modelo.classes_
-    
-    roc_curves = {}
-    
-    if len(classes) == 2:
-        # Binário
-        fpr, tpr, thresholds = roc_curve(y_test, y_proba[:, 1], pos_label=classes[1])
-        roc_curves[classes[1]] = {'fpr': fpr, 'tpr': tpr, 'thresholds': thresholds}
-    else:
-        # Multiclasse - One vs Rest
-        y_test_bin = label_binarize(y_test, classes=classes)
-        
-        for i, classe in enumerate(classes):
-            fpr, tpr, thresholds = roc_curve(y_test_bin[:, i], y_proba[:, i])
-            roc_curves[classe] = {'fpr': fpr, 'tpr': tpr, 'thresholds': thresholds}
+    if pontuacao is None:
+        pontuacao = pontuar_modelo(modelo, X_test, y_test, label_encoder)
     
-    return roc_curves
+    return curvas_roc(pontuacao)
 
 
-def salvar_modelo(modelo, preprocessadores, feature_names, caminho_base='models/modelo'):
+def salvar_modelo(modelo, preprocessadores, feature_names, caminho_base='models/modelo', explicacao_global=None):
     """
     Salva modelo e preprocessadores em disco
     
@@ -338,6 +436,8 @@ def salvar_modelo(modelo, preprocessadores, feature_names, caminho_base='models/
         preprocessadores: Dict com preprocessadores
         feature_names: Lista de nomes das features
         caminho_base: Caminho base (sem extensão)
+        explicacao_global: Explicação global pré-calculada (ver
+            vetlib.explain.gerar_explicacao_global), guardada no próprio artefato
         
     Returns:
         Caminho completo do arquivo salvo
@@ -345,19 +445,41 @@ def salvar_modelo(modelo, preprocessadores, feature_names, caminho_base='models/
     # Criar diretório se não existir
     Path('models').mkdir(exist_ok=True)
     
+    artefato = {
+        'modelo': modelo,
+        'preprocessadores': preprocessadores,
+        'feature_names': feature_names,
+        'classes': modelo.classes_.tolist()
+    }
+    if explicacao_global is not None:
+        artefato['explicacao_global'] = explicacao_global
+    
     # Salvar modelo
     caminho_modelo = f"{caminho_base}.pkl"
     with open(caminho_modelo, 'wb') as f:
-        pickle.dump({
-            'modelo': modelo,
-            'preprocessadores': preprocessadores,
-            'feature_names': feature_names,
-            'classes': modelo.classes_.tolist()
-        }, f)
+        pickle.dump(artefato, f)
     
     return caminho_modelo
 
 
+def carregar_artefato(caminho='models/modelo.pkl'):
+    """
+    Carrega o artefato completo do disco (modelo, preprocessadores,
+    feature_names, classes e, se houver, explicacao_global)
+    
+    Args:
+        caminho: Caminho do arquivo
+    
+    Returns:
+        dict do artefato, ou None se o arquivo não existir
+    """
+    if not Path(caminho).exists():
+        return None
+    
+    with open(caminho, 'rb') as f:
+        return pickle.load(f)
+
+
 def carregar_modelo(caminho='models/modelo.pkl'):
     """
     Carrega modelo e preprocessadores do disco
@@ -368,12 +490,10 @@ def carregar_modelo(caminho='models/modelo.pkl'):
     Returns:
         modelo, preprocessadores, feature_names, classes
     """
-    if not Path(caminho).exists():
+    dados = carregar_artefato(caminho)
+    if dados is None:
         return None, None, None, None
     
-    with open(caminho, 'rb') as f:
-        dados = pickle.load(f)
-    
     return (
         dados['modelo'],
         dados['preprocessadores'],
@@ -430,7 +550,7 @@ def prever_diagnostico(modelo, X, preprocessadores, feature_names, top_n=3):
     return resultados
 
 
-def avaliar_por_especie(modelo, X_test, y_test, especie_col, label_encoder=None):
+def avaliar_por_especie(modelo, X_test, y_test, especie_col, label_encoder=None, pontuacao=None):
     """
     Avalia modelo separadamente por espécie
     
@@ -438,42 +558,17 @@ def avaliar_por_especie(modelo, X_test, y_test, especie_col, label_encoder=None)
         modelo: Modelo treinado
         X_test: Features de teste (com coluna de espécie)
         y_test: Target de teste
-        especie_col: DataFrame com coluna de espécie alinhado com X_test
+        especie_col: Série com a espécie de cada amostra, alinhada com X_test
         label_encoder: LabelEncoder usado no treinamento (opcional)
+        pontuacao: Resultado de pontuar_modelo para reaproveitar as predições (opcional)
         
     Returns:
         dict com métricas por espécie
     """
-    metricas_especies = {}
-    
-    especies_unicas = especie_col.unique()
-    
-    for especie in especies_unicas:
-        mask = (especie_col == especie)
-        
-        if mask.sum() == 0:
-            continue
-        
-        X_esp = X_test[mask]
-        y_esp = y_test[mask]
-        
-        # Codificar y_esp se necessário
-        if label_encoder is not None:
-            y_esp_encoded = label_encoder.transform(y_esp)
-        else:
-            y_esp_encoded = y_esp
-        
-        # Avaliar
-        y_pred_esp = modelo.predict(X_esp)
-        
-        metricas_especies[especie] = {
-            'n_samples': mask.sum(),
-            'accuracy': accuracy_score(y_esp_encoded, y_pred_esp),
-            'f1_macro': f1_score(y_esp_encoded, y_pred_esp, average='macro', zero_division=0),
-            'confusion_matrix': confusion_matrix(y_esp_encoded, y_pred_esp)
-        }
+    if pontuacao is None:
+        pontuacao = pontuar_modelo(modelo, X_test, y_test, label_encoder)
     
-    return metricas_especies
+    return metricas_por_grupo(pontuacao, especie_col)
 
 
 def balancear_classes(y_train):
@@ -494,7 +589,90 @@ def balancear_classes(y_train):
     return dict(zip(classes, class_weights))
 
 
-def comparar_modelos(X_train, y_train, X_test, y_test, modelos_treinar=None):
+def dividir_nucleos(n_modelos, n_jobs=-1):
+    """
+    Divide os núcleos disponíveis entre modelos em paralelo e o n_jobs interno de cada um
+    
+    Args:
+        n_modelos: Número de modelos a treinar simultaneamente
+        n_jobs: Total de núcleos a usar (-1 = todos)
+    
+    Returns:
+        (n_processos, n_jobs_por_modelo)
+    """
+    n_nucleos = joblib.cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
+    n_processos = max(1, min(n_modelos, n_nucleos))
+    n_jobs_por_modelo = max(1, n_nucleos // n_processos)
+    
+    return n_processos, n_jobs_por_modelo
+
+
+def _treinar_e_avaliar(nome_modelo, X_train, y_train, X_test, y_test, n_jobs):
+    """Treina e avalia um modelo dentro de um processo de trabalho"""
+    inicio = time.perf_counter()
+    
+    try:
+        modelo, historico = treinar_modelo(X_train, y_train, nome_modelo, n_jobs=n_jobs)
+        metricas = avaliar_modelo(modelo, X_test, y_test, label_encoder=historico.get('label_encoder'))
+    except Exception as e:
+        return {'Modelo': nome_modelo, 'erro': str(e)}
+    
+    return {
+        'Modelo': nome_modelo,
+        'Accuracy': metricas['accuracy'],
+        'F1 (Macro)': metricas['f1_macro'],
+        'F1 (Weighted)': metricas['f1_weighted'],
+        'Precision (Macro)': metricas['precision_macro'],
+        'Recall (Macro)': metricas['recall_macro'],
+        'ROC AUC': metricas['roc_auc'],
+        'Tempo (s)': time.perf_counter() - inicio
+    }
+
+
+def comparar_modelos_iter(X_train, y_train, X_test, y_test, modelos_treinar=None, n_jobs=-1):
+    """
+    Treina múltiplos modelos em paralelo e entrega cada resultado assim que termina
+    
+    As matrizes de treino e teste são gravadas uma vez em disco e abertas como
+    memmap pelos processos, em vez de serem serializadas para cada modelo.
+    
+    Args:
+        X_train, y_train: Dados de treino
+        X_test, y_test: Dados de teste
+        modelos_treinar: Lista de nomes de modelos (None = todos disponíveis)
+        n_jobs: Total de núcleos a usar (-1 = todos)
+    
+    Yields:
+        dict com as métricas de um modelo (ou chave 'erro' em caso de falha)
+    """
+    if modelos_treinar is None:
+        modelos_treinar = list(obter_modelos_disponiveis().keys())
+    
+    if len(modelos_treinar) == 0:
+        return
+    
+    n_processos, n_jobs_por_modelo = dividir_nucleos(len(modelos_treinar), n_jobs)
+    
+    with tempfile.TemporaryDirectory(prefix='vetlib_comparacao_') as pasta:
+        matrizes = {}
+        for nome, X in [('X_train', X_train), ('X_test', X_test)]:
+            caminho = os.path.join(pasta, f'{nome}.mmap')
+            joblib.dump(np.ascontiguousarray(np.asarray(X, dtype=np.float64)), caminho)
+            matrizes[nome] = joblib.load(caminho, mmap_mode='r')
+        
+        resultados = Parallel(n_jobs=n_processos, return_as='generator_unordered')(
+            delayed(_treinar_e_avaliar)(
+                nome_modelo, matrizes['X_train'], y_train, matrizes['X_test'], y_test,
+                n_jobs_por_modelo
+            )
+            for nome_modelo in modelos_treinar
+        )
+        
+        for resultado in resultados:
+            yield resultado
+
+
+def comparar_modelos(X_train, y_train, X_test, y_test, modelos_treinar=None, n_jobs=-1):
     """
     Treina e compara múltiplos modelos
     
@@ -502,36 +680,19 @@ def comparar_modelos(X_train, y_train, X_test, y_test, modelos_treinar=None):
         X_train, y_train: Dados de treino
         X_test, y_test: Dados de teste
         modelos_treinar: Lista de nomes de modelos (None = todos disponíveis)
+        n_jobs: Total de núcleos a usar (-1 = todos)
         
     Returns:
         DataFrame com comparação de métricas
     """
-    if modelos_treinar is None:
-        modelos_treinar = list(obter_modelos_disponiveis().keys())
-    
     resultados = []
     
-    for nome_modelo in modelos_treinar:
-        try:
-            # Treinar
-            modelo, historico = treinar_modelo(X_train, y_train, nome_modelo)
-            
-            # Avaliar
-            metricas = avaliar_modelo(modelo, X_test, y_test, label_encoder=historico.get('label_encoder'))
-            
-            resultados.append({
-                'Modelo': nome_modelo,
-                'Accuracy': metricas['accuracy'],
-                'F1 (Macro)': metricas['f1_macro'],
-                'F1 (Weighted)': metricas['f1_weighted'],
-                'Precision (Macro)': metricas['precision_macro'],
-                'Recall (Macro)': metricas['recall_macro'],
-                'ROC AUC': metricas['roc_auc']
-            })
-        except Exception as e:
-            st.warning(f"Erro ao treinar {nome_modelo}: {str(e)}")
+    for resultado in comparar_modelos_iter(X_train, y_train, X_test, y_test, modelos_treinar, n_jobs):
+        if 'erro' in resultado:
+            st.warning(f"Erro ao treinar {resultado['Modelo']}: {resultado['erro']}")
+            continue
+        resultados.append(resultado)
     
     df_comparacao = pd.DataFrame(resultados).sort_values('F1 (Macro)', ascending=False)
     
     return df_comparacao
-
@@ -0,0 +1,227 @@
+"""
+Importância por permutação com orçamento
+
+Em vez de n_repeats fixos sobre todo o X, o cálculo:
+
+- usa uma amostra estratificada por classe (max_amostras linhas);
+- repete a permutação de cada feature só até o intervalo de confiança (t de
+  Student, 95%) da queda de acurácia ficar mais estreito que a tolerância,
+  entre min_repeticoes e max_repeticoes;
+- pontua as cópias permutadas em blocos: um único buffer com a amostra
+  repetida tamanho_bloco vezes, em que só a coluna permutada de cada cópia é
+  sobrescrita (e restaurada) antes de uma única chamada a predict_proba.
+
+A acurácia sem permutação é guardada por modelo e amostra, e o resultado é
+salvo ao lado do artefato do modelo ('<nome>_importancia_permutacao.json').
+"""
+
+import json
+import time
+import weakref
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+# Acurácia sem permutação, por modelo e por amostra (some junto com o modelo)
+_CACHE_BASE = weakref.WeakKeyDictionary()
+
+
+def amostra_estratificada(y, max_amostras, random_state=42):
+    """
+    Índices de uma amostra com a mesma proporção de classes de y
+    
+    Args:
+        y: Target
+        max_amostras: Tamanho máximo da amostra
+        random_state: Seed
+    
+    Returns:
+        Array ordenado de índices (todos, se len(y) <= max_amostras)
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_amostras:
+        return np.arange(n)
+    
+    rng = np.random.RandomState(random_state)
+    _, codigos, contagens = np.unique(y, return_inverse=True, return_counts=True)
+    cotas = np.maximum(1, np.round(contagens * max_amostras / n)).astype(int)
+    
+    # Ordem aleatória dentro de cada classe; cada classe contribui com a sua cota
+    ordem = rng.permutation(n)
+    ordem = ordem[np.argsort(codigos[ordem], kind='stable')]
+    inicio_classe = np.concatenate([[0], np.cumsum(contagens)[:-1]])
+    posicao = np.arange(n) - inicio_classe[codigos[ordem]]
+    
+    return np.sort(ordem[posicao < cotas[codigos[ordem]]])
+
+
+def acuracia_base(modelo, X, y_true):
+    """
+    Acurácia do modelo sem permutação, calculada uma vez por modelo e amostra
+    
+    Args:
+        modelo: Modelo treinado
+        X: Features pré-processadas da amostra
+        y_true: Índice da classe verdadeira em modelo.classes_
+    
+    Returns:
+        float
+    """
+    chave = joblib.hash((np.asarray(X), np.asarray(y_true)))
+    por_amostra = _CACHE_BASE.setdefault(modelo, {})
+    
+    if chave not in por_amostra:
+        y_pred = np.argmax(modelo.predict_proba(X), axis=1)
+        por_amostra[chave] = float(np.mean(y_pred == y_true))
+    
+    return por_amostra[chave]
+
+
+def limpar_cache_base(modelo=None):
+    """Descarta a acurácia base de um modelo alterado no lugar (ex.: atualização incremental), ou todas"""
+    if modelo is None:
+        _CACHE_BASE.clear()
+    else:
+        _CACHE_BASE.pop(modelo, None)
+
+
+def _meia_largura_ic(quedas, confianca=0.95):
+    """Meia largura do intervalo t de Student da média das quedas"""
+    n = len(quedas)
+    if n < 2:
+        return np.inf
+    return stats.t.ppf(0.5 + confianca / 2, n - 1) * np.std(quedas, ddof=1) / np.sqrt(n)
+
+
+def calcular_importancia_permutacao(modelo, X, y, label_encoder=None, max_amostras=2000,
+                                    min_repeticoes=3, max_repeticoes=10, tolerancia=0.005,
+                                    tamanho_bloco=8, random_state=42):
+    """
+    Queda de acurácia ao permutar cada feature, com parada antecipada por feature
+    
+    Args:
+        modelo: Modelo treinado (qualquer um com predict_proba e classes_)
+        X: DataFrame de features pré-processadas
+        y: Target (rótulos originais se label_encoder for informado)
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+        max_amostras: Linhas usadas (amostra estratificada por classe)
+        min_repeticoes: Repetições mínimas por feature
+        max_repeticoes: Repetições máximas por feature
+        tolerancia: Meia largura do IC 95% abaixo da qual a feature para de repetir
+        tamanho_bloco: Cópias permutadas pontuadas por chamada ao modelo
+        random_state: Seed
+    
+    Returns:
+        (DataFrame com feature, importancia, std, ic_inferior, ic_superior e
+        n_repeticoes, ordenado; dict resumo com acuracia_base, n_amostras,
+        n_permutacoes, n_permutacoes_maximo e tempo_s)
+    """
+    inicio = time.perf_counter()
+    
+    colunas = list(X.columns)
+    indices = amostra_estratificada(y, max_amostras, random_state)
+    X_amostra = X.iloc[indices].to_numpy(dtype=np.float64)
+    y_amostra = np.asarray(y)[indices]
+    if label_encoder is not None:
+        y_amostra = label_encoder.transform(y_amostra)
+    y_true = np.searchsorted(np.asarray(modelo.classes_), y_amostra)
+    
+    base = acuracia_base(modelo, pd.DataFrame(X_amostra, columns=colunas), y_true)
+    
+    n_amostras, n_features = X_amostra.shape
+    rng = np.random.RandomState(random_state)
+    quedas = [[] for _ in range(n_features)]
+    
+    # Buffer reaproveitado: tamanho_bloco cópias da amostra, uma coluna permutada em cada
+    buffer = np.tile(X_amostra, (tamanho_bloco, 1))
+    
+    ativas = list(range(n_features))
+    while ativas:
+        for inicio_bloco in range(0, len(ativas), tamanho_bloco):
+            bloco = ativas[inicio_bloco:inicio_bloco + tamanho_bloco]
+            
+            for copia, feature in enumerate(bloco):
+                linhas = slice(copia * n_amostras, (copia + 1) * n_amostras)
+                buffer[linhas, feature] = X_amostra[rng.permutation(n_amostras), feature]
+            
+            X_bloco = pd.DataFrame(buffer[:len(bloco) * n_amostras], columns=colunas, copy=False)
+            y_pred = np.argmax(modelo.predict_proba(X_bloco), axis=1).reshape(len(bloco), n_amostras)
+            acuracias = (y_pred == y_true).mean(axis=1)
+            
+            for copia, feature in enumerate(bloco):
+                quedas[feature].append(base - acuracias[copia])
+                buffer[copia * n_amostras:(copia + 1) * n_amostras, feature] = X_amostra[:, feature]
+        
+        # Cada feature repete até o IC estreitar ou o máximo de repetições
+        ativas = [
+            feature for feature in ativas
+            if len(quedas[feature]) < max_repeticoes
+            and (len(quedas[feature]) < min_repeticoes or _meia_largura_ic(quedas[feature]) > tolerancia)
+        ]
+    
+    medias = np.array([np.mean(q) for q in quedas])
+    meias_larguras = np.array([_meia_largura_ic(q) for q in quedas])
+    
+    df_importancia = pd.DataFrame({
+        'feature': colunas,
+        'importancia': medias,
+        'std': [np.std(q, ddof=1) if len(q) > 1 else 0.0 for q in quedas],
+        'ic_inferior': medias - meias_larguras,
+        'ic_superior': medias + meias_larguras,
+        'n_repeticoes': [len(q) for q in quedas]
+    }).sort_values('importancia', ascending=False, kind='stable').reset_index(drop=True)
+    
+    resumo = {
+        'acuracia_base': base,
+        'n_amostras': int(n_amostras),
+        'n_permutacoes': int(df_importancia['n_repeticoes'].sum()),
+        'n_permutacoes_maximo': int(n_features * max_repeticoes),
+        'tempo_s': time.perf_counter() - inicio
+    }
+    
+    return df_importancia, resumo
+
+
+def caminho_importancia_permutacao(caminho_modelo):
+    """Caminho da importância por permutação ao lado do artefato ('<nome>_importancia_permutacao.json')"""
+    caminho_modelo = Path(caminho_modelo)
+    return caminho_modelo.with_name(f"{caminho_modelo.stem}_importancia_permutacao.json")
+
+
+def salvar_importancia_permutacao(caminho_modelo, df_importancia, resumo):
+    """
+    Salva a importância por permutação ao lado do artefato do modelo
+    
+    Args:
+        caminho_modelo: Caminho do artefato (.pkl)
+        df_importancia: DataFrame de calcular_importancia_permutacao
+        resumo: Resumo de calcular_importancia_permutacao
+    
+    Returns:
+        Caminho do arquivo salvo
+    """
+    caminho = caminho_importancia_permutacao(caminho_modelo)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({
+            'resumo': {**resumo, 'timestamp': datetime.now().isoformat()},
+            'importancias': df_importancia.replace({np.inf: None, -np.inf: None}).to_dict(orient='records')
+        }, f, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def carregar_importancia_permutacao(caminho_modelo):
+    """(DataFrame, resumo) salvos ao lado do artefato, ou (None, None) se não houver"""
+    caminho = caminho_importancia_permutacao(caminho_modelo)
+    if not caminho.exists():
+        return None, None
+    
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+    
+    return pd.DataFrame(dados['importancias']), dados['resumo']
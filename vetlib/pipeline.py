@@ -0,0 +1,533 @@
+"""
+Pipeline unificado de treinamento dos scripts de produção
+
+Substitui o código repetido de train_model.py, create_model_781.py e
+create_optimized_model.py por uma sequência única de etapas configuráveis:
+
+    carregar → features → seleção → busca → avaliação → exportação
+
+Cada etapa (menos a exportação, que escreve em models/) é uma função pura
+cacheada em disco com joblib.Memory pelo hash das suas entradas: mudar só o
+espaço de busca reaproveita leitura, features e seleção; mudar só o motor
+reaproveita leitura e features. As etapas formam uma cadeia (cada uma usa a
+saída da anterior); o trabalho independente roda em paralelo dentro delas
+(configuração × fold na busca, ajuste final junto com os folds da validação
+cruzada na avaliação).
+"""
+
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from vetlib.boosting import (
+    PARAMETROS_PADRAO, GRIDS_BUSCA_STAGED, criar_boosting, busca_staged_n_estimators,
+    preencher_faltantes, selecionar_colunas
+)
+from vetlib.registry import registrar_modelo
+
+
+DIRETORIO_CACHE = 'models/cache_pipeline'
+
+ETAPAS = ('carregar', 'features', 'selecao', 'busca', 'avaliacao', 'exportacao')
+
+# Ordem de preferência dos datasets em data/ (cada perfil mantém a do seu script)
+DATASETS_PRIORITARIOS = [
+    'veterinary_complete_real_dataset.csv',
+    'veterinary_master_dataset.csv',
+    'veterinary_realistic_dataset.csv',
+    'clinical_veterinary_data.csv',
+    'laboratory_complete_panel.csv'
+]
+
+DATASETS_PRIORITARIOS_REALISTA = [
+    'veterinary_complete_real_dataset.csv',
+    'veterinary_realistic_dataset.csv',
+    'veterinary_master_dataset.csv',
+    'clinical_veterinary_data.csv',
+    'laboratory_complete_panel.csv'
+]
+
+SINTOMAS = [
+    'febre', 'apatia', 'perda_peso', 'vomito', 'diarreia',
+    'tosse', 'letargia', 'feridas_cutaneas', 'poliuria', 'polidipsia'
+]
+
+CONFIG_PADRAO = {
+    'dados': None,                 # CSV a usar (None = primeiro de 'datasets' em data/)
+    'datasets': DATASETS_PRIORITARIOS,
+    'variante_idade': 'ordinal',   # 'ordinal' (idade_categoria 0-4) ou 'rotulos' (LabelEncoder dos rótulos)
+    'motor': 'exato',
+    'test_size': 0.2,
+    'k_features': None,            # SelectKBest após a escala (None = todas as features)
+    'busca': False,                # Busca staged de hiperparâmetros
+    'param_grid': None,            # None = GRIDS_BUSCA_STAGED[motor]
+    'n_iter': 30,
+    'parametros': None,            # Sem busca: None = PARAMETROS_PADRAO[motor]
+    'cv_folds': 5,
+    'early_stopping': None,        # None = só no motor histograma (o exato ajusta todas as árvores)
+    'n_iter_no_change': 50,
+    'validation_fraction': 0.1,
+    'random_state': 42,
+    'arquivo_modelo': 'models/gb_optimized_model.pkl',
+    'arquivo_info': None,          # Relatório em texto (None = não gera)
+    'titulo_info': 'INFORMAÇÕES DO MODELO',
+    'sufixo_tipo': '',             # Acrescentado ao model_type do artefato
+    'origem': 'pipeline'
+}
+
+# Configuração de cada script de produção
+PERFIS = {
+    'otimizado': {
+        'variante_idade': 'ordinal', 'k_features': 50, 'busca': True,
+        'arquivo_info': 'models/model_info.txt', 'origem': 'train_model.py'
+    },
+    '781': {
+        'variante_idade': 'rotulos', 'datasets': DATASETS_PRIORITARIOS_REALISTA,
+        'arquivo_info': 'models/model_info_781.txt', 'titulo_info': 'MODELO 78.1%',
+        'sufixo_tipo': '_781', 'origem': 'create_model_781.py'
+    },
+    'basico': {
+        'variante_idade': 'rotulos', 'datasets': DATASETS_PRIORITARIOS_REALISTA,
+        'origem': 'create_optimized_model.py'
+    }
+}
+
+
+def localizar_dataset(dados=None, diretorio='data', datasets=DATASETS_PRIORITARIOS):
+    """
+    Escolhe o CSV de treino
+    
+    Args:
+        dados: Caminho explícito (tem prioridade)
+        diretorio: Pasta dos datasets
+        datasets: Nomes em ordem de preferência (depois, o primeiro CSV da pasta)
+    
+    Returns:
+        Path do CSV
+    """
+    if dados is not None:
+        return Path(dados)
+    
+    data_path = Path(diretorio)
+    if not data_path.exists():
+        raise FileNotFoundError(f"Pasta '{diretorio}' não encontrada!")
+    
+    for dataset_name in datasets:
+        dataset_path = data_path / dataset_name
+        if dataset_path.exists() and dataset_path.stat().st_size > 0:
+            return dataset_path
+    
+    csv_files = sorted(data_path.glob("*.csv"))
+    if not csv_files:
+        raise FileNotFoundError(f"Nenhum arquivo CSV encontrado na pasta '{diretorio}'!")
+    
+    return csv_files[0]
+
+
+def carregar_dataset(caminho, assinatura=None):
+    """
+    Etapa carregar: lê o CSV
+    
+    Args:
+        caminho: Caminho do CSV
+        assinatura: (tamanho, mtime) do arquivo; só entra na chave do cache,
+            para que um arquivo alterado no mesmo caminho seja relido
+    
+    Returns:
+        DataFrame
+    """
+    df = pd.read_csv(caminho)
+    if len(df) == 0:
+        raise ValueError(f"Dataset vazio: {caminho}")
+    return df
+
+
+def construir_features(df, variante_idade='ordinal'):
+    """
+    Etapa features: codificação e feature engineering dos scripts de produção
+    
+    Os faltantes são mantidos (cada motor os trata na etapa de seleção).
+    
+    Args:
+        df: DataFrame com o histórico de casos (coluna diagnostico)
+        variante_idade: 'ordinal' (idade_categoria 0-4, train_model.py) ou
+            'rotulos' (idade_categoria_encoded, create_*.py)
+    
+    Returns:
+        dict com X (DataFrame numérico), y, le_especie, le_sexo, le_diagnostico e feature_names
+    """
+    if 'diagnostico' not in df.columns:
+        raise ValueError("Coluna 'diagnostico' não encontrada!")
+    
+    df_ml = df.copy()
+    
+    # Codificação de variáveis categóricas
+    le_especie = LabelEncoder()
+    le_sexo = LabelEncoder()
+    le_diagnostico = LabelEncoder()
+    
+    if 'especie' in df_ml.columns:
+        df_ml['especie_encoded'] = le_especie.fit_transform(df_ml['especie'])
+    if 'sexo' in df_ml.columns:
+        df_ml['sexo_encoded'] = le_sexo.fit_transform(df_ml['sexo'])
+    
+    df_ml['diagnostico_encoded'] = le_diagnostico.fit_transform(df_ml['diagnostico'])
+    
+    # Features de idade
+    if 'idade_anos' in df_ml.columns:
+        idade = df_ml['idade_anos']
+        bins = [0, 1, 3, 7, 12, 100]
+        
+        if variante_idade == 'ordinal':
+            df_ml['idade_categoria'] = pd.cut(idade, bins=bins, labels=[0, 1, 2, 3, 4]).astype(int)
+            df_ml['idade_senior'] = (idade > 7).astype(int)
+            df_ml['idade_filhote'] = (idade < 1).astype(int)
+            df_ml['idade_quadrado'] = idade ** 2
+            df_ml['idade_log'] = np.log1p(idade)
+        else:
+            try:
+                categorias = pd.cut(idade, bins=bins, labels=['Filhote', 'Jovem', 'Adulto', 'Maduro', 'Idoso'])
+                df_ml['idade_categoria_encoded'] = LabelEncoder().fit_transform(categorias)
+            except (TypeError, ValueError):
+                df_ml['idade_categoria_encoded'] = (idade // 5).astype(int)
+            df_ml['idade_quadrado'] = idade ** 2
+            df_ml['idade_log'] = np.log1p(idade)
+            df_ml['idade_senior'] = (idade > 7).astype(int)
+            df_ml['idade_filhote'] = (idade < 1).astype(int)
+    
+    # Features de sintomas
+    sintomas_presentes = [col for col in SINTOMAS if col in df_ml.columns]
+    if sintomas_presentes:
+        df_ml['total_sintomas'] = df_ml[sintomas_presentes].sum(axis=1)
+        df_ml['severidade_sintomas'] = df_ml['total_sintomas'].apply(
+            lambda x: 0 if x == 0 else 1 if x <= 2 else 2 if x <= 4 else 3
+        )
+    
+    # Features laboratoriais combinadas
+    if 'hemoglobina' in df_ml.columns and 'hematocrito' in df_ml.columns:
+        df_ml['indice_anemia'] = (df_ml['hemoglobina'] < 12).astype(int)
+        df_ml['indice_policitemia'] = (df_ml['hematocrito'] > 50).astype(int)
+    
+    if 'ureia' in df_ml.columns and 'creatinina' in df_ml.columns:
+        df_ml['indice_renal'] = ((df_ml['ureia'] > 40) | (df_ml['creatinina'] > 1.5)).astype(int)
+    
+    if 'alt' in df_ml.columns:
+        df_ml['indice_hepatico'] = (df_ml['alt'] > 100).astype(int)
+    
+    # Selecionar features numéricas
+    numeric_cols = df_ml.select_dtypes(include=[np.number]).columns.tolist()
+    if 'diagnostico_encoded' in numeric_cols:
+        numeric_cols.remove('diagnostico_encoded')
+    
+    return {
+        'X': df_ml[numeric_cols],
+        'y': df_ml['diagnostico_encoded'].to_numpy(),
+        'le_especie': le_especie,
+        'le_sexo': le_sexo,
+        'le_diagnostico': le_diagnostico,
+        'feature_names': numeric_cols
+    }
+
+
+def selecionar_features(X, y, motor='exato', k_features=None, test_size=0.2, random_state=42):
+    """
+    Etapa seleção: faltantes do motor, divisão treino/teste, escala e SelectKBest
+    
+    Args:
+        X: DataFrame de features (com faltantes)
+        y: Target codificado
+        motor: 'exato' (faltantes viram 0) ou 'histograma' (NaN preservado)
+        k_features: Número de features mantidas (None = todas)
+        test_size: Fração de teste
+        random_state: Seed
+    
+    Returns:
+        dict com X_train, X_test, y_train, y_test (arrays), scaler e selector (ou None)
+    """
+    X = preencher_faltantes(X, motor)
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+    
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    selector = None
+    if k_features is not None:
+        selector = SelectKBest(score_func=f_classif, k=min(k_features, X.shape[1]))
+        # A seleção é pontuada sem faltantes; o recorte de colunas preserva os NaN
+        selector.fit(np.nan_to_num(X_train_scaled), y_train)
+        X_train_scaled = selecionar_colunas(selector, X_train_scaled)
+        X_test_scaled = selecionar_colunas(selector, X_test_scaled)
+    
+    return {
+        'X_train': X_train_scaled,
+        'X_test': X_test_scaled,
+        'y_train': np.asarray(y_train),
+        'y_test': np.asarray(y_test),
+        'scaler': scaler,
+        'selector': selector
+    }
+
+
+def buscar_hiperparametros(X_train, y_train, motor='exato', param_grid=None, n_iter=30,
+                           cv_folds=5, random_state=42, early_stopping=None,
+                           n_iter_no_change=50, validation_fraction=0.1, n_jobs=-1):
+    """
+    Etapa busca: busca staged de hiperparâmetros (vetlib.boosting)
+    
+    Args:
+        X_train, y_train: Dados de treino já selecionados
+        motor: 'exato' ou 'histograma'
+        param_grid: Espaço de busca (None = GRIDS_BUSCA_STAGED[motor])
+        n_iter, cv_folds, random_state, early_stopping, n_iter_no_change,
+        validation_fraction, n_jobs: Ver busca_staged_n_estimators
+    
+    Returns:
+        dict de busca_staged_n_estimators
+    """
+    return busca_staged_n_estimators(
+        X_train, y_train, param_grid or GRIDS_BUSCA_STAGED[motor],
+        n_iter=n_iter, cv_folds=cv_folds, random_state=random_state,
+        early_stopping=early_stopping, n_iter_no_change=n_iter_no_change,
+        validation_fraction=validation_fraction, n_jobs=n_jobs, motor=motor
+    )
+
+
+def _ajustar(modelo, X, y):
+    return modelo.fit(X, y)
+
+
+def _pontuar_fold(modelo, X, y, idx_treino, idx_val):
+    modelo.fit(X[idx_treino], y[idx_treino])
+    return accuracy_score(y[idx_val], modelo.predict(X[idx_val]))
+
+
+def avaliar_modelo_final(X_train, X_test, y_train, y_test, motor='exato', parametros=None,
+                         scores_folds=None, cv_folds=5, random_state=42, early_stopping=None,
+                         n_iter_no_change=50, validation_fraction=0.1, n_jobs=-1):
+    """
+    Etapa avaliação: ajuste final, acurácia de teste e validação cruzada
+    
+    Quando a busca já produziu os scores por fold do melhor candidato eles são
+    reaproveitados; senão o ajuste final e os folds rodam juntos em paralelo.
+    
+    Args:
+        X_train, X_test, y_train, y_test: Saída da etapa de seleção
+        motor: 'exato' ou 'histograma'
+        parametros: Hiperparâmetros do motor (None = PARAMETROS_PADRAO[motor])
+        scores_folds: Scores por fold vindos da busca (None = calcula a CV)
+        cv_folds: Folds da validação cruzada
+        random_state, early_stopping, n_iter_no_change, validation_fraction: Ver criar_boosting
+        n_jobs: Processos paralelos
+    
+    Returns:
+        dict com modelo, accuracy, cv_mean, cv_std e scores_folds
+    """
+    modelo = criar_boosting(
+        motor,
+        early_stopping=early_stopping,
+        n_iter_no_change=n_iter_no_change,
+        validation_fraction=validation_fraction,
+        random_state=random_state,
+        **(parametros if parametros is not None else PARAMETROS_PADRAO[motor])
+    )
+    
+    tarefas = [delayed(_ajustar)(clone(modelo), X_train, y_train)]
+    if scores_folds is None:
+        folds = StratifiedKFold(n_splits=cv_folds).split(X_train, y_train)
+        tarefas += [
+            delayed(_pontuar_fold)(clone(modelo), X_train, y_train, idx_treino, idx_val)
+            for idx_treino, idx_val in folds
+        ]
+    
+    saidas = Parallel(n_jobs=n_jobs)(tarefas)
+    modelo = saidas[0]
+    scores_folds = np.asarray(saidas[1:] if scores_folds is None else scores_folds)
+    
+    return {
+        'modelo': modelo,
+        'accuracy': accuracy_score(y_test, modelo.predict(X_test)),
+        'cv_mean': scores_folds.mean(),
+        'cv_std': scores_folds.std(),
+        'scores_folds': scores_folds
+    }
+
+
+def exportar_modelo(avaliacao, features, selecao, dataset_name, config):
+    """
+    Etapa exportação: salva o artefato no formato do app de predição
+    
+    Args:
+        avaliacao: Saída de avaliar_modelo_final
+        features: Saída de construir_features
+        selecao: Saída de selecionar_features
+        dataset_name: Nome do CSV usado
+        config: Configuração do pipeline (arquivo_modelo, arquivo_info, ...)
+    
+    Returns:
+        Path do artefato, dict salvo
+    """
+    modelo = avaliacao['modelo']
+    le_diagnostico = features['le_diagnostico']
+    feature_names = features['feature_names']
+    
+    model_data = {
+        'model': modelo,
+        'scaler': selecao['scaler'],
+        'le_especie': features['le_especie'],
+        'le_sexo': features['le_sexo'],
+        'le_diagnostico': le_diagnostico,
+        'accuracy': avaliacao['accuracy'],
+        'cv_mean': avaliacao['cv_mean'],
+        'cv_std': avaliacao['cv_std'],
+        'timestamp': datetime.now().isoformat(),
+        'training_samples': len(selecao['X_train']),
+        'test_samples': len(selecao['X_test']),
+        'feature_names': feature_names,
+        'dataset_name': dataset_name,
+        'model_type': type(modelo).__name__ + config['sufixo_tipo']
+    }
+    if selecao['selector'] is not None:
+        model_data['selector'] = selecao['selector']
+    
+    model_file = Path(config['arquivo_modelo'])
+    model_file.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model_data, model_file)
+    
+    if config['arquivo_info']:
+        with open(config['arquivo_info'], 'w', encoding='utf-8') as f:
+            f.write(f"=== VETDIAGNOSIS AI - {config['titulo_info']} ===\n\n")
+            f.write(f"Data de Treinamento: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Dataset Usado: {dataset_name}\n")
+            f.write(f"Tipo de Modelo: {model_data['model_type']}\n")
+            f.write(f"Acurácia: {avaliacao['accuracy']:.4f} ({avaliacao['accuracy']:.1%})\n")
+            f.write(f"CV Mean: {avaliacao['cv_mean']:.4f} ± {avaliacao['cv_std']:.4f}\n")
+            f.write(f"Amostras de Treino: {model_data['training_samples']:,}\n")
+            f.write(f"Amostras de Teste: {model_data['test_samples']:,}\n")
+            f.write(f"Features Usadas: {len(feature_names)}\n")
+            f.write(f"Classes de Diagnóstico: {len(le_diagnostico.classes_)}\n\n")
+            
+            f.write("Classes de Diagnóstico:\n")
+            for i, classe in enumerate(le_diagnostico.classes_):
+                f.write(f"  {i}: {classe}\n")
+            
+            f.write(f"\nFeatures Utilizadas:\n")
+            for i, feature in enumerate(feature_names):
+                f.write(f"  {i}: {feature}\n")
+    
+    registrar_modelo(model_file, {
+        'origem': config['origem'],
+        'modelo': model_data['model_type'],
+        'accuracy': avaliacao['accuracy'],
+        'cv_mean': avaliacao['cv_mean'],
+        'n_treino': model_data['training_samples'],
+        'n_features': len(feature_names)
+    })
+    
+    return model_file, model_data
+
+
+def executar_pipeline(config=None, diretorio_cache=DIRETORIO_CACHE, n_jobs=-1, verbose=True):
+    """
+    Executa o pipeline completo com cache por etapa
+    
+    Args:
+        config: dict sobre CONFIG_PADRAO (por exemplo {**PERFIS['781'], 'motor': 'histograma'})
+        diretorio_cache: Pasta do cache das etapas (None = sem cache)
+        n_jobs: Processos paralelos dentro das etapas
+        verbose: Imprime cada etapa (tempo e se veio do cache)
+    
+    Returns:
+        dict com caminho_modelo, model_data, selecao, busca (ou None) e etapas
+        ({etapa: {'tempo_s', 'cache'}})
+    """
+    config = {**CONFIG_PADRAO, **(config or {})}
+    memoria = joblib.Memory(diretorio_cache, verbose=0)
+    etapas = {}
+    
+    def executar_etapa(nome, funcao, *args, **kwargs):
+        cacheada = memoria.cache(funcao, ignore=['n_jobs'] if 'n_jobs' in kwargs else None)
+        em_cache = diretorio_cache is not None and cacheada.check_call_in_cache(*args, **kwargs)
+        
+        inicio = time.perf_counter()
+        saida = cacheada(*args, **kwargs)
+        etapas[nome] = {'tempo_s': time.perf_counter() - inicio, 'cache': bool(em_cache)}
+        
+        if verbose:
+            origem = "♻️ cache" if em_cache else "⚙️ calculada"
+            print(f"   • {nome}: {origem} ({etapas[nome]['tempo_s']:.2f}s)")
+        
+        return saida
+    
+    motor = config['motor']
+    random_state = config['random_state']
+    parametros_boosting = {
+        'random_state': random_state,
+        'early_stopping': config['early_stopping'],
+        'n_iter_no_change': config['n_iter_no_change'],
+        'validation_fraction': config['validation_fraction']
+    }
+    
+    caminho = localizar_dataset(config['dados'], datasets=config['datasets'])
+    estatisticas = caminho.stat()
+    df = executar_etapa('carregar', carregar_dataset, str(caminho),
+                        assinatura=(estatisticas.st_size, estatisticas.st_mtime_ns))
+    
+    if verbose:
+        print(f"✅ Dataset: {caminho.name} ({len(df)} registros)")
+    
+    features = executar_etapa('features', construir_features, df, variante_idade=config['variante_idade'])
+    
+    selecao = executar_etapa(
+        'selecao', selecionar_features, features['X'], features['y'],
+        motor=motor, k_features=config['k_features'],
+        test_size=config['test_size'], random_state=random_state
+    )
+    
+    busca = None
+    parametros = config['parametros']
+    scores_folds = None
+    if config['busca']:
+        busca = executar_etapa(
+            'busca', buscar_hiperparametros, selecao['X_train'], selecao['y_train'],
+            motor=motor, param_grid=config['param_grid'], n_iter=config['n_iter'],
+            cv_folds=config['cv_folds'], n_jobs=n_jobs, **parametros_boosting
+        )
+        # Os folds da busca são os mesmos da avaliação: o melhor candidato já traz a CV
+        parametros = busca['melhores_parametros']
+        scores_folds = busca['scores_folds']
+    
+    avaliacao = executar_etapa(
+        'avaliacao', avaliar_modelo_final,
+        selecao['X_train'], selecao['X_test'], selecao['y_train'], selecao['y_test'],
+        motor=motor, parametros=parametros, scores_folds=scores_folds,
+        cv_folds=config['cv_folds'], n_jobs=n_jobs, **parametros_boosting
+    )
+    
+    inicio = time.perf_counter()
+    caminho_modelo, model_data = exportar_modelo(avaliacao, features, selecao, caminho.name, config)
+    etapas['exportacao'] = {'tempo_s': time.perf_counter() - inicio, 'cache': False}
+    
+    if verbose:
+        print(f"   • exportacao: {caminho_modelo} ({etapas['exportacao']['tempo_s']:.2f}s)")
+    
+    return {
+        'caminho_modelo': caminho_modelo,
+        'model_data': model_data,
+        'selecao': selecao,
+        'busca': busca,
+        'etapas': etapas
+    }
@@ -2,12 +2,12 @@
 Módulo de pré-processamento de dados
 """
 
+import copy
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.feature_selection import mutual_info_classif
-import streamlit as st
 
 
 # Faixas de referência por espécie (simplificadas)
@@ -216,20 +216,8 @@ def criar_preprocessador(X, colunas_numericas=None, colunas_categoricas=None):
     return preprocessadores
 
 
-def aplicar_preprocessamento(X, preprocessadores, fit=True):
-    """
-    Aplica pré-processamento aos dados
-    
-    Args:
-        X: DataFrame de features
-        preprocessadores: Dict com objetos de pré-processamento
-        fit: Se True, ajusta os preprocessadores; se False, apenas transforma
-        
-    Returns:
-        DataFrame transformado, preprocessadores atualizados
-    """
-    X_proc = X.copy()
-    
+def _imputar_e_codificar(X_proc, preprocessadores, fit):
+    """Imputa valores ausentes e codifica categóricas (sem escalonamento)"""
     colunas_num = preprocessadores['colunas_numericas']
     colunas_cat = preprocessadores['colunas_categoricas']
     
@@ -266,6 +254,23 @@ def aplicar_preprocessamento(X, preprocessadores, fit=True):
                     le.classes_ = np.append(le.classes_, 'desconhecido')
                 X_proc[col] = le.transform(X_proc[col].astype(str))
     
+    return X_proc
+
+
+def aplicar_preprocessamento(X, preprocessadores, fit=True):
+    """
+    Aplica pré-processamento aos dados
+    
+    Args:
+        X: DataFrame de features
+        preprocessadores: Dict com objetos de pré-processamento
+        fit: Se True, ajusta os preprocessadores; se False, apenas transforma
+        
+    Returns:
+        DataFrame transformado, preprocessadores atualizados
+    """
+    X_proc = _imputar_e_codificar(X.copy(), preprocessadores, fit)
+    
     # Escalonamento de todas as features numéricas finais
     if fit:
         X_proc[X_proc.columns] = preprocessadores['scaler'].fit_transform(X_proc)
@@ -275,6 +280,65 @@ def aplicar_preprocessamento(X, preprocessadores, fit=True):
     return X_proc, preprocessadores
 
 
+def atualizar_estatisticas_preprocessamento(X_novo, preprocessadores):
+    """
+    Acumula estatísticas de escalonamento com novos casos, sem reajustar
+    
+    A transformação usada pelo modelo ('scaler') fica congelada; as médias e
+    variâncias atualizadas vão para 'scaler_acumulado' (partial_fit) e servem
+    para medir a deriva em relação ao último treino completo.
+    
+    Args:
+        X_novo: DataFrame com os novos casos (antes do pré-processamento)
+        preprocessadores: Dict com preprocessadores já ajustados
+        
+    Returns:
+        preprocessadores atualizados
+    """
+    X_base = _imputar_e_codificar(X_novo.copy(), preprocessadores, fit=False)
+    
+    if 'scaler_acumulado' not in preprocessadores:
+        preprocessadores['scaler_acumulado'] = copy.deepcopy(preprocessadores['scaler'])
+    
+    preprocessadores['scaler_acumulado'].partial_fit(X_base)
+    
+    return preprocessadores
+
+
+def calcular_deriva_preprocessamento(preprocessadores):
+    """
+    Mede a deriva entre as estatísticas congeladas e as acumuladas
+    
+    Args:
+        preprocessadores: Dict com 'scaler' e (opcionalmente) 'scaler_acumulado'
+        
+    Returns:
+        dict com deslocamento máximo da média (em desvios-padrão), razão
+        máxima de variâncias e a feature com maior deslocamento
+    """
+    scaler = preprocessadores['scaler']
+    acumulado = preprocessadores.get('scaler_acumulado')
+    
+    if acumulado is None:
+        return {'deslocamento_media_max': 0.0, 'razao_variancia_max': 1.0, 'feature_maior_deriva': None}
+    
+    escala = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    deslocamento = np.abs(acumulado.mean_ - scaler.mean_) / escala
+    
+    var_base = np.where(scaler.var_ > 0, scaler.var_, 1.0)
+    var_acum = np.where(acumulado.var_ > 0, acumulado.var_, 1.0)
+    razao_var = np.maximum(var_acum / var_base, var_base / var_acum)
+    
+    idx_max = int(np.argmax(deslocamento))
+    nomes = getattr(scaler, 'feature_names_in_', None)
+    
+    return {
+        'deslocamento_media_max': float(deslocamento[idx_max]),
+        'razao_variancia_max': float(razao_var.max()),
+        'feature_maior_deriva': nomes[idx_max] if nomes is not None else idx_max
+    }
+
+
 def selecionar_features_importantes(X, y, n_features=None, threshold=0.01):
     """
     Seleciona features mais importantes usando mutual information
@@ -0,0 +1,84 @@
+"""
+Registro de modelos treinados
+
+Índice em JSON Lines (uma linha por artefato salvo em models/) com o caminho,
+a origem do treino, o modelo, as métricas principais e a data. Cada linha é
+acrescentada com uma única escrita, o que permite registrar a partir de
+vários processos (jobs) ao mesmo tempo.
+"""
+
+import json
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+INDICE_REGISTRO = 'models/registro_modelos.jsonl'
+
+
+def _serializavel(valor):
+    """Converte tipos numpy (e demais objetos) para JSON"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+def registrar_modelo(caminho, metadados=None, indice=INDICE_REGISTRO):
+    """
+    Registra um artefato de modelo já salvo em disco
+    
+    Args:
+        caminho: Caminho do artefato (.pkl)
+        metadados: dict com origem, modelo, métricas etc.
+        indice: Arquivo do índice
+    
+    Returns:
+        dict com a entrada registrada
+    """
+    entrada = {
+        'id': uuid.uuid4().hex[:12],
+        'caminho': str(caminho),
+        'registrado_em': datetime.now().isoformat(),
+        **(metadados or {})
+    }
+    
+    indice = Path(indice)
+    indice.parent.mkdir(parents=True, exist_ok=True)
+    with open(indice, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entrada, ensure_ascii=False, default=_serializavel) + '\n')
+    
+    return entrada
+
+
+def listar_modelos_registrados(indice=INDICE_REGISTRO):
+    """
+    Lista os modelos registrados, do mais recente para o mais antigo
+    
+    Args:
+        indice: Arquivo do índice
+    
+    Returns:
+        DataFrame com uma linha por entrada e a coluna 'existe' (artefato ainda em disco)
+    """
+    indice = Path(indice)
+    if not indice.exists():
+        return pd.DataFrame()
+    
+    entradas = []
+    with open(indice, encoding='utf-8') as f:
+        for linha in f:
+            try:
+                entradas.append(json.loads(linha))
+            except json.JSONDecodeError:  # linha truncada
+                continue
+    
+    if not entradas:
+        return pd.DataFrame()
+    
+    df = pd.DataFrame(entradas).iloc[::-1].reset_index(drop=True)
+    df['existe'] = df['caminho'].map(lambda caminho: Path(caminho).exists())
+    
+    return df
@@ -0,0 +1,265 @@
+"""
+Roteamento de predições por espécie
+
+Em vez de um único modelo aprendendo as interações de Canina, Felina e
+Equina, o ModeloPorEspecie treina um modelo compacto por espécie (em
+paralelo) e despacha cada caso pela coluna 'especie'. Espécies com poucos
+casos de treino, ou desconhecidas no treino, caem no modelo global, treinado
+com todos os casos.
+
+O roteamento trabalha sobre as features já pré-processadas: o valor
+codificado/escalonado da coluna 'especie' identifica a rota, e os nomes das
+espécies vêm dos preprocessadores (nomear_especies) só para os relatórios.
+"""
+
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+from vetlib.evaluation import pontuar_modelo, metricas_por_grupo
+
+
+ROTA_GLOBAL = 'global'
+
+# Casas decimais usadas para comparar o valor escalonado da coluna de espécie
+_CASAS_CODIGO = 6
+
+
+def _ajustar_rota(nome_modelo, parametros, random_state, X, y):
+    """Treina o modelo de uma rota (um núcleo por rota; o paralelismo é entre rotas)"""
+    from vetlib.modeling import criar_modelo_base
+    
+    modelo = criar_modelo_base(nome_modelo, random_state=random_state, n_jobs=1)
+    if parametros:
+        modelo.set_params(**parametros)
+    
+    return modelo.fit(X, y)
+
+
+class ModeloPorEspecie(ClassifierMixin, BaseEstimator):
+    """
+    Ensemble roteado: um modelo por espécie e um modelo global de reserva
+    
+    Args:
+        nome_modelo: Modelo de cada rota (ver obter_modelos_disponiveis)
+        min_amostras: Casos de treino mínimos para uma espécie ter modelo próprio
+        parametros: Hiperparâmetros aplicados a todos os modelos (None = padrão)
+        coluna_especie: Coluna (pré-processada) usada no roteamento
+        random_state: Seed
+        n_jobs: Rotas treinadas em paralelo
+    """
+    
+    def __init__(self, nome_modelo='Random Forest', min_amostras=50, parametros=None,
+                 coluna_especie='especie', random_state=42, n_jobs=None):
+        self.nome_modelo = nome_modelo
+        self.min_amostras = min_amostras
+        self.parametros = parametros
+        self.coluna_especie = coluna_especie
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+    
+    def _como_dataframe(self, X):
+        if isinstance(X, pd.DataFrame):
+            return X
+        return pd.DataFrame(np.asarray(X), columns=self.feature_names_in_)
+    
+    def _codigos(self, X):
+        return np.round(X[self.coluna_especie].to_numpy(dtype=np.float64), _CASAS_CODIGO)
+    
+    def fit(self, X, y):
+        """
+        Treina o modelo global e um modelo por espécie frequente, em paralelo
+        
+        Args:
+            X: DataFrame de features pré-processadas (com a coluna de espécie)
+            y: Target (classes codificadas)
+        
+        Returns:
+            self
+        """
+        if not isinstance(X, pd.DataFrame) or self.coluna_especie not in X.columns:
+            raise ValueError(f"ModeloPorEspecie precisa de um DataFrame com a coluna '{self.coluna_especie}'")
+        
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        
+        codigos = self._codigos(X)
+        valores, contagens = np.unique(codigos, return_counts=True)
+        
+        # Uma rota só vale a pena com casos suficientes e mais de um diagnóstico
+        rotas = [
+            valor for valor, n in zip(valores, contagens)
+            if n >= self.min_amostras and len(np.unique(y[codigos == valor])) > 1
+        ]
+        indices = [np.arange(len(y))] + [np.flatnonzero(codigos == valor) for valor in rotas]
+        
+        modelos = Parallel(n_jobs=self.n_jobs)(
+            delayed(_ajustar_rota)(self.nome_modelo, self.parametros, self.random_state, X.iloc[idx], y[idx])
+            for idx in indices
+        )
+        
+        self.modelo_global_ = modelos[0]
+        self.modelos_especie_ = dict(zip(rotas, modelos[1:]))
+        self.n_treino_rotas_ = {ROTA_GLOBAL: len(y), **{v: len(idx) for v, idx in zip(rotas, indices[1:])}}
+        self.nomes_especie_ = {valor: str(valor) for valor in valores}
+        
+        return self
+    
+    def nomear_especies(self, preprocessadores):
+        """
+        Traduz os códigos escalonados de espécie para os nomes originais
+        
+        Args:
+            preprocessadores: Dict de preprocessadores usado no treino
+        
+        Returns:
+            self
+        """
+        scaler = preprocessadores['scaler']
+        le = preprocessadores['label_encoders'].get(self.coluna_especie)
+        if le is None:
+            return self
+        
+        i = list(scaler.feature_names_in_).index(self.coluna_especie)
+        for valor in self.nomes_especie_:
+            codigo = int(round(valor * scaler.scale_[i] + scaler.mean_[i]))
+            if 0 <= codigo < len(le.classes_):
+                self.nomes_especie_[valor] = str(le.classes_[codigo])
+        
+        return self
+    
+    def rotear(self, X):
+        """
+        Nome da rota de cada caso (espécie com modelo próprio ou 'global')
+        
+        Args:
+            X: Features pré-processadas
+        
+        Returns:
+            Array com o nome da rota de cada linha
+        """
+        codigos = self._codigos(self._como_dataframe(X))
+        nomes = np.full(len(codigos), ROTA_GLOBAL, dtype=object)
+        for valor in self.modelos_especie_:
+            nomes[codigos == valor] = self.nomes_especie_[valor]
+        return nomes
+    
+    def modelos_rotas(self):
+        """dict {nome da rota: modelo}, com o modelo global em 'global'"""
+        return {
+            ROTA_GLOBAL: self.modelo_global_,
+            **{self.nomes_especie_[v]: m for v, m in self.modelos_especie_.items()}
+        }
+    
+    def predict_proba(self, X):
+        """
+        Probabilidades por classe, cada caso pontuado pelo modelo da sua rota
+        
+        Classes que uma rota nunca viu no treino recebem probabilidade zero.
+        """
+        X = self._como_dataframe(X)
+        codigos = self._codigos(X)
+        
+        proba = np.zeros((len(X), len(self.classes_)))
+        restantes = np.ones(len(X), dtype=bool)
+        
+        for valor, modelo in self.modelos_especie_.items():
+            mascara = codigos == valor
+            if mascara.any():
+                self._pontuar_rota(modelo, X, mascara, proba)
+                restantes &= ~mascara
+        
+        if restantes.any():
+            self._pontuar_rota(self.modelo_global_, X, restantes, proba)
+        
+        return proba
+    
+    def _pontuar_rota(self, modelo, X, mascara, proba):
+        colunas = np.searchsorted(self.classes_, modelo.classes_)
+        proba[np.ix_(np.flatnonzero(mascara), colunas)] = modelo.predict_proba(X[mascara])
+    
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+    
+    @property
+    def feature_importances_(self):
+        """Importâncias das rotas ponderadas pelo número de casos de treino de cada uma"""
+        modelos = [(ROTA_GLOBAL, self.modelo_global_)] + list(self.modelos_especie_.items())
+        if not all(hasattr(m, 'feature_importances_') for _, m in modelos):
+            raise AttributeError("Os modelos das rotas não expõem feature_importances_")
+        
+        pesos = np.array([self.n_treino_rotas_[rota] for rota, _ in modelos], dtype=np.float64)
+        importancias = np.array([m.feature_importances_ for _, m in modelos])
+        return pesos @ importancias / pesos.sum()
+
+
+def _latencia_caso_ms(modelo, caso, n_repeticoes):
+    """Mediana da latência de predict_proba para um único caso"""
+    modelo.predict_proba(caso)  # aquecimento
+    tempos = []
+    for _ in range(n_repeticoes):
+        inicio = time.perf_counter()
+        modelo.predict_proba(caso)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos) * 1000)
+
+
+def relatorio_rotas(modelo, X_test, y_test, label_encoder=None, n_repeticoes=20):
+    """
+    Acurácia, F1, latência e tamanho de cada rota do ModeloPorEspecie
+    
+    Cada caso de teste é atribuído à rota que o pontua; a mesma fatia é
+    pontuada pelo modelo global para medir o ganho da especialização.
+    
+    Args:
+        modelo: ModeloPorEspecie treinado
+        X_test: Features de teste pré-processadas
+        y_test: Target de teste (rótulos originais)
+        label_encoder: LabelEncoder usado no treinamento (opcional)
+        n_repeticoes: Repetições para a mediana da latência de um caso
+    
+    Returns:
+        DataFrame indexado pela rota, com n_treino, n_samples, accuracy,
+        f1_macro, accuracy_global, f1_global, latencia_caso_ms,
+        predicao_lote_ms_por_caso e tamanho_mb
+    """
+    X_test = modelo._como_dataframe(X_test)
+    rotas = modelo.rotear(X_test)
+    modelos = modelo.modelos_rotas()
+    
+    metricas_rota = metricas_por_grupo(pontuar_modelo(modelo, X_test, y_test, label_encoder), rotas)
+    metricas_global = metricas_por_grupo(
+        pontuar_modelo(modelo.modelo_global_, X_test, y_test, label_encoder), rotas
+    )
+    n_treino = {modelo.nomes_especie_.get(v, v): n for v, n in modelo.n_treino_rotas_.items()}
+    
+    linhas = []
+    for nome, modelo_rota in modelos.items():
+        mascara = rotas == nome
+        linha = {'rota': nome, 'n_treino': n_treino[nome], 'n_samples': int(mascara.sum())}
+        
+        if mascara.any():
+            X_rota = X_test[mascara]
+            inicio = time.perf_counter()
+            modelo_rota.predict_proba(X_rota)
+            linha.update({
+                'accuracy': metricas_rota[nome]['accuracy'],
+                'f1_macro': metricas_rota[nome]['f1_macro'],
+                'accuracy_global': metricas_global[nome]['accuracy'],
+                'f1_global': metricas_global[nome]['f1_macro'],
+                'predicao_lote_ms_por_caso': (time.perf_counter() - inicio) / len(X_rota) * 1000,
+                'latencia_caso_ms': _latencia_caso_ms(modelo_rota, X_rota.iloc[:1], n_repeticoes)
+            })
+        
+        linha['tamanho_mb'] = len(pickle.dumps(modelo_rota)) / 1024 / 1024
+        linhas.append(linha)
+    
+    colunas = ['n_treino', 'n_samples', 'accuracy', 'f1_macro', 'accuracy_global', 'f1_global',
+               'latencia_caso_ms', 'predicao_lote_ms_por_caso', 'tamanho_mb']
+    return pd.DataFrame(linhas).set_index('rota').reindex(columns=colunas)
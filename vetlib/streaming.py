@@ -0,0 +1,544 @@
+"""
+Treinamento out-of-core (streaming)
+
+Treina a partir de um CSV maior que a memória, lendo-o em blocos cujo tamanho
+sai de um orçamento de memória. A primeira passada coleta uma amostra
+uniforme (medianas, categorias e limiares de histograma) e as contagens de
+classe; a segunda imputa e codifica cada bloco, acumula as estatísticas de
+escala (partial_fit) e grava a matriz em float32 num arquivo mapeado em
+disco. As épocas de treino leem esse arquivo bloco a bloco: o modelo linear
+usa partial_fit e o Hist Gradient Boosting cresce por warm start, alguns
+estágios por bloco, sobre features discretizadas pelos limiares da amostra.
+"""
+
+import math
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from vetlib.data_io import ler_csv_em_blocos
+from vetlib.evaluation import metricas_de_confusao
+from vetlib.preprocessing import (
+    preparar_features_target, criar_preprocessador, aplicar_preprocessamento, _imputar_e_codificar
+)
+
+
+MODELOS_STREAMING = ['Hist Gradient Boosting', 'SGD (Logística)']
+
+# Teto da amostra uniforme (o _BinMapper do sklearn também subamostra 2e5 linhas)
+AMOSTRA_MAX_LINHAS = 200000
+
+# Teto do bloco: acima de 2e5 linhas o _BinMapper subamostraria e perderia as âncoras
+BLOCO_MAX_LINHAS = 190000
+
+# Regularização L2 das folhas: cada bloco traz casos novos, com gradiente alto e
+# hessiana baixa, e sem ela os passos de Newton divergem após algumas épocas
+L2_HIST_GB = 10.0
+
+# Peso das linhas-âncora do Hist Gradient Boosting (desprezível, mas não nulo)
+PESO_ANCORA = 1e-10
+
+# Linhas lidas para estimar o custo de memória por linha
+LINHAS_SONDAGEM = 1000
+
+# Cópias em float64 de um bloco vivas ao mesmo tempo (codificado, escalado, estimador)
+COPIAS_POR_BLOCO = 4
+
+# Memória de pico por byte de DataFrame bruto (buffers do parser de CSV e cópias
+# da padronização; concatenação e pré-processamento da amostra), medida com RssAnon
+FATOR_LEITURA = 6
+FATOR_AMOSTRA = 4
+
+
+def estimar_tamanho_bloco(caminho, memoria_max_mb):
+    """
+    Converte o orçamento de memória em linhas por bloco e tamanho da amostra
+    
+    Metade do orçamento vai para o bloco em processamento (leitura do CSV e
+    cópias numéricas) e um quarto para a amostra uniforme; o restante cobre
+    o modelo e os estados auxiliares.
+    
+    Args:
+        caminho: Caminho do CSV
+        memoria_max_mb: Orçamento de memória em MB
+    
+    Returns:
+        tamanho_bloco, tamanho_amostra (em linhas)
+    """
+    sondagem = pd.read_csv(caminho, nrows=LINHAS_SONDAGEM)
+    bytes_brutos = sondagem.memory_usage(deep=True).sum() / max(len(sondagem), 1)
+    bytes_por_linha = FATOR_LEITURA * bytes_brutos + COPIAS_POR_BLOCO * 8 * sondagem.shape[1]
+    
+    orcamento = memoria_max_mb * 1e6
+    tamanho_bloco = min(BLOCO_MAX_LINHAS, max(1000, int(0.5 * orcamento / bytes_por_linha)))
+    tamanho_amostra = max(1000, min(AMOSTRA_MAX_LINHAS, int(0.25 * orcamento / (FATOR_AMOSTRA * bytes_brutos))))
+    
+    return tamanho_bloco, tamanho_amostra
+
+
+def _em_teste(indices, fracao_teste):
+    """Separação treino/teste determinística pelo índice global da linha"""
+    # Hash multiplicativo: estável entre passadas e independente do tamanho do bloco
+    hash_linhas = (np.asarray(indices, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hash_linhas < np.uint64(fracao_teste * 2 ** 32)
+
+
+def _separar_bloco(bloco, feature_names=None):
+    """Remove casos sem diagnóstico e separa X e y com colunas fixas"""
+    bloco = bloco.dropna(subset=['diagnostico'])
+    X, y, nomes = preparar_features_target(bloco)
+    
+    if feature_names is not None:
+        X = X.reindex(columns=feature_names)
+    
+    return X, y.astype(str), nomes
+
+
+def coletar_estatisticas(caminho, tamanho_bloco, tamanho_amostra, fracao_teste=0.2, random_state=42):
+    """
+    Primeira passada: amostra uniforme, classes, categorias e contagens
+    
+    A amostra guarda as linhas de treino com as menores chaves aleatórias
+    (amostragem bottom-k), o que equivale a sortear sem reposição sem saber
+    o total de linhas de antemão.
+    
+    Args:
+        caminho: Caminho do CSV
+        tamanho_bloco: Linhas por bloco
+        tamanho_amostra: Linhas da amostra uniforme
+        fracao_teste: Fração de linhas reservadas para teste
+        random_state: Seed
+    
+    Returns:
+        dict com 'amostra' (X e diagnóstico), 'feature_names',
+        'colunas_categoricas', 'categorias', 'contagens_classes' (treino),
+        'classes' e 'n_linhas'
+    """
+    rng = np.random.RandomState(random_state)
+    amostra = None
+    contagens = pd.Series(dtype=np.float64)
+    classes = set()
+    categorias = {}
+    feature_names = None
+    colunas_categoricas = []
+    n_linhas = 0
+    
+    for bloco in ler_csv_em_blocos(caminho, tamanho_bloco):
+        X, y, nomes = _separar_bloco(bloco, feature_names)
+        
+        if feature_names is None:
+            feature_names = nomes
+            colunas_categoricas = X.select_dtypes(include=['object', 'category']).columns.tolist()
+            categorias = {col: set() for col in colunas_categoricas}
+        
+        for col in colunas_categoricas:
+            categorias[col].update(X[col].dropna().astype(str).unique())
+        classes.update(y.unique())
+        n_linhas += len(X)
+        
+        treino = ~_em_teste(X.index.values, fracao_teste)
+        contagens = contagens.add(y[treino].value_counts(), fill_value=0)
+        
+        chaves = rng.random_sample(len(X))
+        entra = treino.copy()
+        if amostra is not None and len(amostra) == tamanho_amostra:
+            # Só entram linhas com chave menor que a maior chave já guardada
+            entra &= chaves < amostra['_chave'].max()
+        
+        candidatos = X[entra].assign(diagnostico=y[entra].values, _chave=chaves[entra])
+        amostra = candidatos if amostra is None else pd.concat([amostra, candidatos])
+        if len(amostra) > tamanho_amostra:
+            amostra = amostra.nsmallest(tamanho_amostra, '_chave')
+    
+    if feature_names is None or amostra is None or len(amostra) == 0:
+        raise ValueError("Nenhum caso de treino com diagnóstico encontrado no arquivo")
+    
+    return {
+        'amostra': amostra.drop(columns='_chave'),
+        'feature_names': feature_names,
+        'colunas_categoricas': colunas_categoricas,
+        'categorias': categorias,
+        'contagens_classes': contagens,
+        'classes': np.array(sorted(classes)),
+        'n_linhas': n_linhas
+    }
+
+
+def ajustar_preprocessadores(estatisticas):
+    """
+    Ajusta imputers e encoders na amostra, com as categorias de todo o arquivo
+    
+    O scaler fica vazio: é ajustado com partial_fit na segunda passada.
+    
+    Args:
+        estatisticas: Resultado de coletar_estatisticas
+    
+    Returns:
+        dict de preprocessadores no formato de criar_preprocessador
+    """
+    X_amostra = estatisticas['amostra'][estatisticas['feature_names']]
+    preprocessadores = criar_preprocessador(X_amostra, colunas_categoricas=estatisticas['colunas_categoricas'])
+    _imputar_e_codificar(X_amostra.copy(), preprocessadores, fit=True)
+    
+    # Categorias raras podem faltar na amostra: encoders com o conjunto completo
+    modas = dict(zip(estatisticas['colunas_categoricas'], preprocessadores['imputer_categorico'].statistics_))
+    for col, valores in estatisticas['categorias'].items():
+        preprocessadores['label_encoders'][col] = LabelEncoder().fit(sorted(valores | {str(modas[col])}))
+    
+    preprocessadores['scaler'] = StandardScaler()
+    
+    return preprocessadores
+
+
+def gravar_matriz(caminho, estatisticas, preprocessadores, diretorio, tamanho_bloco, fracao_teste=0.2):
+    """
+    Segunda passada: codifica os blocos em disco e ajusta o scaler online
+    
+    Args:
+        caminho: Caminho do CSV
+        estatisticas: Resultado de coletar_estatisticas
+        preprocessadores: Resultado de ajustar_preprocessadores (scaler é ajustado aqui)
+        diretorio: Diretório dos arquivos mapeados
+        tamanho_bloco: Linhas por bloco
+        fracao_teste: Fração de linhas reservadas para teste
+    
+    Returns:
+        matriz (float32, imputada e codificada, sem escala), y (índice da
+        classe) e máscara de teste, todos mapeados em disco
+    """
+    n_linhas = estatisticas['n_linhas']
+    feature_names = estatisticas['feature_names']
+    classes = estatisticas['classes']
+    diretorio = Path(diretorio)
+    
+    matriz = np.memmap(diretorio / 'X.dat', dtype=np.float32, mode='w+', shape=(n_linhas, len(feature_names)))
+    y_codigos = np.memmap(diretorio / 'y.dat', dtype=np.int32, mode='w+', shape=(n_linhas,))
+    teste = np.memmap(diretorio / 'teste.dat', dtype=bool, mode='w+', shape=(n_linhas,))
+    
+    scaler = preprocessadores['scaler']
+    posicao = 0
+    
+    for bloco in ler_csv_em_blocos(caminho, tamanho_bloco):
+        X, y, _ = _separar_bloco(bloco, feature_names)
+        if len(X) == 0:
+            continue
+        
+        em_teste = _em_teste(X.index.values, fracao_teste)
+        X_base = _imputar_e_codificar(X.copy(), preprocessadores, fit=False)
+        
+        if (~em_teste).any():
+            scaler.partial_fit(X_base[~em_teste])
+        
+        fim = posicao + len(X)
+        matriz[posicao:fim] = X_base.to_numpy(dtype=np.float32)
+        y_codigos[posicao:fim] = np.searchsorted(classes, y.values)
+        teste[posicao:fim] = em_teste
+        posicao = fim
+    
+    matriz.flush()
+    
+    return matriz, y_codigos, teste
+
+
+def calcular_limiares(X, n_bins=255):
+    """
+    Limiares de histograma por feature a partir de uma amostra
+    
+    Features com poucos valores distintos usam os pontos médios entre eles;
+    as demais, quantis da amostra.
+    
+    Args:
+        X: Array (n_amostras, n_features) já escalado
+        n_bins: Número máximo de bins por feature (até 255, para uint8)
+    
+    Returns:
+        Lista com um array ordenado de limiares por feature
+    """
+    limiares = []
+    
+    for coluna in np.asarray(X, dtype=np.float64).T:
+        distintos = np.unique(coluna)
+        if len(distintos) <= n_bins:
+            limiares.append((distintos[:-1] + distintos[1:]) / 2)
+        else:
+            quantis = np.percentile(coluna, np.linspace(0, 100, n_bins + 1)[1:-1], method='midpoint')
+            limiares.append(np.unique(quantis))
+    
+    return limiares
+
+
+class ClassificadorHistograma:
+    """
+    Estimador treinado sobre features discretizadas por limiares fixos
+    
+    Recebe as features já pré-processadas (como os demais modelos do app) e
+    as converte nos códigos de bin usados no treinamento.
+    """
+    
+    def __init__(self, estimador, limiares, feature_names):
+        self.estimador = estimador
+        self.limiares = limiares
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(limiares)
+    
+    @property
+    def classes_(self):
+        return self.estimador.classes_
+    
+    def discretizar(self, X):
+        """Converte features escaladas em códigos de bin (uint8)"""
+        X = np.asarray(X, dtype=np.float64)
+        codigos = np.empty(X.shape, dtype=np.uint8)
+        for j, limiares in enumerate(self.limiares):
+            codigos[:, j] = np.searchsorted(limiares, X[:, j], side='right')
+        return codigos
+    
+    def predict_proba(self, X):
+        return self.estimador.predict_proba(self.discretizar(X))
+    
+    def predict(self, X):
+        return self.estimador.predict(self.discretizar(X))
+
+
+def _pesos_balanceados(contagens, classes):
+    """Pesos 'balanced' calculados com as contagens do arquivo inteiro"""
+    contagens = contagens.reindex(classes, fill_value=0)
+    total = contagens.sum()
+    return {
+        classe: float(total / (len(classes) * n)) if n > 0 else 1.0
+        for classe, n in contagens.items()
+    }
+
+
+def _blocos_treino(matriz, y_codigos, teste, media, escala, tamanho_bloco, rng):
+    """Percorre os blocos de treino em ordem aleatória, já escalados"""
+    inicios = np.arange(0, len(matriz), tamanho_bloco)
+    
+    for inicio in rng.permutation(inicios):
+        fatia = slice(inicio, inicio + tamanho_bloco)
+        selecao = ~np.asarray(teste[fatia])
+        if not selecao.any():
+            continue
+        
+        X_bloco = (np.asarray(matriz[fatia][selecao], dtype=np.float64) - media) / escala
+        y_bloco = np.asarray(y_codigos[fatia][selecao])
+        
+        ordem = rng.permutation(len(y_bloco))
+        yield X_bloco[ordem], y_bloco[ordem]
+
+
+def _treinar_sgd(matriz, y_codigos, teste, preprocessadores, estatisticas, tamanho_bloco,
+                 n_epocas, random_state):
+    """Regressão logística por SGD, com partial_fit bloco a bloco"""
+    classes = estatisticas['classes']
+    feature_names = estatisticas['feature_names']
+    scaler = preprocessadores['scaler']
+    rng = np.random.RandomState(random_state)
+    
+    modelo = SGDClassifier(
+        loss='log_loss',
+        alpha=1e-4,
+        class_weight=_pesos_balanceados(estatisticas['contagens_classes'], classes),
+        random_state=random_state
+    )
+    
+    for _ in range(n_epocas):
+        for X_bloco, y_bloco in _blocos_treino(matriz, y_codigos, teste, scaler.mean_, scaler.scale_,
+                                               tamanho_bloco, rng):
+            modelo.partial_fit(pd.DataFrame(X_bloco, columns=feature_names), classes[y_bloco], classes=classes)
+    
+    return modelo
+
+
+def _treinar_hist_gb(matriz, y_codigos, teste, preprocessadores, estatisticas, tamanho_bloco,
+                     n_epocas, max_iter, n_bins, random_state):
+    """
+    Hist Gradient Boosting com warm start: alguns estágios por bloco
+    
+    Cada bloco ajusta os próximos estágios sobre o gradiente do ensemble
+    inteiro (boosting estocástico com subamostra = bloco). Com mais blocos do
+    que estágios, o treino para ao atingir max_iter.
+    """
+    classes = estatisticas['classes']
+    feature_names = estatisticas['feature_names']
+    scaler = preprocessadores['scaler']
+    rng = np.random.RandomState(random_state)
+    
+    X_amostra, _ = aplicar_preprocessamento(
+        estatisticas['amostra'][feature_names], preprocessadores, fit=False
+    )
+    limiares = calcular_limiares(X_amostra, n_bins=n_bins)
+    modelo = ClassificadorHistograma(None, limiares, feature_names)
+    
+    # O warm start do HGB compara os estágios antigos com o bin mapper do bloco
+    # novo; linhas-âncora com todos os códigos de bin e todas as classes fazem
+    # cada bloco produzir o mesmo mapeamento (código = bin) e o mesmo classes_
+    n_codigos = np.array([len(limiares_feature) + 1 for limiares_feature in limiares])
+    n_ancoras = max(int(n_codigos.max()), len(classes))
+    X_ancora = np.minimum(np.arange(n_ancoras)[:, None], n_codigos - 1).astype(np.uint8)
+    y_ancora = classes[np.arange(n_ancoras) % len(classes)]
+    
+    n_blocos = math.ceil(len(matriz) / tamanho_bloco)
+    estagios_por_bloco = max(1, math.ceil(max_iter / (n_blocos * n_epocas)))
+    
+    estimador = HistGradientBoostingClassifier(
+        max_iter=0,
+        max_bins=n_bins,
+        l2_regularization=L2_HIST_GB,
+        early_stopping=False,
+        warm_start=True,
+        random_state=random_state
+    )
+    
+    # Pesos 'balanced' aplicados como sample_weight (o class_weight do HGB é recalculado por bloco)
+    peso_classe = np.array(list(_pesos_balanceados(estatisticas['contagens_classes'], classes).values()))
+    
+    for _ in range(n_epocas):
+        for X_bloco, y_bloco in _blocos_treino(matriz, y_codigos, teste, scaler.mean_, scaler.scale_,
+                                               tamanho_bloco, rng):
+            X_treino = np.vstack([modelo.discretizar(X_bloco), X_ancora])
+            y_treino = np.concatenate([classes[y_bloco], y_ancora])
+            pesos = np.concatenate([peso_classe[y_bloco], np.full(n_ancoras, PESO_ANCORA)])
+            
+            estimador.set_params(max_iter=min(max_iter, estimador.max_iter + estagios_por_bloco))
+            estimador.fit(X_treino, y_treino, sample_weight=pesos)
+            
+            if estimador.max_iter >= max_iter:
+                break
+        
+        if estimador.max_iter >= max_iter:
+            break
+    
+    modelo.estimador = estimador
+    
+    return modelo
+
+
+def avaliar_streaming(modelo, matriz, y_codigos, teste, preprocessadores, classes, tamanho_bloco):
+    """
+    Avalia o modelo nas linhas de teste, bloco a bloco
+    
+    Args:
+        modelo: Modelo treinado (recebe features escaladas)
+        matriz, y_codigos, teste: Resultado de gravar_matriz
+        preprocessadores: Preprocessadores com o scaler ajustado
+        classes: Classes (ordenadas) do diagnóstico
+        tamanho_bloco: Linhas por bloco
+    
+    Returns:
+        dict com as métricas de metricas_de_confusao e a matriz de confusão,
+        ou None se não houver linhas de teste
+    """
+    scaler = preprocessadores['scaler']
+    feature_names = list(scaler.feature_names_in_)
+    n_classes = len(classes)
+    confusao = np.zeros(n_classes * n_classes, dtype=np.int64)
+    
+    for inicio in range(0, len(matriz), tamanho_bloco):
+        fatia = slice(inicio, inicio + tamanho_bloco)
+        selecao = np.asarray(teste[fatia])
+        if not selecao.any():
+            continue
+        
+        X_bloco = (np.asarray(matriz[fatia][selecao], dtype=np.float64) - scaler.mean_) / scaler.scale_
+        y_pred = np.searchsorted(classes, modelo.predict(pd.DataFrame(X_bloco, columns=feature_names)))
+        confusao += np.bincount(np.asarray(y_codigos[fatia][selecao]) * n_classes + y_pred,
+                                minlength=n_classes * n_classes)
+    
+    if confusao.sum() == 0:
+        return None
+    
+    confusao = confusao.reshape(n_classes, n_classes)
+    metricas = {nome: float(valor) for nome, valor in metricas_de_confusao(confusao).items()}
+    metricas['confusion_matrix'] = confusao
+    
+    return metricas
+
+
+def treinar_modelo_streaming(caminho, nome_modelo='Hist Gradient Boosting', memoria_max_mb=512,
+                             n_epocas=3, max_iter=200, n_bins=255, fracao_teste=0.2,
+                             random_state=42, diretorio_temp=None, verbose=True):
+    """
+    Treina um modelo lendo o CSV em blocos, dentro de um orçamento de memória
+    
+    Args:
+        caminho: Caminho do CSV com a coluna 'diagnostico'
+        nome_modelo: Um de MODELOS_STREAMING
+        memoria_max_mb: Orçamento de memória em MB (define o tamanho dos blocos)
+        n_epocas: Passadas de treino sobre os blocos
+        max_iter: Estágios do Hist Gradient Boosting
+        n_bins: Bins por feature do Hist Gradient Boosting (até 255)
+        fracao_teste: Fração de linhas reservadas para teste
+        random_state: Seed
+        diretorio_temp: Onde criar os arquivos mapeados (padrão: temporário do sistema)
+        verbose: Imprime o progresso
+    
+    Returns:
+        modelo, preprocessadores, feature_names, historico
+    """
+    if nome_modelo not in MODELOS_STREAMING:
+        raise ValueError(f"Modelo '{nome_modelo}' não suporta treinamento streaming")
+    
+    inicio = time.perf_counter()
+    tamanho_bloco, tamanho_amostra = estimar_tamanho_bloco(caminho, memoria_max_mb)
+    
+    if verbose:
+        print(f"🌊 Streaming: blocos de {tamanho_bloco:,} linhas, amostra de {tamanho_amostra:,}")
+    
+    estatisticas = coletar_estatisticas(caminho, tamanho_bloco, tamanho_amostra, fracao_teste, random_state)
+    preprocessadores = ajustar_preprocessadores(estatisticas)
+    feature_names = estatisticas['feature_names']
+    
+    with tempfile.TemporaryDirectory(dir=diretorio_temp) as diretorio:
+        matriz, y_codigos, teste = gravar_matriz(
+            caminho, estatisticas, preprocessadores, diretorio, tamanho_bloco, fracao_teste
+        )
+        tempo_estatisticas = time.perf_counter() - inicio
+        
+        if verbose:
+            print(f"✅ {estatisticas['n_linhas']:,} linhas codificadas em disco "
+                  f"({tempo_estatisticas:.1f}s)")
+        
+        if nome_modelo == 'SGD (Logística)':
+            modelo = _treinar_sgd(
+                matriz, y_codigos, teste, preprocessadores, estatisticas,
+                tamanho_bloco, n_epocas, random_state
+            )
+        else:
+            modelo = _treinar_hist_gb(
+                matriz, y_codigos, teste, preprocessadores, estatisticas,
+                tamanho_bloco, n_epocas, max_iter, n_bins, random_state
+            )
+        
+        metricas = avaliar_streaming(
+            modelo, matriz, y_codigos, teste, preprocessadores, estatisticas['classes'], tamanho_bloco
+        )
+        n_teste = int(np.count_nonzero(teste))
+        del matriz, y_codigos, teste
+    
+    historico = {
+        'modelo': nome_modelo,
+        'modo': 'streaming',
+        'memoria_max_mb': memoria_max_mb,
+        'tamanho_bloco': tamanho_bloco,
+        'tamanho_amostra': len(estatisticas['amostra']),
+        'n_linhas': estatisticas['n_linhas'],
+        'n_treino': estatisticas['n_linhas'] - n_teste,
+        'n_teste': n_teste,
+        'n_epocas': n_epocas,
+        'metricas_teste': metricas,
+        'tempo_estatisticas_s': tempo_estatisticas,
+        'tempo_total_s': time.perf_counter() - inicio
+    }
+    
+    if verbose and metricas is not None:
+        print(f"✅ {nome_modelo}: acurácia {metricas['accuracy']:.4f}, "
+              f"F1 macro {metricas['f1_macro']:.4f} ({historico['tempo_total_s']:.1f}s)")
+    
+    return modelo, preprocessadores, feature_names, historico
@@ -0,0 +1,226 @@
+"""
+Cache em disco de resultados de treinamento
+
+Cada entrada guarda o modelo, o histórico e a avaliação de um treino,
+indexada por uma chave que combina a impressão digital do dataset, a lista
+de features, o modelo, os hiperparâmetros e a seed. A entrada sobrevive a
+reinícios do processo; acessos atualizam a data da entrada e, acima do
+tamanho máximo, as menos usadas recentemente são removidas (LRU).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+# Incrementar quando o formato das entradas mudar (invalida o cache antigo)
+VERSAO_CACHE = 1
+
+EXTENSAO_ENTRADA = '.joblib'
+
+
+def impressao_dados(X, y=None):
+    """
+    Impressão digital (SHA-256) do conteúdo de um dataset
+    
+    Considera valores, nomes e tipos das colunas e a ordem das linhas.
+    
+    Args:
+        X: DataFrame de features
+        y: Target (opcional)
+    
+    Returns:
+        str hexadecimal
+    """
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps([list(map(str, X.columns)), list(map(str, X.dtypes))]).encode())
+    hasher.update(pd.util.hash_pandas_object(X, index=True).values.tobytes())
+    
+    if y is not None:
+        hasher.update(pd.util.hash_pandas_object(pd.Series(y), index=False).values.tobytes())
+    
+    return hasher.hexdigest()
+
+
+def _serializavel(valor):
+    """Converte tipos numpy (e demais objetos) para a serialização JSON da chave"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    return str(valor)
+
+
+def chave_treino(impressao, feature_names, nome_modelo, parametros=None, random_state=None):
+    """
+    Chave do cache para uma combinação de dados e configuração
+    
+    Args:
+        impressao: Resultado de impressao_dados
+        feature_names: Lista de features usadas
+        nome_modelo: Nome do modelo
+        parametros: dict com hiperparâmetros e opções que afetam o resultado
+        random_state: Seed
+    
+    Returns:
+        str hexadecimal
+    """
+    componentes = {
+        'versao_cache': VERSAO_CACHE,
+        'sklearn': sklearn.__version__,
+        'dados': impressao,
+        'features': list(feature_names),
+        'modelo': nome_modelo,
+        'parametros': parametros or {},
+        'random_state': random_state
+    }
+    texto = json.dumps(componentes, sort_keys=True, default=_serializavel)
+    
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+class CacheTreino:
+    """
+    Cache LRU de treinos em disco, com teto de tamanho
+    
+    Args:
+        diretorio: Pasta das entradas
+        tamanho_max_mb: Tamanho máximo somado das entradas
+        max_entradas: Número máximo de entradas (None = sem limite)
+    """
+    
+    def __init__(self, diretorio='models/cache_treino', tamanho_max_mb=500, max_entradas=None):
+        self.diretorio = Path(diretorio)
+        self.tamanho_max_mb = tamanho_max_mb
+        self.max_entradas = max_entradas
+    
+    def _caminho(self, chave):
+        return self.diretorio / f"{chave}{EXTENSAO_ENTRADA}"
+    
+    def _entradas(self):
+        """Entradas existentes, da menos para a mais recentemente usada"""
+        if not self.diretorio.exists():
+            return []
+        
+        entradas = []
+        for caminho in self.diretorio.glob(f"*{EXTENSAO_ENTRADA}"):
+            try:
+                info = caminho.stat()
+            except FileNotFoundError:  # removida por outro processo
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+        
+        return sorted(entradas)
+    
+    def obter(self, chave):
+        """
+        Retorna o resultado guardado (ou None) e marca a entrada como usada
+        
+        Args:
+            chave: Resultado de chave_treino
+        
+        Returns:
+            Objeto guardado ou None
+        """
+        caminho = self._caminho(chave)
+        
+        try:
+            resultado = joblib.load(caminho)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada corrompida ou de versão incompatível: descartar
+            caminho.unlink(missing_ok=True)
+            return None
+        
+        os.utime(caminho)
+        
+        return resultado
+    
+    def guardar(self, chave, resultado):
+        """
+        Guarda um resultado e aplica a política de remoção
+        
+        A escrita vai para um arquivo temporário renomeado ao final, para que
+        leitores concorrentes nunca vejam uma entrada incompleta.
+        
+        Args:
+            chave: Resultado de chave_treino
+            resultado: Objeto serializável com joblib
+        
+        Returns:
+            Caminho da entrada
+        """
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self._caminho(chave)
+        
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        os.close(descritor)
+        try:
+            joblib.dump(resultado, temporario)
+            os.replace(temporario, caminho)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        
+        self.remover_excedentes(manter=caminho)
+        
+        return caminho
+    
+    def remover_excedentes(self, manter=None):
+        """
+        Remove as entradas menos usadas até respeitar os limites
+        
+        Args:
+            manter: Entrada que nunca é removida (a recém-gravada)
+        
+        Returns:
+            Número de entradas removidas
+        """
+        entradas = self._entradas()
+        tamanho_total = sum(tamanho for _, tamanho, _ in entradas)
+        limite_bytes = self.tamanho_max_mb * 1e6
+        n_entradas = len(entradas)
+        removidas = 0
+        
+        for _, tamanho, caminho in entradas:
+            excede_tamanho = tamanho_total > limite_bytes
+            excede_entradas = self.max_entradas is not None and n_entradas > self.max_entradas
+            if not (excede_tamanho or excede_entradas):
+                break
+            if manter is not None and caminho == manter:
+                continue
+            
+            caminho.unlink(missing_ok=True)
+            tamanho_total -= tamanho
+            n_entradas -= 1
+            removidas += 1
+        
+        return removidas
+    
+    def limpar(self):
+        """Remove todas as entradas"""
+        for _, _, caminho in self._entradas():
+            caminho.unlink(missing_ok=True)
+    
+    def estatisticas(self):
+        """
+        Resumo do cache
+        
+        Returns:
+            dict com n_entradas, tamanho_mb e tamanho_max_mb
+        """
+        entradas = self._entradas()
+        
+        return {
+            'n_entradas': len(entradas),
+            'tamanho_mb': sum(tamanho for _, tamanho, _ in entradas) / 1e6,
+            'tamanho_max_mb': self.tamanho_max_mb
+        }
@@ -0,0 +1,427 @@
+"""
+Tarefas de treinamento executadas pela fila de jobs (vetlib.jobs)
+
+Cada tarefa recebe os dados e as opções escolhidas na página e um callback de
+progresso; o modelo treinado é salvo em models/ e registrado no índice de
+modelos (vetlib.registry) pelo próprio job, mesmo que a página seja fechada.
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split, cross_val_score, RandomizedSearchCV
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from vetlib.boosting import (
+    PARAMETROS_PADRAO, GRIDS_BUSCA, criar_boosting, preencher_faltantes, selecionar_colunas
+)
+from vetlib.cascade import construir_cascata, relatorio_cascata
+from vetlib.case_index import IndiceCasos, salvar_indice_casos
+from vetlib.compression import comprimir_modelo, salvar_modelo_compacto
+from vetlib.evaluation import pontuar_modelo, intervalos_bootstrap
+from vetlib.explain import resumir_fundo, salvar_fundo, gerar_explicacao_global
+from vetlib.incremental import iniciar_estado_incremental
+from vetlib.modeling import (
+    progresso_por_fold, treinar_modelo, avaliar_modelo, obter_importancia_features,
+    calcular_roc_curves, avaliar_por_especie, salvar_modelo
+)
+from vetlib.permutation import calcular_importancia_permutacao, salvar_importancia_permutacao
+from vetlib.preprocessing import criar_preprocessador, aplicar_preprocessamento, selecionar_features_importantes
+from vetlib.registry import registrar_modelo
+from vetlib.routing import relatorio_rotas
+from vetlib.training_cache import CacheTreino
+
+
+def _sem_progresso(info):
+    pass
+
+
+def treinar_e_avaliar(X, y, feature_names, nome_modelo='Random Forest', test_size=0.2,
+                      usar_grid_search=False, cv_folds=5, random_state=42,
+                      usar_selecao_features=False, n_features=None, n_jobs=-1,
+                      chave_cache=None, progresso=None, rotear_por_especie=False,
+                      min_amostras_rota=50, usar_cascata=False, tolerancia_cascata=0.01):
+    """
+    Treino completo da página Treinar Modelo: split, pré-processamento,
+    seleção de features, treino, avaliação e estado incremental
+    
+    Args:
+        X, y: Features e target (saída de preparar_features_target)
+        feature_names: Lista de features
+        nome_modelo: Nome do modelo (ver obter_modelos_disponiveis)
+        test_size: Fração de teste
+        usar_grid_search: Se True, usa GridSearchCV
+        cv_folds: Número de folds
+        random_state: Seed
+        usar_selecao_features: Se True, mantém as n_features mais informativas
+        n_features: Número de features selecionadas
+        n_jobs: Núcleos do job (-1 = todos os reservados ao job pela fila, ver vetlib.jobs)
+        chave_cache: Se informada, o resultado é guardado no cache de treinos
+        progresso: Callback de progresso (ver vetlib.jobs)
+        rotear_por_especie: Se True, treina um modelo por espécie (ModeloPorEspecie)
+        min_amostras_rota: Casos mínimos para uma espécie ter modelo próprio
+        usar_cascata: Se True, um modelo rápido responde os casos óbvios (ver vetlib.cascade)
+        tolerancia_cascata: Perda máxima de acurácia aceita pela cascata
+    
+    Returns:
+        dict com modelo, preprocessadores, feature_names, historico, metricas,
+        intervalos, df_importancia, df_importancia_permutacao (e seu resumo),
+        indice_casos, explicacao_global, roc_curves, metricas_especies,
+        relatorio_rotas (None sem roteamento), relatorio_cascata (None sem
+        cascata) e caminho_modelo
+    """
+    progresso = progresso or _sem_progresso
+    
+    # 1. Split dos dados
+    progresso({'etapa': 'divisao', 'percentual': 10})
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y,
+        test_size=test_size,
+        random_state=random_state,
+        stratify=y
+    )
+    
+    especie_test = X_test['especie'].copy() if 'especie' in X_test.columns else None
+    
+    # 2. Pré-processamento
+    progresso({'etapa': 'preprocessamento', 'percentual': 20})
+    
+    preprocessadores = criar_preprocessador(X_train)
+    X_train_proc, preprocessadores = aplicar_preprocessamento(
+        X_train, preprocessadores, fit=True
+    )
+    X_test_proc, _ = aplicar_preprocessamento(
+        X_test, preprocessadores, fit=False
+    )
+    
+    # 3. Seleção de features (opcional)
+    if usar_selecao_features:
+        progresso({'etapa': 'selecao_features', 'percentual': 30})
+        
+        features_selecionadas, _ = selecionar_features_importantes(
+            X_train_proc, y_train, n_features=n_features
+        )
+        
+        # O roteamento precisa da coluna de espécie mesmo que ela não seja selecionada
+        if rotear_por_especie and 'especie' not in features_selecionadas:
+            features_selecionadas = list(features_selecionadas) + ['especie']
+        
+        X_train_proc = X_train_proc[features_selecionadas]
+        X_test_proc = X_test_proc[features_selecionadas]
+        feature_names = features_selecionadas
+    
+    # 4. Treinamento (progresso a cada fold da busca e da CV)
+    progresso({'etapa': 'treinamento', 'percentual': 40})
+    
+    modelo, historico = treinar_modelo(
+        X_train_proc, y_train,
+        nome_modelo=nome_modelo,
+        usar_grid_search=usar_grid_search,
+        cv_folds=cv_folds,
+        random_state=random_state,
+        n_jobs=n_jobs,
+        progresso=lambda info: progresso({**info, 'percentual': 50}),
+        rotear_por_especie=rotear_por_especie,
+        min_amostras_rota=min_amostras_rota
+    )
+    
+    if rotear_por_especie:
+        modelo.nomear_especies(preprocessadores)
+    
+    # 4b. Cascata: estágio rápido e limiar calibrados fora do fold (opcional)
+    if usar_cascata:
+        progresso({'etapa': 'cascata', 'percentual': 60})
+        
+        label_encoder = historico.get('label_encoder')
+        modelo = construir_cascata(
+            modelo, X_train_proc,
+            label_encoder.transform(y_train) if label_encoder is not None else y_train,
+            tolerancia=tolerancia_cascata,
+            cv_folds=cv_folds,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+        historico['cascata'] = {'limiar': modelo.limiar, 'tolerancia': tolerancia_cascata}
+    
+    # 5. Avaliação (uma única passada do modelo no teste)
+    progresso({'etapa': 'avaliacao', 'percentual': 70})
+    
+    pontuacao = pontuar_modelo(modelo, X_test_proc, y_test, historico.get('label_encoder'))
+    metricas = avaliar_modelo(modelo, X_test_proc, y_test, pontuacao=pontuacao)
+    intervalos = intervalos_bootstrap(pontuacao, n_bootstrap=1000, random_state=random_state)
+    
+    # 6. Importância de features e curvas ROC
+    progresso({'etapa': 'importancia', 'percentual': 85})
+    
+    df_importancia = obter_importancia_features(modelo, feature_names)
+    df_permutacao, resumo_permutacao = calcular_importancia_permutacao(
+        modelo, X_test_proc, y_test, historico.get('label_encoder'), random_state=random_state
+    )
+    roc_curves = calcular_roc_curves(modelo, X_test_proc, y_test, pontuacao=pontuacao)
+    
+    # Explicação global (|SHAP| por classe, permutação e perfis), salva dentro do artefato
+    fundo = resumir_fundo(X_train_proc)
+    explicacao_global = gerar_explicacao_global(
+        modelo, X_train_proc, y_train, historico.get('label_encoder'),
+        df_permutacao, resumo_permutacao, fundo=fundo, random_state=random_state
+    )
+    
+    # 7. Avaliação por espécie (e por rota, no modelo roteado)
+    if especie_test is not None:
+        metricas_especies = avaliar_por_especie(modelo, X_test_proc, y_test, especie_test, pontuacao=pontuacao)
+    else:
+        metricas_especies = None
+    
+    if rotear_por_especie:
+        modelo_roteado = modelo.pesado if usar_cascata else modelo
+        df_rotas = relatorio_rotas(modelo_roteado, X_test_proc, y_test, historico.get('label_encoder'))
+    else:
+        df_rotas = None
+    
+    if usar_cascata:
+        info_cascata = relatorio_cascata(modelo, X_test_proc, y_test, historico.get('label_encoder'))
+    else:
+        info_cascata = None
+    
+    # 8. Estado para atualizações incrementais (warm start)
+    historico = iniciar_estado_incremental(X_train_proc, y_train, historico)
+    
+    # 9. Persistência: artefato em models/ + registro + cache de treinos
+    progresso({'etapa': 'salvando', 'percentual': 95})
+    
+    sufixo_rota = ('_por_especie' if rotear_por_especie else '') + ('_cascata' if usar_cascata else '')
+    nome_arquivo = f"modelo_{nome_modelo.replace(' ', '_').lower()}{sufixo_rota}_{datetime.now():%Y%m%d_%H%M%S}"
+    caminho_modelo = salvar_modelo(
+        modelo, preprocessadores, feature_names, caminho_base=f'models/{nome_arquivo}',
+        explicacao_global=explicacao_global
+    )
+    salvar_fundo(caminho_modelo, fundo)
+    salvar_importancia_permutacao(caminho_modelo, df_permutacao, resumo_permutacao)
+    indice_casos = IndiceCasos(X_train_proc, y_train, ids=X_train.index)
+    salvar_indice_casos(caminho_modelo, indice_casos)
+    registrar_modelo(caminho_modelo, {
+        'origem': 'Treinar Modelo',
+        'modelo': f"{nome_modelo} por espécie" if rotear_por_especie else nome_modelo,
+        'accuracy': metricas['accuracy'],
+        'f1_macro': metricas['f1_macro'],
+        'n_treino': len(X_train),
+        'n_features': len(feature_names)
+    })
+    
+    resultado = {
+        'modelo': modelo,
+        'preprocessadores': preprocessadores,
+        'feature_names': feature_names,
+        'historico': historico,
+        'metricas': metricas,
+        'intervalos': intervalos,
+        'df_importancia': df_importancia,
+        'df_importancia_permutacao': df_permutacao,
+        'resumo_importancia_permutacao': resumo_permutacao,
+        'indice_casos': indice_casos,
+        'explicacao_global': explicacao_global,
+        'roc_curves': roc_curves,
+        'metricas_especies': metricas_especies,
+        'relatorio_rotas': df_rotas,
+        'relatorio_cascata': info_cascata,
+        'caminho_modelo': caminho_modelo
+    }
+    
+    if chave_cache is not None:
+        CacheTreino().guardar(chave_cache, resultado)
+    
+    return resultado
+
+
+def treinar_gradient_boosting(df, use_advanced_features=True, use_feature_selection=True,
+                              test_size=0.2, use_hyperparameter_tuning=True, cv_folds=5,
+                              random_state=42, gerar_compacto=False, latencia_max_ms=None,
+                              tamanho_max_mb=None, tolerancia_acuracia=0.01, n_jobs=-1,
+                              motor='exato', progresso=None):
+    """
+    Treino do GradientBoosting do app gerencial (models/gb_optimized_model.pkl)
+    
+    Args:
+        df: DataFrame com o histórico de casos (coluna diagnostico)
+        use_advanced_features: Cria features derivadas de idade e sintomas
+        use_feature_selection: Mantém as 30 melhores features (SelectKBest)
+        test_size: Fração de teste
+        use_hyperparameter_tuning: Usa RandomizedSearchCV
+        cv_folds: Número de folds
+        random_state: Seed
+        gerar_compacto: Gera também a versão compacta (vetlib.compression)
+        latencia_max_ms, tamanho_max_mb, tolerancia_acuracia: Orçamento da compressão
+        n_jobs: Núcleos do job (-1 = todos os reservados ao job pela fila, ver vetlib.jobs)
+        motor: 'exato' (GradientBoosting) ou 'histograma' (HistGradientBoosting)
+        progresso: Callback de progresso (ver vetlib.jobs)
+    
+    Returns:
+        dict com accuracy, cv_mean, cv_std, caminho_modelo e, se gerar_compacto,
+        relatorio_compressao e caminho_compacto
+    """
+    progresso = progresso or _sem_progresso
+    
+    progresso({'etapa': 'preparacao', 'percentual': 5})
+    
+    # Preparar dados
+    df_ml = df.copy()
+    
+    # Codificação
+    le_especie = LabelEncoder()
+    le_sexo = LabelEncoder()
+    le_diagnostico = LabelEncoder()
+    
+    if 'especie' in df_ml.columns:
+        df_ml['especie_encoded'] = le_especie.fit_transform(df_ml['especie'])
+    if 'sexo' in df_ml.columns:
+        df_ml['sexo_encoded'] = le_sexo.fit_transform(df_ml['sexo'])
+    df_ml['diagnostico_encoded'] = le_diagnostico.fit_transform(df_ml['diagnostico'])
+    
+    # Feature engineering
+    if use_advanced_features:
+        # Criar features derivadas
+        if 'idade_anos' in df_ml.columns:
+            df_ml['idade_categoria'] = pd.cut(df_ml['idade_anos'], bins=[0, 1, 3, 7, 12, 100], labels=[0, 1, 2, 3, 4])
+            df_ml['idade_senior'] = (df_ml['idade_anos'] > 7).astype(int)
+        
+        # Criar features de sintomas
+        sintoma_cols = [col for col in df_ml.columns if col in ['febre', 'apatia', 'perda_peso', 'vomito', 'diarreia', 'tosse', 'letargia', 'feridas_cutaneas', 'poliuria', 'polidipsia']]
+        if sintoma_cols:
+            df_ml['total_sintomas'] = df_ml[sintoma_cols].sum(axis=1)
+    
+    # Selecionar features numéricas
+    numeric_cols = df_ml.select_dtypes(include=[np.number]).columns.tolist()
+    if 'diagnostico_encoded' in numeric_cols:
+        numeric_cols.remove('diagnostico_encoded')
+    
+    X = preencher_faltantes(df_ml[numeric_cols], motor)
+    y = df_ml['diagnostico_encoded']
+    
+    # Feature selection
+    if use_feature_selection:
+        from sklearn.feature_selection import SelectKBest, f_classif
+        k_best = min(30, X.shape[1])
+        selector = SelectKBest(score_func=f_classif, k=k_best)
+        selector.fit(np.nan_to_num(X.to_numpy(dtype=float)), y)
+        X = selecionar_colunas(selector, X)
+    
+    # Dividir dados
+    progresso({'etapa': 'divisao', 'percentual': 10})
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+    
+    # Escalar
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # Configurar modelo (o motor exato mantém o ajuste completo, sem parada antecipada)
+    gb_params = dict(PARAMETROS_PADRAO[motor])
+    if motor == 'exato':
+        del gb_params['max_features']
+    early_stopping = motor == 'histograma'
+    
+    # Otimização de hiperparâmetros
+    if use_hyperparameter_tuning:
+        param_grid = GRIDS_BUSCA[motor]
+        n_iter = 15
+        
+        gb_base = criar_boosting(motor, early_stopping=early_stopping, random_state=random_state)
+        with progresso_por_fold(
+            'accuracy', lambda info: progresso({**info, 'percentual': 30}), 'busca', n_iter, cv_folds, n_jobs
+        ) as scoring:
+            random_search = RandomizedSearchCV(
+                gb_base, param_grid, n_iter=n_iter, cv=cv_folds, scoring=scoring,
+                random_state=random_state, n_jobs=n_jobs
+            )
+            random_search.fit(X_train_scaled, y_train)
+        gb_params.update(random_search.best_params_)
+    
+    # Treinar modelo final
+    progresso({'etapa': 'ajuste', 'percentual': 60})
+    
+    gb_model = criar_boosting(motor, early_stopping=early_stopping, random_state=random_state, **gb_params)
+    gb_model.fit(X_train_scaled, y_train)
+    
+    # Predições
+    y_pred = gb_model.predict(X_test_scaled)
+    accuracy = accuracy_score(y_test, y_pred)
+    
+    # Validação cruzada
+    with progresso_por_fold(
+        'accuracy', lambda info: progresso({**info, 'percentual': 75}), 'validacao_cruzada', 1, cv_folds, n_jobs
+    ) as scoring:
+        cv_scores = cross_val_score(
+            gb_model, X_train_scaled, y_train, cv=cv_folds, n_jobs=n_jobs, scoring=scoring
+        )
+    cv_mean = cv_scores.mean()
+    cv_std = cv_scores.std()
+    
+    # Salvar modelo
+    progresso({'etapa': 'salvando', 'percentual': 90})
+    
+    model_data = {
+        'model': gb_model,
+        'scaler': scaler,
+        'le_diagnostico': le_diagnostico,
+        'le_especie': le_especie,
+        'le_sexo': le_sexo,
+        'accuracy': accuracy,
+        'cv_mean': cv_mean,
+        'cv_std': cv_std,
+        'timestamp': datetime.now().isoformat(),
+        'training_samples': len(X_train),
+        'test_samples': len(X_test),
+        'features_used': numeric_cols[:X.shape[1]] if use_feature_selection else numeric_cols
+    }
+    
+    model_path = Path("models")
+    model_path.mkdir(exist_ok=True)
+    caminho_modelo = model_path / "gb_optimized_model.pkl"
+    joblib.dump(model_data, caminho_modelo)
+    registrar_modelo(caminho_modelo, {
+        'origem': 'App Gerencial',
+        'modelo': 'Hist Gradient Boosting' if motor == 'histograma' else 'Gradient Boosting',
+        'accuracy': accuracy,
+        'cv_mean': cv_mean,
+        'n_treino': len(X_train)
+    })
+    
+    resultado = {
+        'accuracy': accuracy,
+        'cv_mean': cv_mean,
+        'cv_std': cv_std,
+        'caminho_modelo': str(caminho_modelo)
+    }
+    
+    # Versão compacta dentro do orçamento
+    if gerar_compacto:
+        progresso({'etapa': 'compressao', 'percentual': 95})
+        
+        modelo_compacto, relatorio = comprimir_modelo(
+            gb_model, X_train_scaled, y_train, X_test_scaled, y_test,
+            latencia_max_ms=latencia_max_ms, tamanho_max_mb=tamanho_max_mb,
+            tolerancia_acuracia=tolerancia_acuracia, random_state=random_state,
+            verbose=False
+        )
+        
+        resultado['relatorio_compressao'] = relatorio
+        resultado['caminho_compacto'] = None
+        
+        if modelo_compacto is not None:
+            caminho_compacto = salvar_modelo_compacto(caminho_modelo, modelo_compacto, relatorio)
+            registrar_modelo(caminho_compacto, {
+                'origem': 'App Gerencial (compacto)',
+                'modelo': type(modelo_compacto).__name__,
+                'accuracy': relatorio['escolhido']['accuracy_teste']
+            })
+            resultado['caminho_compacto'] = str(caminho_compacto)
+    
+    return resultado
@@ -0,0 +1,488 @@
+"""
+Atribuição local nativa para ensembles de árvores (sem depender do shap)
+
+Lê os arrays das árvores treinadas (filhos, feature, limiar, cobertura e
+valor das folhas) de RandomForest/ExtraTrees, GradientBoosting e
+HistGradientBoosting e calcula a contribuição de cada feature para cada caso
+só com NumPy:
+
+- 'saabas': percorre o caminho do caso em todas as árvores ao mesmo tempo e
+  credita a cada feature a variação do valor esperado do nó ao atravessar
+  uma divisão nela. Custa o mesmo que uma predição.
+- 'treeshap': valores SHAP exatos (versão dependente do caminho, a mesma do
+  shap.TreeExplainer sem dados de fundo). Cada folha vira um caminho com
+  suas features únicas; a fração de cobertura (z) e a condição do caso (o)
+  de cada feature formam o polinômio de Shapley, calculado de uma vez para
+  todos os caminhos de mesmo comprimento.
+
+As contribuições ficam no espaço do próprio modelo, como no TreeExplainer:
+probabilidades nas florestas e margem (log-odds) no boosting. Em qualquer
+modo, valor_esperado + soma das contribuições = saída do modelo.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+METODOS_ATRIBUICAO = ('saabas', 'treeshap')
+
+_FLORESTAS = ('RandomForestClassifier', 'ExtraTreesClassifier', 'DecisionTreeClassifier')
+_BOOSTING = ('GradientBoostingClassifier',)
+_BOOSTING_HIST = ('HistGradientBoostingClassifier',)
+
+# Elementos (amostras x árvores) por bloco no Saabas e
+# (amostras x caminhos x features do caminho) no TreeSHAP
+_ELEMENTOS_POR_BLOCO_SAABAS = 2 ** 18
+_ELEMENTOS_POR_BLOCO = 2 ** 14
+
+
+def suporta_atribuicao(modelo):
+    """Indica se o motor nativo sabe explicar o modelo"""
+    nome_classe = type(modelo).__name__
+    
+    if nome_classe in _FLORESTAS:
+        return getattr(modelo, 'n_outputs_', 1) == 1
+    
+    if nome_classe in _BOOSTING:
+        init = getattr(modelo, 'init_', None)
+        return init == 'zero' or type(init).__name__ == 'DummyClassifier'
+    
+    if nome_classe in _BOOSTING_HIST:
+        return hasattr(modelo, '_predictors') and not any(
+            preditor.nodes['is_categorical'].any()
+            for iteracao in modelo._predictors for preditor in iteracao
+        )
+    
+    return False
+
+
+def _arvore_sklearn(arvore, valores_folhas, coluna=None, n_saidas=None):
+    """
+    Arrays de uma árvore do sklearn
+    
+    Args:
+        arvore: estimador.tree_
+        valores_folhas: Valores no espaço de saída, (n_nos, n_saidas) ou, no
+            boosting, (n_nos,) da única saída que a árvore alimenta
+        coluna: Saída alimentada pela árvore (boosting) ou None (todas)
+        n_saidas: Número de saídas do modelo (boosting)
+    """
+    if coluna is not None:
+        valores = np.zeros((arvore.node_count, n_saidas))
+        valores[:, coluna] = valores_folhas
+        valores_folhas = valores
+    
+    return {
+        'esquerda': arvore.children_left,
+        'direita': arvore.children_right,
+        'feature': arvore.feature,
+        'limiar': arvore.threshold,
+        'nan_esquerda': arvore.missing_go_to_left.astype(bool),
+        'cobertura': arvore.weighted_n_node_samples,
+        'valor': valores_folhas,
+        'coluna': coluna
+    }
+
+
+def _arvore_hist(preditor, coluna, n_saidas):
+    """Arrays de uma árvore do HistGradientBoosting (folhas já com a taxa de aprendizado)"""
+    nos = preditor.nodes
+    folha = nos['is_leaf'].astype(bool)
+    
+    valores = np.zeros((len(nos), n_saidas))
+    valores[:, coluna] = np.where(folha, nos['value'], 0.0)
+    
+    return {
+        'esquerda': np.where(folha, -1, nos['left'].astype(np.intp)),
+        'direita': np.where(folha, -1, nos['right'].astype(np.intp)),
+        'feature': np.where(folha, -2, nos['feature_idx'].astype(np.intp)),
+        'limiar': nos['num_threshold'],
+        'nan_esquerda': nos['missing_go_to_left'].astype(bool),
+        'cobertura': nos['count'].astype(np.float64),
+        'valor': valores,
+        'coluna': coluna
+    }
+
+
+def _extrair_arvores(modelo):
+    """
+    Árvores do modelo, valor base da saída e tipo de entrada
+    
+    Returns:
+        (lista de arrays por árvore, base (n_saidas,), dtype usado nas comparações)
+    """
+    nome_classe = type(modelo).__name__
+    
+    if nome_classe in _FLORESTAS:
+        estimadores = modelo.estimators_ if hasattr(modelo, 'estimators_') else [modelo]
+        n_classes = len(modelo.classes_)
+        arvores = []
+        for estimador in estimadores:
+            arvore = estimador.tree_
+            proba = arvore.value[:, 0, :n_classes]
+            normalizador = proba.sum(axis=1)[:, None]
+            normalizador[normalizador == 0.0] = 1.0
+            arvores.append(_arvore_sklearn(arvore, proba / normalizador / len(estimadores)))
+        return arvores, np.zeros(n_classes), np.float32
+    
+    if nome_classe in _BOOSTING:
+        n_saidas = modelo.estimators_.shape[1]
+        arvores = [
+            _arvore_sklearn(estimador.tree_, modelo.learning_rate * estimador.tree_.value[:, 0, 0], k, n_saidas)
+            for estagio in modelo.estimators_ for k, estimador in enumerate(estagio)
+        ]
+        X_zero = np.zeros((1, modelo.n_features_in_), dtype=np.float32)
+        return arvores, modelo._raw_predict_init(X_zero)[0], np.float32
+    
+    n_saidas = modelo.n_trees_per_iteration_
+    arvores = [
+        _arvore_hist(preditor, k, n_saidas)
+        for iteracao in modelo._predictors for k, preditor in enumerate(iteracao)
+    ]
+    return arvores, np.asarray(modelo._baseline_prediction, dtype=np.float64).ravel(), np.float64
+
+
+def _valores_esperados(esquerda, direita, cobertura, valor, profundidade):
+    """Valor esperado de cada nó: média das folhas abaixo dele ponderada pela cobertura"""
+    valor = valor.copy()
+    interno = np.flatnonzero(esquerda >= 0)
+    
+    # Profundidade de cada nó, propagada da raiz nível a nível
+    nivel = np.zeros(len(esquerda), dtype=np.intp)
+    for _ in range(profundidade):
+        nivel[esquerda[interno]] = nivel[interno] + 1
+        nivel[direita[interno]] = nivel[interno] + 1
+    
+    # Das folhas para a raiz: E[nó] = (c_esq E[esq] + c_dir E[dir]) / (c_esq + c_dir)
+    for n in range(profundidade - 1, -1, -1):
+        nos = interno[nivel[interno] == n]
+        c_esq = cobertura[esquerda[nos]][:, None]
+        c_dir = cobertura[direita[nos]][:, None]
+        valor[nos] = (c_esq * valor[esquerda[nos]] + c_dir * valor[direita[nos]]) / (c_esq + c_dir)
+    
+    return valor, nivel
+
+
+def _pesos_shapley(d):
+    """Peso de Shapley k!(d-k-1)!/d! de cada tamanho k = 0..d-1 de coalizão"""
+    return np.array([
+        math.factorial(k) * math.factorial(d - k - 1) / math.factorial(d) for k in range(d)
+    ])
+
+
+class AtribuidorArvores:
+    """
+    Contribuições locais por feature de um ensemble de árvores
+    
+    Use criar_atribuidor(modelo) para criar a partir de um modelo treinado.
+    
+    Args:
+        arvores: Arrays de cada árvore (ver _extrair_arvores)
+        base: Valor base da saída (prior do boosting ou zeros)
+        classes: Classes do modelo
+        n_features: Número de features de entrada
+        dtype: Tipo para o qual a entrada é convertida antes das comparações
+        feature_names: Nomes das features no treino (opcional)
+    """
+    
+    def __init__(self, arvores, base, classes, n_features, dtype=np.float32, feature_names=None):
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.dtype = dtype
+        
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+        
+        n_nos = np.array([len(arvore['esquerda']) for arvore in arvores])
+        deslocamentos = np.concatenate([[0], np.cumsum(n_nos)[:-1]])
+        
+        # Índices globais de nós; folhas continuam com filho -1
+        esquerda = np.concatenate([
+            np.where(a['esquerda'] >= 0, a['esquerda'] + d, -1) for a, d in zip(arvores, deslocamentos)
+        ])
+        direita = np.concatenate([
+            np.where(a['direita'] >= 0, a['direita'] + d, -1) for a, d in zip(arvores, deslocamentos)
+        ])
+        folha = esquerda < 0
+        self.raizes = deslocamentos.astype(np.intp)
+        self.feature = np.where(folha, 0, np.concatenate([a['feature'] for a in arvores])).astype(np.intp)
+        self.limiar = np.concatenate([a['limiar'] for a in arvores]).astype(np.float64)
+        self.nan_esquerda = np.concatenate([a['nan_esquerda'] for a in arvores]) & ~folha
+        cobertura = np.concatenate([a['cobertura'] for a in arvores]).astype(np.float64)
+        
+        # Profundidade máxima: no pior caso a árvore é uma corrente
+        self.profundidade = 0
+        nos = self.raizes.copy()
+        while True:
+            internos = nos[esquerda[nos] >= 0]
+            if len(internos) == 0:
+                break
+            self.profundidade += 1
+            nos = np.concatenate([esquerda[internos], direita[internos]])
+        
+        self.valor, _ = _valores_esperados(
+            esquerda, direita, cobertura,
+            np.concatenate([a['valor'] for a in arvores]).astype(np.float64),
+            self.profundidade
+        )
+        self.n_saidas = self.valor.shape[1]
+        self.valor_esperado_raw = base + self.valor[self.raizes].sum(axis=0)
+        
+        # Aresta que chega em cada nó: variação do valor esperado e feature da divisão (raiz: zero)
+        interno = np.flatnonzero(~folha)
+        self.delta = np.zeros_like(self.valor)
+        self.feature_pai = np.zeros(len(esquerda), dtype=np.intp)
+        for filho in (esquerda[interno], direita[interno]):
+            self.delta[filho] = self.valor[filho] - self.valor[interno]
+            self.feature_pai[filho] = self.feature[interno]
+        
+        # Saída alimentada por cada nó quando cada árvore tem uma só (boosting)
+        self.coluna = None
+        if all(a['coluna'] is not None for a in arvores):
+            self.coluna = np.repeat([a['coluna'] for a in arvores], n_nos)
+        
+        # Filhos intercalados: próximo nó = filhos[2*nó + foi_para_esquerda]; folhas apontam para si
+        indices = np.arange(len(esquerda))
+        self.filhos = np.empty(2 * len(esquerda), dtype=np.intp)
+        self.filhos[0::2] = np.where(folha, indices, direita)
+        self.filhos[1::2] = np.where(folha, indices, esquerda)
+        
+        self._caminhos = self._montar_caminhos(esquerda, direita, cobertura, folha)
+    
+    def _montar_caminhos(self, esquerda, direita, cobertura, folha):
+        """
+        Caminhos raiz-folha com features únicas, agrupados pelo número de features
+        
+        Para cada folha e feature do caminho: z = produto das frações de
+        cobertura das divisões nessa feature; o intervalo (inferior, superior]
+        que o caso precisa respeitar; e se um valor ausente seguiria o caminho.
+        """
+        pai = np.full(len(esquerda), -1, dtype=np.intp)
+        interno = np.flatnonzero(~folha)
+        pai[esquerda[interno]] = interno
+        pai[direita[interno]] = interno
+        
+        folhas = np.flatnonzero(folha)
+        atual = folhas.copy()
+        passos = []
+        while True:
+            ativos = np.flatnonzero(pai[atual] >= 0)
+            if len(ativos) == 0:
+                break
+            no = atual[ativos]
+            divisao = pai[no]
+            foi_esquerda = esquerda[divisao] == no
+            passos.append(pd.DataFrame({
+                'folha': ativos,
+                'feature': self.feature[divisao],
+                'z': cobertura[no] / cobertura[divisao],
+                'inferior': np.where(foi_esquerda, -np.inf, self.limiar[divisao]),
+                'superior': np.where(foi_esquerda, self.limiar[divisao], np.inf),
+                'nan_segue': foi_esquerda == self.nan_esquerda[divisao]
+            }))
+            atual[ativos] = divisao
+        
+        if not passos:
+            return []
+        
+        elementos = pd.concat(passos, ignore_index=True).groupby(['folha', 'feature'], sort=True).agg(
+            z=('z', 'prod'), inferior=('inferior', 'max'), superior=('superior', 'min'), nan_segue=('nan_segue', 'all')
+        ).reset_index()
+        
+        tamanhos = elementos.groupby('folha').size()
+        elementos['d'] = elementos['folha'].map(tamanhos)
+        
+        grupos = []
+        for d, grupo in elementos.groupby('d', sort=True):
+            n_caminhos = len(grupo) // d
+            forma = (n_caminhos, d)
+            features = grupo['feature'].to_numpy().reshape(forma)
+            valor_folha = self.valor[folhas[grupo['folha'].to_numpy()[::d]]]
+            
+            grupos.append({
+                'd': d,
+                'features': features,
+                'z': grupo['z'].to_numpy().reshape(forma),
+                'inferior': grupo['inferior'].to_numpy().reshape(forma),
+                'superior': grupo['superior'].to_numpy().reshape(forma),
+                'nan_segue': grupo['nan_segue'].to_numpy().reshape(forma),
+                'valor_folha': valor_folha,
+                'saidas': np.flatnonzero(np.abs(valor_folha).sum(axis=0) > 0),
+                'pesos': _pesos_shapley(d)
+            })
+        
+        return grupos
+    
+    def _preparar_entrada(self, X):
+        """Converte para o dtype das comparações do modelo, respeitando os nomes das features"""
+        if isinstance(X, pd.DataFrame):
+            nomes = getattr(self, 'feature_names_in_', None)
+            if nomes is not None and not np.array_equal(X.columns, nomes):
+                X = X[nomes]
+            X = X.to_numpy()
+        
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X tem {X.shape[1]} features, mas o modelo espera {self.n_features_in_}"
+            )
+        
+        return X
+    
+    def _saabas(self, X):
+        """Variação do valor esperado a cada divisão do caminho, creditada à feature da divisão"""
+        n_amostras, n_features = X.shape
+        n_arvores = len(self.raizes)
+        X_plano = X.ravel()
+        
+        nos = np.repeat(self.raizes, n_amostras)
+        inicio_linha = np.tile(np.arange(0, n_amostras * n_features, n_features), n_arvores)
+        tem_nan = bool(np.isnan(X_plano).any())
+        
+        # Só a travessia no laço; as contribuições são somadas de uma vez no fim
+        caminho = np.empty((self.profundidade, len(nos)), dtype=np.intp)
+        for passo in range(self.profundidade):
+            valor = X_plano[inicio_linha + self.feature[nos]]
+            vai_esquerda = valor <= self.limiar[nos]
+            
+            if tem_nan:
+                vai_esquerda |= np.isnan(valor) & self.nan_esquerda[nos]
+            
+            nos = self.filhos[2 * nos + vai_esquerda]
+            caminho[passo] = nos
+        
+        # Folhas apontam para si: cada nó do caminho conta uma única vez
+        novo = np.ones(caminho.shape, dtype=bool)
+        novo[1:] = caminho[1:] != caminho[:-1]
+        nos = caminho[novo]
+        linhas = np.broadcast_to(inicio_linha, caminho.shape)[novo]
+        
+        posicao = (linhas + self.feature_pai[nos]) * self.n_saidas
+        if self.coluna is not None:
+            # Boosting: cada árvore alimenta uma única saída
+            indices, pesos = posicao + self.coluna[nos], self.delta[nos, self.coluna[nos]]
+        else:
+            indices = (posicao[:, None] + np.arange(self.n_saidas)).ravel()
+            pesos = self.delta[nos].ravel()
+        
+        contribuicoes = np.bincount(indices, weights=pesos, minlength=n_amostras * n_features * self.n_saidas)
+        
+        return contribuicoes.reshape(n_amostras, n_features, self.n_saidas)
+    
+    def _treeshap_grupo(self, grupo, X, contribuicoes):
+        """SHAP exato dos caminhos com d features únicas, somado em contribuicoes"""
+        d = grupo['d']
+        z = grupo['z']
+        valores_x = X[:, grupo['features']]
+        
+        # o = 1 se o caso segue o caminho em todas as divisões daquela feature
+        o = (valores_x > grupo['inferior']) & (valores_x <= grupo['superior'])
+        o = np.where(np.isnan(valores_x), grupo['nan_segue'], o).astype(np.float64)
+        
+        # Coeficientes de prod_j (z_j + o_j t): coeficiente k soma as coalizões de tamanho k
+        q = np.zeros(o.shape[:2] + (d + 1,))
+        q[..., 0] = 1.0
+        for j in range(d):
+            anterior = q.copy()
+            q *= z[:, j, None]
+            q[..., 1:] += o[..., j, None] * anterior[..., :-1]
+        
+        # Tirar o fator da feature i: se o_i = 0, dividir por z_i;
+        # se o_i = 1, divisão sintética por (z_i + t), do maior grau para o menor
+        pesos = grupo['pesos']
+        soma_sem_i = (q[..., :d] @ pesos)[..., None] / z
+        
+        r = np.broadcast_to(q[..., d, None], o.shape)
+        soma_com_i = r * pesos[d - 1]
+        for k in range(d - 1, 0, -1):
+            r = q[..., k, None] - z * r
+            soma_com_i = soma_com_i + r * pesos[k - 1]
+        
+        phi = (o - z) * np.where(o > 0, soma_com_i, soma_sem_i)
+        
+        # Soma por feature dos elementos de todos os caminhos, saída a saída
+        n_features = self.n_features_in_
+        indices = (np.arange(len(X))[:, None, None] * n_features + grupo['features']).ravel()
+        for saida in grupo['saidas']:
+            ponderado = phi * grupo['valor_folha'][:, saida, None]
+            contribuicoes[:, :, saida] += np.bincount(
+                indices, weights=ponderado.ravel(), minlength=len(X) * n_features
+            ).reshape(len(X), n_features)
+    
+    def _treeshap(self, X):
+        contribuicoes = np.zeros((len(X), self.n_features_in_, self.n_saidas))
+        X = X.astype(np.float64)
+        
+        for grupo in self._caminhos:
+            tamanho_bloco = max(1, _ELEMENTOS_POR_BLOCO // grupo['features'].size)
+            for inicio in range(0, len(X), tamanho_bloco):
+                fatia = slice(inicio, inicio + tamanho_bloco)
+                self._treeshap_grupo(grupo, X[fatia], contribuicoes[fatia])
+        
+        return contribuicoes
+    
+    def _expandir_binario(self, valores):
+        """Boosting binário tem uma saída (log-odds da classe positiva): a negativa é o simétrico"""
+        if self.n_saidas == 1 and len(self.classes_) == 2:
+            return np.concatenate([-valores, valores], axis=-1)
+        return valores
+    
+    @property
+    def valor_esperado(self):
+        """Saída média do modelo no treino, por classe"""
+        return self._expandir_binario(self.valor_esperado_raw)
+    
+    def contribuicoes(self, X, metodo='saabas'):
+        """
+        Contribuição de cada feature para cada caso e classe
+        
+        Args:
+            X: Features já pré-processadas (DataFrame ou array)
+            metodo: 'saabas' (caminho percorrido) ou 'treeshap' (SHAP exato)
+        
+        Returns:
+            Array (n_amostras, n_features, n_classes); valor_esperado + soma
+            nas features = saída do modelo (probabilidade ou margem)
+        """
+        if metodo not in METODOS_ATRIBUICAO:
+            raise ValueError(f"Método '{metodo}' não disponível (opções: {', '.join(METODOS_ATRIBUICAO)})")
+        
+        X = self._preparar_entrada(X)
+        
+        if metodo == 'treeshap':
+            valores = self._treeshap(X)
+        else:
+            tamanho_bloco = max(1, _ELEMENTOS_POR_BLOCO_SAABAS // len(self.raizes))
+            valores = np.concatenate([
+                self._saabas(X[inicio:inicio + tamanho_bloco])
+                for inicio in range(0, max(len(X), 1), tamanho_bloco)
+            ])
+        
+        return self._expandir_binario(valores)
+
+
+def criar_atribuidor(modelo):
+    """
+    Extrai as árvores de um modelo treinado para o motor de atribuição
+    
+    Args:
+        modelo: RandomForest, ExtraTrees, DecisionTree, GradientBoosting ou
+            HistGradientBoosting treinado (ver suporta_atribuicao)
+    
+    Returns:
+        AtribuidorArvores
+    """
+    if not suporta_atribuicao(modelo):
+        raise ValueError(f"Modelo {type(modelo).__name__} não suportado pelo motor de atribuição")
+    
+    arvores, base, dtype = _extrair_arvores(modelo)
+    
+    return AtribuidorArvores(
+        arvores, base, modelo.classes_, modelo.n_features_in_, dtype=dtype,
+        feature_names=getattr(modelo, 'feature_names_in_', None)
+    )